@@ -0,0 +1,84 @@
+"""
+Bulk-generate practice quizzes for many materials (admin CLI)
+
+Examples:
+    python bulk_generate_quizzes.py --subject Matematica --grade 10
+    python bulk_generate_quizzes.py --professor-id 2 --concurrency 8 --rpm 60
+    python bulk_generate_quizzes.py --resume 3 --retry-failed
+"""
+import argparse
+import asyncio
+import os
+import sys
+
+# Change to the script's directory so the default sqlite path resolves
+script_dir = os.path.dirname(os.path.abspath(__file__))
+os.chdir(script_dir)
+
+from src.config.database import Base, SessionLocal, engine
+from src.config.settings import settings
+import src.models  # noqa: F401 - register all tables
+from src.services.bulk_quiz_generation_service import create_bulk_job, run_bulk_job
+
+
+def print_outcome(outcome):
+    """Print one per-material result as soon as it is known"""
+    if outcome["status"] == "succeeded":
+        print(f"✅ Material {outcome['material_id']}: quiz {outcome['quiz_id']}")
+    else:
+        print(f"❌ Material {outcome['material_id']}: {outcome['error']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk AI quiz generation for materials")
+    parser.add_argument("--subject", help="Filter materials by subject")
+    parser.add_argument("--grade", type=int, choices=[9, 10, 11, 12], help="Filter materials by grade level")
+    parser.add_argument("--professor-id", type=int, help="Filter materials by owner professor")
+    parser.add_argument("--concurrency", type=int, default=settings.BULK_GENERATION_CONCURRENCY,
+                        help="Maximum parallel generation requests")
+    parser.add_argument("--rpm", type=int, default=settings.BULK_GENERATION_RPM,
+                        help="Maximum Gemini requests per minute")
+    parser.add_argument("--resume", type=int, metavar="JOB_ID", help="Resume an interrupted job")
+    parser.add_argument("--retry-failed", action="store_true", help="When resuming, also retry failed materials")
+    args = parser.parse_args()
+
+    # Create missing tables only - never drop existing data
+    Base.metadata.create_all(bind=engine)
+
+    if args.resume:
+        job_id = args.resume
+    else:
+        db = SessionLocal()
+        try:
+            job = create_bulk_job(
+                db,
+                subject=args.subject,
+                grade_level=args.grade,
+                professor_id=args.professor_id,
+                concurrency=args.concurrency,
+                requests_per_minute=args.rpm
+            )
+            job_id = job.id
+            total = len(job.items)
+        finally:
+            db.close()
+
+        if total == 0:
+            print("ℹ️  No materials match the filter")
+            return
+        print(f"📦 Job {job_id}: {total} materials")
+
+    try:
+        summary = asyncio.run(run_bulk_job(job_id, retry_failed=args.retry_failed, on_item_done=print_outcome))
+    except KeyboardInterrupt:
+        print(f"\n🛑 Interrupted. Resume with: python bulk_generate_quizzes.py --resume {job_id}")
+        sys.exit(1)
+
+    print("-" * 50)
+    print(f"Job {job_id}: {summary['succeeded']} succeeded, {summary['failed']} failed, {summary['pending']} pending")
+    if summary["failed"]:
+        print(f"Retry failures with: python bulk_generate_quizzes.py --resume {job_id} --retry-failed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""
+Offline LLM stand-in server for load testing
+
+Serves Gemini- and OpenAI-compatible endpoints backed by the replay provider,
+so the real HTTP clients can be benchmarked end to end without quota:
+
+    python llm_standin_server.py --port 8100 --latency lognormal:800,0.5 --failure-rate 0.02
+
+Then start the backend with:
+    GEMINI_BASE_URL=http://localhost:8100/v1beta GEMINI_API_KEY=offline
+    OPENAI_BASE_URL=http://localhost:8100/v1 OPENAI_API_KEY=offline
+"""
+import argparse
+import json
+import os
+
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import JSONResponse, StreamingResponse
+
+# Change to the script's directory so the default recordings path resolves
+script_dir = os.path.dirname(os.path.abspath(__file__))
+os.chdir(script_dir)
+
+from src.services.llm_client import LLMError, LLMRequest
+from src.services.llm_replay import ReplayLLMClient, infer_operation
+
+app = FastAPI(title="RoEdu LLM stand-in")
+replay_client: ReplayLLMClient = None
+
+
+async def _replay(prompt: str, system=None):
+    request = LLMRequest(prompt=prompt, operation=infer_operation(prompt), system=system)
+    try:
+        return await replay_client._generate(request)
+    except LLMError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+
+async def _replay_stream(prompt: str, system, to_event, done_marker=None):
+    """SSE response streaming replay chunks (failures surface before the first byte)"""
+    request = LLMRequest(prompt=prompt, operation=infer_operation(prompt), system=system)
+    chunks = replay_client._stream(request)
+    try:
+        first = await chunks.__anext__()
+    except StopAsyncIteration:
+        first = ""
+    except LLMError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+    async def events():
+        yield f"data: {json.dumps(to_event(first), ensure_ascii=False)}\n\n"
+        async for chunk in chunks:
+            yield f"data: {json.dumps(to_event(chunk), ensure_ascii=False)}\n\n"
+        if done_marker:
+            yield f"data: {done_marker}\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+
+@app.post("/v1beta/models/{model_action}")
+async def gemini_generate_content(model_action: str, body: dict):
+    """Gemini generateContent / streamGenerateContent"""
+    if not model_action.endswith((":generateContent", ":streamGenerateContent")):
+        raise HTTPException(status_code=404, detail="Unsupported action")
+
+    prompt = "".join(part.get("text", "") for content in body.get("contents", []) for part in content.get("parts", []))
+    system = "".join(part.get("text", "") for part in body.get("systemInstruction", {}).get("parts", [])) or None
+
+    if model_action.endswith(":streamGenerateContent"):
+        return await _replay_stream(prompt, system, lambda chunk: {
+            "candidates": [{"content": {"role": "model", "parts": [{"text": chunk}]}}]
+        })
+
+    response = await _replay(prompt, system)
+
+    return JSONResponse({
+        "candidates": [{"content": {"role": "model", "parts": [{"text": response.text}]}, "finishReason": "STOP"}],
+        "usageMetadata": {
+            "promptTokenCount": response.prompt_tokens,
+            "candidatesTokenCount": response.completion_tokens
+        }
+    })
+
+
+@app.post("/v1/chat/completions")
+async def openai_chat_completions(body: dict):
+    """OpenAI chat completions"""
+    messages = body.get("messages", [])
+    prompt = "\n".join(m["content"] for m in messages if m.get("role") == "user")
+    system = "\n".join(m["content"] for m in messages if m.get("role") == "system") or None
+
+    if body.get("stream"):
+        return await _replay_stream(prompt, system, lambda chunk: {
+            "choices": [{"index": 0, "delta": {"content": chunk}, "finish_reason": None}]
+        }, done_marker="[DONE]")
+
+    response = await _replay(prompt, system)
+
+    return JSONResponse({
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": response.text}, "finish_reason": "stop"}],
+        "usage": {"prompt_tokens": response.prompt_tokens, "completion_tokens": response.completion_tokens}
+    })
+
+
+def main():
+    global replay_client
+    parser = argparse.ArgumentParser(description="Offline LLM stand-in server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--recordings", help="Recordings JSONL file (default LLM_REPLAY_FILE)")
+    parser.add_argument("--latency", help="fixed:MS | uniform:MIN,MAX | lognormal:MEDIAN,SIGMA")
+    parser.add_argument("--failure-rate", type=float, help="Fraction of calls that fail with HTTP 503")
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args()
+
+    replay_client = ReplayLLMClient(
+        recordings_file=args.recordings,
+        record=False,
+        latency=args.latency,
+        failure_rate=args.failure_rate,
+        seed=args.seed
+    )
+
+    import uvicorn
+    uvicorn.run(app, host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
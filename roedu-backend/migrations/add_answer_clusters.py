@@ -0,0 +1,44 @@
+"""
+Add answer cluster columns to ai_evaluation_reports table
+
+This migration adds 'cluster_id' and 'cluster_similarity' columns: near-duplicate
+free-text answers graded with one AI evaluation share a cluster_id
+"""
+
+import sqlite3
+import os
+
+def run_migration():
+    # Path to database
+    db_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'roedu.db')
+    
+    if not os.path.exists(db_path):
+        print("Database not found. Please run the application first to create it.")
+        return
+    
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+    
+    try:
+        # Check if columns already exist
+        cursor.execute("PRAGMA table_info(ai_evaluation_reports)")
+        columns = [column[1] for column in cursor.fetchall()]
+        
+        if 'cluster_id' not in columns:
+            print("Adding 'cluster_id' and 'cluster_similarity' columns to ai_evaluation_reports table...")
+            cursor.execute("ALTER TABLE ai_evaluation_reports ADD COLUMN cluster_id VARCHAR(64)")
+            cursor.execute("ALTER TABLE ai_evaluation_reports ADD COLUMN cluster_similarity FLOAT")
+            cursor.execute("CREATE INDEX IF NOT EXISTS ix_ai_evaluation_reports_cluster_id ON ai_evaluation_reports (cluster_id)")
+            conn.commit()
+            print("✅ Migration completed successfully!")
+        else:
+            print("ℹ️  Column 'cluster_id' already exists. Skipping migration.")
+            
+    except Exception as e:
+        print(f"❌ Error during migration: {e}")
+        conn.rollback()
+    finally:
+        conn.close()
+
+if __name__ == "__main__":
+    run_migration()
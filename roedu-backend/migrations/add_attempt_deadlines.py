@@ -0,0 +1,63 @@
+"""
+Add attempt deadlines
+
+This migration adds a 'deadline_at' column to quiz_attempts (open attempts
+past it are auto-submitted by the deadline sweeper), a partial index on the
+deadlines of open attempts, and sets the deadline of attempts still open
+(started_at + the quiz's time limit, 60 minutes if it has none)
+"""
+
+import sqlite3
+import os
+
+def run_migration():
+    # Path to database
+    db_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'roedu.db')
+    
+    if not os.path.exists(db_path):
+        print("Database not found. Please run the application first to create it.")
+        return
+    
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+    
+    try:
+        # Check if column already exists
+        cursor.execute("PRAGMA table_info(quiz_attempts)")
+        columns = [column[1] for column in cursor.fetchall()]
+        
+        if 'deadline_at' not in columns:
+            print("Adding 'deadline_at' column to quiz_attempts table...")
+            cursor.execute("ALTER TABLE quiz_attempts ADD COLUMN deadline_at DATETIME")
+        else:
+            print("ℹ️  Column 'deadline_at' already exists.")
+        
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS ix_quiz_attempts_open_deadline
+            ON quiz_attempts (deadline_at) WHERE completed_at IS NULL
+        """)
+        
+        cursor.execute("""
+            UPDATE quiz_attempts
+            SET deadline_at = datetime(
+                started_at,
+                '+' || COALESCE(
+                    (SELECT NULLIF(quizzes.time_limit, 0) * 60 FROM quizzes WHERE quizzes.id = quiz_attempts.quiz_id),
+                    3600
+                ) || ' seconds'
+            )
+            WHERE completed_at IS NULL AND deadline_at IS NULL AND started_at IS NOT NULL
+        """)
+        print(f"Set the deadline of {cursor.rowcount} open attempts")
+        
+        conn.commit()
+        print("✅ Migration completed successfully!")
+            
+    except Exception as e:
+        print(f"❌ Error during migration: {e}")
+        conn.rollback()
+    finally:
+        conn.close()
+
+if __name__ == "__main__":
+    run_migration()
@@ -0,0 +1,49 @@
+"""
+Add attempt question scores
+
+This migration creates the 'attempt_question_scores' table (per-question
+scores of each attempt, written when the attempt is scored). Attempts
+submitted before it have no rows and are scored on the fly by the result page.
+"""
+
+import sqlite3
+import os
+
+def run_migration():
+    # Path to database
+    db_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'roedu.db')
+    
+    if not os.path.exists(db_path):
+        print("Database not found. Please run the application first to create it.")
+        return
+    
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+    
+    try:
+        print("Creating 'attempt_question_scores' table (if missing)...")
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS attempt_question_scores (
+                attempt_id INTEGER NOT NULL REFERENCES quiz_attempts(id) ON DELETE CASCADE,
+                question_id INTEGER NOT NULL REFERENCES questions(id) ON DELETE CASCADE,
+                score FLOAT NOT NULL,
+                source VARCHAR(20) NOT NULL,
+                updated_at DATETIME,
+                PRIMARY KEY (attempt_id, question_id)
+            )
+        """)
+        cursor.execute(
+            "CREATE INDEX IF NOT EXISTS ix_attempt_question_scores_question_id ON attempt_question_scores (question_id)"
+        )
+        
+        conn.commit()
+        print("✅ Migration completed successfully!")
+            
+    except Exception as e:
+        print(f"❌ Error during migration: {e}")
+        conn.rollback()
+    finally:
+        conn.close()
+
+if __name__ == "__main__":
+    run_migration()
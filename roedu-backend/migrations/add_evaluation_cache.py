@@ -0,0 +1,61 @@
+"""
+Add the evaluation cache
+
+This migration creates the 'evaluation_cache' table (AI evaluations reused for
+identical free-text answers) and adds a 'cache_hit' column to ai_evaluation_reports
+"""
+
+import sqlite3
+import os
+
+def run_migration():
+    # Path to database
+    db_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'roedu.db')
+    
+    if not os.path.exists(db_path):
+        print("Database not found. Please run the application first to create it.")
+        return
+    
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+    
+    try:
+        print("Creating 'evaluation_cache' table (if missing)...")
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS evaluation_cache (
+                id INTEGER PRIMARY KEY,
+                question_id INTEGER NOT NULL REFERENCES questions(id) ON DELETE CASCADE,
+                criteria_hash VARCHAR(64) NOT NULL,
+                answer_hash VARCHAR(64) NOT NULL,
+                score FLOAT NOT NULL,
+                feedback TEXT,
+                evaluation_metadata TEXT,
+                hit_count INTEGER NOT NULL DEFAULT 0,
+                created_at DATETIME,
+                last_hit_at DATETIME,
+                CONSTRAINT uq_evaluation_cache_key UNIQUE (question_id, criteria_hash, answer_hash)
+            )
+        """)
+        cursor.execute("CREATE INDEX IF NOT EXISTS ix_evaluation_cache_question_id ON evaluation_cache (question_id)")
+        
+        # Check if column already exists
+        cursor.execute("PRAGMA table_info(ai_evaluation_reports)")
+        columns = [column[1] for column in cursor.fetchall()]
+        
+        if 'cache_hit' not in columns:
+            print("Adding 'cache_hit' column to ai_evaluation_reports table...")
+            cursor.execute("ALTER TABLE ai_evaluation_reports ADD COLUMN cache_hit BOOLEAN DEFAULT 0")
+        else:
+            print("ℹ️  Column 'cache_hit' already exists. Skipping.")
+        
+        conn.commit()
+        print("✅ Migration completed successfully!")
+            
+    except Exception as e:
+        print(f"❌ Error during migration: {e}")
+        conn.rollback()
+    finally:
+        conn.close()
+
+if __name__ == "__main__":
+    run_migration()
@@ -0,0 +1,45 @@
+"""
+Add grading claims
+
+This migration adds a 'grading_claimed_at' column to quiz_attempts. A grading
+worker sets it (with a conditional UPDATE) before grading a pending attempt, so
+several application processes recovering pending attempts on start do not
+grade the same attempt twice.
+"""
+
+import sqlite3
+import os
+
+def run_migration():
+    # Path to database
+    db_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'roedu.db')
+    
+    if not os.path.exists(db_path):
+        print("Database not found. Please run the application first to create it.")
+        return
+    
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+    
+    try:
+        # Check if column already exists
+        cursor.execute("PRAGMA table_info(quiz_attempts)")
+        columns = [column[1] for column in cursor.fetchall()]
+        
+        if 'grading_claimed_at' not in columns:
+            print("Adding 'grading_claimed_at' column to quiz_attempts table...")
+            cursor.execute("ALTER TABLE quiz_attempts ADD COLUMN grading_claimed_at DATETIME")
+        else:
+            print("ℹ️  Column 'grading_claimed_at' already exists.")
+        
+        conn.commit()
+        print("✅ Migration completed successfully!")
+            
+    except Exception as e:
+        print(f"❌ Error during migration: {e}")
+        conn.rollback()
+    finally:
+        conn.close()
+
+if __name__ == "__main__":
+    run_migration()
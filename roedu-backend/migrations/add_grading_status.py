@@ -0,0 +1,42 @@
+"""
+Add grading_status column to quiz_attempts table
+
+This migration adds a 'grading_status' column used by deferred grading:
+'pending' while free-text answers are evaluated in the background, 'graded' after
+"""
+
+import sqlite3
+import os
+
+def run_migration():
+    # Path to database
+    db_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'roedu.db')
+    
+    if not os.path.exists(db_path):
+        print("Database not found. Please run the application first to create it.")
+        return
+    
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+    
+    try:
+        # Check if column already exists
+        cursor.execute("PRAGMA table_info(quiz_attempts)")
+        columns = [column[1] for column in cursor.fetchall()]
+        
+        if 'grading_status' not in columns:
+            print("Adding 'grading_status' column to quiz_attempts table...")
+            cursor.execute("ALTER TABLE quiz_attempts ADD COLUMN grading_status VARCHAR(20)")
+            conn.commit()
+            print("✅ Migration completed successfully!")
+        else:
+            print("ℹ️  Column 'grading_status' already exists. Skipping migration.")
+            
+    except Exception as e:
+        print(f"❌ Error during migration: {e}")
+        conn.rollback()
+    finally:
+        conn.close()
+
+if __name__ == "__main__":
+    run_migration()
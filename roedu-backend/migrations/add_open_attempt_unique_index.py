@@ -0,0 +1,77 @@
+"""
+Add the open attempt unique index
+
+This migration merges duplicate open attempts (several started for the same
+quiz by the same student, e.g. by double clicks) into the newest one - its
+answers win, the older attempts fill in the questions it left unanswered -
+deletes the older ones and adds a partial unique index allowing at most one
+open attempt per student and quiz, which start_quiz_attempt relies on to be
+idempotent
+"""
+
+import json
+import sqlite3
+import os
+
+def run_migration():
+    # Path to database
+    db_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'roedu.db')
+    
+    if not os.path.exists(db_path):
+        print("Database not found. Please run the application first to create it.")
+        return
+    
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+    
+    try:
+        cursor.execute("""
+            SELECT id, quiz_id, student_id, answers FROM quiz_attempts
+            WHERE completed_at IS NULL AND (quiz_id, student_id) IN (
+                SELECT quiz_id, student_id FROM quiz_attempts
+                WHERE completed_at IS NULL
+                GROUP BY quiz_id, student_id
+                HAVING COUNT(*) > 1
+            )
+            ORDER BY quiz_id, student_id, id
+        """)
+        duplicates = {}
+        for attempt_id, quiz_id, student_id, answers in cursor.fetchall():
+            duplicates.setdefault((quiz_id, student_id), []).append((attempt_id, answers))
+        
+        removed = []
+        for attempts in duplicates.values():
+            merged = {}
+            for _, answers in attempts:  # Oldest first, so the newest answers win
+                try:
+                    merged.update(json.loads(answers or "{}"))
+                except json.JSONDecodeError:
+                    pass
+            newest_id = attempts[-1][0]
+            cursor.execute("UPDATE quiz_attempts SET answers = ? WHERE id = ?", (json.dumps(merged), newest_id))
+            removed.extend(attempt_id for attempt_id, _ in attempts[:-1])
+        
+        for table, column in (
+            ("attempt_question_scores", "attempt_id"),
+            ("ai_evaluation_reports", "quiz_attempt_id"),
+            ("quiz_attempts", "id"),
+        ):
+            cursor.executemany(f"DELETE FROM {table} WHERE {column} = ?", [(attempt_id,) for attempt_id in removed])
+        print(f"Merged {len(removed)} duplicate open attempts into {len(duplicates)} attempts")
+        
+        cursor.execute("""
+            CREATE UNIQUE INDEX IF NOT EXISTS uq_quiz_attempts_open_per_student
+            ON quiz_attempts (quiz_id, student_id) WHERE completed_at IS NULL
+        """)
+        
+        conn.commit()
+        print("✅ Migration completed successfully!")
+            
+    except Exception as e:
+        print(f"❌ Error during migration: {e}")
+        conn.rollback()
+    finally:
+        conn.close()
+
+if __name__ == "__main__":
+    run_migration()
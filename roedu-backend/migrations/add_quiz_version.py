@@ -0,0 +1,44 @@
+"""
+Add version column to quizzes table
+
+This migration adds a 'version' column, bumped whenever a quiz or one of its
+questions is edited, so cached compiled answer keys are recompiled
+"""
+
+import sqlite3
+import os
+
+def run_migration():
+    # Path to database
+    db_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'roedu.db')
+    
+    if not os.path.exists(db_path):
+        print("Database not found. Please run the application first to create it.")
+        return
+    
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+    
+    try:
+        # Check if column already exists
+        cursor.execute("PRAGMA table_info(quizzes)")
+        columns = [column[1] for column in cursor.fetchall()]
+        
+        if 'version' in columns:
+            print("ℹ️  Column 'version' already exists. Skipping migration.")
+            return
+        
+        print("Adding 'version' column to quizzes table...")
+        cursor.execute("ALTER TABLE quizzes ADD COLUMN version INTEGER NOT NULL DEFAULT 1")
+        
+        conn.commit()
+        print("✅ Migration completed successfully!")
+            
+    except Exception as e:
+        print(f"❌ Error during migration: {e}")
+        conn.rollback()
+    finally:
+        conn.close()
+
+if __name__ == "__main__":
+    run_migration()
@@ -0,0 +1,54 @@
+"""
+Add regrade jobs
+
+This migration creates the 'regrade_jobs' table (bulk re-evaluation of the
+answers to a question after its evaluation criteria changed)
+"""
+
+import sqlite3
+import os
+
+def run_migration():
+    # Path to database
+    db_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'roedu.db')
+    
+    if not os.path.exists(db_path):
+        print("Database not found. Please run the application first to create it.")
+        return
+    
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+    
+    try:
+        print("Creating 'regrade_jobs' table (if missing)...")
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS regrade_jobs (
+                id INTEGER PRIMARY KEY,
+                question_id INTEGER NOT NULL REFERENCES questions(id) ON DELETE CASCADE,
+                created_by INTEGER REFERENCES users(id),
+                status VARCHAR(9) NOT NULL,
+                cancel_requested BOOLEAN NOT NULL DEFAULT 0,
+                total INTEGER,
+                processed INTEGER,
+                updated INTEGER,
+                overridden INTEGER,
+                failed INTEGER,
+                error TEXT,
+                created_at DATETIME,
+                started_at DATETIME,
+                finished_at DATETIME
+            )
+        """)
+        cursor.execute("CREATE INDEX IF NOT EXISTS ix_regrade_jobs_question_id ON regrade_jobs (question_id)")
+        
+        conn.commit()
+        print("✅ Migration completed successfully!")
+            
+    except Exception as e:
+        print(f"❌ Error during migration: {e}")
+        conn.rollback()
+    finally:
+        conn.close()
+
+if __name__ == "__main__":
+    run_migration()
@@ -1,9 +1,10 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status, BackgroundTasks
 from sqlalchemy.orm import Session
 from src.models.administrator import Administrator
 from src.models.professor import Professor
 from src.models.student import Student
 from src.models.user import User, UserRole
+from src.models.bulk_generation_job import BulkGenerationJob
 from src.schemas.user_schema import (
     AdministratorResponse,
     AdministratorUpdate,
@@ -13,6 +14,11 @@ from src.schemas.user_schema import (
     StudentManagedCreate,
     StudentResponse,
 )
+from src.schemas.bulk_generation_schema import (
+    BulkQuizGenerationRequest,
+    BulkJobResumeRequest,
+    BulkGenerationJobResponse,
+)
 from src.services.auth_service import AuthService, require_role
 from src.config.database import get_db
 
@@ -36,6 +42,74 @@ def list_administrators(
         for admin in administrators
     ]
 
+# ========== BULK QUIZ GENERATION (MUST BE BEFORE /{administrator_id}) ==========
+
+@router.post("/quizzes/bulk-generate", response_model=BulkGenerationJobResponse, status_code=status.HTTP_202_ACCEPTED)
+def start_bulk_quiz_generation(
+    request: BulkQuizGenerationRequest,
+    background_tasks: BackgroundTasks,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role([UserRole.ADMINISTRATOR]))
+):
+    """
+    Generate practice quizzes for every material matching the filter (admin only)
+    Runs in the background; poll the job for per-material outcomes
+    """
+    from src.services.bulk_quiz_generation_service import create_bulk_job, run_bulk_job, summarize_job
+    
+    job = create_bulk_job(
+        db,
+        subject=request.subject,
+        grade_level=request.grade_level,
+        professor_id=request.professor_id,
+        concurrency=request.concurrency,
+        requests_per_minute=request.requests_per_minute,
+        created_by=current_user.id
+    )
+    if job.items:
+        background_tasks.add_task(run_bulk_job, job.id)
+    
+    return summarize_job(job)
+
+@router.get("/quizzes/bulk-generate/{job_id}", response_model=BulkGenerationJobResponse)
+def get_bulk_quiz_generation_job(
+    job_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role([UserRole.ADMINISTRATOR]))
+):
+    """Get status and per-material outcomes of a bulk generation job"""
+    from src.services.bulk_quiz_generation_service import summarize_job
+    
+    job = db.query(BulkGenerationJob).filter(BulkGenerationJob.id == job_id).first()
+    if not job:
+        raise HTTPException(status_code=404, detail="Bulk generation job not found")
+    
+    return summarize_job(job)
+
+@router.post("/quizzes/bulk-generate/{job_id}/resume", response_model=BulkGenerationJobResponse, status_code=status.HTTP_202_ACCEPTED)
+def resume_bulk_quiz_generation_job(
+    job_id: int,
+    background_tasks: BackgroundTasks,
+    request: BulkJobResumeRequest = BulkJobResumeRequest(),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role([UserRole.ADMINISTRATOR]))
+):
+    """Resume an interrupted job (optionally retrying failed materials)"""
+    from src.services.bulk_quiz_generation_service import run_bulk_job, summarize_job, is_job_running
+    
+    job = db.query(BulkGenerationJob).filter(BulkGenerationJob.id == job_id).first()
+    if not job:
+        raise HTTPException(status_code=404, detail="Bulk generation job not found")
+    
+    if is_job_running(job_id):
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Bulk generation job is already running"
+        )
+    
+    background_tasks.add_task(run_bulk_job, job.id, request.retry_failed)
+    return summarize_job(job)
+
 @router.get("/{administrator_id}")
 def get_administrator(
     administrator_id: int,
@@ -1,74 +1,55 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 from typing import List
 from datetime import datetime
 
 from src.config.database import get_db
 from src.models.ai_evaluation_report import AIEvaluationReport, EvaluationStatus
-from src.models.quiz import QuizAttempt, Question
+from src.models.quiz import QuizAttempt, Question, QuestionType
+from src.models.regrade_job import RegradeJob
 from src.models.user import User
 from src.schemas.ai_evaluation_schema import (
     AIEvaluationReportCreate,
     AIEvaluationReportResponse,
+    AnswerClusterResponse,
+    LearnedGraderAccuracyResponse,
+    RegradeJobResponse,
     ReviewReportRequest
 )
 from src.services.auth_service import get_current_user
+from src.services.learned_grader import SKLEARN_AVAILABLE, accuracy_report, get_learned_grader, live_accuracy
 
 router = APIRouter(tags=["ai_evaluation_reports"])
 
 def recalculate_attempt_score(db: Session, attempt_id: int):
-    """Recalculate attempt total score based on question scores and professor overrides"""
+    """
+    Recalculate attempt total score based on question scores and professor overrides
+    (other free-text answers keep their AI or keyword score)
+    """
     attempt = db.query(QuizAttempt).filter(QuizAttempt.id == attempt_id).first()
     if not attempt:
         return
     
-    # Get quiz and all questions
-    from src.models.quiz import Quiz, QuestionType
     import json
+    from src.services.scoring import (
+        get_answer_key, reports_by_question, save_question_scores, score_answers, unevaluated_free_text
+    )
     
-    quiz = attempt.quiz
-    if not quiz or not quiz.questions:
+    key = get_answer_key(db, attempt.quiz_id)
+    if not key or not key.questions:
         return
     
-    student_answers = json.loads(attempt.answers) if attempt.answers else {}
-    total_score = 0
-    max_score = 0
+    reports = db.query(AIEvaluationReport).filter(AIEvaluationReport.quiz_attempt_id == attempt_id)
+    result = score_answers(
+        key,
+        json.loads(attempt.answers) if attempt.answers else {},
+        reports_by_question(reports),
+        unevaluated_free_text(attempt.grading_status)
+    )
     
-    for question in quiz.questions:
-        max_score += question.points
-        
-        # Check if professor has override score
-        prof_override = db.query(AIEvaluationReport).filter(
-            AIEvaluationReport.quiz_attempt_id == attempt_id,
-            AIEvaluationReport.question_id == question.id,
-            AIEvaluationReport.new_score != None
-        ).first()
-        
-        if prof_override:
-            # Use professor's score
-            total_score += prof_override.new_score
-        else:
-            # Use existing calculation
-            student_ans = student_answers.get(str(question.id), [])
-            if isinstance(student_ans, str):
-                student_ans = [student_ans]
-            
-            if question.question_type == QuestionType.FREE_TEXT:
-                # Check for AI evaluation
-                ai_eval = db.query(AIEvaluationReport).filter(
-                    AIEvaluationReport.quiz_attempt_id == attempt_id,
-                    AIEvaluationReport.question_id == question.id
-                ).first()
-                if ai_eval:
-                    total_score += ai_eval.ai_score
-            else:
-                # Multiple choice
-                correct_answers = json.loads(question.correct_answers)
-                if set(student_ans) == set(correct_answers):
-                    total_score += question.points
-    
-    attempt.score = total_score
-    attempt.max_score = max_score
+    attempt.score = result.score
+    attempt.max_score = result.max_score
+    save_question_scores(db, attempt.id, result)
     db.commit()
 
 @router.post("/attempts/{attempt_id}/questions/{question_id}/report", response_model=AIEvaluationReportResponse, status_code=status.HTTP_201_CREATED)
@@ -201,14 +182,13 @@ def review_evaluation_report(
     report.new_score = review_data.new_score
     report.reviewed_at = datetime.utcnow()
     
-    # If professor assigned new score, update attempt score if all questions reviewed
-    if review_data.new_score is not None:
-        attempt = report.quiz_attempt
-        # TODO: Recalculate attempt total score based on professor corrections
-        pass
-    
     db.commit()
     db.refresh(report)
+    
+    # If professor assigned new score, update the attempt's scores
+    if review_data.new_score is not None:
+        recalculate_attempt_score(db, report.quiz_attempt_id)
+    
     return report
 
 @router.get("/reports/{report_id}", response_model=AIEvaluationReportResponse)
@@ -247,6 +227,170 @@ def get_evaluation_report(
     
     return report
 
+@router.get("/questions/{question_id}/clusters", response_model=List[AnswerClusterResponse])
+def get_answer_clusters(
+    question_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Professor reviews the clusters of near-duplicate answers that were graded
+    with a single AI evaluation (largest clusters first)
+    """
+    question = db.query(Question).filter(Question.id == question_id).first()
+    if not question:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Question not found"
+        )
+    
+    if question.quiz.professor_id != current_user.id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not authorized to view clusters for this quiz"
+        )
+    
+    import json
+    reports = db.query(AIEvaluationReport).filter(
+        AIEvaluationReport.question_id == question_id,
+        AIEvaluationReport.cluster_id != None
+    ).order_by(AIEvaluationReport.id).all()
+    
+    clusters = {}
+    for report in reports:
+        answers = json.loads(report.quiz_attempt.answers or "{}")
+        answer = answers.get(str(question_id))
+        if isinstance(answer, list):
+            answer = answer[0] if answer else None
+        
+        cluster = clusters.setdefault(report.cluster_id, {
+            "cluster_id": report.cluster_id,
+            "question_id": question_id,
+            "ai_score": report.ai_score,
+            "ai_feedback": report.ai_feedback,
+            "members": []
+        })
+        cluster["members"].append({
+            "report_id": report.id,
+            "quiz_attempt_id": report.quiz_attempt_id,
+            "student_id": report.student_id,
+            "similarity": report.cluster_similarity,
+            "student_answer": answer
+        })
+    
+    for cluster in clusters.values():
+        cluster["size"] = len(cluster["members"])
+    return sorted(clusters.values(), key=lambda cluster: -cluster["size"])
+
+@router.post("/questions/{question_id}/regrade", response_model=RegradeJobResponse, status_code=status.HTTP_202_ACCEPTED)
+def start_question_regrade(
+    question_id: int,
+    background_tasks: BackgroundTasks,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Professor re-evaluates every graded answer to a free-text question (e.g.
+    after fixing its evaluation criteria). Runs in the background; poll the job
+    for progress. Professor overrides are kept.
+    """
+    from src.services.regrade_service import create_regrade_job, is_regrade_running, run_regrade_job, summarize_regrade_job
+    
+    question = db.query(Question).filter(Question.id == question_id).first()
+    if not question:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Question not found"
+        )
+    
+    if question.quiz.professor_id != current_user.id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not authorized to regrade this quiz"
+        )
+    
+    if question.question_type != QuestionType.FREE_TEXT:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Only free-text questions can be regraded"
+        )
+    
+    if is_regrade_running(db, question_id):
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="A regrade of this question is already pending or running"
+        )
+    
+    job = create_regrade_job(db, question, created_by=current_user.id)
+    background_tasks.add_task(run_regrade_job, job.id)
+    return summarize_regrade_job(job)
+
+def _get_regrade_job(db: Session, job_id: int, current_user: User) -> RegradeJob:
+    """Regrade job of a quiz owned by the current professor"""
+    job = db.query(RegradeJob).filter(RegradeJob.id == job_id).first()
+    if not job:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Regrade job not found"
+        )
+    
+    if job.question.quiz.professor_id != current_user.id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not authorized to view this regrade job"
+        )
+    return job
+
+@router.get("/regrade-jobs/{job_id}", response_model=RegradeJobResponse)
+def get_regrade_job(
+    job_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Progress of a regrade job"""
+    from src.services.regrade_service import summarize_regrade_job
+    
+    return summarize_regrade_job(_get_regrade_job(db, job_id, current_user))
+
+@router.post("/regrade-jobs/{job_id}/cancel", response_model=RegradeJobResponse)
+def cancel_regrade_job(
+    job_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Cancel a regrade job: it stops before its next batch; answers already
+    regraded keep their new scores
+    """
+    from src.services.regrade_service import cancel_regrade_job as request_cancel, summarize_regrade_job
+    
+    job = _get_regrade_job(db, job_id, current_user)
+    return summarize_regrade_job(request_cancel(db, job))
+
+@router.get("/learned-grader/accuracy", response_model=LearnedGraderAccuracyResponse)
+def get_learned_grader_accuracy(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Accuracy of the local grader trained on professor corrections: held-out
+    error per model (next to the AI's error on the same answers) and the error
+    of its scores that professors corrected afterwards
+    """
+    from src.models.professor import Professor
+    prof = db.query(Professor).filter(Professor.id == current_user.id).first()
+    if not prof:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only professors can view grader accuracy"
+        )
+    
+    return {
+        "available": SKLEARN_AVAILABLE,
+        **accuracy_report(get_learned_grader().refresh()),
+        **live_accuracy(db)
+    }
+
 @router.get("/student/reports", response_model=List[AIEvaluationReportResponse])
 def get_student_reports(
     db: Session = Depends(get_db),
@@ -10,6 +10,7 @@ from src.models.group import Group
 from src.models.student import Student
 from src.models.user import User
 from src.models.professor import Professor
+from src.services.quiz_access import clear_group_access
 from typing import List
 from datetime import datetime
 from src.schemas.group_schema import StudentInGroup
@@ -181,6 +182,7 @@ def delete_group(group_id: int, db: Session = Depends(get_db)):
     
     db.delete(group)
     db.commit()
+    clear_group_access(group_id)
 
 @router.post("/{group_id}/students/add")
 def add_students_to_group(
@@ -215,6 +217,7 @@ def add_students_to_group(
             group.students.append(student)
     
     db.commit()
+    clear_group_access(group_id)
     
     return {"message": f"Added {len(students)} students to group"}
 
@@ -237,5 +240,6 @@ def remove_students_from_group(
     group.students = [s for s in group.students if s.id not in request.student_ids]
     
     db.commit()
+    clear_group_access(group_id)
     
     return {"message": f"Removed {len(request.student_ids)} students from group"}
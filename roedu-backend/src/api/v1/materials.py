@@ -1,4 +1,4 @@
-from fastapi import APIRouter, HTTPException, Depends, status, UploadFile, File, Form, Query
+from fastapi import APIRouter, HTTPException, Depends, status, UploadFile, File, Form, Query, Request
 from typing import List, Optional
 from sqlalchemy.orm import Session
 from datetime import datetime, timedelta
@@ -622,8 +622,9 @@ def get_materials_needing_review(
     return paginate_results(query, page, page_size)
 
 @router.post("/{material_id}/ask-ai")
-def ask_ai_about_material(
+async def ask_ai_about_material(
     material_id: int,
+    http_request: Request,
     question: str = Query(..., min_length=1, description="Question to ask about the material"),
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
@@ -632,7 +633,9 @@ def ask_ai_about_material(
     Ask AI questions about a specific material
     Available to all authenticated users
     """
-    material = db.query(Material).filter(Material.id == material_id).first()
+    import asyncio
+    # The lookup runs in a thread, so the event loop only waits on the AI
+    material = await asyncio.to_thread(lambda: db.query(Material).filter(Material.id == material_id).first())
     if not material:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -641,14 +644,18 @@ def ask_ai_about_material(
     
     # Import AI service
     from src.services.ai_service import ask_ai_about_material as ai_ask
+    from src.services.llm_client import cancel_on_disconnect
     
     try:
-        response = ai_ask(material, question, db)
+        # Stop waiting on the LLM if the client goes away
+        response = await cancel_on_disconnect(http_request, ai_ask(material, question))
         return {
             "material_id": material_id,
             "question": question,
             "answer": response
         }
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -1,56 +1,29 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, WebSocket, WebSocketDisconnect
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, joinedload, selectinload
 from typing import List, Optional, Dict, Any
-from datetime import datetime
+from datetime import datetime, timedelta
 import json
 import logging
 
 from src.config.database import get_db
-from src.services.auth_service import get_current_user
+from src.services.auth_service import get_current_user, get_token_data
+from src.schemas.user_schema import TokenData
 from src.models.user import User
-from src.models.quiz import Quiz, Question, QuizAttempt, QuestionType
+from src.models.quiz import Quiz, Question, QuizAttempt, GradingStatus
 from src.models.professor import Professor
 from src.schemas.quiz_schema import (
     QuizCreate, QuizUpdate, QuizResponse,
-    QuestionCreate, QuestionResponse,
+    QuestionCreate, QuestionUpdate, QuestionResponse,
     QuizAttemptCreate, QuizAttemptResponse, QuizResultResponse,
-    QuizCopyRequest, AIQuizGenerateRequest
+    AnswerAutosaveRequest, AnswerAutosaveResponse, AttemptTimerResponse, QuizCopyRequest, QuizScoresResponse,
+    QuizAnalyticsResponse, QuizPrewarmResponse, AIQuizGenerateRequest
 )
 
 router = APIRouter()
 
 logger = logging.getLogger(__name__)
 
-def score_free_text_answer(student_answer: str, evaluation_criteria: str, correct_answers: List[str]) -> tuple[float, bool]:
-    """
-    Score a free text answer based on keyword matching or exact match.
-    Returns (score: 0 or 1, is_correct: bool)
-    """
-    if not student_answer or not student_answer.strip():
-        return (0.0, False)
-    
-    student_answer_lower = student_answer.lower().strip()
-    
-    # First try exact match with any correct answer
-    for correct in correct_answers:
-        if student_answer_lower == correct.lower():
-            return (1.0, True)
-    
-    # If evaluation_criteria provided, check for keyword matching
-    if evaluation_criteria:
-        try:
-            criteria = json.loads(evaluation_criteria)
-            if isinstance(criteria, list):
-                # Check if any keywords are present
-                keywords = [kw.lower() for kw in criteria]
-                for keyword in keywords:
-                    if keyword in student_answer_lower:
-                        return (0.5, False)  # Partial credit for keyword match
-        except json.JSONDecodeError:
-            pass
-    
-    return (0.0, False)
-
 @router.get("/", response_model=List[QuizResponse])
 def list_quizzes(
     subject: Optional[str] = Query(None, description="Filter by subject"),
@@ -179,95 +152,141 @@ def start_quiz_attempt(
     """
     Start a new quiz attempt or resume an existing one
     Returns the attempt with initial time_remaining from server
+
+    Idempotent: while the student has an open attempt (at most one, enforced
+    by a partial unique index) it is returned instead of a new one. Quiz and
+    group access come from the quiz access cache.
     """
-    print(f"🔍 start_quiz_attempt: quiz_id={quiz_id}, user_id={current_user.id}, role={current_user.role.value}")
+    if current_user.role.value != "student":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only students can take quizzes"
+        )
     
-    quiz = db.query(Quiz).filter(Quiz.id == quiz_id).first()
-    if not quiz:
-        print(f"❌ Quiz {quiz_id} not found")
+    from src.services.quiz_access import get_quiz_access
+    access = get_quiz_access(db, quiz_id)
+    if access is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Quiz not found"
         )
     
-    print(f"📝 Quiz found: {quiz.title}, group_id={quiz.group_id}, created_by_student_id={quiz.created_by_student_id}")
+    # Only the student who generated an AI quiz, or the students of the quiz's group
+    if not access.allows(current_user.id):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="You don't have access to this quiz"
+        )
     
-    # Check if user can take quiz
-    if current_user.role.value == "student":
-        print(f"✅ User {current_user.id} is student, checking quiz access for quiz {quiz_id}...")
-        
-        # Only need access check if quiz has group_id or is AI-generated by someone else
-        if quiz.created_by_student_id and quiz.created_by_student_id != current_user.id:
-            # AI-generated quiz by another student - deny
-            print(f"❌ AI quiz created by {quiz.created_by_student_id}, current user is {current_user.id}")
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="You don't have access to this quiz"
-            )
-        
-        if quiz.group_id:
-            # Quiz has a group - verify student is in that group
-            print(f"👥 Quiz assigned to group {quiz.group_id}, checking membership...")
-            from src.models.student import Student
-            from sqlalchemy.orm import joinedload
-            student = db.query(Student).options(joinedload(Student.groups)).filter(Student.id == current_user.id).first()
-            
-            if not student:
-                print(f"❌ No student profile for user {current_user.id}")
-                raise HTTPException(
-                    status_code=status.HTTP_403_FORBIDDEN,
-                    detail="Student profile not found"
-                )
-            
-            student_group_ids = [g.id for g in student.groups]
-            print(f"📋 Student groups: {student_group_ids}")
-            
-            if quiz.group_id not in student_group_ids:
-                print(f"❌ Quiz group {quiz.group_id} not in {student_group_ids}")
-                raise HTTPException(
-                    status_code=status.HTTP_403_FORBIDDEN,
-                    detail="You don't have access to this quiz"
-                )
-            print(f"✅ Student is in group {quiz.group_id}")
-        else:
-            # Public quiz - allow
-            print(f"✅ Public quiz (no group), access granted")
-        
-        # Check if user already completed this quiz
-        existing_attempt = db.query(QuizAttempt).filter(
+    from src.services.attempt_timer import attempt_deadline, time_limit_seconds, timer_state_of
+    
+    def find_attempts():
+        return db.query(QuizAttempt).filter(
             QuizAttempt.quiz_id == quiz_id,
-            QuizAttempt.student_id == current_user.id,
-            QuizAttempt.completed_at.isnot(None)
-        ).first()
-        
-        if existing_attempt:
-            print(f"⏰ Student already completed this quiz")
+            QuizAttempt.student_id == current_user.id
+        ).all()
+    
+    def resume(attempts):
+        """The open attempt, if any (403 once the quiz was completed)"""
+        if any(attempt.completed_at is not None for attempt in attempts):
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail="You have already completed this quiz"
             )
-    else:
-        print(f"❌ User role {current_user.role.value} is not student")
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Only students can take quizzes"
-        )
+        if attempts:
+            timer_state_of(attempts[0])
+            return attempts[0]
+        return None
+    
+    existing_attempt = resume(find_attempts())
+    if existing_attempt:
+        return existing_attempt
     
-    # Create new attempt
-    print(f"✅ Creating new attempt for student {current_user.id} on quiz {quiz_id}")
+    # Create new attempt (auto-submitted by the deadline sweeper once past deadline_at)
+    started_at = datetime.utcnow()
     new_attempt = QuizAttempt(
         quiz_id=quiz_id,
         student_id=current_user.id,
-        started_at=datetime.utcnow(),
-        time_remaining=quiz.time_limit * 60 if quiz.time_limit else 3600
+        started_at=started_at,
+        deadline_at=attempt_deadline(access, started_at),
+        time_remaining=time_limit_seconds(access)
     )
     db.add(new_attempt)
-    db.commit()
-    db.refresh(new_attempt)
+    try:
+        db.commit()
+    except IntegrityError:
+        # A concurrent request (double click) opened the attempt first
+        db.rollback()
+        existing_attempt = resume(find_attempts())
+        if existing_attempt is None:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="The attempt could not be started, please try again"
+            )
+        return existing_attempt
+    timer_state_of(new_attempt)  # Seed the timer cache: polls of a fresh attempt never hit the database
     
-    print(f"✅ Attempt created: attempt_id={new_attempt.id}")
+    logger.info(f"✅ Attempt {new_attempt.id} started: student {new_attempt.student_id}, quiz {quiz_id}")
     return new_attempt
 
+@router.post("/{quiz_id}/prewarm", response_model=QuizPrewarmResponse)
+def prewarm_quiz(
+    quiz_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Load a quiz's access data and answer key into the caches before a class
+    starts it (quiz owner or admin only)
+    """
+    from src.services.quiz_access import clear_quiz_access, get_quiz_access
+    from src.services.scoring import get_answer_key
+    clear_quiz_access(quiz_id)
+    access = get_quiz_access(db, quiz_id)
+    if access is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Quiz not found"
+        )
+    
+    if access.professor_id != current_user.id and current_user.role.value != "administrator":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not authorized"
+        )
+    
+    answer_key = get_answer_key(db, quiz_id)
+    return {
+        "quiz_id": quiz_id,
+        "students": len(access.member_ids) if access.member_ids is not None else None,
+        "questions": len(answer_key.questions)
+    }
+
+# Queries get_quiz_result may issue (checked by tests/test_quiz_result.py):
+# the attempt with its quiz, student and user (joined), its evaluation reports
+# and its stored question scores (selectin), plus the questions when the
+# quiz's compiled answer key is not cached
+RESULT_QUERY_BUDGET = 4
+
+def _evaluation_details(report) -> Dict[str, Any]:
+    """AI evaluation of one answer as shown on the result page (JSON fields parsed)"""
+    return {
+        "ai_score": report.ai_score,
+        "ai_feedback": report.ai_feedback,
+        "ai_reasoning": report.ai_reasoning,
+        "ai_model_version": report.ai_model_version,
+        "ai_score_breakdown": json.loads(report.ai_score_breakdown) if report.ai_score_breakdown else {},
+        "ai_strengths": json.loads(report.ai_strengths) if report.ai_strengths else [],
+        "ai_improvements": json.loads(report.ai_improvements) if report.ai_improvements else [],
+        "ai_suggestions": json.loads(report.ai_suggestions) if report.ai_suggestions else [],
+        "cache_hit": bool(report.cache_hit),
+        "cluster_id": report.cluster_id,
+        # Add report dispute status and reason
+        "reported_status": report.status.value if report.status else None,
+        "reported_reason": report.reason if report.reason != "Auto-evaluated by AI system" else None,
+        "professor_feedback": report.professor_feedback
+    }
+
 @router.get("/attempt/{attempt_id}", response_model=QuizResultResponse)
 def get_quiz_result(
     attempt_id: int,
@@ -276,8 +295,18 @@ def get_quiz_result(
 ):
     """
     Get detailed results for a quiz attempt
+    Loaded eagerly, at most RESULT_QUERY_BUDGET queries whatever the number of questions
     """
-    attempt = db.query(QuizAttempt).filter(QuizAttempt.id == attempt_id).first()
+    from src.models.student import Student
+    from src.models.attempt_question_score import ScoreSource
+    from src.services.scoring import FreeTextScoring, get_answer_key, reports_by_question, score_answers
+    
+    attempt = db.query(QuizAttempt).options(
+        joinedload(QuizAttempt.quiz),
+        joinedload(QuizAttempt.student).joinedload(Student.user),
+        selectinload(QuizAttempt.evaluation_reports),
+        selectinload(QuizAttempt.question_scores)
+    ).filter(QuizAttempt.id == attempt_id).first()
     if not attempt:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -285,7 +314,7 @@ def get_quiz_result(
         )
     
     # Check permissions
-    quiz = db.query(Quiz).filter(Quiz.id == attempt.quiz_id).first()
+    quiz = attempt.quiz
     if (attempt.student_id != current_user.id and 
         quiz.professor_id != current_user.id and 
         current_user.role.value != "administrator"):
@@ -295,8 +324,7 @@ def get_quiz_result(
         )
     
     # Enrich attempt with student_email and duration_seconds
-    from src.models.student import Student
-    student = db.query(Student).filter(Student.id == attempt.student_id).first()
+    student = attempt.student
     attempt_dict = {
         'id': attempt.id,
         'quiz_id': attempt.quiz_id,
@@ -307,6 +335,7 @@ def get_quiz_result(
         'completed_at': attempt.completed_at,
         'time_remaining': attempt.time_remaining,
         'is_expired': attempt.is_expired,
+        'grading_status': attempt.grading_status,
     }
     
     # Add student email
@@ -329,87 +358,160 @@ def get_quiz_result(
         }
     
     student_answers = json.loads(attempt.answers)
-    correct_answers = {}
-    question_scores = {}
-    ai_evaluations = {}  # Store AI evaluations by question_id
-    
-    # Get AI evaluation reports for this attempt
-    from src.models.ai_evaluation_report import AIEvaluationReport
-    ai_reports = db.query(AIEvaluationReport).filter(
-        AIEvaluationReport.quiz_attempt_id == attempt.id
-    ).all()
-    
-    for report in ai_reports:
-        ai_evaluations[report.question_id] = {
-            "ai_score": report.ai_score,
-            "ai_feedback": report.ai_feedback,
-            "ai_reasoning": report.ai_reasoning,
-            "ai_model_version": report.ai_model_version,
-            "ai_score_breakdown": json.loads(report.ai_score_breakdown) if report.ai_score_breakdown else {},
-            "ai_strengths": json.loads(report.ai_strengths) if report.ai_strengths else [],
-            "ai_improvements": json.loads(report.ai_improvements) if report.ai_improvements else [],
-            "ai_suggestions": json.loads(report.ai_suggestions) if report.ai_suggestions else [],
-            # Add report dispute status and reason
-            "reported_status": report.status.value if report.status else None,
-            "reported_reason": report.reason if report.reason != "Auto-evaluated by AI system" else None,
-            "professor_feedback": report.professor_feedback
-        }
-    
-    for question in quiz.questions:
-        correct_answers[question.id] = json.loads(question.correct_answers)
-        
-        # Calculate score for this question
-        student_ans = student_answers.get(str(question.id), [])
-        if isinstance(student_ans, str):
-            student_ans = [student_ans]
-        
-        # Check if professor has overridden the score
-        ai_report = None
-        for report in ai_reports:
-            if report.question_id == question.id:
-                ai_report = report
-                break
-        
-        professor_override = ai_report and ai_report.new_score is not None
-        
-        # Score based on question type
-        if question.question_type == QuestionType.FREE_TEXT:
-            if professor_override:
-                # Use professor's corrected score (already in points, not percentage)
-                question_scores[question.id] = ai_report.new_score
-            else:
-                # Check if AI evaluation exists for this question
-                ai_eval = ai_evaluations.get(question.id)
-                if ai_eval:
-                    # Use AI score
-                    question_scores[question.id] = ai_eval["ai_score"]
-                else:
-                    # Fallback to keyword matching if no AI evaluation
-                    student_text = student_ans[0] if student_ans else ""
-                    score, _ = score_free_text_answer(
-                        student_text,
-                        question.evaluation_criteria or "",
-                        correct_answers[question.id]
-                    )
-                    question_scores[question.id] = score * question.points
-        else:
-            # Grila scoring - professor can also override these
-            if professor_override:
-                question_scores[question.id] = ai_report.new_score
-            else:
-                if set(student_ans) == set(correct_answers[question.id]):
-                    question_scores[question.id] = question.points
-                else:
-                    question_scores[question.id] = 0.0
+    grading_pending = attempt.grading_status == GradingStatus.PENDING.value
+    reports = reports_by_question(attempt.evaluation_reports)
+    ai_evaluations = {question_id: _evaluation_details(report) for question_id, report in reports.items()}
+    
+    key = get_answer_key(db, quiz.id, quiz)
+    correct_answers = {question.id: list(question.correct_answers) for question in key.questions}
+    
+    # Scores materialized when the attempt was scored / graded / overridden
+    if attempt.question_scores:
+        question_scores = {row.question_id: row.score for row in attempt.question_scores}
+        pending_questions = [
+            row.question_id for row in attempt.question_scores
+            if grading_pending and row.source == ScoreSource.PENDING.value
+        ]
+    else:
+        # Attempts submitted before scores were materialized: professor overrides first,
+        # then grila / AI scores; free-text answers still being graded score 0 for now,
+        # otherwise fall back to keyword matching
+        result = score_answers(
+            key,
+            student_answers,
+            reports,
+            FreeTextScoring.DEFER if grading_pending else FreeTextScoring.KEYWORDS
+        )
+        question_scores = result.question_scores
+        pending_questions = result.pending_questions
     
     return {
         "attempt": attempt_dict,
         "correct_answers": correct_answers,
         "student_answers": {int(k) if k.isdigit() else k: v for k, v in student_answers.items()},
         "question_scores": question_scores,
-        "ai_evaluations": ai_evaluations  # Include detailed AI feedback
+        "ai_evaluations": ai_evaluations,  # Include detailed AI feedback
+        "pending_questions": pending_questions
     }
 
+@router.get("/attempts/{attempt_id}/timer", response_model=AttemptTimerResponse)
+def get_attempt_timer(
+    attempt_id: int,
+    token_data: TokenData = Depends(get_token_data)
+):
+    """
+    Time remaining of an attempt, computed from its deadline
+    Served from the in-memory timer state (no database session); the only
+    write is marking the attempt expired once its deadline has passed
+    """
+    from src.services.attempt_timer import check_expiry, get_timer_state
+    timer = get_timer_state(attempt_id)
+    if timer is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Attempt not found"
+        )
+    
+    # Verify student owns this attempt
+    if timer.student_id != token_data.user_id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not authorized"
+        )
+    
+    now = datetime.utcnow()
+    timer = check_expiry(timer, now)
+    return {
+        "attempt_id": timer.attempt_id,
+        "deadline_at": timer.deadline_at,
+        "time_remaining": timer.remaining(now),
+        "is_expired": timer.expired,
+        "completed": timer.completed
+    }
+
+@router.patch("/attempts/{attempt_id}/answers", response_model=AnswerAutosaveResponse)
+def autosave_answers(
+    attempt_id: int,
+    autosave: AnswerAutosaveRequest,
+    token_data: TokenData = Depends(get_token_data)
+):
+    """
+    Autosave the answers changed since the last autosave (question_id -> answer,
+    null clears it)
+    Buffered in memory and written in coalesced batches; submit merges them, so
+    the final submit does not need to re-send every answer
+    """
+    from src.config.settings import settings
+    from src.services.answer_autosave import get_answer_autosave
+    from src.services.attempt_timer import get_timer_state
+    timer = get_timer_state(attempt_id)
+    if timer is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Attempt not found"
+        )
+    
+    # Verify student owns this attempt
+    if timer.student_id != token_data.user_id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not authorized"
+        )
+    
+    # Answers saved within the grace period still count for the deadline sweeper
+    if timer.completed or datetime.utcnow() > timer.deadline_at + timedelta(seconds=settings.DEADLINE_GRACE_SECONDS):
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Attempt already submitted or expired"
+        )
+    
+    buffered = get_answer_autosave().record(attempt_id, autosave.answers)
+    return {"attempt_id": attempt_id, "buffered_questions": buffered}
+
+@router.websocket("/attempts/{attempt_id}/live")
+async def attempt_live_channel(
+    websocket: WebSocket,
+    attempt_id: int,
+    token: str = Query(...)
+):
+    """
+    Live channel of an active attempt (authenticated once, with ?token=<access token>)
+    Server -> client: {"type": "tick", "time_remaining", "deadline_at"}, then
+    {"type": "expired"} or {"type": "completed"} before the channel is closed
+    Client -> server: {"type": "answers", "answers": {question_id: answer}},
+    answered with {"type": "saved", "buffered_questions"}
+    """
+    import asyncio
+    from src.services.attempt_channel import CLOSE_POLICY_VIOLATION, get_attempt_channel_hub, tick_message
+    from src.services.attempt_timer import check_expiry, get_timer_state
+    from src.services.auth_service import decode_token
+    token_data = decode_token(token)
+    timer = await asyncio.to_thread(get_timer_state, attempt_id) if token_data else None
+    if timer is None or timer.student_id != token_data.user_id:
+        await websocket.close(code=CLOSE_POLICY_VIOLATION)
+        return
+    
+    await websocket.accept()
+    now = datetime.utcnow()
+    if timer.completed or timer.remaining(now) == 0:
+        timer = await asyncio.to_thread(check_expiry, timer, now)
+        await websocket.send_json({"type": "completed" if timer.completed else "expired", "attempt_id": attempt_id})
+        await websocket.close()
+        return
+    
+    hub = get_attempt_channel_hub()
+    await websocket.send_json(tick_message(timer, now))
+    hub.connect(attempt_id, websocket, timer)
+    try:
+        while True:
+            message = await websocket.receive_json()
+            await websocket.send_json(hub.handle_message(attempt_id, message))
+    except (WebSocketDisconnect, RuntimeError, ValueError):
+        # Disconnected by the client, or closed by the hub at the deadline
+        pass
+    finally:
+        hub.disconnect(attempt_id, websocket)
+
 @router.put("/attempts/{attempt_id}/timer-sync", response_model=QuizAttemptResponse)
 def sync_timer(
     attempt_id: int,
@@ -418,7 +520,8 @@ def sync_timer(
 ):
     """
     Sync timer for an active attempt
-    Recalculates time remaining based on server time
+    Recalculates time remaining based on server time (not stored: the attempt
+    is only written when it expires; GET /attempts/{id}/timer is the cheaper poll)
     """
     attempt = db.query(QuizAttempt).filter(QuizAttempt.id == attempt_id).first()
     if not attempt:
@@ -438,23 +541,17 @@ def sync_timer(
     if attempt.completed_at or attempt.is_expired:
         return attempt
     
-    # Recalculate time remaining
-    quiz = attempt.quiz
-    time_elapsed = (datetime.utcnow() - attempt.started_at).total_seconds()
-    total_time_seconds = quiz.time_limit * 60 if quiz.time_limit else 3600
-    time_remaining = max(0, int(total_time_seconds - time_elapsed))
-    
-    attempt.time_remaining = time_remaining
-    if time_remaining <= 0:
-        attempt.is_expired = 1
-    
-    db.commit()
-    db.refresh(attempt)
-    
-    return attempt
+    # Recalculate time remaining from the attempt's deadline
+    from src.services.attempt_timer import check_expiry, timer_state_of
+    now = datetime.utcnow()
+    timer = check_expiry(timer_state_of(attempt), now)
+    return QuizAttemptResponse.model_validate(attempt).model_copy(update={
+        "time_remaining": timer.remaining(now),
+        "is_expired": int(timer.expired)
+    })
 
 @router.post("/attempts/{attempt_id}/auto-submit", response_model=QuizAttemptResponse, status_code=status.HTTP_200_OK)
-def auto_submit_quiz_attempt(
+async def auto_submit_quiz_attempt(
     attempt_id: int,
     submit_data: Optional[Dict[str, Any]] = None,
     db: Session = Depends(get_db),
@@ -463,7 +560,23 @@ def auto_submit_quiz_attempt(
     """
     Auto-submit a quiz attempt when time expires or student submits
     Can optionally receive answers to save before submitting
+    
+    Returns immediately with the objective score; if there are free-text answers
+    the attempt is grading_status=pending until the background worker has graded
+    them and updated the score. The database work runs in a thread, off the
+    event loop.
     """
+    import asyncio
+    attempt, grading_pending = await asyncio.to_thread(_auto_submit, db, attempt_id, submit_data, current_user.id)
+    
+    if grading_pending:
+        from src.services.grading_worker import get_grading_worker
+        get_grading_worker().enqueue(attempt.id)
+    
+    return attempt
+
+def _auto_submit(db: Session, attempt_id: int, submit_data: Optional[Dict[str, Any]], student_id: int):
+    """Save the final answers and finalize the attempt; returns (attempt, whether grading is pending)"""
     attempt = db.query(QuizAttempt).filter(QuizAttempt.id == attempt_id).first()
     if not attempt:
         raise HTTPException(
@@ -472,7 +585,7 @@ def auto_submit_quiz_attempt(
         )
     
     # Verify student owns this attempt
-    if attempt.student_id != current_user.id:
+    if attempt.student_id != student_id:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Not authorized"
@@ -484,94 +597,28 @@ def auto_submit_quiz_attempt(
             detail="Attempt already submitted"
         )
     
-    # If answers are provided in request, save them
+    # Autosaved answers not written yet, then the answers in the request (if any) on top
+    from src.services.answer_autosave import apply_deltas, get_answer_autosave
+    get_answer_autosave().merge_pending(attempt)
     if submit_data and "answers" in submit_data and submit_data["answers"]:
         answers_dict = submit_data["answers"]
         # Convert keys to strings if needed
         if isinstance(answers_dict, dict):
             answers_dict = {str(k): v for k, v in answers_dict.items()}
-        attempt.answers = json.dumps(answers_dict)
-    
-    # Mark as expired and completed
-    attempt.is_expired = 1
-    attempt.time_remaining = 0
-    attempt.completed_at = datetime.utcnow()
-    
-    # If answers were provided, calculate score
-    if attempt.answers:
-        quiz = attempt.quiz
-        total_score = 0.0
-        max_score = 0.0
-        
-        try:
-            answers_dict = json.loads(attempt.answers)
-            
-            for question in quiz.questions:
-                max_score += question.points
-                student_answers = answers_dict.get(str(question.id), [])
-                if isinstance(student_answers, str):
-                    student_answers = [student_answers]
-                
-                if question.question_type == QuestionType.SINGLE_CHOICE:
-                    correct_answers = json.loads(question.correct_answers)
-                    if student_answers and student_answers[0] in correct_answers:
-                        total_score += question.points
-                
-                elif question.question_type == QuestionType.MULTIPLE_CHOICE:
-                    correct_answers = json.loads(question.correct_answers)
-                    if set(student_answers) == set(correct_answers):
-                        total_score += question.points
-                
-                elif question.question_type == QuestionType.FREE_TEXT:
-                    # For free text, use AI evaluation if available
-                    from src.services.ai_evaluation_service import get_ai_evaluation_service
-                    from src.models.ai_evaluation_report import AIEvaluationReport
-                    ai_service = get_ai_evaluation_service()
-                    
-                    if student_answers:
-                        student_text = student_answers if isinstance(student_answers, str) else student_answers[0]
-                        criteria = question.evaluation_criteria or "Check if answer makes sense"
-                        try:
-                            ai_score, ai_feedback, metadata = ai_service.evaluate_free_text_answer(
-                                question.question_text,
-                                student_text,
-                                criteria,
-                                question.points,
-                                "free_text"
-                            )
-                            total_score += ai_score
-                            
-                            # Save detailed AI evaluation report
-                            ai_report = AIEvaluationReport(
-                                quiz_attempt_id=attempt.id,
-                                question_id=question.id,
-                                student_id=attempt.student_id,
-                                ai_score=ai_score,
-                                ai_feedback=ai_feedback,
-                                ai_reasoning=metadata.get("reasoning", ""),
-                                ai_model_version=metadata.get("version", "gemini-2.5-flash-preview-05-20"),
-                                ai_score_breakdown=json.dumps(metadata.get("score_breakdown", {})),
-                                ai_strengths=json.dumps(metadata.get("strengths", [])),
-                                ai_improvements=json.dumps(metadata.get("improvements", [])),
-                                ai_suggestions=json.dumps(metadata.get("suggestions", [])),
-                                reason="Auto-evaluated by AI system",
-                                status="resolved"
-                            )
-                            db.add(ai_report)
-                            
-                        except Exception as e:
-                            logger.error(f"AI evaluation failed: {e}, skipping score")
-                            pass  # If AI fails, don't add points
-            
-            attempt.score = total_score
-            attempt.max_score = max_score
-        except (json.JSONDecodeError, KeyError, TypeError):
-            pass
+            attempt.answers = apply_deltas(attempt.answers, answers_dict)
+        else:
+            attempt.answers = json.dumps(answers_dict)
+    
+    # Mark as expired and completed; objective questions are scored now,
+    # free-text answers are graded by the background worker
+    from src.services.attempt_service import finalize_attempt
+    from src.services.attempt_timer import mark_completed
+    grading_pending = finalize_attempt(db, attempt)
     
     db.commit()
+    mark_completed(attempt.id)
     db.refresh(attempt)
-    
-    return attempt
+    return attempt, grading_pending
 
 @router.delete("/attempts/{attempt_id}", status_code=status.HTTP_204_NO_CONTENT)
 def delete_quiz_attempt(
@@ -614,6 +661,10 @@ def delete_quiz_attempt(
         # Delete attempt
         db.delete(attempt)
         db.commit()
+        from src.services.answer_autosave import get_answer_autosave
+        from src.services.attempt_timer import forget_timer
+        forget_timer(attempt_id)
+        get_answer_autosave().discard(attempt_id)
         
         return None
     except Exception as e:
@@ -752,10 +803,63 @@ def update_quiz(
     for field, value in update_data.items():
         setattr(quiz, field, value)
     
+    from src.services.scoring import bump_quiz_version
+    bump_quiz_version(db, quiz.id)
+    
     db.commit()
     db.refresh(quiz)
+    from src.services.quiz_access import clear_quiz_access
+    clear_quiz_access(quiz.id)
     return quiz
 
+@router.put("/questions/{question_id}", response_model=QuestionResponse)
+def update_question(
+    question_id: int,
+    question_data: QuestionUpdate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Update a question (quiz owner or admin only)
+    Changing what free-text grading depends on drops the cached evaluations;
+    existing answers are re-evaluated with POST /ai_evaluation_reports/questions/{id}/regrade.
+    Changing how answers score rescores the stored scores of finished attempts.
+    """
+    from src.services.evaluation_cache_service import invalidate_question
+    from src.services.scoring import bump_quiz_version, rescore_finished_attempts
+    
+    question = db.query(Question).filter(Question.id == question_id).first()
+    if not question:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Question not found"
+        )
+    
+    # Check permissions
+    if question.quiz.professor_id != current_user.id and current_user.role.value != "administrator":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not authorized to update this question"
+        )
+    
+    update_data = question_data.model_dump(exclude_unset=True)
+    if "options" in update_data:
+        update_data["options"] = json.dumps(update_data["options"]) if update_data["options"] else None
+    if "correct_answers" in update_data:
+        update_data["correct_answers"] = json.dumps(update_data["correct_answers"] or [])
+    for field, value in update_data.items():
+        setattr(question, field, value)
+    
+    if update_data.keys() & {"question_text", "evaluation_criteria", "correct_answers", "points"}:
+        invalidate_question(db, question.id)
+    bump_quiz_version(db, question.quiz_id)
+    if update_data.keys() & {"question_type", "options", "correct_answers", "evaluation_criteria", "points"}:
+        rescore_finished_attempts(db, question.quiz_id)
+    
+    db.commit()
+    db.refresh(question)
+    return question
+
 @router.delete("/{quiz_id}", status_code=status.HTTP_204_NO_CONTENT)
 def delete_quiz(
     quiz_id: int,
@@ -781,6 +885,12 @@ def delete_quiz(
     
     db.delete(quiz)
     db.commit()
+    
+    # The id may be reused by a new quiz starting again at version 1
+    from src.services.quiz_access import clear_quiz_access
+    from src.services.scoring import clear_answer_keys
+    clear_answer_keys(quiz_id)
+    clear_quiz_access(quiz_id)
     return None
 
 @router.post("/{quiz_id}/attempt", response_model=QuizAttemptResponse, status_code=status.HTTP_201_CREATED)
@@ -826,46 +936,27 @@ def submit_quiz_attempt(
                 detail="You are not allocated to this quiz. Only students in the assigned group can take it."
             )
     
-    # Calculate score
-    total_score = 0.0
-    max_score = 0.0
-    
-    for question in quiz.questions:
-        max_score += question.points
-        
-        # Get student's answers for this question
-        student_answers = attempt_data.answers.get(str(question.id), [])
-        if isinstance(student_answers, str):
-            student_answers = [student_answers]
-        
-        correct_answers = json.loads(question.correct_answers)
-        
-        # Score based on question type
-        if question.question_type == QuestionType.FREE_TEXT:
-            # For free text, use keyword matching
-            student_text = student_answers[0] if student_answers else ""
-            score, _ = score_free_text_answer(
-                student_text,
-                question.evaluation_criteria or "",
-                correct_answers
-            )
-            total_score += score * question.points
-        else:
-            # For grila (SINGLE_CHOICE, MULTIPLE_CHOICE), exact match
-            if set(student_answers) == set(correct_answers):
-                total_score += question.points
+    # Calculate score (free text by keyword matching)
+    from src.services.scoring import FreeTextScoring, get_answer_key, save_question_scores, score_answers
+    result = score_answers(
+        get_answer_key(db, quiz_id),
+        {str(k): v for k, v in attempt_data.answers.items()},
+        free_text=FreeTextScoring.KEYWORDS
+    )
     
     # Create attempt
     new_attempt = QuizAttempt(
         quiz_id=quiz_id,
         student_id=current_user.id,
         answers=json.dumps({str(k): v for k, v in attempt_data.answers.items()}),
-        score=total_score,
-        max_score=max_score,
+        score=result.score,
+        max_score=result.max_score,
         completed_at=datetime.utcnow()
     )
     
     db.add(new_attempt)
+    db.flush()
+    save_question_scores(db, new_attempt.id, result)
     db.commit()
     db.refresh(new_attempt)
     return new_attempt
@@ -929,6 +1020,78 @@ def get_quiz_attempts(
     
     return result
 
+@router.get("/{quiz_id}/scores", response_model=QuizScoresResponse)
+def get_quiz_scores(
+    quiz_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Per-question and total scores of every finished attempt of a quiz (owner or admin only)
+    Scored in bulk from the quiz's answer key (see services/bulk_scoring.py)
+    """
+    quiz = db.query(Quiz).filter(Quiz.id == quiz_id).first()
+    if not quiz:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Quiz not found"
+        )
+    
+    if quiz.professor_id != current_user.id and current_user.role.value != "administrator":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not authorized to view scores for this quiz"
+        )
+    
+    from src.services.bulk_scoring import score_quiz_attempts
+    scores = score_quiz_attempts(db, quiz_id)
+    
+    return {
+        "quiz_id": quiz_id,
+        "max_score": scores.max_score,
+        "question_averages": dict(zip(scores.question_ids, scores.question_averages)),
+        "attempts": [
+            {
+                "attempt_id": attempt_id,
+                "student_id": student_id,
+                "score": total,
+                "grading_status": grading_status,
+                "question_scores": dict(zip(scores.question_ids, row))
+            }
+            for attempt_id, student_id, grading_status, total, row in zip(
+                scores.attempt_ids, scores.student_ids, scores.grading_statuses,
+                scores.totals, scores.question_scores
+            )
+        ]
+    }
+
+@router.get("/{quiz_id}/analytics", response_model=QuizAnalyticsResponse)
+def get_quiz_analytics(
+    quiz_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Item analytics of a quiz over its finished attempts (owner or admin only):
+    difficulty and discrimination of each question, option counts and score
+    histograms (see services/item_analytics.py)
+    """
+    quiz = db.query(Quiz).filter(Quiz.id == quiz_id).first()
+    if not quiz:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Quiz not found"
+        )
+    
+    if quiz.professor_id != current_user.id and current_user.role.value != "administrator":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not authorized to view analytics for this quiz"
+        )
+    
+    from src.services import item_analytics
+    return item_analytics.get_quiz_analytics(db, quiz_id)
+
 @router.post("/generate-ai", response_model=QuizResponse, status_code=status.HTTP_201_CREATED)
 def generate_ai_quiz(
     request: AIQuizGenerateRequest,
@@ -956,18 +1119,8 @@ def generate_ai_quiz(
             detail=f"Failed to generate quiz: {str(e)}"
         )
 
-@router.post("/generate-from-material/{material_id}", response_model=QuizResponse, status_code=status.HTTP_201_CREATED)
-def generate_quiz_from_material(
-    material_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
-):
-    """
-    Generate a quiz from material content using AI
-    Creates 3 questions: single_choice, multiple_choice, free_text
-    Students can use this to practice based on material
-    """
-    # Get material
+def _get_generation_material(db: Session, material_id: int, current_user: User):
+    """Material a quiz is generated from (404 if missing, 403 if private and not owned)"""
     from src.models.material import Material
     material = db.query(Material).filter(Material.id == material_id).first()
     if not material:
@@ -982,79 +1135,210 @@ def generate_quiz_from_material(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="You don't have access to this material"
         )
+    return material
+
+@router.post("/generate-from-material/{material_id}", response_model=QuizResponse, status_code=status.HTTP_201_CREATED)
+async def generate_quiz_from_material(
+    material_id: int,
+    http_request: Request,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Generate a quiz from material content using AI
+    Creates 3 questions: single_choice, multiple_choice, free_text
+    Students can use this to practice based on material
+    
+    Database work runs in a thread, so the event loop only waits on the AI.
+    """
+    import asyncio
+    material = await asyncio.to_thread(_get_generation_material, db, material_id, current_user)
     
     try:
-        from src.services.quiz_generation_service import get_quiz_generation_service
-        from src.utils.pdf_extractor import extract_text_from_multiple_pdfs
-        from src.utils.helpers import parse_json_field
+        from src.services.quiz_generation_service import (
+            get_quiz_generation_service,
+            build_material_content,
+            create_quiz_from_generated_data
+        )
+        from src.services.llm_client import cancel_on_disconnect
         quiz_gen = get_quiz_generation_service()
         
-        # Prepare content from material + attached PDFs
-        material_content = material.content or material.description or ""
-        
-        # Extract content from attached PDF files
-        if material.file_paths:
-            try:
-                file_paths = parse_json_field(material.file_paths)
-                if file_paths:
-                    pdf_content = extract_text_from_multiple_pdfs(file_paths)
-                    if pdf_content:
-                        material_content += f"\n\n--- Content from attached files ---\n{pdf_content}"
-            except Exception as e:
-                logger.warning(f"Failed to extract PDF content: {str(e)}")
-                # Continue anyway, just use material content
+        # Prepare content from material + attached PDFs (file I/O off the event loop)
+        material_content = await asyncio.to_thread(build_material_content, material)
         
-        # Generate quiz data from combined content
-        quiz_data = quiz_gen.generate_quiz_from_material(
+        # Generate quiz data from combined content - cancelled if the client disconnects
+        quiz_data = await cancel_on_disconnect(http_request, quiz_gen.generate_quiz_from_material(
             material_title=material.title,
             material_content=material_content,
             subject=material.subject or "General Knowledge",
             grade_level=material.grade_level or 10
-        )
+        ))
         
         # Create quiz in database
         # For students: mark quiz as created by them, professor_id is material owner
         # For professors: professor_id is themselves, no created_by_student_id
-        new_quiz = Quiz(
-            title=quiz_data.get("title", f"Quiz - {material.title}"),
-            description=quiz_data.get("description", f"Practice quiz from material: {material.title}"),
-            subject=quiz_data.get("subject", material.subject),
-            grade_level=quiz_data.get("grade_level", material.grade_level),
-            professor_id=current_user.id if current_user.role.value == "professor" else material.professor_id,
-            created_by_student_id=current_user.id if current_user.role.value == "student" else None,
-            is_ai_generated=True,
-            time_limit=30  # 30 minutes default
-        )
-        
-        db.add(new_quiz)
-        db.flush()  # Get quiz ID
-        
-        # Add questions
-        for idx, question_data in enumerate(quiz_data.get("questions", [])):
-            options = question_data.get("options")
-            correct_answers = question_data.get("correct_answers", [])
-            
-            question = Question(
-                quiz_id=new_quiz.id,
-                question_text=question_data.get("question_text"),
-                question_type=question_data.get("question_type"),
-                options=json.dumps(options) if options else None,
-                correct_answers=json.dumps(correct_answers),
-                evaluation_criteria=question_data.get("evaluation_criteria"),
-                points=question_data.get("points", 1.0),
-                order_index=idx
+        def save_quiz():
+            new_quiz = create_quiz_from_generated_data(
+                db,
+                quiz_data,
+                material,
+                professor_id=current_user.id if current_user.role.value == "professor" else material.professor_id,
+                created_by_student_id=current_user.id if current_user.role.value == "student" else None
             )
-            db.add(question)
-        
-        db.commit()
-        db.refresh(new_quiz)
+            db.commit()
+            db.refresh(new_quiz)
+            return QuizResponse.model_validate(new_quiz)
         
-        return new_quiz
+        return await asyncio.to_thread(save_quiz)
         
+    except HTTPException:
+        await asyncio.to_thread(db.rollback)
+        raise
     except Exception as e:
-        db.rollback()
+        await asyncio.to_thread(db.rollback)
         logger.error(f"Failed to generate quiz from material: {str(e)}")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to generate quiz: {str(e)}"
-        )
\ No newline at end of file
+        )
+
+def _sse_event(event: str, data: Dict[str, Any]) -> str:
+    """Format one Server-Sent Event"""
+    return f"event: {event}\ndata: {json.dumps(data, default=str, ensure_ascii=False)}\n\n"
+
+async def _quiz_generation_events(
+    material,
+    material_content: str,
+    professor_id: int,
+    created_by_student_id: Optional[int]
+):
+    """
+    SSE stream for streamed quiz generation
+    The quiz row is saved first, then every question is committed as soon as
+    the AI finishes it. A quiz that ends up with no questions is deleted.
+    Database work runs in a thread (one at a time, on the generator's own
+    session), off the event loop.
+    """
+    import asyncio
+    import time
+    from src.config.database import SessionLocal
+    from src.services.quiz_generation_service import (
+        get_quiz_generation_service,
+        build_generated_question,
+        create_quiz_from_generated_data
+    )
+    
+    quiz_gen = get_quiz_generation_service()
+    session = SessionLocal()
+    started = time.perf_counter()
+    first_question_ms = None
+    quiz = None
+    quiz_id = None
+    question_count = 0
+    
+    def create_quiz():
+        quiz = create_quiz_from_generated_data(session, {}, material, professor_id, created_by_student_id)
+        session.commit()
+        return quiz, quiz.id, quiz.title
+    
+    def save_question(data: Dict[str, Any], order_index: int) -> Dict[str, Any]:
+        question = build_generated_question(data, quiz_id, order_index)
+        session.add(question)
+        session.commit()
+        return QuestionResponse.model_validate(question).model_dump(mode="json")
+    
+    def save_quiz_fields(data: Dict[str, Any]) -> str:
+        # Quiz-level fields only arrive with the end of the document
+        for field in ("title", "description", "subject", "grade_level"):
+            if data.get(field):
+                setattr(quiz, field, data[field])
+        session.commit()
+        return quiz.title
+    
+    def close_session(discard_quiz: bool):
+        try:
+            if discard_quiz:
+                session.rollback()
+                session.query(Quiz).filter(Quiz.id == quiz_id).delete()
+                session.commit()
+        finally:
+            session.close()
+    
+    try:
+        quiz, quiz_id, title = await asyncio.to_thread(create_quiz)
+        yield _sse_event("quiz", {"quiz_id": quiz_id, "title": title})
+        
+        async for kind, data in quiz_gen.stream_quiz_from_material(
+            material_title=material.title,
+            material_content=material_content,
+            subject=material.subject or "General Knowledge",
+            grade_level=material.grade_level or 10
+        ):
+            if kind == "question":
+                question = await asyncio.to_thread(save_question, data, question_count)
+                question_count += 1
+                if first_question_ms is None:
+                    first_question_ms = (time.perf_counter() - started) * 1000
+                yield _sse_event("question", question)
+            else:
+                title = await asyncio.to_thread(save_quiz_fields, data)
+        
+        total_ms = (time.perf_counter() - started) * 1000
+        logger.info(
+            f"✅ Streamed quiz {quiz_id}: {question_count} questions, "
+            f"first after {first_question_ms:.0f} ms, total {total_ms:.0f} ms"
+        )
+        yield _sse_event("done", {
+            "quiz_id": quiz_id,
+            "title": title,
+            "question_count": question_count,
+            "time_to_first_question_ms": round(first_question_ms, 1),
+            "total_ms": round(total_ms, 1)
+        })
+    except Exception as e:
+        await asyncio.to_thread(session.rollback)
+        logger.error(f"Failed to stream quiz from material: {str(e)}")
+        yield _sse_event("error", {
+            "detail": f"Failed to generate quiz: {str(e)}",
+            "quiz_id": quiz_id if question_count else None,
+            "question_count": question_count
+        })
+    finally:
+        # Also runs when the client disconnects mid-stream (shielded, so the cleanup is not cancelled with it)
+        await asyncio.shield(asyncio.to_thread(close_session, quiz_id is not None and question_count == 0))
+
+@router.post("/generate-from-material/{material_id}/stream")
+async def stream_quiz_from_material(
+    material_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Streaming variant of generate-from-material (Server-Sent Events)
+    Each question is saved and sent as soon as the AI has produced it
+    
+    Events:
+    - quiz: {"quiz_id", "title"} - quiz created, questions follow
+    - question: QuestionResponse - one saved question
+    - done: {"quiz_id", "title", "question_count", "time_to_first_question_ms", "total_ms"}
+    - error: {"detail", "quiz_id", "question_count"} - quiz_id is set if questions were kept
+    """
+    import asyncio
+    from fastapi.responses import StreamingResponse
+    from src.services.quiz_generation_service import build_material_content
+    
+    material = await asyncio.to_thread(_get_generation_material, db, material_id, current_user)
+    
+    # Prepare content from material + attached PDFs (file I/O off the event loop)
+    material_content = await asyncio.to_thread(build_material_content, material)
+    
+    return StreamingResponse(
+        _quiz_generation_events(
+            material,
+            material_content,
+            professor_id=current_user.id if current_user.role.value == "professor" else material.professor_id,
+            created_by_student_id=current_user.id if current_user.role.value == "student" else None
+        ),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
@@ -28,6 +28,105 @@ class Settings:
     # AI settings
     AI_ENABLED: bool = os.getenv("AI_ENABLED", "true").lower() == "true"
     OPENAI_API_KEY: str = os.getenv("OPENAI_API_KEY", "")
+    OPENAI_MODEL: str = os.getenv("OPENAI_MODEL", "gpt-3.5-turbo")
+    OPENAI_BASE_URL: str = os.getenv("OPENAI_BASE_URL", "https://api.openai.com/v1")
+    GEMINI_API_KEY: str = os.getenv("GEMINI_API_KEY", "")
+    GEMINI_MODEL: str = os.getenv("GEMINI_MODEL", "gemini-2.5-flash")
+    GEMINI_BASE_URL: str = os.getenv("GEMINI_BASE_URL", "https://generativelanguage.googleapis.com/v1beta")
+    
+    # LLM client layer (shared async HTTP client)
+    LLM_TIMEOUT_SECONDS: float = float(os.getenv("LLM_TIMEOUT_SECONDS", "30"))  # Per-call timeout
+    LLM_MAX_CONNECTIONS: int = int(os.getenv("LLM_MAX_CONNECTIONS", "100"))
+    LLM_PROVIDER: str = os.getenv("LLM_PROVIDER", "")  # Override for all AI services: gemini, openai, replay
+    
+    # LLM resilience - latency SLO per operation (seconds, upper bound for the timeout),
+    # adaptive timeout from recent p95, circuit breaker per provider, hedged requests
+    LLM_SLO_SECONDS: str = os.getenv(
+        "LLM_SLO_SECONDS",
+        "quiz_generation=60,quiz_questions=30,answer_question=20,free_text_evaluation=15,"
+        "free_text_batch_evaluation=90"
+    )  # Operations not listed use LLM_TIMEOUT_SECONDS
+    LLM_MIN_TIMEOUT_SECONDS: float = float(os.getenv("LLM_MIN_TIMEOUT_SECONDS", "5"))
+    LLM_TIMEOUT_P95_MULTIPLIER: float = float(os.getenv("LLM_TIMEOUT_P95_MULTIPLIER", "2.0"))
+    LLM_BREAKER_FAILURES: int = int(os.getenv("LLM_BREAKER_FAILURES", "5"))  # Consecutive failures that open it
+    LLM_BREAKER_RESET_SECONDS: float = float(os.getenv("LLM_BREAKER_RESET_SECONDS", "30"))  # Open -> half-open
+    LLM_HEDGE_OPERATIONS: str = os.getenv("LLM_HEDGE_OPERATIONS", "free_text_evaluation")  # Comma separated
+    LLM_HEDGE_MIN_DELAY_SECONDS: float = float(os.getenv("LLM_HEDGE_MIN_DELAY_SECONDS", "1.0"))  # Floor of the learned p95 (no hedging before it is known)
+    
+    # Provider quotas (provider=limit, comma separated; unlisted providers are unlimited),
+    # enforced across worker processes through a SQLite file; calls queue by priority
+    LLM_RPM_LIMITS: str = os.getenv("LLM_RPM_LIMITS", "gemini=60,openai=500")
+    LLM_TPM_LIMITS: str = os.getenv("LLM_TPM_LIMITS", "gemini=1000000,openai=200000")
+    LLM_RATE_LIMIT_DB: str = os.getenv("LLM_RATE_LIMIT_DB", "./llm_rate_limit.db")
+    LLM_RATE_LIMIT_MAX_WAIT_SECONDS: float = float(os.getenv("LLM_RATE_LIMIT_MAX_WAIT_SECONDS", "120"))
+    
+    # Offline replay provider (LLM_PROVIDER=replay) for load testing without quota
+    LLM_REPLAY_FILE: str = os.getenv("LLM_REPLAY_FILE", "./llm_recordings.jsonl")
+    LLM_REPLAY_RECORD: bool = os.getenv("LLM_REPLAY_RECORD", "false").lower() == "true"  # Record real responses
+    LLM_RECORD_PROVIDER: str = os.getenv("LLM_RECORD_PROVIDER", "gemini")  # Real provider used when recording
+    LLM_REPLAY_LATENCY: str = os.getenv("LLM_REPLAY_LATENCY", "lognormal:800,0.5")  # fixed:MS | uniform:MIN,MAX | lognormal:MEDIAN,SIGMA
+    LLM_REPLAY_FAILURE_RATE: float = float(os.getenv("LLM_REPLAY_FAILURE_RATE", "0"))
+    LLM_REPLAY_SEED: int = int(os.getenv("LLM_REPLAY_SEED", "42"))
+    
+    # Free-text grading - background worker (attempts graded at a time) and
+    # AI evaluations run in parallel per submission
+    GRADING_WORKERS: int = int(os.getenv("GRADING_WORKERS", "4"))
+    GRADING_CONCURRENCY: int = int(os.getenv("GRADING_CONCURRENCY", "5"))
+    # Answers to the same question graded in one AI call (1 disables batching)
+    GRADING_BATCH_SIZE: int = int(os.getenv("GRADING_BATCH_SIZE", "20"))
+    # Submissions arriving within this window are graded together (batched per question),
+    # up to GRADING_ROUND_SIZE attempts per round; a full round starts at once
+    GRADING_BATCH_WINDOW_SECONDS: float = float(os.getenv("GRADING_BATCH_WINDOW_SECONDS", "2.0"))
+    GRADING_ROUND_SIZE: int = int(os.getenv("GRADING_ROUND_SIZE", "20"))
+    # Reuse AI evaluations of identical (normalized) answers to the same question
+    EVALUATION_CACHE_ENABLED: bool = os.getenv("EVALUATION_CACHE_ENABLED", "true").lower() == "true"
+    # Near-duplicate answers (MinHash/LSH) graded once per cluster; similarity is
+    # Jaccard over character shingles, borderline members are graded individually
+    ANSWER_CLUSTERING_ENABLED: bool = os.getenv("ANSWER_CLUSTERING_ENABLED", "true").lower() == "true"
+    ANSWER_CLUSTER_THRESHOLD: float = float(os.getenv("ANSWER_CLUSTER_THRESHOLD", "0.85"))
+    ANSWER_CLUSTER_BORDERLINE: float = float(os.getenv("ANSWER_CLUSTER_BORDERLINE", "0.6"))
+    # Trivial answers (empty, copy of the question, exactly a correct answer)
+    # scored locally instead of by the AI; the similarity is a 0-1 string ratio
+    TRIAGE_ENABLED: bool = os.getenv("TRIAGE_ENABLED", "true").lower() == "true"
+    TRIAGE_COPY_SIMILARITY: float = float(os.getenv("TRIAGE_COPY_SIMILARITY", "0.85"))
+    # Local model trained on professor-reviewed scores (needs numpy + scikit-learn);
+    # a question's model scores only answers whose held-out error stays within the limit (fraction of max score)
+    LEARNED_GRADER_ENABLED: bool = os.getenv("LEARNED_GRADER_ENABLED", "true").lower() == "true"
+    LEARNED_GRADER_PATH: str = os.getenv("LEARNED_GRADER_PATH", "./learned_grader.pkl")
+    LEARNED_GRADER_MIN_SAMPLES: int = int(os.getenv("LEARNED_GRADER_MIN_SAMPLES", "30"))
+    LEARNED_GRADER_MAX_ERROR: float = float(os.getenv("LEARNED_GRADER_MAX_ERROR", "0.1"))
+    LEARNED_GRADER_RETRAIN_HOURS: float = float(os.getenv("LEARNED_GRADER_RETRAIN_HOURS", "24"))  # 0 disables
+    
+    # Compiled quiz answer keys kept in memory (quizzes)
+    ANSWER_KEY_CACHE_SIZE: int = int(os.getenv("ANSWER_KEY_CACHE_SIZE", "1024"))
+    
+    # Quiz access data (group members, time limit) cached for attempt starts
+    QUIZ_ACCESS_CACHE_SIZE: int = int(os.getenv("QUIZ_ACCESS_CACHE_SIZE", "1024"))
+    QUIZ_ACCESS_CACHE_TTL_SECONDS: float = float(os.getenv("QUIZ_ACCESS_CACHE_TTL_SECONDS", "60"))
+    
+    # Item analytics (GET /quizzes/{id}/analytics) - cached quizzes and histogram bins
+    ANALYTICS_CACHE_SIZE: int = int(os.getenv("ANALYTICS_CACHE_SIZE", "256"))
+    ANALYTICS_HISTOGRAM_BINS: int = int(os.getenv("ANALYTICS_HISTOGRAM_BINS", "10"))
+    
+    # Deadline sweeper - auto-submits open attempts past their deadline_at (plus a
+    # grace period for the client's own auto-submit), in batches
+    DEADLINE_SWEEPER_ENABLED: bool = os.getenv("DEADLINE_SWEEPER_ENABLED", "true").lower() == "true"
+    DEADLINE_SWEEP_INTERVAL_SECONDS: float = float(os.getenv("DEADLINE_SWEEP_INTERVAL_SECONDS", "15"))
+    DEADLINE_SWEEP_BATCH_SIZE: int = int(os.getenv("DEADLINE_SWEEP_BATCH_SIZE", "200"))
+    DEADLINE_GRACE_SECONDS: int = int(os.getenv("DEADLINE_GRACE_SECONDS", "10"))
+    
+    # Timer states of attempts kept in memory (GET /quizzes/attempts/{id}/timer)
+    ATTEMPT_TIMER_CACHE_SIZE: int = int(os.getenv("ATTEMPT_TIMER_CACHE_SIZE", "10000"))
+    
+    # Autosaved answers are buffered in memory and written once per interval per attempt
+    AUTOSAVE_FLUSH_INTERVAL_SECONDS: float = float(os.getenv("AUTOSAVE_FLUSH_INTERVAL_SECONDS", "5"))
+    
+    # Live attempt channel (WebSocket /quizzes/attempts/{id}/live) - seconds between countdown ticks
+    ATTEMPT_CHANNEL_TICK_SECONDS: float = float(os.getenv("ATTEMPT_CHANNEL_TICK_SECONDS", "5"))
+    
+    # Bulk quiz generation defaults (admin endpoint + CLI)
+    BULK_GENERATION_CONCURRENCY: int = int(os.getenv("BULK_GENERATION_CONCURRENCY", "4"))
+    BULK_GENERATION_RPM: int = int(os.getenv("BULK_GENERATION_RPM", "30"))  # Gemini requests per minute
     
     # CORS
     CORS_ORIGINS: list = [
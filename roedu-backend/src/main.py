@@ -1,12 +1,23 @@
+import asyncio
 import os
 from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 from fastapi.staticfiles import StaticFiles
 
 from src.api.v1 import auth, administrators, professors, students, materials, quizzes, comments, suggestions, groups, ai_evaluation_reports
 from src.config.database import init_db
 from src.config.settings import settings
+from src.services.llm_client import close_http_client
+from src.services.llm_resilience import resilience_status
+from src.services.llm_rate_limiter import rate_limit_status
+from src.services.grading_worker import get_grading_worker
+from src.services.answer_autosave import get_answer_autosave
+from src.services.attempt_channel import get_attempt_channel_hub
+from src.services.deadline_sweeper import get_deadline_sweeper
+from src.services.learned_grader import SKLEARN_AVAILABLE, retrain_periodically
+from src.utils.metrics import metrics
 
 
 # Lifespan events
@@ -17,9 +28,23 @@ async def lifespan(app: FastAPI):
     print("🚀 Starting up RoEdu Educational Platform...")
     init_db()
     print("✅ Database initialized successfully!")
+    await get_grading_worker().start()
+    await get_answer_autosave().start()
+    if settings.DEADLINE_SWEEPER_ENABLED:
+        await get_deadline_sweeper().start()
+    retrain_task = None
+    if settings.LEARNED_GRADER_ENABLED and settings.LEARNED_GRADER_RETRAIN_HOURS > 0 and SKLEARN_AVAILABLE:
+        retrain_task = asyncio.create_task(retrain_periodically())
     yield
     # Shutdown
     print("🛑 Shutting down RoEdu Educational Platform...")
+    if retrain_task:
+        retrain_task.cancel()
+    await get_attempt_channel_hub().stop()
+    await get_deadline_sweeper().stop()
+    await get_answer_autosave().stop()
+    await get_grading_worker().stop()
+    await close_http_client()
 
 
 # Initialize FastAPI app with lifespan
@@ -80,6 +105,21 @@ async def health_check():
     }
 
 
+@app.get("/health/ai", tags=["Health"])
+async def ai_health_check():
+    """AI provider status: circuit breakers, latency percentiles/histograms, current timeouts, rate limits"""
+    status = resilience_status()
+    degraded = any(breaker["state"] != "closed" for breaker in status["circuit_breakers"].values())
+    rate_limits = await asyncio.to_thread(rate_limit_status)
+    return {"status": "degraded" if degraded else "healthy", **status, "rate_limits": rate_limits}
+
+
+@app.get("/metrics", tags=["Health"], response_class=PlainTextResponse)
+async def metrics_endpoint():
+    """In-process metrics in the Prometheus text format (LLM calls, parse failures, retries)"""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(
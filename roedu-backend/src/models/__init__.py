@@ -13,10 +13,19 @@ from src.models.material_suggestions import (
     MaterialFeedbackStudent,
     SuggestionStatus
 )
-from src.models.quiz import Quiz, Question, QuizAttempt, QuestionType
+from src.models.quiz import Quiz, Question, QuizAttempt, QuestionType, GradingStatus
+from src.models.attempt_question_score import AttemptQuestionScore, ScoreSource
 from src.models.comment import Comment, CommentType, CommentStatus
 from src.models.group import Group
 from src.models.ai_evaluation_report import AIEvaluationReport, EvaluationStatus
+from src.models.evaluation_cache import EvaluationCacheEntry
+from src.models.bulk_generation_job import (
+    BulkGenerationJob,
+    BulkGenerationItem,
+    BulkJobStatus,
+    BulkItemStatus
+)
+from src.models.regrade_job import RegradeJob, RegradeJobStatus
 
 __all__ = [
     "User",
@@ -36,10 +45,20 @@ __all__ = [
     "Question",
     "QuizAttempt",
     "QuestionType",
+    "GradingStatus",
+    "AttemptQuestionScore",
+    "ScoreSource",
     "Comment",
     "CommentType",
     "CommentStatus",
     "Group",
     "AIEvaluationReport",
     "EvaluationStatus",
+    "EvaluationCacheEntry",
+    "BulkGenerationJob",
+    "BulkGenerationItem",
+    "BulkJobStatus",
+    "BulkItemStatus",
+    "RegradeJob",
+    "RegradeJobStatus",
 ]
\ No newline at end of file
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, ForeignKey, DateTime, Enum, Float
+from sqlalchemy import Column, Integer, String, Text, ForeignKey, DateTime, Enum, Float, Boolean
 from sqlalchemy.orm import relationship
 from src.config.database import Base
 from datetime import datetime
@@ -26,6 +26,9 @@ class AIEvaluationReport(Base):
     ai_strengths = Column(Text, nullable=True)  # JSON array: strengths list
     ai_improvements = Column(Text, nullable=True)  # JSON array: improvements list
     ai_suggestions = Column(Text, nullable=True)  # JSON array: suggestions for learning
+    cache_hit = Column(Boolean, default=False)  # Reused the evaluation of an identical answer
+    cluster_id = Column(String(64), nullable=True, index=True)  # Near-duplicate answers graded together
+    cluster_similarity = Column(Float, nullable=True)  # Similarity to the cluster's representative answer
     
     # Student Report (Dispute)
     reason = Column(Text, nullable=False)  # Why student disputes the evaluation
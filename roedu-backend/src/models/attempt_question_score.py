@@ -0,0 +1,32 @@
+"""
+Materialized per-question scores of quiz attempts - written when an attempt
+is scored or graded and updated on professor overrides, so result pages and
+per-question analytics read them instead of rescoring the answers
+"""
+
+from sqlalchemy import Column, Integer, String, Float, ForeignKey, DateTime
+from sqlalchemy.orm import relationship
+from src.config.database import Base
+from datetime import datetime
+import enum
+
+class ScoreSource(str, enum.Enum):
+    AUTO = "auto"  # Choice answer, keyword fallback or unanswered
+    AI = "ai"  # AI (or local) evaluation of a free-text answer
+    PROFESSOR = "professor"  # Professor override (AIEvaluationReport.new_score)
+    PENDING = "pending"  # Free-text answer not evaluated yet (scores 0 for now)
+
+class AttemptQuestionScore(Base):
+    __tablename__ = 'attempt_question_scores'
+
+    attempt_id = Column(Integer, ForeignKey('quiz_attempts.id', ondelete='CASCADE'), primary_key=True)
+    question_id = Column(Integer, ForeignKey('questions.id', ondelete='CASCADE'), primary_key=True, index=True)
+    score = Column(Float, nullable=False, default=0.0)
+    source = Column(String(20), nullable=False)  # ScoreSource value
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    # Relationships
+    attempt = relationship("QuizAttempt", back_populates="question_scores")
+
+    def __repr__(self):
+        return f"<AttemptQuestionScore(attempt_id={self.attempt_id}, question_id={self.question_id}, score={self.score})>"
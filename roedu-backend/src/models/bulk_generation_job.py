@@ -0,0 +1,73 @@
+"""
+Models for bulk AI quiz generation jobs (admin)
+"""
+
+from sqlalchemy import Column, Integer, String, Text, ForeignKey, DateTime, Enum as SQLEnum
+from sqlalchemy.orm import relationship
+from src.config.database import Base
+from datetime import datetime
+import enum
+
+class BulkJobStatus(str, enum.Enum):
+    PENDING = "pending"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    INTERRUPTED = "interrupted"  # Stopped before all items were processed - can be resumed
+
+class BulkItemStatus(str, enum.Enum):
+    PENDING = "pending"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+
+class BulkGenerationJob(Base):
+    """
+    A bulk quiz generation run over a filtered set of materials
+    Items are created up-front so an interrupted job can be resumed
+    """
+    __tablename__ = 'bulk_generation_jobs'
+
+    id = Column(Integer, primary_key=True, index=True)
+    created_by = Column(Integer, ForeignKey('users.id'), nullable=True)  # None when started from the CLI
+
+    # Material filter
+    subject = Column(String(100), nullable=True)
+    grade_level = Column(Integer, nullable=True)
+    professor_id = Column(Integer, ForeignKey('professors.id'), nullable=True)
+
+    # Throughput controls
+    concurrency = Column(Integer, default=4)
+    requests_per_minute = Column(Integer, default=30)
+
+    status = Column(SQLEnum(BulkJobStatus), default=BulkJobStatus.PENDING, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+
+    # Relationships
+    items = relationship("BulkGenerationItem", back_populates="job", cascade="all, delete-orphan")
+
+    def __repr__(self):
+        return f"<BulkGenerationJob(id={self.id}, status={self.status})>"
+
+
+class BulkGenerationItem(Base):
+    """
+    Outcome of generating a quiz for one material inside a bulk job
+    """
+    __tablename__ = 'bulk_generation_items'
+
+    id = Column(Integer, primary_key=True, index=True)
+    job_id = Column(Integer, ForeignKey('bulk_generation_jobs.id'), nullable=False, index=True)
+    material_id = Column(Integer, ForeignKey('materials.id'), nullable=False)
+    status = Column(SQLEnum(BulkItemStatus), default=BulkItemStatus.PENDING, nullable=False)
+    quiz_id = Column(Integer, ForeignKey('quizzes.id'), nullable=True)
+    error = Column(Text, nullable=True)
+    attempts = Column(Integer, default=0)
+    finished_at = Column(DateTime, nullable=True)
+
+    # Relationships
+    job = relationship("BulkGenerationJob", back_populates="items")
+    material = relationship("Material")
+
+    def __repr__(self):
+        return f"<BulkGenerationItem(job_id={self.job_id}, material_id={self.material_id}, status={self.status})>"
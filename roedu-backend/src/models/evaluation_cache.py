@@ -0,0 +1,34 @@
+"""
+Cache of AI evaluations of free-text answers, shared between attempts
+"""
+
+from sqlalchemy import Column, Integer, String, Text, ForeignKey, DateTime, Float, UniqueConstraint
+from src.config.database import Base
+from datetime import datetime
+
+class EvaluationCacheEntry(Base):
+    """
+    AI evaluation of one normalized answer to a question
+    criteria_hash covers the question text, evaluation criteria and points, so
+    editing any of them makes older entries unreachable
+    """
+    __tablename__ = 'evaluation_cache'
+    __table_args__ = (
+        UniqueConstraint('question_id', 'criteria_hash', 'answer_hash', name='uq_evaluation_cache_key'),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    question_id = Column(Integer, ForeignKey('questions.id', ondelete='CASCADE'), nullable=False, index=True)
+    criteria_hash = Column(String(64), nullable=False)
+    answer_hash = Column(String(64), nullable=False)  # sha256 of the normalized answer text
+
+    score = Column(Float, nullable=False)
+    feedback = Column(Text, nullable=True)
+    evaluation_metadata = Column(Text, nullable=True)  # JSON: reasoning, breakdown, strengths, ...
+
+    hit_count = Column(Integer, default=0, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    last_hit_at = Column(DateTime, nullable=True)
+
+    def __repr__(self):
+        return f"<EvaluationCacheEntry(id={self.id}, question_id={self.question_id}, hits={self.hit_count})>"
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, ForeignKey, DateTime, Enum as SQLEnum, Float
+from sqlalchemy import Column, Integer, String, Text, ForeignKey, DateTime, Enum as SQLEnum, Float, Index, text
 from sqlalchemy.orm import relationship
 from src.config.database import Base
 from datetime import datetime
@@ -9,6 +9,10 @@ class QuestionType(str, enum.Enum):
     MULTIPLE_CHOICE = "multiple_choice"
     FREE_TEXT = "free_text"
 
+class GradingStatus(str, enum.Enum):
+    PENDING = "pending"  # Free-text answers still being evaluated in the background
+    GRADED = "graded"
+
 class Quiz(Base):
     __tablename__ = 'quizzes'
 
@@ -25,6 +29,7 @@ class Quiz(Base):
     created_by_student_id = Column(Integer, ForeignKey('students.id'), nullable=True)  # For AI-generated quizzes by students
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    version = Column(Integer, default=1, nullable=False)  # Bumped on quiz/question edits (invalidates compiled answer keys)
 
     # Relationships
     professor = relationship("Professor", back_populates="quizzes")
@@ -68,11 +73,31 @@ class QuizAttempt(Base):
     completed_at = Column(DateTime)
     time_remaining = Column(Integer)  # in seconds, for timer persistence
     is_expired = Column(Integer, default=0)  # 0 or 1, using Integer for SQLite compatibility
+    grading_status = Column(String(20), nullable=True)  # GradingStatus value; NULL for attempts graded before deferred grading
+    deadline_at = Column(DateTime, nullable=True)  # Auto-submitted by the deadline sweeper once past (NULL: no deadline)
+    grading_claimed_at = Column(DateTime, nullable=True)  # Set while a grading worker owns the pending attempt
 
     # Relationships
     quiz = relationship("Quiz", back_populates="attempts")
     student = relationship("Student", back_populates="quiz_attempts")
     evaluation_reports = relationship("AIEvaluationReport", back_populates="quiz_attempt", cascade="all, delete-orphan")
+    question_scores = relationship("AttemptQuestionScore", back_populates="attempt", cascade="all, delete-orphan")
+
+    __table_args__ = (
+        # Open attempts by deadline - the sweeper only reads the overdue ones
+        Index(
+            'ix_quiz_attempts_open_deadline', 'deadline_at',
+            sqlite_where=text('completed_at IS NULL'),
+            postgresql_where=text('completed_at IS NULL')
+        ),
+        # At most one open attempt per student and quiz (start_quiz_attempt is idempotent)
+        Index(
+            'uq_quiz_attempts_open_per_student', 'quiz_id', 'student_id',
+            unique=True,
+            sqlite_where=text('completed_at IS NULL'),
+            postgresql_where=text('completed_at IS NULL')
+        ),
+    )
 
     def __repr__(self):
         return f"<QuizAttempt(id={self.id}, student_id={self.student_id}, score={self.score})>"
\ No newline at end of file
@@ -0,0 +1,49 @@
+"""
+Models for regrade jobs - re-evaluating every answer to a question after its
+criteria changed
+"""
+
+from sqlalchemy import Column, Integer, Text, ForeignKey, DateTime, Boolean, Enum as SQLEnum
+from sqlalchemy.orm import relationship
+from src.config.database import Base
+from datetime import datetime
+import enum
+
+class RegradeJobStatus(str, enum.Enum):
+    PENDING = "pending"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    CANCELLED = "cancelled"  # Stopped on request; answers regraded so far keep their new scores
+    FAILED = "failed"
+
+class RegradeJob(Base):
+    """
+    Re-evaluation of all graded answers to one free-text question
+    Counters are updated after every batch so the job reports its progress
+    """
+    __tablename__ = 'regrade_jobs'
+
+    id = Column(Integer, primary_key=True, index=True)
+    question_id = Column(Integer, ForeignKey('questions.id', ondelete='CASCADE'), nullable=False, index=True)
+    created_by = Column(Integer, ForeignKey('users.id'), nullable=True)
+
+    status = Column(SQLEnum(RegradeJobStatus), default=RegradeJobStatus.PENDING, nullable=False)
+    cancel_requested = Column(Boolean, default=False, nullable=False)  # Checked before each batch
+
+    # Progress (answers)
+    total = Column(Integer, default=0)
+    processed = Column(Integer, default=0)
+    updated = Column(Integer, default=0)  # Reports rewritten with the new evaluation
+    overridden = Column(Integer, default=0)  # Reports whose professor score was kept
+    failed = Column(Integer, default=0)  # Answers the evaluator could not grade (report left unchanged)
+    error = Column(Text, nullable=True)
+
+    created_at = Column(DateTime, default=datetime.utcnow)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+
+    # Relationships
+    question = relationship("Question")
+
+    def __repr__(self):
+        return f"<RegradeJob(id={self.id}, question_id={self.question_id}, status={self.status})>"
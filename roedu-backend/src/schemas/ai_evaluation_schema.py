@@ -34,6 +34,9 @@ class AIEvaluationReportResponse(BaseModel):
     ai_strengths: Optional[List[str]] = None  # List of strengths
     ai_improvements: Optional[List[str]] = None  # List of areas for improvement
     ai_suggestions: Optional[List[str]] = None  # List of suggestions for learning
+    cache_hit: Optional[bool] = False  # Evaluation reused from an identical answer
+    cluster_id: Optional[str] = None  # Near-duplicate cluster graded with one evaluation
+    cluster_similarity: Optional[float] = None
     
     # Student Report
     reason: str
@@ -91,3 +94,60 @@ class AIEvaluationReportResponse(BaseModel):
             except:
                 return []
         return v if v else []
+
+class AnswerClusterMember(BaseModel):
+    report_id: int
+    quiz_attempt_id: int
+    student_id: int
+    similarity: Optional[float] = None
+    student_answer: Optional[str] = None
+
+class AnswerClusterResponse(BaseModel):
+    """Near-duplicate answers to a question that share one AI evaluation"""
+    cluster_id: str
+    question_id: int
+    ai_score: float
+    ai_feedback: Optional[str] = None
+    size: int
+    members: List[AnswerClusterMember]
+
+class LearnedGraderModelAccuracy(BaseModel):
+    """Held-out accuracy of one learned grader model (errors as fractions of max score)"""
+    key: str  # "question:<id>"
+    samples: int
+    test_samples: int
+    mae: float
+    within_tolerance: float  # Share of predictions within 10% of the professor's score
+    max_uncertainty: Optional[float] = None  # Calibrated confidence cut-off (None: the model scores nothing)
+    confident_share: float  # Share of predictions confident enough to skip the AI
+    confident_mae: Optional[float] = None
+    ai_mae: float  # Error of the AI's original scores on the same answers
+
+class LearnedGraderAccuracyResponse(BaseModel):
+    """Accuracy of the learned grader against professor corrections"""
+    available: bool  # numpy and scikit-learn installed
+    trained_at: Optional[str] = None
+    test_samples: int = 0
+    mae: Optional[float] = None
+    within_tolerance: Optional[float] = None
+    ai_mae: Optional[float] = None
+    models: List[LearnedGraderModelAccuracy] = []
+    live_corrections: int = 0  # Learned-grader scores later corrected by professors
+    live_mae: Optional[float] = None
+
+class RegradeJobResponse(BaseModel):
+    """Progress of the re-evaluation of all answers to a question"""
+    id: int
+    question_id: int
+    status: str
+    cancel_requested: bool = False
+    total: int
+    processed: int
+    updated: int  # Reports rewritten with the new evaluation
+    overridden: int  # Of those, reports whose professor score was kept
+    failed: int
+    progress: float  # processed / total
+    error: Optional[str] = None
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
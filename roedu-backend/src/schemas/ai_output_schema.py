@@ -0,0 +1,83 @@
+"""
+Schemas for structured AI output
+Sent to the provider as the response schema and used to validate what comes back
+"""
+from pydantic import BaseModel, Field, field_validator
+from typing import List, Optional
+
+from src.schemas.quiz_schema import QuestionType
+
+
+def _as_list(value):
+    """Models sometimes return a single string where a list is expected"""
+    if value is None:
+        return value
+    if isinstance(value, list):
+        return [str(item) for item in value]
+    return [str(value)]
+
+
+# Quiz generation
+class GeneratedQuestion(BaseModel):
+    question_text: str = Field(..., min_length=1)
+    question_type: QuestionType
+    options: Optional[List[str]] = None
+    correct_answers: List[str] = Field(default_factory=list)
+    evaluation_criteria: Optional[str] = None
+    points: float = Field(1.0, ge=0)
+
+    @field_validator("options", "correct_answers", mode="before")
+    @classmethod
+    def coerce_lists(cls, value):
+        return _as_list(value)
+
+    @field_validator("points", mode="before")
+    @classmethod
+    def default_points(cls, value):
+        return 1.0 if value is None else value
+
+
+class GeneratedQuiz(BaseModel):
+    title: Optional[str] = None
+    description: Optional[str] = None
+    subject: Optional[str] = None
+    grade_level: Optional[int] = None
+    questions: List[GeneratedQuestion] = Field(..., min_length=3)
+
+
+# Free-text evaluation
+class EvaluationBreakdown(BaseModel):
+    corectitudine: float = 0
+    completitudine: float = 0
+    claritate: float = 0
+
+
+class EvaluationBreakdownPercentage(BaseModel):
+    correctness_percent: float = 0
+    completeness_percent: float = 0
+    clarity_percent: float = 0
+
+
+class FreeTextEvaluation(BaseModel):
+    score: float
+    feedback: str = "No feedback available"
+    reasoning: str = ""
+    score_breakdown_percentage: Optional[EvaluationBreakdownPercentage] = None
+    score_breakdown: Optional[EvaluationBreakdown] = None
+    strengths: List[str] = Field(default_factory=list)
+    improvements: List[str] = Field(default_factory=list)
+    suggestions: List[str] = Field(default_factory=list)
+
+    @field_validator("strengths", "improvements", "suggestions", mode="before")
+    @classmethod
+    def coerce_lists(cls, value):
+        return _as_list(value) or []
+
+
+# Batch free-text evaluation (many answers to one question in a single call)
+class BatchEvaluationItem(FreeTextEvaluation):
+    answer_id: str
+
+
+class BatchEvaluation(BaseModel):
+    evaluations: List[BatchEvaluationItem] = Field(default_factory=list)
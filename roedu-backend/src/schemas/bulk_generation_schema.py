@@ -0,0 +1,41 @@
+from pydantic import BaseModel, Field
+from typing import List, Optional
+from datetime import datetime
+
+from src.config.settings import settings
+
+class BulkQuizGenerationRequest(BaseModel):
+    """Admin request to generate practice quizzes for all materials matching a filter"""
+    subject: Optional[str] = None
+    grade_level: Optional[int] = Field(None, ge=9, le=12)
+    professor_id: Optional[int] = None
+    concurrency: int = Field(default=settings.BULK_GENERATION_CONCURRENCY, ge=1, le=32)
+    requests_per_minute: int = Field(default=settings.BULK_GENERATION_RPM, ge=1, le=1000)
+
+class BulkJobResumeRequest(BaseModel):
+    retry_failed: bool = False
+
+class BulkGenerationItemResponse(BaseModel):
+    material_id: int
+    status: str
+    quiz_id: Optional[int] = None
+    error: Optional[str] = None
+    attempts: int = 0
+    finished_at: Optional[datetime] = None
+
+class BulkGenerationJobResponse(BaseModel):
+    id: int
+    status: str
+    subject: Optional[str] = None
+    grade_level: Optional[int] = None
+    professor_id: Optional[int] = None
+    concurrency: int
+    requests_per_minute: int
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    total: int
+    succeeded: int
+    failed: int
+    pending: int
+    items: List[BulkGenerationItemResponse] = []
@@ -111,15 +111,85 @@ class QuizAttemptResponse(BaseModel):
     is_expired: int = 0
     student_email: Optional[str] = None  # Student email for professor view
     duration_seconds: Optional[int] = None  # Total time spent on quiz
+    grading_status: Optional[str] = None  # "pending" while free-text answers are being evaluated
     
     model_config = ConfigDict(from_attributes=True)
 
+class AnswerAutosaveRequest(BaseModel):
+    """Answers changed since the last autosave"""
+    answers: Dict[int, Optional[Union[List[str], str]]]  # question_id -> answer (null clears it)
+
+class AnswerAutosaveResponse(BaseModel):
+    attempt_id: int
+    buffered_questions: int  # Questions of the attempt waiting to be written
+
+class AttemptTimerResponse(BaseModel):
+    """Server-side timer of an attempt (GET /quizzes/attempts/{id}/timer)"""
+    attempt_id: int
+    deadline_at: datetime
+    time_remaining: int  # in seconds
+    is_expired: bool
+    completed: bool
+
+class HistogramResponse(BaseModel):
+    bin_edges: List[float]  # bins + 1 edges
+    counts: List[int]
+    
+    model_config = ConfigDict(from_attributes=True)
+
+class QuestionAnalyticsResponse(BaseModel):
+    question_id: int
+    question_type: str
+    points: float
+    average_score: Optional[float] = None
+    difficulty: Optional[float] = None  # p-value: mean fraction of the points earned
+    discrimination: Optional[float] = None  # Upper 27% minus lower 27% difficulty
+    option_counts: Optional[Dict[str, int]] = None  # Choice questions: attempts that picked each option
+    unanswered: int
+    other_answers: int
+    histogram: HistogramResponse
+    
+    model_config = ConfigDict(from_attributes=True)
+
+class QuizAnalyticsResponse(BaseModel):
+    """Item analytics of a quiz over its finished attempts"""
+    quiz_id: int
+    attempts: int
+    max_score: float
+    mean_score: Optional[float] = None
+    score_histogram: HistogramResponse
+    questions: List[QuestionAnalyticsResponse]
+    computed_at: datetime
+    
+    model_config = ConfigDict(from_attributes=True)
+
+class QuizPrewarmResponse(BaseModel):
+    """Caches loaded for a quiz ahead of a class start"""
+    quiz_id: int
+    students: Optional[int] = None  # Members of the quiz's group (None without a group)
+    questions: int
+
 class QuizResultResponse(BaseModel):
     attempt: QuizAttemptResponse
     correct_answers: Dict[int, List[str]]
     student_answers: Dict[int, List[str]]
     question_scores: Dict[int, float]
     ai_evaluations: Optional[Dict[int, Any]] = None  # AI evaluation details by question_id
+    pending_questions: List[int] = []  # Free-text questions still being graded
+
+class AttemptScoresResponse(BaseModel):
+    attempt_id: int
+    student_id: int
+    score: float
+    grading_status: Optional[str] = None
+    question_scores: Dict[int, float]
+
+class QuizScoresResponse(BaseModel):
+    """Scores of every finished attempt of a quiz"""
+    quiz_id: int
+    max_score: float
+    question_averages: Dict[int, float]
+    attempts: List[AttemptScoresResponse]
 
 # AI Quiz Generation
 class AIQuizGenerateRequest(BaseModel):
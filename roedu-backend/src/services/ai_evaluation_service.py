@@ -4,52 +4,100 @@ Implements specialized evaluation for free text answers
 Similar to AssesmentLearningPlatform's AI evaluation system
 """
 
-import os
-import json
+import asyncio
 import logging
-from typing import Dict, Any, Optional, Tuple
-import google.generativeai as genai
+from typing import Dict, Any, List, Optional, Tuple
+
+from pydantic import ValidationError
+
+from src.config.settings import settings
+from src.schemas.ai_output_schema import BatchEvaluation, BatchEvaluationItem, FreeTextEvaluation
+from src.services.answer_triage import record_triage, triage_answer
+from src.services.llm_client import LLMCircuitOpenError, get_service_llm_client
+from src.utils.json_repair import parse_json_object
+from src.utils.metrics import metrics
 
 logger = logging.getLogger(__name__)
 
+# Calls per answer when the response cannot be parsed (1 retry)
+MAX_EVALUATION_ATTEMPTS = 2
+
+EvaluationResult = Tuple[float, str, Dict[str, Any]]
+
 
 class AIEvaluationService:
     """Service for evaluating free text answers using AI"""
     
     def __init__(self):
         """Initialize Gemini AI client"""
-        api_key = os.getenv("GEMINI_API_KEY")
-        if not api_key:
+        self.llm = get_service_llm_client("gemini")
+        self.enabled = self.llm.enabled
+        if not self.enabled:
             logger.warning("GEMINI_API_KEY not set - AI evaluation will use fallback keyword matching")
-            self.enabled = False
-        else:
-            genai.configure(api_key=api_key)
-            # Use gemini-2.5-flash (latest available, fast, and cost-effective)
-            self.model = genai.GenerativeModel('gemini-2.5-flash')
-            self.enabled = True
     
-    def evaluate_free_text_answer(
+    async def evaluate_free_text_answer(
         self,
         question_text: str,
         student_answer: str,
         correct_criteria: str,
         max_score: float = 100.0,
-        question_type: str = "free_text"
+        question_type: str = "free_text",
+        correct_answers: Optional[List[str]] = None
     ) -> Tuple[float, str, Dict[str, Any]]:
         """
         Evaluate a free text answer using AI
         
+        Trivial answers (empty, copy of the question, exact reference answer...)
+        are scored locally by answer_triage without calling the AI.
+        
         Args:
             question_text: The quiz question
             student_answer: Student's answer text
             correct_criteria: Evaluation criteria/keywords
             max_score: Maximum points for this question
             question_type: Type of question
+            correct_answers: Reference answers of the question, if any
         
         Returns:
             Tuple of (score, feedback, metadata_dict)
         """
-        
+        triaged = self._triage(question_text, student_answer, correct_criteria, max_score, correct_answers)
+        if triaged:
+            return triaged
+        return await self._evaluate_with_ai(
+            question_text,
+            student_answer,
+            correct_criteria,
+            max_score,
+            question_type
+        )
+    
+    def _triage(
+        self,
+        question_text: str,
+        student_answer: str,
+        correct_criteria: str,
+        max_score: float,
+        correct_answers: Optional[List[str]]
+    ) -> Optional[EvaluationResult]:
+        """Local result for a trivial answer (None if the answer needs the AI)"""
+        if not settings.TRIAGE_ENABLED:
+            return None
+        result = triage_answer(question_text, student_answer, correct_criteria, max_score, correct_answers)
+        record_triage(result)
+        if result is None:
+            return None
+        return result.score, result.feedback, result.metadata
+    
+    async def _evaluate_with_ai(
+        self,
+        question_text: str,
+        student_answer: str,
+        correct_criteria: str,
+        max_score: float,
+        question_type: str
+    ) -> EvaluationResult:
+        """Evaluate one answer with the AI (keyword matching if unavailable)"""
         if not self.enabled:
             logger.info("AI evaluation disabled, using keyword matching")
             return self._evaluate_with_keywords(
@@ -58,35 +106,155 @@ class AIEvaluationService:
                 max_score
             )
         
+        prompt = self._build_evaluation_prompt(
+            question_text,
+            student_answer,
+            correct_criteria,
+            max_score,
+            question_type
+        )
+        
+        for attempt in range(1, MAX_EVALUATION_ATTEMPTS + 1):
+            try:
+                # Call Gemini API (JSON constrained to FreeTextEvaluation)
+                response = await self.llm.generate(
+                    prompt,
+                    operation="free_text_evaluation",
+                    response_schema=FreeTextEvaluation.model_json_schema()
+                )
+                
+                # Parse AI response (repaired locally if malformed)
+                return self._parse_ai_response(
+                    response.text,
+                    max_score,
+                    question_type
+                )
+                
+            except ValueError as e:
+                if attempt < MAX_EVALUATION_ATTEMPTS:
+                    logger.warning(f"⚠️  Unusable AI evaluation ({str(e)}), retrying")
+                    metrics.inc("llm_retries_total", operation="free_text_evaluation")
+                    continue
+                logger.error(f"AI evaluation unusable after {attempt} attempts, falling back to keyword matching")
+                metrics.inc("llm_fallbacks_total", operation="free_text_evaluation", reason="invalid_response")
+            except LLMCircuitOpenError:
+                # Provider is failing - skip straight to the fallback
+                metrics.inc("llm_fallbacks_total", operation="free_text_evaluation", reason="circuit_open")
+                break
+            except Exception as e:
+                logger.error(f"AI evaluation failed: {str(e)}, falling back to keyword matching")
+                metrics.inc("llm_fallbacks_total", operation="free_text_evaluation", reason="error")
+                break
+        
+        return self._evaluate_with_keywords(
+            student_answer,
+            correct_criteria,
+            max_score
+        )
+    
+    async def evaluate_free_text_batch(
+        self,
+        question_text: str,
+        student_answers: List[str],
+        correct_criteria: str,
+        max_score: float = 100.0,
+        question_type: str = "free_text",
+        correct_answers: Optional[List[str]] = None
+    ) -> List[EvaluationResult]:
+        """
+        Evaluate many answers to the same question with a single AI call
+        
+        Trivial answers are scored locally first (see answer_triage); the
+        question, criteria and scoring rules are then sent once, followed by the
+        remaining answers tagged with IDs, and the response holds one evaluation
+        per ID. Answers whose evaluation is missing or invalid are evaluated
+        again one by one.
+        
+        Returns:
+            One (score, feedback, metadata_dict) per answer, in input order
+        """
+        triaged: Dict[int, EvaluationResult] = {}
+        for index, answer in enumerate(student_answers):
+            result = self._triage(question_text, answer, correct_criteria, max_score, correct_answers)
+            if result:
+                triaged[index] = result
+        forwarded = [index for index in range(len(student_answers)) if index not in triaged]
+        if not forwarded:
+            return [triaged[index] for index in range(len(student_answers))]
+        
+        evaluated = await self._evaluate_batch_with_ai(
+            question_text,
+            [student_answers[index] for index in forwarded],
+            correct_criteria,
+            max_score,
+            question_type
+        )
+        triaged.update(zip(forwarded, evaluated))
+        return [triaged[index] for index in range(len(student_answers))]
+    
+    async def _evaluate_batch_with_ai(
+        self,
+        question_text: str,
+        student_answers: List[str],
+        correct_criteria: str,
+        max_score: float,
+        question_type: str
+    ) -> List[EvaluationResult]:
+        """Evaluate answers with one AI call, individually for those it misses"""
+        if not self.enabled:
+            return [
+                self._evaluate_with_keywords(answer, correct_criteria, max_score)
+                for answer in student_answers
+            ]
+        
+        prompt = self._build_batch_evaluation_prompt(
+            question_text,
+            student_answers,
+            correct_criteria,
+            max_score
+        )
+        
+        results: Dict[int, EvaluationResult] = {}
         try:
-            prompt = self._build_evaluation_prompt(
-                question_text,
-                student_answer,
-                correct_criteria,
-                max_score,
-                question_type
+            response = await self.llm.generate(
+                prompt,
+                operation="free_text_batch_evaluation",
+                response_schema=BatchEvaluation.model_json_schema()
             )
-            
-            # Call Gemini API
-            response = self.model.generate_content(prompt)
-            response_text = response.text
-            
-            # Parse AI response
-            score, feedback, metadata = self._parse_ai_response(
-                response_text,
+            results = self._parse_batch_response(
+                response.text,
+                len(student_answers),
                 max_score,
                 question_type
             )
-            
-            return score, feedback, metadata
-            
+        except LLMCircuitOpenError:
+            # Provider is failing - individual calls would fail fast too
+            metrics.inc("llm_fallbacks_total", operation="free_text_batch_evaluation", reason="circuit_open")
+            return [
+                self._evaluate_with_keywords(answer, correct_criteria, max_score)
+                for answer in student_answers
+            ]
         except Exception as e:
-            logger.error(f"AI evaluation failed: {str(e)}, falling back to keyword matching")
-            return self._evaluate_with_keywords(
-                student_answer,
-                correct_criteria,
-                max_score
-            )
+            logger.error(f"Batch AI evaluation failed: {str(e)}, evaluating answers individually")
+        
+        missing = [index for index in range(len(student_answers)) if index not in results]
+        metrics.inc("grading_batch_answers_total", len(results), outcome="batched")
+        if missing:
+            metrics.inc("grading_batch_answers_total", len(missing), outcome="individual")
+            logger.warning(f"⚠️  {len(missing)}/{len(student_answers)} answers not evaluated in batch, evaluating individually")
+            individual = await asyncio.gather(*(
+                self._evaluate_with_ai(
+                    question_text,
+                    student_answers[index],
+                    correct_criteria,
+                    max_score,
+                    question_type
+                )
+                for index in missing
+            ))
+            results.update(zip(missing, individual))
+        
+        return [results[index] for index in range(len(student_answers))]
     
     def _build_evaluation_prompt(
         self,
@@ -175,76 +343,169 @@ CERINȚE IMPORTANTE:
         
         return prompt
     
+    def _build_batch_evaluation_prompt(
+        self,
+        question_text: str,
+        student_answers: List[str],
+        correct_criteria: str,
+        max_score: float
+    ) -> str:
+        """Build the evaluation prompt for many answers to one question (answer IDs 1..n)"""
+        
+        answers_block = "\n\n".join(
+            f"--- RĂSPUNS ID: {index} ---\n{answer}"
+            for index, answer in enumerate(student_answers, start=1)
+        )
+        
+        prompt = f"""Ești un evaluator educațional expert specializat în evaluarea răspunsurilor studenților.
+Evaluează SEPARAT fiecare dintre cele {len(student_answers)} răspunsuri de mai jos la aceeași întrebare.
+
+ÎNTREBARE:
+{question_text}
+
+CRITERII DE EVALUARE / PUNCTE CHEIE:
+{correct_criteria}
+
+PUNCTAJ MAXIM: {int(max_score)} puncte
+
+LINIILE DIRECTOARE DE EVALUARE:
+1. **Corectitudine**: Răspunsul este factual corect?
+2. **Completitudine**: Răspunsul abordează toate aspectele întrebării?
+3. **Claritate**: Explicația este clară și bine structurată?
+4. **Înțelegere**: Răspunsul demonstrează o înțelegere adevărată, nu doar memorare?
+
+SCALA DE PUNCTARE:
+- Punctaj complet ({int(max_score)} pct): Răspuns cuprinzător, corect și care demonstrează înțelegere profundă
+- 60% ({int(max_score * 0.6)} pct): Răspuns care acoperă punctele principale dar le lipsește completitudinea sau claritatea
+- 20% ({int(max_score * 0.2)} pct): Înțelegere minimă, răspuns în mare parte incorect
+- 0% (0 pct): Fără răspuns sau complet incorect
+
+RĂSPUNSURILE STUDENȚILOR:
+{answers_block}
+
+Furnizează evaluările în următorul format JSON (TREBUIE SĂ FIE JSON VALID), câte una pentru fiecare ID:
+{{
+    "evaluations": [
+        {{
+            "answer_id": "<ID-ul răspunsului, ex: 1>",
+            "score": <punctajul final (0-{int(max_score)})>,
+            "feedback": "<Feedback concis pentru acest răspuns>",
+            "reasoning": "<Explicație scurtă a punctajului>",
+            "score_breakdown": {{
+                "corectitudine": <puncte>,
+                "completitudine": <puncte>,
+                "claritate": <puncte>
+            }},
+            "strengths": ["<Punct forte 1>", "<Punct forte 2>"],
+            "improvements": ["<Îmbunătățire 1>", "<Îmbunătățire 2>"],
+            "suggestions": ["<Sugestie 1>", "<Sugestie 2>"]
+        }}
+    ]
+}}
+
+CERINȚE IMPORTANTE:
+- Exact o evaluare pentru fiecare ID, fără a compara răspunsurile între ele
+- \"score\" trebuie să fie între 0 și {int(max_score)}; suma componentelor din score_breakdown = score
+- Feedback-ul trebuie să fie ÎN LIMBA ROMÂNĂ, specific răspunsului evaluat"""
+        
+        return prompt
+    
+    def _parse_batch_response(
+        self,
+        response_text: str,
+        answer_count: int,
+        max_score: float,
+        question_type: str
+    ) -> Dict[int, EvaluationResult]:
+        """
+        Parse a batch evaluation response
+        
+        Each evaluation is validated on its own, so one bad item does not
+        discard the rest. Returns results keyed by answer index (0-based);
+        answers without a valid evaluation are missing from the dict.
+        
+        Raises:
+            ValueError: if no JSON object can be recovered from the response
+        """
+        try:
+            raw, repaired = parse_json_object(response_text)
+        except ValueError:
+            metrics.inc("llm_parse_total", operation="free_text_batch_evaluation", outcome="invalid")
+            raise
+        metrics.inc("llm_parse_total", operation="free_text_batch_evaluation", outcome="repaired" if repaired else "ok")
+        
+        items = raw.get("evaluations")
+        results: Dict[int, EvaluationResult] = {}
+        for item in items if isinstance(items, list) else []:
+            try:
+                data = BatchEvaluationItem.model_validate(item)
+                index = int(str(data.answer_id).strip()) - 1
+            except (ValidationError, ValueError):
+                continue
+            if 0 <= index < answer_count and index not in results:
+                score, feedback, metadata = self._evaluation_result(data, max_score, question_type, repaired)
+                metadata["batch_size"] = answer_count
+                results[index] = (score, feedback, metadata)
+        return results
+    
     def _parse_ai_response(
         self,
         response_text: str,
         max_score: float,
         question_type: str
     ) -> Tuple[float, str, Dict[str, Any]]:
-        """Parse AI response and extract score, feedback, and detailed breakdown"""
+        """
+        Parse AI response and extract score, feedback, and detailed breakdown
         
+        Raises:
+            ValueError: if the response cannot be parsed/repaired or fails validation
+        """
         try:
-            # Try to extract JSON from response
-            json_start = response_text.find('{')
-            json_end = response_text.rfind('}') + 1
-            
-            if json_start == -1 or json_end <= json_start:
-                logger.warning("Could not find JSON in AI response")
-                raise ValueError("No JSON found in response")
-            
-            json_str = response_text[json_start:json_end]
-            data = json.loads(json_str)
-            
-            # Validate and normalize score
-            score = float(data.get("score", 0))
-            score = max(0, min(score, max_score))  # Clamp between 0 and max_score
-            
-            feedback = data.get("feedback", "No feedback available")
-            
-            # Extract detailed feedback components
-            score_breakdown = data.get("score_breakdown", {})
-            
-            # Normalize Romanian field names to English for consistency
-            # AI returns: {"corectitudine": X, "completitudine": Y, "claritate": Z}
-            # We convert to: {"correctness": X, "completeness": Y, "clarity": Z}
-            normalized_breakdown = {}
-            if score_breakdown:
-                normalized_breakdown["correctness"] = score_breakdown.get("corectitudine", 0)
-                normalized_breakdown["completeness"] = score_breakdown.get("completitudine", 0)
-                normalized_breakdown["clarity"] = score_breakdown.get("claritate", 0)
-            
-            strengths = data.get("strengths", [])
-            improvements = data.get("improvements", [])
-            suggestions = data.get("suggestions", [])
-            reasoning = data.get("reasoning", "")
-            
-            metadata = {
-                "version": "v2-detailed-feedback",
-                "question_type": question_type,
-                "max_score": max_score,
-                "reasoning": reasoning,
-                "score_breakdown": normalized_breakdown,
-                "strengths": strengths,
-                "improvements": improvements,
-                "suggestions": suggestions,
-                "ai_generated": True
-            }
-            
-            return score, feedback, metadata
-            
-        except (json.JSONDecodeError, ValueError, KeyError) as e:
+            raw, repaired = parse_json_object(response_text)
+            data = FreeTextEvaluation.model_validate(raw)
+        except (ValueError, ValidationError) as e:
+            metrics.inc("llm_parse_total", operation="free_text_evaluation", outcome="invalid")
             logger.error(f"Failed to parse AI response: {str(e)}")
-            # Fallback: return middle score with generic feedback
-            score = max_score * 0.5
-            feedback = "Could not properly evaluate your answer. Please review with your instructor."
-            metadata = {
-                "version": "v1-fallback",
-                "question_type": question_type,
-                "max_score": max_score,
-                "error": str(e),
-                "ai_generated": False
-            }
-            return score, feedback, metadata
+            raise ValueError(f"Invalid evaluation JSON in AI response: {str(e)}")
+        
+        metrics.inc("llm_parse_total", operation="free_text_evaluation", outcome="repaired" if repaired else "ok")
+        return self._evaluation_result(data, max_score, question_type, repaired)
+    
+    def _evaluation_result(
+        self,
+        data: FreeTextEvaluation,
+        max_score: float,
+        question_type: str,
+        repaired: bool = False
+    ) -> EvaluationResult:
+        """Score, feedback and metadata of a validated evaluation"""
+        # Validate and normalize score
+        score = max(0, min(data.score, max_score))  # Clamp between 0 and max_score
+        
+        # Normalize Romanian field names to English for consistency
+        # AI returns: {"corectitudine": X, "completitudine": Y, "claritate": Z}
+        # We convert to: {"correctness": X, "completeness": Y, "clarity": Z}
+        normalized_breakdown = {}
+        if data.score_breakdown:
+            normalized_breakdown["correctness"] = data.score_breakdown.corectitudine
+            normalized_breakdown["completeness"] = data.score_breakdown.completitudine
+            normalized_breakdown["clarity"] = data.score_breakdown.claritate
+        
+        metadata = {
+            "version": "v2-detailed-feedback",
+            "question_type": question_type,
+            "max_score": max_score,
+            "reasoning": data.reasoning,
+            "score_breakdown": normalized_breakdown,
+            "strengths": data.strengths,
+            "improvements": data.improvements,
+            "suggestions": data.suggestions,
+            "ai_generated": True
+        }
+        if repaired:
+            metadata["repaired_json"] = True
+        
+        return score, data.feedback, metadata
     
     def _evaluate_with_keywords(
         self,
@@ -309,7 +570,7 @@ def get_ai_evaluation_service() -> AIEvaluationService:
     return _ai_service
 
 
-def evaluate_answer(
+async def evaluate_answer(
     question_text: str,
     student_answer: str,
     correct_criteria: str,
@@ -322,7 +583,7 @@ def evaluate_answer(
         Tuple of (score, feedback)
     """
     service = get_ai_evaluation_service()
-    score, feedback, _ = service.evaluate_free_text_answer(
+    score, feedback, _ = await service.evaluate_free_text_answer(
         question_text,
         student_answer,
         correct_criteria,
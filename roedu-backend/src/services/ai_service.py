@@ -2,6 +2,7 @@ from typing import List, Dict, Any, Optional
 import json
 from src.config.settings import settings
 from src.schemas.quiz_schema import AIQuizGenerateRequest, QuestionCreate, QuestionType
+from src.services.llm_client import get_service_llm_client
 
 class AIService:
     """
@@ -10,15 +11,8 @@ class AIService:
     
     def __init__(self):
         self.ai_enabled = settings.AI_ENABLED
-        if self.ai_enabled and settings.OPENAI_API_KEY:
-            try:
-                import openai
-                self.client = openai.OpenAI(api_key=settings.OPENAI_API_KEY)
-            except ImportError:
-                self.ai_enabled = False
-                self.client = None
-        else:
-            self.client = None
+        llm = get_service_llm_client("openai")
+        self.client = llm if llm.enabled else None
     
     async def generate_quiz(self, request: AIQuizGenerateRequest) -> List[QuestionCreate]:
         """
@@ -32,18 +26,16 @@ class AIService:
             # Build prompt for OpenAI
             prompt = self._build_quiz_prompt(request)
             
-            response = self.client.chat.completions.create(
-                model="gpt-3.5-turbo",
-                messages=[
-                    {"role": "system", "content": "You are an educational quiz generator. Generate quiz questions in JSON format."},
-                    {"role": "user", "content": prompt}
-                ],
+            response = await self.client.generate(
+                prompt,
+                operation="quiz_questions",
+                system="You are an educational quiz generator. Generate quiz questions in JSON format.",
                 temperature=0.7,
-                max_tokens=2000
+                max_output_tokens=2000
             )
             
             # Parse response
-            content = response.choices[0].message.content
+            content = response.text
             questions_data = json.loads(content)
             
             # Convert to QuestionCreate objects
@@ -131,18 +123,36 @@ Make questions appropriate for the grade level and profile type. For multiple ch
         try:
             prompt = f"Context: {context}\n\nÎntrebare: {question}\n\nRăspunde în limba română, clar și educațional:"
             
-            response = self.client.chat.completions.create(
-                model="gpt-3.5-turbo",
-                messages=[
-                    {"role": "system", "content": "You are a helpful educational assistant for Romanian high school students. Answer in Romanian."},
-                    {"role": "user", "content": prompt}
-                ],
+            response = await self.client.generate(
+                prompt,
+                operation="answer_question",
+                system="You are a helpful educational assistant for Romanian high school students. Answer in Romanian.",
                 temperature=0.7,
-                max_tokens=500
+                max_output_tokens=500
             )
             
-            return response.choices[0].message.content
+            return response.text
         
         except Exception as e:
             print(f"AI Answer Error: {e}")
-            return "Ne pare rău, nu am putut genera un răspuns momentan."
\ No newline at end of file
+            return "Ne pare rău, nu am putut genera un răspuns momentan."
+
+
+# Global instance
+_ai_service: Optional[AIService] = None
+
+
+def get_ai_service() -> AIService:
+    """Get or create AI service instance"""
+    global _ai_service
+    if _ai_service is None:
+        _ai_service = AIService()
+    return _ai_service
+
+
+async def ask_ai_about_material(material, question: str) -> str:
+    """
+    Answer a question about a material, using its content as context
+    """
+    context = f"{material.title}\n\n{material.content or material.description or ''}"
+    return await get_ai_service().answer_question(question, context[:4000])
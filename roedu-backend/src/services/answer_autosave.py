@@ -0,0 +1,175 @@
+"""
+Answer Autosave
+Buffers the per-question answer deltas students autosave during an attempt
+and writes them to quiz_attempts.answers in coalesced batches.
+
+- PATCH /attempts/{id}/answers only updates the in-memory buffer: the latest
+  answer per question wins, so any number of autosaves costs one write per
+  attempt per AUTOSAVE_FLUSH_INTERVAL_SECONDS
+- A flush merges every buffered attempt in one transaction; each UPDATE is
+  conditional on the attempt still being open
+- Submit (and the deadline sweeper) merge the buffered deltas - including the
+  ones of a flush in progress - into the attempt, so the client does not have
+  to re-send its answers and no delta is lost to a concurrent flush
+"""
+
+import asyncio
+import json
+import logging
+import threading
+from typing import Any, Dict, Iterable, Optional
+
+from sqlalchemy import update
+
+from src.config import database
+from src.config.settings import settings
+from src.models.quiz import QuizAttempt
+from src.utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+
+def apply_deltas(answers_json: Optional[str], deltas: Dict[str, Any]) -> str:
+    """Answers JSON with the deltas applied (a None answer clears the question)"""
+    try:
+        answers = json.loads(answers_json) if answers_json else {}
+    except json.JSONDecodeError:
+        answers = {}
+    for question_id, answer in deltas.items():
+        if answer is None:
+            answers.pop(question_id, None)
+        else:
+            answers[question_id] = answer
+    return json.dumps(answers)
+
+
+class AnswerAutosave:
+    """Autosaved answer deltas by attempt, flushed every AUTOSAVE_FLUSH_INTERVAL_SECONDS"""
+
+    def __init__(self, interval: Optional[float] = None):
+        self.interval = interval or settings.AUTOSAVE_FLUSH_INTERVAL_SECONDS
+        self._pending: Dict[int, Dict[str, Any]] = {}
+        self._flushing: Dict[int, Dict[str, Any]] = {}  # Taken by the flush in progress
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None
+
+    def record(self, attempt_id: int, deltas: Dict[Any, Any]) -> int:
+        """
+        Buffer answer deltas of an attempt
+
+        Returns:
+            Number of questions of the attempt waiting to be written
+        """
+        with self._lock:
+            pending = self._pending.setdefault(attempt_id, {})
+            pending.update({str(question_id): answer for question_id, answer in deltas.items()})
+            buffered = len(pending)
+        metrics.inc("autosave_deltas_total", len(deltas))
+        return buffered
+
+    def take(self, attempt_id: int) -> Dict[str, Any]:
+        """Buffered deltas of an attempt (dropped from the buffer), for merging on submit"""
+        with self._lock:
+            deltas = dict(self._flushing.get(attempt_id, {}))
+            deltas.update(self._pending.pop(attempt_id, {}))
+        return deltas
+
+    def merge_pending(self, attempt: QuizAttempt) -> bool:
+        """Apply the attempt's buffered deltas to attempt.answers (does not commit)"""
+        deltas = self.take(attempt.id)
+        if deltas:
+            attempt.answers = apply_deltas(attempt.answers, deltas)
+        return bool(deltas)
+
+    def restore(self, attempt_id: int, deltas: Dict[str, Any]):
+        """Put taken deltas back (their submit failed), behind anything recorded meanwhile"""
+        if deltas:
+            with self._lock:
+                self._pending[attempt_id] = {**deltas, **self._pending.get(attempt_id, {})}
+
+    def discard(self, attempt_id: int):
+        with self._lock:
+            self._pending.pop(attempt_id, None)
+
+    def flush(self, attempt_ids: Optional[Iterable[int]] = None) -> int:
+        """
+        Write the buffered deltas (of attempt_ids, or of every attempt)
+
+        Returns:
+            Number of attempts updated
+        """
+        with self._flush_lock:
+            with self._lock:
+                ids = list(self._pending) if attempt_ids is None else [i for i in attempt_ids if i in self._pending]
+                self._flushing = {attempt_id: self._pending.pop(attempt_id) for attempt_id in ids}
+            if not self._flushing:
+                return 0
+
+            written = 0
+            db = database.SessionLocal()
+            try:
+                attempts = db.query(QuizAttempt.id, QuizAttempt.answers).filter(
+                    QuizAttempt.id.in_(list(self._flushing)),
+                    QuizAttempt.completed_at.is_(None)
+                ).all()
+                for attempt_id, answers in attempts:
+                    written += db.execute(
+                        update(QuizAttempt)
+                        .where(QuizAttempt.id == attempt_id, QuizAttempt.completed_at.is_(None))
+                        .values(answers=apply_deltas(answers, self._flushing[attempt_id]))
+                        .execution_options(synchronize_session=False)
+                    ).rowcount
+                db.commit()
+            except Exception:
+                db.rollback()
+                # Put the deltas back behind anything recorded meanwhile
+                with self._lock:
+                    for attempt_id, deltas in self._flushing.items():
+                        self._pending[attempt_id] = {**deltas, **self._pending.get(attempt_id, {})}
+                raise
+            finally:
+                db.close()
+                with self._lock:
+                    self._flushing = {}
+
+        metrics.inc("autosave_flushed_attempts_total", written)
+        return written
+
+    async def start(self):
+        if self.running:
+            return
+        self._task = asyncio.create_task(self._run())
+        logger.info(f"💾 Answer autosave started (flush every {self.interval:g}s)")
+
+    async def stop(self):
+        """Stop the flush task and write what is still buffered"""
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        await asyncio.to_thread(self.flush)
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await asyncio.to_thread(self.flush)
+            except Exception as e:
+                logger.error(f"❌ Autosave flush failed: {str(e)}")
+
+
+# Global instance
+_answer_autosave: Optional[AnswerAutosave] = None
+
+
+def get_answer_autosave() -> AnswerAutosave:
+    """Get or create the answer autosave buffer"""
+    global _answer_autosave
+    if _answer_autosave is None:
+        _answer_autosave = AnswerAutosave()
+    return _answer_autosave
@@ -0,0 +1,170 @@
+"""
+Answer Clustering
+Many free-text answers to a question differ only in a few words. Answers to
+the same question are grouped with MinHash/LSH (character shingles of the
+normalized text) and each cluster is graded once:
+
+- members with similarity >= ANSWER_CLUSTER_THRESHOLD to the representative
+  get its grade; their report stores cluster_id and cluster_similarity so
+  professors can review the cluster
+- borderline members (similarity >= ANSWER_CLUSTER_BORDERLINE but below the
+  threshold) are graded individually, and so is any answer whose decisive
+  tokens differ from the representative's however similar the characters
+  are: a number ("300000 km/s" / "300 km/s"), a content word ("raza la
+  patrat" / "la cub", compared on their first letters so inflections still
+  match) or a negation
+"""
+
+import hashlib
+import logging
+import re
+from collections import defaultdict
+from dataclasses import dataclass, field, replace
+from typing import Dict, FrozenSet, List, Optional, Set, Tuple
+
+from src.config.settings import settings
+from src.services.grading_service import FreeTextAnswer, FreeTextGrade, grade_free_text_answers
+from src.utils.helpers import normalize_text
+from src.utils.metrics import metrics
+from src.utils.minhash import LSHIndex, MinHasher, jaccard, shingles
+
+logger = logging.getLogger(__name__)
+
+# A changed negation flips the meaning however similar the wording is
+NEGATION_WORDS = {"nu", "nici", "fara", "niciodata", "nimic", "not", "no", "never"}
+# Words this short are left out of the content-word check ("si", "de", "la"...)
+SHORT_WORD_LETTERS = 2
+# Content words are compared on their first letters ("oxigen" / "oxigenul")
+STEM_LETTERS = 5
+
+_hasher = MinHasher(num_perm=64)
+
+
+@dataclass
+class AnswerCluster:
+    """Answers graded with one evaluation (indexes into the graded list)"""
+    cluster_id: str
+    representative: int
+    members: List[Tuple[int, float]] = field(default_factory=list)  # (index, similarity), get the representative's grade
+    borderline: List[int] = field(default_factory=list)  # Similar but graded on their own
+
+
+@dataclass(frozen=True)
+class DecisiveTokens:
+    """Tokens two answers must share to get one grade"""
+    numbers: FrozenSet[str]
+    stems: FrozenSet[str]  # Content words, first STEM_LETTERS letters
+    negations: FrozenSet[str]
+
+
+def _number(token: str) -> str:
+    """Comparable form of a number: "-5" and "5" differ, "+5" and "5" do not"""
+    return token.replace("\u2212", "-").lstrip("+").replace(",", ".")
+
+
+def decisive_tokens(text: str) -> DecisiveTokens:
+    """Numbers (with their sign), content-word stems and negations of a normalized answer"""
+    words = re.findall(r"[^\W\d_]+", text)
+    return DecisiveTokens(
+        numbers=frozenset(_number(number) for number in re.findall(r"(?<!\w)[-+\u2212]?\d+(?:[.,]\d+)*", text)),
+        stems=frozenset(word[:STEM_LETTERS] for word in words if len(word) > SHORT_WORD_LETTERS),
+        negations=frozenset(words) & NEGATION_WORDS
+    )
+
+
+def cluster_answers(
+    answers: List[FreeTextAnswer],
+    threshold: Optional[float] = None,
+    borderline: Optional[float] = None
+) -> List[AnswerCluster]:
+    """
+    Group near-duplicate answers to the same question
+
+    Every answer is the representative of exactly one cluster or a member of
+    one; borderline answers become representatives of their own clusters.
+    Representatives are picked greedily, answers with the most near-duplicates first.
+    """
+    threshold = settings.ANSWER_CLUSTER_THRESHOLD if threshold is None else threshold
+    borderline = settings.ANSWER_CLUSTER_BORDERLINE if borderline is None else borderline
+
+    texts = [normalize_text(answer.student_answer) for answer in answers]
+    shingle_sets = [shingles(text) for text in texts]
+    tokens = [decisive_tokens(text) for text in texts]
+
+    by_question: Dict[int, List[int]] = defaultdict(list)
+    for index, answer in enumerate(answers):
+        by_question[answer.question_id].append(index)
+
+    clusters: List[AnswerCluster] = []
+    for question_id, indexes in by_question.items():
+        index = LSHIndex(bands=16, rows=4)
+        signatures = {i: _hasher.signature(shingle_sets[i]) for i in indexes}
+        for i in indexes:
+            index.add(i, signatures[i])
+
+        # Similarity to each candidate sharing an LSH band (checked exactly)
+        neighbours: Dict[int, List[Tuple[int, float]]] = {}
+        for i in indexes:
+            candidates = index.candidates(signatures[i]) - {i}
+            neighbours[i] = sorted(
+                ((j, jaccard(shingle_sets[i], shingle_sets[j])) for j in candidates),
+                key=lambda item: (-item[1], item[0])
+            )
+
+        assigned: Set[int] = set()
+        order = sorted(indexes, key=lambda i: (-sum(1 for _, sim in neighbours[i] if sim >= threshold), i))
+        for i in order:
+            if i in assigned:
+                continue
+            assigned.add(i)
+            cluster = AnswerCluster(
+                cluster_id=f"{question_id}:{hashlib.sha256(texts[i].encode('utf-8')).hexdigest()[:12]}",
+                representative=i
+            )
+            for j, similarity in neighbours[i]:
+                if j in assigned:
+                    continue
+                if similarity >= threshold and tokens[i] == tokens[j]:
+                    cluster.members.append((j, similarity))
+                    assigned.add(j)
+                elif similarity >= borderline:
+                    cluster.borderline.append(j)
+            clusters.append(cluster)
+    return clusters
+
+
+async def grade_clustered(answers: List[FreeTextAnswer]) -> List[FreeTextGrade]:
+    """
+    Grade one representative per cluster and give its grade to the members
+
+    Returns:
+        One FreeTextGrade per answer, in input order
+    """
+    if not settings.ANSWER_CLUSTERING_ENABLED or len(answers) < 2:
+        return await grade_free_text_answers(answers)
+
+    clusters = cluster_answers(answers)
+    representative_grades = await grade_free_text_answers([answers[c.representative] for c in clusters])
+
+    grades: List[Optional[FreeTextGrade]] = [None] * len(answers)
+    for cluster, grade in zip(clusters, representative_grades):
+        if cluster.members:
+            grade = replace(grade, cluster_id=cluster.cluster_id, cluster_similarity=1.0)
+        grades[cluster.representative] = grade
+        for member, similarity in cluster.members:
+            grades[member] = replace(
+                grade,
+                metadata={**grade.metadata, "cluster_propagated": True},
+                cluster_id=cluster.cluster_id,
+                cluster_similarity=round(similarity, 3)
+            )
+
+    propagated = sum(len(cluster.members) for cluster in clusters)
+    metrics.inc("grading_cluster_answers_total", len(clusters), outcome="evaluated")
+    metrics.inc("grading_cluster_answers_total", propagated, outcome="propagated")
+    representatives = {cluster.representative for cluster in clusters}
+    borderline = {index for cluster in clusters for index in cluster.borderline} & representatives
+    metrics.inc("grading_cluster_answers_total", len(borderline), outcome="borderline")
+    if propagated:
+        logger.info(f"🧩 {len(answers)} answers graded with {len(clusters)} evaluations ({propagated} propagated in clusters)")
+    return grades
@@ -0,0 +1,109 @@
+"""
+Answer Triage
+Deterministic checks run before a free-text answer is sent to the AI. Trivial
+answers are scored locally, at once, with standard feedback; only ambiguous
+ones go to the LLM.
+
+- empty answer -> 0
+- exactly one of the question's correct_answers (ignoring case, diacritics,
+  spacing and trailing sentence punctuation; signs and operators such as
+  - < > = . , / % count) -> full score. Near matches go to the AI: one
+  changed word ("nu", CO2 -> O2) or sign (-5 / 5) can make an answer wrong
+- copy of the question (similarity >= TRIAGE_COPY_SIMILARITY) -> 0
+
+Short answers are never zeroed locally: a single correct word ("Paris") can
+answer a question whose reference answer is a whole sentence.
+"""
+
+import re
+from dataclasses import dataclass, field
+from difflib import SequenceMatcher
+from typing import Any, Dict, List, Optional
+
+from src.config.settings import settings
+from src.utils.helpers import normalize_text
+from src.utils.metrics import metrics
+
+TRIAGE_VERSION = "local-triage-v3"
+
+FEEDBACK = {
+    "empty": "Nu ai oferit niciun răspuns.",
+    "correct_answer": "Răspuns corect - corespunde răspunsului așteptat.",
+    "question_copy": "Răspunsul doar repetă întrebarea, fără a oferi o explicație.",
+}
+
+
+@dataclass
+class TriageResult:
+    """Local score for a trivial answer"""
+    rule: str
+    score: float
+    feedback: str
+    metadata: Dict[str, Any] = field(default_factory=dict)
+
+
+def _comparable(text: str) -> str:
+    """Normalized text without punctuation"""
+    return " ".join(re.sub(r"[^\w\s]", " ", normalize_text(text)).split())
+
+
+def _exact_form(text: str) -> str:
+    """Normalized text for the exact-match rule: keeps signs and operators, drops trailing punctuation"""
+    return normalize_text((text or "").replace("\u2212", "-")).rstrip(" .!?;:…")
+
+
+def _similarity(a: str, b: str) -> float:
+    return SequenceMatcher(None, a, b).ratio() if a and b else 0.0
+
+
+def _result(rule: str, score: float, max_score: float, **details) -> TriageResult:
+    return TriageResult(rule, score, FEEDBACK[rule], {
+        "method": "local_triage",
+        "rule": rule,
+        "version": TRIAGE_VERSION,
+        "max_score": max_score,
+        "reasoning": f"Evaluat local (regula: {rule})",
+        **details
+    })
+
+
+def triage_answer(
+    question_text: str,
+    student_answer: str,
+    correct_criteria: str,
+    max_score: float,
+    correct_answers: Optional[List[str]] = None
+) -> Optional[TriageResult]:
+    """
+    Score an answer locally if it is trivial
+
+    Returns:
+        TriageResult, or None if the answer needs the AI
+    """
+    answer = _comparable(student_answer)
+    if not answer:
+        return _result("empty", 0.0, max_score)
+
+    references = {_exact_form(reference) for reference in correct_answers or [] if reference}
+    if _exact_form(student_answer) in references - {""}:
+        return _result("correct_answer", max_score, max_score)
+
+    question = _comparable(question_text)
+    similarity = _similarity(answer, question)
+    if similarity >= settings.TRIAGE_COPY_SIMILARITY:
+        return _result("question_copy", 0.0, max_score, similarity=round(similarity, 3))
+
+    return None
+
+
+def record_triage(result: Optional[TriageResult]):
+    """Count a triage decision; grading_triage_local_ratio is the share scored locally"""
+    if result:
+        metrics.inc("grading_triage_total", outcome="local", rule=result.rule)
+    else:
+        metrics.inc("grading_triage_total", outcome="llm", rule="none")
+    local = sum(
+        metrics.get("grading_triage_total", outcome="local", rule=rule) for rule in FEEDBACK
+    )
+    total = local + metrics.get("grading_triage_total", outcome="llm", rule="none")
+    metrics.set("grading_triage_local_ratio", local / total if total else 0.0)
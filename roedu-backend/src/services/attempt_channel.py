@@ -0,0 +1,162 @@
+"""
+Attempt Channel
+Live WebSocket channel of an active quiz attempt, replacing the timer-sync
+and autosave polling: the student authenticates once per connection.
+
+- One ticker task serves every connection: every ATTEMPT_CHANNEL_TICK_SECONDS
+  (sooner when a deadline falls in between) it pushes the server-authoritative
+  time remaining to every open channel
+- At the deadline the attempt is marked expired (attempt_timer.check_expiry)
+  and its channels get an "expired" message and are closed; attempts
+  submitted meanwhile get "completed"
+- Answer deltas sent over the channel go to the autosave buffer, like
+  PATCH /attempts/{id}/answers
+- The timer state comes from the in-memory timer cache, so a tick reads the
+  database only for open attempts whose cached state is due for a re-check
+  (attempt_timer.OPEN_STATE_RECHECK_SECONDS), in one worker thread per tick
+"""
+
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional, Set
+
+from fastapi import WebSocket
+
+from src.config.settings import settings
+from src.services.answer_autosave import get_answer_autosave
+from src.services.attempt_timer import TimerState, check_expiry, get_timer_state
+from src.utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Close codes (RFC 6455): normal closure, policy violation (auth/ownership)
+CLOSE_NORMAL = 1000
+CLOSE_POLICY_VIOLATION = 1008
+
+
+def tick_message(timer: TimerState, now: datetime) -> Dict[str, Any]:
+    return {
+        "type": "tick",
+        "attempt_id": timer.attempt_id,
+        "time_remaining": timer.remaining(now),
+        "deadline_at": timer.deadline_at.isoformat()
+    }
+
+
+class AttemptChannelHub:
+    """Open channels by attempt id, with the ticker task pushing their countdown"""
+
+    def __init__(self, tick_interval: Optional[float] = None):
+        self.tick_interval = tick_interval or settings.ATTEMPT_CHANNEL_TICK_SECONDS
+        self._channels: Dict[int, Set[WebSocket]] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._wake: Optional[asyncio.Event] = None
+        self._next_tick_at = datetime.min
+
+    @property
+    def connections(self) -> int:
+        return sum(len(sockets) for sockets in self._channels.values())
+
+    def connect(self, attempt_id: int, websocket: WebSocket, timer: TimerState):
+        """Register an accepted channel (and start the ticker, or wake it for an earlier deadline)"""
+        self._channels.setdefault(attempt_id, set()).add(websocket)
+        metrics.set("attempt_channel_connections", self.connections)
+        if self._task is None or self._task.done() or self._task.get_loop() is not asyncio.get_running_loop():
+            self._wake = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+        elif timer.deadline_at < self._next_tick_at:
+            self._wake.set()
+
+    def disconnect(self, attempt_id: int, websocket: WebSocket):
+        sockets = self._channels.get(attempt_id)
+        if sockets is not None:
+            sockets.discard(websocket)
+            if not sockets:
+                del self._channels[attempt_id]
+        metrics.set("attempt_channel_connections", self.connections)
+
+    def handle_message(self, attempt_id: int, message: Any) -> Dict[str, Any]:
+        """Reply to a client message ({"type": "answers", "answers": {question_id: answer}})"""
+        if not isinstance(message, dict) or message.get("type") != "answers" or not isinstance(message.get("answers"), dict):
+            return {"type": "error", "detail": "Expected {\"type\": \"answers\", \"answers\": {...}}"}
+        buffered = get_answer_autosave().record(attempt_id, message["answers"])
+        return {"type": "saved", "attempt_id": attempt_id, "buffered_questions": buffered}
+
+    async def _send(self, attempt_id: int, message: Dict[str, Any], close: bool = False):
+        """Send a message to every channel of an attempt (dropping the broken ones)"""
+        sockets = list(self._channels.get(attempt_id, ()))
+
+        async def send(websocket: WebSocket):
+            try:
+                await websocket.send_json(message)
+                if close:
+                    await websocket.close(code=CLOSE_NORMAL)
+            except Exception:
+                self.disconnect(attempt_id, websocket)
+
+        await asyncio.gather(*(send(websocket) for websocket in sockets))
+        if close:
+            self._channels.pop(attempt_id, None)
+
+    async def tick(self, now: Optional[datetime] = None) -> float:
+        """
+        Push the countdown to every channel, expiring the attempts at their deadline
+
+        Returns:
+            Seconds until the next tick
+        """
+        now = now or datetime.utcnow()
+        next_tick = self.tick_interval
+        sends = []
+        attempt_ids = list(self._channels)
+        timers = await asyncio.to_thread(lambda: [get_timer_state(attempt_id) for attempt_id in attempt_ids])
+        for attempt_id, timer in zip(attempt_ids, timers):
+            if timer is None or timer.completed:
+                sends.append(self._send(attempt_id, {"type": "completed", "attempt_id": attempt_id}, close=True))
+            elif timer.remaining(now) == 0:
+                # Re-reads the attempt if it was submitted elsewhere meanwhile
+                timer = await asyncio.to_thread(check_expiry, timer, now)
+                message = "completed" if timer.completed else "expired"
+                sends.append(self._send(attempt_id, {"type": message, "attempt_id": attempt_id}, close=True))
+            else:
+                sends.append(self._send(attempt_id, tick_message(timer, now)))
+                next_tick = min(next_tick, (timer.deadline_at - now).total_seconds())
+        await asyncio.gather(*sends)
+        metrics.set("attempt_channel_connections", self.connections)
+        return max(next_tick, 0.05)
+
+    async def _run(self):
+        while self._channels:
+            try:
+                delay = await self.tick()
+            except Exception as e:
+                logger.error(f"❌ Attempt channel tick failed: {str(e)}")
+                delay = self.tick_interval
+            self._next_tick_at = datetime.utcnow() + timedelta(seconds=delay)
+            self._wake.clear()
+            try:
+                await asyncio.wait_for(self._wake.wait(), delay)
+            except asyncio.TimeoutError:
+                pass
+
+    async def stop(self):
+        """Close every channel and stop the ticker"""
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        for attempt_id in list(self._channels):
+            await self._send(attempt_id, {"type": "closing", "attempt_id": attempt_id}, close=True)
+
+
+# Global instance
+_attempt_channel_hub: Optional[AttemptChannelHub] = None
+
+
+def get_attempt_channel_hub() -> AttemptChannelHub:
+    """Get or create the attempt channel hub"""
+    global _attempt_channel_hub
+    if _attempt_channel_hub is None:
+        _attempt_channel_hub = AttemptChannelHub()
+    return _attempt_channel_hub
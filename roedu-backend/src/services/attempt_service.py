@@ -0,0 +1,46 @@
+"""
+Attempt Service
+Submission of quiz attempts, shared by the quiz endpoints and the deadline
+sweeper (deadlines themselves: see attempt_timer).
+
+- finalize_attempt closes an attempt with the answers it has (submitted or
+  autosaved): choice answers are scored at once, free-text answers are left
+  to the grading worker (grading_status=pending). Callers stop the cached
+  timer (attempt_timer.mark_completed) once they have committed
+"""
+
+import json
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy.orm import Session
+
+from src.models.quiz import GradingStatus, QuizAttempt
+from src.services.scoring import FreeTextScoring, get_answer_key, save_question_scores, score_answers
+
+
+def finalize_attempt(db: Session, attempt: QuizAttempt, completed_at: Optional[datetime] = None) -> bool:
+    """
+    Mark an attempt expired and completed and score its answers (does not commit)
+
+    Returns:
+        Whether free-text answers are left for the grading worker (enqueue the
+        attempt and call attempt_timer.mark_completed after committing)
+    """
+    attempt.is_expired = 1
+    attempt.time_remaining = 0
+    attempt.completed_at = attempt.completed_at or completed_at or datetime.utcnow()
+
+    # Score the objective questions now; free-text answers are graded by the background worker
+    grading_pending = False
+    if attempt.answers:
+        try:
+            result = score_answers(get_answer_key(db, attempt.quiz_id), json.loads(attempt.answers), free_text=FreeTextScoring.DEFER)
+            attempt.score = result.score
+            attempt.max_score = result.max_score
+            save_question_scores(db, attempt.id, result)
+            grading_pending = bool(result.free_text_answers)
+        except (json.JSONDecodeError, KeyError, TypeError):
+            pass
+    attempt.grading_status = GradingStatus.PENDING.value if grading_pending else GradingStatus.GRADED.value
+    return grading_pending
@@ -0,0 +1,163 @@
+"""
+Attempt Timer
+Remaining time of quiz attempts computed from their deadline, without a
+database write per poll.
+
+- The timer state of an attempt (owner, deadline, completed/expired) is
+  cached in memory (ATTEMPT_TIMER_CACHE_SIZE attempts): seeded when the attempt
+  starts, loaded once on a miss, updated once a submit in this process is
+  committed. A cached "open" is only advisory - the attempt may have been
+  submitted or swept by another process - so open states are re-read after
+  OPEN_STATE_RECHECK_SECONDS, and at the deadline
+- time_remaining = deadline_at - now; the only write is the transition to
+  expired (one conditional UPDATE when the deadline passes)
+- deadline_at is fixed when the attempt starts: started_at + the quiz's time
+  limit (60 minutes for untimed quizzes); attempts started before deadline_at
+  existed get the same from their started_at
+"""
+
+import math
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field, replace
+from datetime import datetime, timedelta
+from typing import TYPE_CHECKING, Optional, Union
+
+from sqlalchemy import update
+
+from src.config import database
+from src.config.settings import settings
+from src.models.quiz import Quiz, QuizAttempt
+from src.utils.metrics import metrics
+
+if TYPE_CHECKING:
+    from src.services.quiz_access import QuizAccess
+
+DEFAULT_TIME_LIMIT_SECONDS = 3600
+# Cached states of open attempts older than this are read again from the database
+OPEN_STATE_RECHECK_SECONDS = 10.0
+
+
+def time_limit_seconds(quiz: Union[Quiz, "QuizAccess"]) -> int:
+    return quiz.time_limit * 60 if quiz.time_limit else DEFAULT_TIME_LIMIT_SECONDS
+
+
+def attempt_deadline(quiz: Union[Quiz, "QuizAccess"], started_at: datetime) -> datetime:
+    """When an attempt started at started_at runs out of time (quiz or its cached access)"""
+    return started_at + timedelta(seconds=time_limit_seconds(quiz))
+
+
+@dataclass(frozen=True)
+class TimerState:
+    attempt_id: int
+    student_id: int
+    deadline_at: datetime
+    completed: bool = False
+    expired: bool = False
+    loaded_at: float = field(default_factory=time.monotonic, compare=False)  # When read from the database
+
+    def remaining(self, now: datetime) -> int:
+        """Seconds left (0 once completed or past the deadline)"""
+        if self.completed or self.expired:
+            return 0
+        return max(0, math.ceil((self.deadline_at - now).total_seconds()))
+
+
+# Timer states by attempt id, least recently used first
+_timers: "OrderedDict[int, TimerState]" = OrderedDict()
+_timers_lock = threading.Lock()
+
+
+def _store(state: TimerState) -> TimerState:
+    with _timers_lock:
+        _timers[state.attempt_id] = state
+        _timers.move_to_end(state.attempt_id)
+        while len(_timers) > max(1, settings.ATTEMPT_TIMER_CACHE_SIZE):
+            _timers.popitem(last=False)
+    return state
+
+
+def timer_state_of(attempt: QuizAttempt) -> TimerState:
+    """Timer state of a loaded attempt (cached)"""
+    return _store(TimerState(
+        attempt_id=attempt.id,
+        student_id=attempt.student_id,
+        deadline_at=attempt.deadline_at or attempt_deadline(attempt.quiz, attempt.started_at),
+        completed=attempt.completed_at is not None,
+        expired=bool(attempt.is_expired)
+    ))
+
+
+def _load(attempt_id: int, db=None) -> Optional[TimerState]:
+    session = db or database.SessionLocal()
+    try:
+        attempt = session.query(QuizAttempt).filter(QuizAttempt.id == attempt_id).first()
+        return timer_state_of(attempt) if attempt else None
+    finally:
+        if db is None:
+            session.close()
+
+
+def get_timer_state(attempt_id: int) -> Optional[TimerState]:
+    """
+    Timer state of an attempt (None if it does not exist); reads the database
+    on a cache miss, and for open attempts cached over OPEN_STATE_RECHECK_SECONDS ago
+    """
+    with _timers_lock:
+        state = _timers.get(attempt_id)
+        if state is not None:
+            _timers.move_to_end(attempt_id)
+    if state is not None and not state.completed and time.monotonic() - state.loaded_at >= OPEN_STATE_RECHECK_SECONDS:
+        state = None
+    metrics.inc("attempt_timer_lookups_total", source="cache" if state is not None else "database")
+    return state if state is not None else _load(attempt_id)
+
+
+def mark_completed(attempt_id: int):
+    """Stop the timer of a submitted attempt (call once the submit is committed)"""
+    with _timers_lock:
+        state = _timers.get(attempt_id)
+        if state is not None:
+            _timers[attempt_id] = replace(state, completed=True)
+
+
+def forget_timer(attempt_id: Optional[int] = None):
+    """Drop the cached state of an attempt (every state if attempt_id is None)"""
+    with _timers_lock:
+        if attempt_id is None:
+            _timers.clear()
+        else:
+            _timers.pop(attempt_id, None)
+
+
+def check_expiry(state: TimerState, now: Optional[datetime] = None) -> TimerState:
+    """
+    Persist the transition to expired once the deadline has passed (the only
+    write of the timer; a no-op for attempts already expired or submitted)
+
+    If the attempt was not open any more (submitted, swept or expired by
+    another process), its state is read again from the database.
+    """
+    if state.completed or state.expired or state.remaining(now or datetime.utcnow()) > 0:
+        return state
+
+    db = database.SessionLocal()
+    try:
+        expired = db.execute(
+            update(QuizAttempt)
+            .where(
+                QuizAttempt.id == state.attempt_id,
+                QuizAttempt.completed_at.is_(None),
+                QuizAttempt.is_expired == 0
+            )
+            .values(is_expired=1, time_remaining=0)
+        ).rowcount
+        db.commit()
+        if not expired:
+            current = _load(state.attempt_id, db)
+            if current is not None:
+                return current
+    finally:
+        db.close()
+    return _store(replace(state, expired=True))
@@ -139,8 +139,34 @@ class AuthService:
         db.refresh(new_user)
         return new_user
 
+def decode_token(token: str) -> Optional[TokenData]:
+    """Identity in an access token (None if it is invalid or expired)"""
+    try:
+        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+    except JWTError:
+        return None
+    user_id: int = payload.get("user_id")
+    if user_id is None:
+        return None
+    return TokenData(user_id=user_id, role=payload.get("role"))
+
+def get_token_data(token: str = Depends(oauth2_scheme)) -> TokenData:
+    """
+    Identity from the token alone, without a database session
+    For hot read-only endpoints (e.g. the quiz timer); the account's is_active
+    flag is not checked
+    """
+    token_data = decode_token(token)
+    if token_data is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return token_data
+
 def get_current_user(
-    token: str = Depends(oauth2_scheme),
+    token_data: TokenData = Depends(get_token_data),
     db: Session = Depends(get_db)
 ) -> User:
     """Get the current authenticated user from token"""
@@ -149,16 +175,6 @@ def get_current_user(
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    try:
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
-        user_id: int = payload.get("user_id")
-        role: str = payload.get("role")
-        if user_id is None:
-            raise credentials_exception
-        token_data = TokenData(user_id=user_id, role=role)
-    except JWTError:
-        raise credentials_exception
-    
     user = db.query(User).filter(User.id == token_data.user_id).first()
     if user is None:
         raise credentials_exception
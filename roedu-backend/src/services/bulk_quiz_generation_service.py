@@ -0,0 +1,306 @@
+"""
+Bulk Quiz Generation Service
+Generates practice quizzes for many materials at once, under a concurrency
+limit and a requests-per-minute budget for the Gemini quota. Its calls have
+the lowest priority in the shared LLM rate limiter.
+Jobs and per-material items are persisted, so an interrupted job can be resumed.
+"""
+
+import asyncio
+import logging
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+from sqlalchemy.orm import Session
+
+from src.config.database import SessionLocal
+from src.models.material import Material
+from src.models.bulk_generation_job import (
+    BulkGenerationJob,
+    BulkGenerationItem,
+    BulkJobStatus,
+    BulkItemStatus
+)
+from src.services.llm_rate_limiter import LLMPriority, llm_priority
+from src.services.quiz_generation_service import (
+    get_quiz_generation_service,
+    build_material_content,
+    create_quiz_from_generated_data
+)
+
+logger = logging.getLogger(__name__)
+
+# Jobs currently executing in this process (job_id set)
+_running_jobs: set = set()
+
+
+class RequestRateLimiter:
+    """Spaces out request starts so that at most `requests_per_minute` begin per minute"""
+
+    def __init__(self, requests_per_minute: int):
+        self.interval = 60.0 / max(1, requests_per_minute)
+        self._next_slot = 0.0
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        """Wait until the next request slot is available"""
+        async with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.interval
+
+        wait = slot - now
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+
+def select_materials(
+    db: Session,
+    subject: Optional[str] = None,
+    grade_level: Optional[int] = None,
+    professor_id: Optional[int] = None
+) -> List[int]:
+    """Return ids of materials matching the bulk generation filter"""
+    query = db.query(Material.id)
+
+    if subject:
+        query = query.filter(Material.subject.ilike(f"%{subject}%"))
+    if grade_level:
+        query = query.filter(Material.grade_level == grade_level)
+    if professor_id:
+        query = query.filter(Material.professor_id == professor_id)
+
+    return [material_id for (material_id,) in query.order_by(Material.id).all()]
+
+
+def create_bulk_job(
+    db: Session,
+    subject: Optional[str] = None,
+    grade_level: Optional[int] = None,
+    professor_id: Optional[int] = None,
+    concurrency: int = 4,
+    requests_per_minute: int = 30,
+    created_by: Optional[int] = None
+) -> BulkGenerationJob:
+    """
+    Create a job with one pending item per matching material
+    """
+    material_ids = select_materials(db, subject, grade_level, professor_id)
+
+    job = BulkGenerationJob(
+        created_by=created_by,
+        subject=subject,
+        grade_level=grade_level,
+        professor_id=professor_id,
+        concurrency=concurrency,
+        requests_per_minute=requests_per_minute,
+        status=BulkJobStatus.PENDING
+    )
+    job.items = [BulkGenerationItem(material_id=material_id) for material_id in material_ids]
+
+    db.add(job)
+    db.commit()
+    db.refresh(job)
+
+    logger.info(f"📦 Created bulk generation job {job.id} with {len(material_ids)} materials")
+    return job
+
+
+def is_job_running(job_id: int) -> bool:
+    """Whether the job is currently executing in this process"""
+    return job_id in _running_jobs
+
+
+def summarize_job(job: BulkGenerationJob) -> Dict[str, Any]:
+    """Build the API/CLI view of a job with per-material outcomes"""
+    counts = {status.value: 0 for status in BulkItemStatus}
+    for item in job.items:
+        counts[item.status.value] += 1
+
+    return {
+        "id": job.id,
+        "status": job.status.value,
+        "subject": job.subject,
+        "grade_level": job.grade_level,
+        "professor_id": job.professor_id,
+        "concurrency": job.concurrency,
+        "requests_per_minute": job.requests_per_minute,
+        "created_at": job.created_at,
+        "started_at": job.started_at,
+        "finished_at": job.finished_at,
+        "total": len(job.items),
+        "succeeded": counts[BulkItemStatus.SUCCEEDED.value],
+        "failed": counts[BulkItemStatus.FAILED.value],
+        "pending": counts[BulkItemStatus.PENDING.value],
+        "items": [
+            {
+                "material_id": item.material_id,
+                "status": item.status.value,
+                "quiz_id": item.quiz_id,
+                "error": item.error,
+                "attempts": item.attempts or 0,
+                "finished_at": item.finished_at
+            }
+            for item in job.items
+        ]
+    }
+
+
+def _load_item_material(item_id: int) -> Dict[str, Any]:
+    """
+    Load the material of a job item and build its generation input
+    Runs in a worker thread (DB + PDF extraction) with its own session
+    """
+    db = SessionLocal()
+    try:
+        item = db.query(BulkGenerationItem).filter(BulkGenerationItem.id == item_id).first()
+        material = db.query(Material).filter(Material.id == item.material_id).first()
+        if not material:
+            return {"error": "Material not found"}
+
+        return {
+            "material_title": material.title,
+            "material_content": build_material_content(material),
+            "subject": material.subject or "General Knowledge",
+            "grade_level": material.grade_level or 10
+        }
+    finally:
+        db.close()
+
+
+def _store_item_result(
+    item_id: int,
+    quiz_data: Optional[Dict[str, Any]] = None,
+    error: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    Persist the generated quiz (or the failure) for one job item
+    Runs in a worker thread with its own session
+    """
+    db = SessionLocal()
+    try:
+        if quiz_data is not None:
+            try:
+                item = db.query(BulkGenerationItem).filter(BulkGenerationItem.id == item_id).first()
+                # Bulk quizzes belong to the material owner
+                quiz = create_quiz_from_generated_data(
+                    db,
+                    quiz_data,
+                    item.material,
+                    professor_id=item.material.professor_id
+                )
+                item.quiz_id = quiz.id
+                item.status = BulkItemStatus.SUCCEEDED
+                item.error = None
+            except Exception as e:
+                db.rollback()
+                error = f"Failed to save quiz: {str(e)}"
+
+        item = db.query(BulkGenerationItem).filter(BulkGenerationItem.id == item_id).first()
+        if error is not None:
+            item.status = BulkItemStatus.FAILED
+            item.error = error
+            logger.warning(f"⚠️  Bulk generation failed for material {item.material_id}: {error}")
+
+        item.attempts = (item.attempts or 0) + 1
+        item.finished_at = datetime.utcnow()
+        db.commit()
+
+        return {
+            "material_id": item.material_id,
+            "status": item.status.value,
+            "quiz_id": item.quiz_id,
+            "error": item.error
+        }
+    finally:
+        db.close()
+
+
+async def _generate_for_item(item_id: int) -> Dict[str, Any]:
+    """Generate and store the quiz for one job item"""
+    generation_input = await asyncio.to_thread(_load_item_material, item_id)
+    if "error" in generation_input:
+        return await asyncio.to_thread(_store_item_result, item_id, None, generation_input["error"])
+
+    try:
+        quiz_gen = get_quiz_generation_service()
+        with llm_priority(LLMPriority.BULK):
+            quiz_data = await quiz_gen.generate_quiz_from_material(**generation_input)
+    except Exception as e:
+        return await asyncio.to_thread(_store_item_result, item_id, None, str(e))
+
+    return await asyncio.to_thread(_store_item_result, item_id, quiz_data)
+
+
+async def run_bulk_job(
+    job_id: int,
+    retry_failed: bool = False,
+    on_item_done: Optional[Callable[[Dict[str, Any]], None]] = None
+) -> Dict[str, Any]:
+    """
+    Run (or resume) a bulk generation job
+
+    Only pending items are processed - plus failed ones when retry_failed is set -
+    so calling this again after an interruption continues where the job stopped.
+
+    Args:
+        job_id: Job to run
+        retry_failed: Also retry items that failed in a previous run
+        on_item_done: Optional callback receiving each per-material outcome
+
+    Returns:
+        Job summary (see summarize_job)
+    """
+    if job_id in _running_jobs:
+        raise Exception(f"Bulk generation job {job_id} is already running")
+
+    db = SessionLocal()
+    _running_jobs.add(job_id)
+    try:
+        job = db.query(BulkGenerationJob).filter(BulkGenerationJob.id == job_id).first()
+        if not job:
+            raise Exception(f"Bulk generation job {job_id} not found")
+
+        statuses = [BulkItemStatus.PENDING]
+        if retry_failed:
+            statuses.append(BulkItemStatus.FAILED)
+        item_ids = [item.id for item in job.items if item.status in statuses]
+
+        job.status = BulkJobStatus.RUNNING
+        job.started_at = job.started_at or datetime.utcnow()
+        job.finished_at = None
+        db.commit()
+
+        logger.info(
+            f"🚀 Bulk generation job {job_id}: {len(item_ids)} materials, "
+            f"concurrency={job.concurrency}, rpm={job.requests_per_minute}"
+        )
+
+        semaphore = asyncio.Semaphore(max(1, job.concurrency))
+        limiter = RequestRateLimiter(job.requests_per_minute)
+
+        async def process(item_id: int):
+            async with semaphore:
+                await limiter.acquire()
+                outcome = await _generate_for_item(item_id)
+                if on_item_done:
+                    on_item_done(outcome)
+
+        try:
+            await asyncio.gather(*(process(item_id) for item_id in item_ids))
+            job.status = BulkJobStatus.COMPLETED
+            job.finished_at = datetime.utcnow()
+        except BaseException:
+            # Cancelled or crashed - remaining pending items can be resumed later
+            job.status = BulkJobStatus.INTERRUPTED
+            raise
+        finally:
+            db.commit()
+            db.refresh(job)
+
+        logger.info(f"✅ Bulk generation job {job_id} finished with status {job.status.value}")
+        return summarize_job(job)
+    finally:
+        _running_jobs.discard(job_id)
+        db.close()
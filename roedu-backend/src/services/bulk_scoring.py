@@ -0,0 +1,252 @@
+"""
+Bulk Scoring
+Scores every finished attempt of a quiz at once (professor dashboards,
+regrades) instead of one score_answers call per attempt.
+
+- One query loads the answers of all attempts, one more their evaluation reports
+- Choice answers are encoded as bitmasks over the question's options
+  (CompiledQuestion.option_bits); the attempts x questions matrix is scored
+  with NumPy, or with the same bitmasks in pure Python when NumPy is missing
+- Same rules as score_answers with FreeTextScoring.EVALUATED_ONLY: professor
+  overrides first, free-text answers count their AI score (0 until graded)
+"""
+
+import gc
+import json
+import logging
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, List, Mapping, Optional, Sequence, Tuple
+
+from sqlalchemy.orm import Session
+
+from src.models.ai_evaluation_report import AIEvaluationReport
+from src.models.quiz import QuestionType, QuizAttempt
+from src.services.scoring import OTHER_ANSWER_BIT, AnswerKey, CompiledQuestion, get_answer_key
+from src.utils.metrics import metrics
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# (attempt row, question column, ai_score, new_score)
+ReportCell = Tuple[int, int, Optional[float], Optional[float]]
+
+
+@dataclass
+class BulkScores:
+    """Scores of all attempts of a quiz; rows follow attempt_ids, columns question_ids"""
+    quiz_id: int
+    max_score: float
+    question_ids: List[int] = field(default_factory=list)
+    attempt_ids: List[int] = field(default_factory=list)
+    student_ids: List[int] = field(default_factory=list)
+    grading_statuses: List[Optional[str]] = field(default_factory=list)
+    question_scores: List[List[float]] = field(default_factory=list)
+    totals: List[float] = field(default_factory=list)
+    question_averages: List[float] = field(default_factory=list)
+
+
+@contextmanager
+def gc_paused():
+    """
+    Decoding and encoding thousands of answers allocates only containers that
+    stay alive, so the cyclic GC would keep rescanning them for nothing
+    """
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
+def encode_choices(questions: Sequence[CompiledQuestion], answers: Sequence[Mapping[str, Any]]) -> List[List[int]]:
+    """
+    Bitmask of every attempt's answer to each question (one row per attempt)
+
+    Same encoding as CompiledQuestion.answer_mask, inlined: this loop runs
+    attempts x questions times.
+    """
+    plan = [(str(question.id), dict(question.option_bits)) for question in questions]
+    rows = []
+    for row in answers:
+        encoded = []
+        for key, bits in plan:
+            chosen = row.get(key)
+            if isinstance(chosen, str):
+                chosen = (chosen,)
+            mask = 0
+            for answer in chosen or ():
+                mask |= bits.get(answer, OTHER_ANSWER_BIT)
+            encoded.append(mask)
+        rows.append(encoded)
+    return rows
+
+
+def _python_choice_score(question: CompiledQuestion, mask: int) -> float:
+    if question.question_type == QuestionType.SINGLE_CHOICE:
+        hit = mask != 0 and mask & (mask - 1) == 0 and mask & ~question.correct_mask == 0
+    else:
+        hit = mask == question.correct_mask
+    return question.points if hit else 0.0
+
+
+def _score_numpy(key: AnswerKey, answers: Sequence[Mapping[str, Any]], reports: List[ReportCell]) -> "np.ndarray":
+    questions = key.questions
+    scores = np.zeros((len(answers), len(questions)), dtype=np.float64)
+
+    masked = [j for j, q in enumerate(questions) if q.correct_mask is not None]
+    if masked and answers:
+        masks = np.array(encode_choices([questions[j] for j in masked], answers), dtype=np.uint64)
+        correct = np.array([questions[j].correct_mask for j in masked], dtype=np.uint64)
+        points = np.array([questions[j].points for j in masked], dtype=np.float64)
+        single = np.array([questions[j].question_type == QuestionType.SINGLE_CHOICE for j in masked])
+
+        exact = masks == correct
+        one_correct_option = (
+            (masks != 0)
+            & ((masks & (masks - np.uint64(1))) == 0)
+            & ((masks & ~correct) == 0)
+        )
+        scores[:, masked] = np.where(np.where(single, one_correct_option, exact), points, 0.0)
+
+    # Choice questions with too many options for a mask
+    for j, question in enumerate(questions):
+        if not question.is_free_text and question.correct_mask is None:
+            scores[:, j] = [question.score_choice(question.answers_in(row)) for row in answers]
+
+    if reports:
+        rows, columns, ai_scores, new_scores = (np.array(values, dtype=object) for values in zip(*reports))
+        rows, columns = rows.astype(np.int64), columns.astype(np.int64)
+        free_text = np.array([questions[j].is_free_text for j in columns], dtype=bool)
+        evaluated = free_text & np.array([score is not None for score in ai_scores], dtype=bool)
+        scores[rows[evaluated], columns[evaluated]] = ai_scores[evaluated].astype(np.float64)
+        overridden = np.array([score is not None for score in new_scores], dtype=bool)
+        scores[rows[overridden], columns[overridden]] = new_scores[overridden].astype(np.float64)
+    return scores
+
+
+def _score_python(key: AnswerKey, answers: Sequence[Mapping[str, Any]], reports: List[ReportCell]) -> List[List[float]]:
+    questions = key.questions
+    masked = [j for j, q in enumerate(questions) if q.correct_mask is not None]
+    scores = [[0.0] * len(questions) for _ in answers]
+    for scores_row, masks in zip(scores, encode_choices([questions[j] for j in masked], answers)):
+        for j, mask in zip(masked, masks):
+            scores_row[j] = _python_choice_score(questions[j], mask)
+
+    # Choice questions with too many options for a mask
+    for j, question in enumerate(questions):
+        if not question.is_free_text and question.correct_mask is None:
+            for scores_row, row in zip(scores, answers):
+                scores_row[j] = question.score_choice(question.answers_in(row))
+
+    for row, column, ai_score, new_score in reports:
+        if new_score is not None:
+            scores[row][column] = new_score
+        elif ai_score is not None and questions[column].is_free_text:
+            scores[row][column] = ai_score
+    return scores
+
+
+def score_matrix(
+    key: AnswerKey,
+    answers: Sequence[Mapping[str, Any]],
+    reports: Optional[List[ReportCell]] = None,
+    use_numpy: Optional[bool] = None
+):
+    """
+    Attempts x questions score matrix
+
+    Args:
+        key: Compiled answer key of the quiz
+        answers: Submitted answers of each attempt (keyed by question id string)
+        reports: Evaluation reports as (attempt row, question column, ai_score, new_score)
+        use_numpy: Force the NumPy (True) or pure-Python (False) path; default NumPy if installed
+
+    Returns:
+        numpy array (NumPy path) or list of rows
+    """
+    if use_numpy is None:
+        use_numpy = NUMPY_AVAILABLE
+    if use_numpy:
+        return _score_numpy(key, answers, reports or [])
+    return _score_python(key, answers, reports or [])
+
+
+def load_finished_attempts(db: Session, key: AnswerKey) -> Tuple[list, List[Mapping[str, Any]], List[ReportCell]]:
+    """
+    Finished attempts of a quiz as (attempt rows, decoded answers, report cells)
+    Call within gc_paused() when loading many attempts
+    """
+    quiz_id = key.quiz_id
+    attempts = db.query(
+        QuizAttempt.id, QuizAttempt.student_id, QuizAttempt.grading_status, QuizAttempt.answers
+    ).filter(
+        QuizAttempt.quiz_id == quiz_id,
+        QuizAttempt.completed_at != None
+    ).order_by(QuizAttempt.id).all()
+
+    rows = {attempt_id: row for row, (attempt_id, _, _, _) in enumerate(attempts)}
+    columns = {question.id: column for column, question in enumerate(key.questions)}
+    reports = [
+        (rows[attempt_id], columns[question_id], ai_score, new_score)
+        for attempt_id, question_id, ai_score, new_score in db.query(
+            AIEvaluationReport.quiz_attempt_id,
+            AIEvaluationReport.question_id,
+            AIEvaluationReport.ai_score,
+            AIEvaluationReport.new_score
+        ).join(QuizAttempt, QuizAttempt.id == AIEvaluationReport.quiz_attempt_id).filter(
+            QuizAttempt.quiz_id == quiz_id
+        )
+        if attempt_id in rows and question_id in columns
+    ]
+    answers = [json.loads(attempt.answers or "{}") for attempt in attempts]
+    return attempts, answers, reports
+
+
+def score_quiz_attempts(db: Session, quiz_id: int, use_numpy: Optional[bool] = None) -> Optional[BulkScores]:
+    """Score every finished attempt of a quiz (None if the quiz does not exist)"""
+    started = time.perf_counter()
+    key = get_answer_key(db, quiz_id)
+    if key is None:
+        return None
+
+    use_numpy = NUMPY_AVAILABLE if use_numpy is None else use_numpy
+    with gc_paused():
+        attempts, answers, reports = load_finished_attempts(db, key)
+        matrix = score_matrix(key, answers, reports, use_numpy)
+
+    if use_numpy:
+        totals = matrix.sum(axis=1).tolist()
+        averages = matrix.mean(axis=0).tolist() if len(attempts) else [0.0] * len(key.questions)
+        question_scores = matrix.tolist()
+    else:
+        totals = [sum(row) for row in matrix]
+        averages = [
+            sum(row[column] for row in matrix) / len(matrix) if matrix else 0.0
+            for column in range(len(key.questions))
+        ]
+        question_scores = matrix
+
+    elapsed = time.perf_counter() - started
+    metrics.observe("bulk_scoring_seconds", elapsed, engine="numpy" if use_numpy else "python")
+    logger.info(f"📊 Scored {len(attempts)} attempts of quiz {quiz_id} in {elapsed * 1000:.0f} ms")
+
+    return BulkScores(
+        quiz_id=quiz_id,
+        max_score=key.max_score,
+        question_ids=[question.id for question in key.questions],
+        attempt_ids=[attempt.id for attempt in attempts],
+        student_ids=[attempt.student_id for attempt in attempts],
+        grading_statuses=[attempt.grading_status for attempt in attempts],
+        question_scores=question_scores,
+        totals=totals,
+        question_averages=averages
+    )
@@ -0,0 +1,186 @@
+"""
+Deadline Sweeper
+Auto-submits open attempts whose deadline passed, so an attempt whose browser
+was closed does not stay open with a stale time_remaining.
+
+- Overdue attempts are found through the partial index on open attempts'
+  deadline_at, DEADLINE_SWEEP_BATCH_SIZE at a time: a sweep reads only the
+  attempts it expires
+- DEADLINE_GRACE_SECONDS past the deadline, so the client's own auto-submit
+  (with its last answers) normally wins
+- Each attempt is claimed with a conditional UPDATE (completed_at IS NULL), so
+  an attempt submitted meanwhile - or swept by another process - is skipped
+- Expired attempts are scored with their autosaved answers (including the
+  ones still buffered in memory); the ones with
+  free-text answers are queued for the grading worker
+- Each attempt is expired in its own savepoint: one that fails is logged,
+  keeps its buffered answers and is skipped for the rest of the sweep, and a
+  failed batch does not lose the attempts committed before it
+"""
+
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Any, Collection, Dict, List, Optional, Set, Tuple
+
+from sqlalchemy import update
+
+from src.config import database
+from src.config.settings import settings
+from src.models.quiz import QuizAttempt
+from src.services.answer_autosave import apply_deltas, get_answer_autosave
+from src.services.attempt_service import finalize_attempt
+from src.services.attempt_timer import mark_completed
+from src.services.grading_worker import get_grading_worker
+from src.utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+
+def overdue_attempts_query(db, cutoff: datetime, limit: int, skip: Collection[int] = ()):
+    """Open attempts whose deadline is at or before cutoff, earliest first (minus `skip`)"""
+    query = db.query(QuizAttempt.id).filter(
+        QuizAttempt.completed_at.is_(None),
+        QuizAttempt.deadline_at <= cutoff
+    )
+    if skip:
+        query = query.filter(QuizAttempt.id.notin_(list(skip)))
+    return query.order_by(QuizAttempt.deadline_at).limit(limit)
+
+
+def _expire_attempt(db, attempt_id: int, now: datetime, deltas: Dict[str, Any]) -> Optional[bool]:
+    """
+    Claim and finalize one overdue attempt with its buffered answers, which are
+    moved into `deltas` so the caller can put them back (does not commit)
+
+    Returns:
+        None if it was submitted meanwhile, else whether it needs the grading worker
+    """
+    claimed = db.execute(
+        update(QuizAttempt)
+        .where(QuizAttempt.id == attempt_id, QuizAttempt.completed_at.is_(None))
+        .values(completed_at=now)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    if not claimed:
+        return None
+    attempt = db.query(QuizAttempt).filter(QuizAttempt.id == attempt_id).first()
+    deltas.update(get_answer_autosave().take(attempt_id))
+    if deltas:
+        attempt.answers = apply_deltas(attempt.answers, deltas)
+    grading_pending = finalize_attempt(db, attempt)
+    db.flush()
+    return grading_pending
+
+
+def expire_overdue_attempts(now: Optional[datetime] = None, batch_size: Optional[int] = None) -> Tuple[List[int], List[int]]:
+    """
+    Auto-submit every open attempt past its deadline (plus the grace period)
+
+    Returns:
+        (expired attempt ids, ids of those left pending for the grading worker),
+        committed ones only
+    """
+    now = now or datetime.utcnow()
+    cutoff = now - timedelta(seconds=settings.DEADLINE_GRACE_SECONDS)
+    batch_size = max(1, batch_size or settings.DEADLINE_SWEEP_BATCH_SIZE)
+
+    expired: List[int] = []
+    pending: List[int] = []
+    failed: Set[int] = set()
+    autosave = get_answer_autosave()
+    db = database.SessionLocal()
+    try:
+        while True:
+            attempt_ids = [attempt_id for (attempt_id,) in overdue_attempts_query(db, cutoff, batch_size, failed)]
+            taken: Dict[int, Dict[str, Any]] = {}
+            batch_pending = []
+            for attempt_id in attempt_ids:
+                deltas: Dict[str, Any] = {}
+                try:
+                    with db.begin_nested():
+                        grading_pending = _expire_attempt(db, attempt_id, now, deltas)
+                except Exception as e:
+                    autosave.restore(attempt_id, deltas)
+                    failed.add(attempt_id)
+                    logger.error(f"❌ Could not auto-submit attempt {attempt_id}: {str(e)}")
+                    continue
+                if grading_pending is None:
+                    continue
+                taken[attempt_id] = deltas
+                if grading_pending:
+                    batch_pending.append(attempt_id)
+            try:
+                db.commit()
+            except Exception:
+                for attempt_id, deltas in taken.items():
+                    autosave.restore(attempt_id, deltas)
+                raise
+            for attempt_id in taken:
+                mark_completed(attempt_id)
+            expired.extend(taken)
+            pending.extend(batch_pending)
+            if len(attempt_ids) < batch_size:
+                break
+    except Exception as e:
+        db.rollback()
+        logger.error(f"❌ Deadline sweep stopped after {len(expired)} attempts: {str(e)}")
+    finally:
+        db.close()
+
+    if expired:
+        metrics.inc("attempts_expired_total", len(expired))
+        logger.info(f"⏰ Auto-submitted {len(expired)} attempts past their deadline ({len(pending)} to grade)")
+    return expired, pending
+
+
+class DeadlineSweeper:
+    """Background task expiring overdue attempts every DEADLINE_SWEEP_INTERVAL_SECONDS"""
+
+    def __init__(self, interval: Optional[float] = None):
+        self.interval = interval or settings.DEADLINE_SWEEP_INTERVAL_SECONDS
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None
+
+    async def sweep(self) -> List[int]:
+        """Expire the overdue attempts now and queue their free-text answers for grading"""
+        expired, pending = await asyncio.to_thread(expire_overdue_attempts)
+        worker = get_grading_worker()
+        for attempt_id in pending:
+            worker.enqueue(attempt_id)
+        return expired
+
+    async def start(self):
+        if self.running:
+            return
+        self._task = asyncio.create_task(self._run())
+        logger.info(f"⏰ Deadline sweeper started (every {self.interval:g}s)")
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                await self.sweep()
+            except Exception as e:
+                logger.error(f"❌ Deadline sweep failed: {str(e)}")
+            await asyncio.sleep(self.interval)
+
+
+# Global instance
+_deadline_sweeper: Optional[DeadlineSweeper] = None
+
+
+def get_deadline_sweeper() -> DeadlineSweeper:
+    """Get or create the deadline sweeper instance"""
+    global _deadline_sweeper
+    if _deadline_sweeper is None:
+        _deadline_sweeper = DeadlineSweeper()
+    return _deadline_sweeper
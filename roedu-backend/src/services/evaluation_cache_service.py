@@ -0,0 +1,175 @@
+"""
+Evaluation Cache
+Short free-text answers (a definition, a formula) are often identical across
+students. Evaluations are cached per question and normalized answer text (case,
+whitespace and diacritics folded), so each distinct answer is sent to the AI
+only once; later attempts reuse the result and their report records cache_hit.
+
+- Key: question id + hash of the question text, criteria and points + hash of
+  the normalized answer; editing the question makes older entries unreachable
+  (and they are purged on the next store or by invalidate_question)
+- Only AI evaluations are cached, never the keyword-matching fallback
+- Identical answers graded in the same round are evaluated once; the
+  remaining distinct answers go through near-duplicate clustering
+  (answer_clustering)
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+from dataclasses import replace
+from datetime import datetime
+from typing import Dict, List, Tuple
+
+from sqlalchemy.exc import IntegrityError
+
+from src.config import database
+from src.config.settings import settings
+from src.models.evaluation_cache import EvaluationCacheEntry
+from src.services.answer_clustering import grade_clustered
+from src.services.grading_service import FreeTextAnswer, FreeTextGrade
+from src.utils.helpers import normalize_text
+from src.utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+CacheKey = Tuple[int, str, str]
+
+
+def _sha256(value: str) -> str:
+    return hashlib.sha256(value.encode("utf-8")).hexdigest()
+
+
+def criteria_hash(answer: FreeTextAnswer) -> str:
+    """Hash of everything besides the answer that the evaluation depends on"""
+    return _sha256(json.dumps([answer.question_text, answer.criteria, float(answer.max_score)], ensure_ascii=False))
+
+
+def cache_key(answer: FreeTextAnswer) -> CacheKey:
+    return answer.question_id, criteria_hash(answer), _sha256(normalize_text(answer.student_answer))
+
+
+def _cacheable(grade: FreeTextGrade) -> bool:
+    """Own AI evaluations only (not keyword fallbacks or grades propagated within a cluster)"""
+    return (
+        grade.error is None
+        and bool(grade.metadata.get("ai_generated"))
+        and not grade.metadata.get("cluster_propagated")
+    )
+
+
+def lookup_cached_grades(keys: List[CacheKey]) -> Dict[CacheKey, FreeTextGrade]:
+    """Cached grades for the given keys (hits are counted)"""
+    if not keys:
+        return {}
+    db = database.SessionLocal()
+    try:
+        question_ids = {question_id for question_id, _, _ in keys}
+        wanted = set(keys)
+        entries = [
+            entry for entry in db.query(EvaluationCacheEntry)
+            .filter(EvaluationCacheEntry.question_id.in_(question_ids))
+            if (entry.question_id, entry.criteria_hash, entry.answer_hash) in wanted
+        ]
+
+        found = {}
+        now = datetime.utcnow()
+        for entry in entries:
+            entry.hit_count += 1
+            entry.last_hit_at = now
+            found[(entry.question_id, entry.criteria_hash, entry.answer_hash)] = FreeTextGrade(
+                entry.question_id,
+                entry.score,
+                entry.feedback or "",
+                json.loads(entry.evaluation_metadata or "{}"),
+                cache_hit=True
+            )
+        db.commit()
+        return found
+    finally:
+        db.close()
+
+
+def store_cached_grades(graded: Dict[CacheKey, FreeTextGrade]) -> int:
+    """
+    Save new AI evaluations; entries of the same questions with an outdated
+    criteria hash are removed
+
+    Returns:
+        Number of entries stored
+    """
+    graded = {key: grade for key, grade in graded.items() if _cacheable(grade)}
+    if not graded:
+        return 0
+    db = database.SessionLocal()
+    try:
+        current_hashes: Dict[int, str] = {question_id: criteria for question_id, criteria, _ in graded}
+        for question_id, criteria in current_hashes.items():
+            db.query(EvaluationCacheEntry).filter(
+                EvaluationCacheEntry.question_id == question_id,
+                EvaluationCacheEntry.criteria_hash != criteria
+            ).delete(synchronize_session=False)
+
+        for (question_id, criteria, answer), grade in graded.items():
+            db.add(EvaluationCacheEntry(
+                question_id=question_id,
+                criteria_hash=criteria,
+                answer_hash=answer,
+                score=grade.score,
+                feedback=grade.feedback,
+                evaluation_metadata=json.dumps(grade.metadata, ensure_ascii=False)
+            ))
+        db.commit()
+        return len(graded)
+    except IntegrityError:
+        # Another worker cached the same answer first - nothing to add
+        db.rollback()
+        return 0
+    finally:
+        db.close()
+
+
+def invalidate_question(db, question_id: int) -> int:
+    """Drop the cached evaluations of a question (call when it is edited; does not commit)"""
+    return db.query(EvaluationCacheEntry).filter(
+        EvaluationCacheEntry.question_id == question_id
+    ).delete(synchronize_session=False)
+
+
+async def grade_with_cache(answers: List[FreeTextAnswer]) -> List[FreeTextGrade]:
+    """
+    Grade answers, reusing cached evaluations of identical (normalized) answers
+
+    Returns:
+        One FreeTextGrade per answer, in input order; reused evaluations have cache_hit=True
+    """
+    if not settings.EVALUATION_CACHE_ENABLED:
+        return await grade_clustered(answers)
+
+    keys = [cache_key(answer) for answer in answers]
+    cached = await asyncio.to_thread(lookup_cached_grades, list(set(keys)))
+
+    # One evaluation per distinct missing key
+    to_grade: Dict[CacheKey, FreeTextAnswer] = {}
+    for key, answer in zip(keys, answers):
+        if key not in cached and key not in to_grade:
+            to_grade[key] = answer
+    graded = dict(zip(to_grade, await grade_clustered(list(to_grade.values()))))
+    if graded:
+        await asyncio.to_thread(store_cached_grades, graded)
+
+    grades = []
+    evaluated = set()
+    for key in keys:
+        if key in cached:
+            grade = replace(cached[key], metadata=dict(cached[key].metadata))
+        elif key not in evaluated:
+            evaluated.add(key)
+            grade = graded[key]
+        else:
+            # Duplicate of an answer evaluated in this round
+            grade = replace(graded[key], metadata=dict(graded[key].metadata), cache_hit=graded[key].error is None)
+        metrics.inc("evaluation_cache_total", outcome="hit" if grade.cache_hit else "miss")
+        grades.append(grade)
+    return grades
@@ -0,0 +1,206 @@
+"""
+Grading Service
+Objective questions are scored locally at submit time (see scoring). Free-text
+answers are graded with the AI evaluator (by the background grading worker): all
+evaluations of one submission run concurrently (bounded by
+GRADING_CONCURRENCY), so grading takes about as long as the slowest answer,
+and the evaluation reports are written with a single bulk insert.
+
+When several attempts are graded together (e.g. a whole class submitting at
+the deadline), answers to the same question are sent to the AI in batches of
+GRADING_BATCH_SIZE, so the question and rubric go out once per batch instead
+of once per answer.
+
+Answers a model trained on professor reviews can score confidently (see
+learned_grader) are not sent to the AI at all.
+"""
+
+import asyncio
+import json
+import logging
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import insert
+
+from src.config.settings import settings
+from src.models.ai_evaluation_report import AIEvaluationReport, EvaluationStatus
+from src.services.ai_evaluation_service import get_ai_evaluation_service
+from src.services.learned_grader import get_learned_grader
+
+logger = logging.getLogger(__name__)
+
+AUTO_EVALUATION_REASON = "Auto-evaluated by AI system"
+DEFAULT_EVALUATION_CRITERIA = "Check if answer makes sense"
+
+
+@dataclass
+class FreeTextAnswer:
+    """One free-text answer to grade (plain data, no ORM objects)"""
+    question_id: int
+    question_text: str
+    student_answer: str
+    criteria: str
+    max_score: float
+    correct_answers: List[str] = field(default_factory=list)  # Reference answers, used by triage
+    subject: Optional[str] = None  # Quiz subject
+
+
+@dataclass
+class FreeTextGrade:
+    """Result of grading one answer; `error` is set if evaluation failed"""
+    question_id: int
+    score: float = 0.0
+    feedback: str = ""
+    metadata: Dict[str, Any] = field(default_factory=dict)
+    error: Optional[str] = None
+    cache_hit: bool = False  # Evaluation reused from an identical answer
+    cluster_id: Optional[str] = None  # Near-duplicate cluster graded with one evaluation
+    cluster_similarity: Optional[float] = None  # Similarity to the cluster's representative
+
+
+def free_text_answer_for(question, student_answers) -> Optional[FreeTextAnswer]:
+    """
+    Build the grading input for a free-text question (None if unanswered or blank)
+
+    Args:
+        question: Question model instance
+        student_answers: Answer value from the attempt (string or list)
+    """
+    if isinstance(student_answers, str):
+        student_answers = [student_answers]
+    text = str(student_answers[0] or "").strip() if student_answers else ""
+    if not text:
+        return None
+
+    return FreeTextAnswer(
+        question_id=question.id,
+        question_text=question.question_text,
+        student_answer=text,
+        criteria=question.evaluation_criteria or DEFAULT_EVALUATION_CRITERIA,
+        max_score=question.points,
+        correct_answers=json.loads(question.correct_answers or "[]"),
+        subject=question.quiz.subject if question.quiz else None
+    )
+
+
+async def grade_free_text_answers(
+    answers: List[FreeTextAnswer],
+    concurrency: Optional[int] = None,
+    batch_size: Optional[int] = None
+) -> List[FreeTextGrade]:
+    """
+    Evaluate answers concurrently, at most `concurrency` AI calls at a time
+    
+    Answers to the same question are grouped into batches of `batch_size`
+    (GRADING_BATCH_SIZE) evaluated with one call each; a question with a single
+    answer is evaluated on its own. Answers scored confidently by the learned
+    grader are not sent to the AI.
+
+    Returns:
+        One FreeTextGrade per answer, in input order
+    """
+    ai_service = get_ai_evaluation_service()
+    semaphore = asyncio.Semaphore(concurrency or settings.GRADING_CONCURRENCY)
+    batch_size = max(1, batch_size or settings.GRADING_BATCH_SIZE)
+
+    async def grade(answer: FreeTextAnswer) -> List[FreeTextGrade]:
+        async with semaphore:
+            try:
+                score, feedback, metadata = await ai_service.evaluate_free_text_answer(
+                    answer.question_text,
+                    answer.student_answer,
+                    answer.criteria,
+                    answer.max_score,
+                    "free_text",
+                    correct_answers=answer.correct_answers
+                )
+                return [FreeTextGrade(answer.question_id, score, feedback, metadata)]
+            except Exception as e:
+                logger.error(f"AI evaluation failed for question {answer.question_id}: {e}")
+                return [FreeTextGrade(answer.question_id, error=str(e))]
+
+    async def grade_batch(batch: List[FreeTextAnswer]) -> List[FreeTextGrade]:
+        first = batch[0]
+        async with semaphore:
+            try:
+                results = await ai_service.evaluate_free_text_batch(
+                    first.question_text,
+                    [answer.student_answer for answer in batch],
+                    first.criteria,
+                    first.max_score,
+                    "free_text",
+                    correct_answers=first.correct_answers
+                )
+                return [
+                    FreeTextGrade(first.question_id, score, feedback, metadata)
+                    for score, feedback, metadata in results
+                ]
+            except Exception as e:
+                logger.error(f"Batch AI evaluation failed for question {first.question_id}: {e}")
+                return [FreeTextGrade(first.question_id, error=str(e)) for _ in batch]
+
+    grades: List[Optional[FreeTextGrade]] = [None] * len(answers)
+    learned = await asyncio.to_thread(get_learned_grader().grade, answers)
+    for index, (answer, result) in enumerate(zip(answers, learned)):
+        if result:
+            score, feedback, metadata = result
+            grades[index] = FreeTextGrade(answer.question_id, score, feedback, metadata)
+
+    # Group the remaining answer positions by question, then split each group into batches
+    by_question: Dict[int, List[int]] = defaultdict(list)
+    for index, answer in enumerate(answers):
+        if grades[index] is None:
+            by_question[answer.question_id].append(index)
+
+    chunks = [
+        positions[start:start + batch_size]
+        for positions in by_question.values()
+        for start in range(0, len(positions), batch_size)
+    ]
+    chunk_grades = await asyncio.gather(*(
+        grade(answers[chunk[0]]) if len(chunk) == 1 else grade_batch([answers[index] for index in chunk])
+        for chunk in chunks
+    ))
+
+    for chunk, chunk_result in zip(chunks, chunk_grades):
+        for index, grade_result in zip(chunk, chunk_result):
+            grades[index] = grade_result
+    return grades
+
+
+def evaluation_report_row(attempt_id: int, student_id: int, grade: FreeTextGrade) -> Dict[str, Any]:
+    """Column values of the auto-evaluation report for one graded answer"""
+    metadata = grade.metadata
+    return {
+        "quiz_attempt_id": attempt_id,
+        "question_id": grade.question_id,
+        "student_id": student_id,
+        "ai_score": grade.score,
+        "ai_feedback": grade.feedback,
+        "ai_reasoning": metadata.get("reasoning", ""),
+        "ai_model_version": metadata.get("version", "gemini-2.5-flash-preview-05-20"),
+        "ai_score_breakdown": json.dumps(metadata.get("score_breakdown", {})),
+        "ai_strengths": json.dumps(metadata.get("strengths", [])),
+        "ai_improvements": json.dumps(metadata.get("improvements", [])),
+        "ai_suggestions": json.dumps(metadata.get("suggestions", [])),
+        "cache_hit": grade.cache_hit,
+        "cluster_id": grade.cluster_id,
+        "cluster_similarity": grade.cluster_similarity,
+        "reason": AUTO_EVALUATION_REASON,
+        "status": EvaluationStatus.RESOLVED
+    }
+
+
+def insert_evaluation_reports(db, attempt_id: int, student_id: int, grades: List[FreeTextGrade]) -> int:
+    """
+    Bulk insert the reports of successfully graded answers (does not commit)
+
+    Returns:
+        Number of reports inserted
+    """
+    rows = [evaluation_report_row(attempt_id, student_id, grade) for grade in grades if grade.error is None]
+    if rows:
+        db.execute(insert(AIEvaluationReport), rows)
+    return len(rows)
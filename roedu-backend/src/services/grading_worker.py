@@ -0,0 +1,319 @@
+"""
+Background Grading Worker
+Submitting an attempt only scores the objective questions and marks the attempt
+grading_status=pending; the free-text answers are graded here, off the request
+path, so submit latency does not depend on the LLM.
+
+- GRADING_WORKERS attempts are graded at a time (each with its answers in
+  parallel, see grading_service)
+- Attempts submitted close together (within GRADING_BATCH_WINDOW_SECONDS, up
+  to GRADING_ROUND_SIZE) are graded in one round, so answers of different
+  students to the same question share batched AI calls; a full round does
+  not wait for the window
+- Started/stopped with the application; on start, attempts left pending by a
+  previous run are queued again
+- A worker claims an attempt (conditional UPDATE of grading_claimed_at) before
+  grading it, so processes recovering the same pending attempts do not grade
+  them twice; claims older than CLAIM_STALE_SECONDS (crashed worker) expire
+- An attempt with failed evaluations stays pending and is queued again after
+  RETRY_DELAY_SECONDS (at most MAX_RETRIES times per run)
+- Grading is idempotent: answers that already have a report are not re-evaluated
+- Evaluations of identical answers are reused (see evaluation_cache_service)
+"""
+
+import asyncio
+import json
+import logging
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Set
+
+from sqlalchemy import or_
+
+from src.config import database
+from src.config.settings import settings
+from src.models.ai_evaluation_report import AIEvaluationReport
+from src.models.quiz import GradingStatus, QuizAttempt
+from src.services.evaluation_cache_service import grade_with_cache
+from src.services.grading_service import FreeTextAnswer, FreeTextGrade, insert_evaluation_reports
+from src.services.scoring import (
+    FreeTextScoring,
+    get_answer_key,
+    reports_by_question,
+    save_question_scores,
+    score_answers
+)
+
+logger = logging.getLogger(__name__)
+
+CLAIM_STALE_SECONDS = 600
+RETRY_DELAY_SECONDS = 30
+MAX_RETRIES = 5
+
+
+def _claimable():
+    """Filter for pending attempts no live worker has claimed"""
+    stale = datetime.utcnow() - timedelta(seconds=CLAIM_STALE_SECONDS)
+    return (
+        QuizAttempt.grading_status == GradingStatus.PENDING.value,
+        or_(QuizAttempt.grading_claimed_at.is_(None), QuizAttempt.grading_claimed_at < stale)
+    )
+
+
+def _claim_ungraded_answers(attempt_id: int) -> Optional[List[FreeTextAnswer]]:
+    """
+    Claim a pending attempt and return its free-text answers that have no report yet
+
+    Returns None if the attempt is not pending or another worker holds the claim.
+    """
+    db = database.SessionLocal()
+    try:
+        claimed = db.query(QuizAttempt).filter(QuizAttempt.id == attempt_id, *_claimable()).update(
+            {QuizAttempt.grading_claimed_at: datetime.utcnow()}, synchronize_session=False
+        )
+        db.commit()
+        if not claimed:
+            return None
+
+        attempt = db.query(QuizAttempt).filter(QuizAttempt.id == attempt_id).first()
+
+        reports = db.query(AIEvaluationReport).filter(AIEvaluationReport.quiz_attempt_id == attempt_id)
+        return score_answers(
+            get_answer_key(db, attempt.quiz_id),
+            json.loads(attempt.answers or "{}"),
+            reports_by_question(reports),
+            FreeTextScoring.DEFER
+        ).free_text_answers
+    finally:
+        db.close()
+
+
+def _store_grades(attempt_id: int, grades: List[FreeTextGrade]) -> bool:
+    """
+    Insert the reports and release the claim; once every answer is graded, set
+    the final score (objective + AI scores, professor overrides first)
+
+    Returns:
+        False if some evaluations failed (the attempt stays pending)
+    """
+    db = database.SessionLocal()
+    try:
+        attempt = db.query(QuizAttempt).filter(QuizAttempt.id == attempt_id).first()
+        if not attempt:
+            return True
+        insert_evaluation_reports(db, attempt.id, attempt.student_id, grades)
+        attempt.grading_claimed_at = None
+        if any(grade.error is not None for grade in grades):
+            db.commit()
+            return False
+        db.flush()
+
+        reports = db.query(AIEvaluationReport).filter(AIEvaluationReport.quiz_attempt_id == attempt_id)
+        result = score_answers(
+            get_answer_key(db, attempt.quiz_id),
+            json.loads(attempt.answers or "{}"),
+            reports_by_question(reports),
+            FreeTextScoring.EVALUATED_ONLY
+        )
+        attempt.score = result.score
+        attempt.max_score = result.max_score
+        save_question_scores(db, attempt.id, result)
+        attempt.grading_status = GradingStatus.GRADED.value
+        db.commit()
+        return True
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+def _release_claims(attempt_ids: Iterable[int]):
+    """Drop the claims of attempts whose grading was interrupted"""
+    db = database.SessionLocal()
+    try:
+        db.query(QuizAttempt).filter(QuizAttempt.id.in_(list(attempt_ids))).update(
+            {QuizAttempt.grading_claimed_at: None}, synchronize_session=False
+        )
+        db.commit()
+    finally:
+        db.close()
+
+
+def _pending_attempt_ids() -> List[int]:
+    """Pending attempts not claimed by a live worker (possibly in another process)"""
+    db = database.SessionLocal()
+    try:
+        return [
+            attempt_id for (attempt_id,) in db.query(QuizAttempt.id)
+            .filter(*_claimable())
+            .order_by(QuizAttempt.completed_at)
+        ]
+    finally:
+        db.close()
+
+
+class GradingWorker:
+    """Pool of asyncio tasks grading queued attempts"""
+
+    def __init__(self, workers: Optional[int] = None):
+        self.workers = workers or settings.GRADING_WORKERS
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._queued: Set[int] = set()
+        self._retries: Dict[int, int] = {}
+        self._retry_handles: Dict[int, asyncio.TimerHandle] = {}
+
+    @property
+    def running(self) -> bool:
+        return bool(self._tasks)
+
+    async def start(self):
+        """Start the worker tasks and re-queue attempts left pending"""
+        if self.running:
+            return
+        self._queue = asyncio.Queue()
+        self._tasks = [asyncio.create_task(self._run()) for _ in range(self.workers)]
+
+        pending = await asyncio.to_thread(_pending_attempt_ids)
+        for attempt_id in pending:
+            self.enqueue(attempt_id)
+        logger.info(f"📝 Grading worker started ({self.workers} workers, {len(pending)} pending attempts recovered)")
+
+    async def stop(self):
+        """Cancel the worker tasks (unfinished attempts stay pending for the next start)"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        for handle in self._retry_handles.values():
+            handle.cancel()
+        self._tasks = []
+        self._queue = None
+        self._queued.clear()
+        self._retries.clear()
+        self._retry_handles.clear()
+
+    def enqueue(self, attempt_id: int):
+        """Queue an attempt for grading (no-op if already queued)"""
+        if not self.running:
+            logger.warning(f"Grading worker not running, attempt {attempt_id} stays pending")
+            return
+        if attempt_id not in self._queued:
+            self._queued.add(attempt_id)
+            self._queue.put_nowait(attempt_id)
+
+    def _retry_later(self, attempt_id: int):
+        """Queue an attempt with failed evaluations again after RETRY_DELAY_SECONDS"""
+        retries = self._retries.get(attempt_id, 0) + 1
+        if not self.running or retries > MAX_RETRIES:
+            logger.warning(f"⚠️ Attempt {attempt_id} has failed evaluations, stays pending until the next start")
+            self._retries.pop(attempt_id, None)
+            return
+        self._retries[attempt_id] = retries
+        self._retry_handles[attempt_id] = asyncio.get_running_loop().call_later(
+            RETRY_DELAY_SECONDS, self._retry_now, attempt_id
+        )
+        logger.info(f"🔁 Attempt {attempt_id} has failed evaluations, retry {retries}/{MAX_RETRIES} in {RETRY_DELAY_SECONDS}s")
+
+    def _retry_now(self, attempt_id: int):
+        self._retry_handles.pop(attempt_id, None)
+        self.enqueue(attempt_id)
+
+    async def join(self):
+        """Wait until every queued attempt has been processed"""
+        if self._queue is not None:
+            await self._queue.join()
+
+    async def _next_round(self) -> List[int]:
+        """
+        Wait for an attempt, then collect the others submitted within the batch
+        window (stops waiting as soon as the round is full)
+        """
+        attempt_ids = [await self._queue.get()]
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + settings.GRADING_BATCH_WINDOW_SECONDS
+        while len(attempt_ids) < max(1, settings.GRADING_ROUND_SIZE):
+            try:
+                attempt_ids.append(self._queue.get_nowait())
+                continue
+            except asyncio.QueueEmpty:
+                pass
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                attempt_ids.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return attempt_ids
+
+    async def _run(self):
+        while True:
+            attempt_ids = await self._next_round()
+            self._queued.difference_update(attempt_ids)
+            try:
+                await self.grade_attempts(attempt_ids)
+            except Exception as e:
+                # Left pending (claims released); picked up again on the next start
+                logger.error(f"❌ Background grading failed for attempts {attempt_ids}: {str(e)}")
+            finally:
+                for _ in attempt_ids:
+                    self._queue.task_done()
+
+    async def grade_attempt(self, attempt_id: int):
+        """Grade the pending free-text answers of one attempt and finalize its score"""
+        await self.grade_attempts([attempt_id])
+
+    async def grade_attempts(self, attempt_ids: List[int]):
+        """
+        Grade several attempts in one round: all their pending answers are
+        evaluated together (batched per question), then each attempt is finalized
+
+        Attempts that are not pending or are claimed by another worker are skipped.
+        """
+        loaded = await asyncio.gather(*(asyncio.to_thread(_claim_ungraded_answers, attempt_id) for attempt_id in attempt_ids))
+        pending = {attempt_id: answers for attempt_id, answers in zip(attempt_ids, loaded) if answers is not None}
+        if not pending:
+            return
+
+        claimed = set(pending)
+        try:
+            answers = [answer for attempt_answers in pending.values() for answer in attempt_answers]
+            started = datetime.utcnow()
+            grades = await grade_with_cache(answers)
+
+            by_attempt: Dict[int, List[FreeTextGrade]] = {}
+            position = 0
+            for attempt_id, attempt_answers in pending.items():
+                by_attempt[attempt_id] = grades[position:position + len(attempt_answers)]
+                position += len(attempt_answers)
+
+            for attempt_id, attempt_grades in by_attempt.items():
+                try:
+                    complete = await asyncio.to_thread(_store_grades, attempt_id, attempt_grades)
+                except Exception as e:
+                    logger.error(f"❌ Could not save grades of attempt {attempt_id}: {str(e)}")
+                    continue
+                claimed.discard(attempt_id)
+                if complete:
+                    self._retries.pop(attempt_id, None)
+                else:
+                    self._retry_later(attempt_id)
+        finally:
+            if claimed:
+                await asyncio.shield(asyncio.to_thread(_release_claims, claimed))
+        logger.info(
+            f"✅ Graded {len(pending)} attempts: {len(grades)} free-text answers "
+            f"in {(datetime.utcnow() - started).total_seconds():.1f}s"
+        )
+
+
+# Global instance
+_grading_worker: Optional[GradingWorker] = None
+
+
+def get_grading_worker() -> GradingWorker:
+    """Get or create the grading worker instance"""
+    global _grading_worker
+    if _grading_worker is None:
+        _grading_worker = GradingWorker()
+    return _grading_worker
@@ -0,0 +1,316 @@
+"""
+Item Analytics
+Per-question statistics of a quiz over all its finished attempts, to spot
+questions that are too hard or misleading (GET /quizzes/{id}/analytics).
+
+- difficulty: p-value, the mean fraction of the question's points earned
+  (1.0 = everybody got it right)
+- discrimination: upper minus lower group difficulty, the groups being the
+  27% best and worst attempts by total score (near 0 or negative = the
+  question does not separate strong from weak students)
+- option counts (choice questions): how many attempts picked each option,
+  from the same bitmasks as bulk scoring; score histograms per question and
+  of the totals (ANALYTICS_HISTOGRAM_BINS bins)
+- Computed with NumPy over the attempts x questions score matrix
+  (bulk_scoring.score_matrix), or with the same matrix in pure Python when
+  NumPy is missing, and cached per quiz under a fingerprint of its
+  attempts and scores: recomputed only when an attempt completes, a score
+  changes or the quiz is edited
+"""
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from src.config.settings import settings
+from src.models.ai_evaluation_report import AIEvaluationReport
+from src.models.attempt_question_score import AttemptQuestionScore
+from src.models.quiz import Quiz, QuizAttempt
+from src.services.bulk_scoring import NUMPY_AVAILABLE, encode_choices, gc_paused, load_finished_attempts, score_matrix
+from src.services.scoring import OTHER_ANSWER_BIT, get_answer_key
+from src.utils.metrics import metrics
+
+if NUMPY_AVAILABLE:
+    import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Share of attempts in each of the upper and lower groups of the discrimination index
+DISCRIMINATION_GROUP = 0.27
+
+
+@dataclass
+class Histogram:
+    bin_edges: List[float]
+    counts: List[int]
+
+
+@dataclass
+class QuestionAnalytics:
+    question_id: int
+    question_type: str
+    points: float
+    average_score: Optional[float]
+    difficulty: Optional[float]
+    discrimination: Optional[float]
+    option_counts: Optional[Dict[str, int]]  # Choice questions: attempts that picked each option
+    unanswered: int
+    other_answers: int  # Attempts that picked an answer not among the options
+    histogram: Histogram
+
+
+@dataclass
+class QuizAnalytics:
+    quiz_id: int
+    attempts: int
+    max_score: float
+    mean_score: Optional[float]
+    score_histogram: Histogram
+    questions: List[QuestionAnalytics] = field(default_factory=list)
+    computed_at: datetime = field(default_factory=datetime.utcnow)
+
+
+@dataclass
+class _Statistics:
+    """Per-question columns of compute_analytics, as plain lists"""
+    totals: List[float]
+    averages: Optional[List[float]]
+    difficulty: Optional[List[float]]
+    discrimination: Optional[List[float]]
+    option_counts: Dict[int, Dict[str, int]]
+    unanswered: List[int]
+    other: List[int]
+    histograms: List[Histogram]
+    score_histogram: Histogram
+
+
+def _histogram(values: "np.ndarray", upper: float) -> Histogram:
+    counts, edges = np.histogram(values, bins=max(1, settings.ANALYTICS_HISTOGRAM_BINS), range=(0.0, upper or 1.0))
+    return Histogram(bin_edges=edges.tolist(), counts=counts.tolist())
+
+
+def _python_histogram(values: List[float], upper: float) -> Histogram:
+    """Same bins as numpy.histogram over [0, upper]: the last bin includes its right edge"""
+    bins = max(1, settings.ANALYTICS_HISTOGRAM_BINS)
+    upper = upper or 1.0
+    counts = [0] * bins
+    for value in values:
+        if 0.0 <= value <= upper:
+            counts[min(bins - 1, int(value / upper * bins))] += 1
+    step = upper / bins
+    return Histogram(bin_edges=[i * step for i in range(bins)] + [upper], counts=counts)
+
+
+def _statistics_numpy(questions, answers, reports, key, masked, masks) -> _Statistics:
+    n = len(answers)
+    scores = score_matrix(key, answers, reports, use_numpy=True)
+    masks = np.array(masks, dtype=np.uint64).reshape(n, len(masked))
+    points = np.array([question.points for question in questions], dtype=np.float64)
+    fractions = np.divide(scores, points, out=np.zeros_like(scores), where=points > 0)
+    totals = scores.sum(axis=1)
+
+    difficulty = fractions.mean(axis=0).tolist() if n else None
+    averages = scores.mean(axis=0).tolist() if n else None
+    discrimination = None
+    if n >= 2:
+        group = max(1, int(round(DISCRIMINATION_GROUP * n)))
+        order = np.argsort(totals, kind="stable")
+        discrimination = (fractions[order[-group:]].mean(axis=0) - fractions[order[:group]].mean(axis=0)).tolist()
+
+    option_counts: Dict[int, Dict[str, int]] = {}
+    unanswered = np.zeros(len(questions), dtype=np.int64)
+    other = np.zeros(len(questions), dtype=np.int64)
+    for column, j in enumerate(masked):
+        options = list(questions[j].option_bits.items())
+        bits = np.array([bit for _, bit in options], dtype=np.uint64)
+        chosen = (masks[:, column, None] & bits[None, :]) != 0
+        option_counts[j] = dict(zip((option for option, _ in options), chosen.sum(axis=0).tolist()))
+        unanswered[j] = int((masks[:, column] == 0).sum())
+        other[j] = int(((masks[:, column] & np.uint64(OTHER_ANSWER_BIT)) != 0).sum())
+
+    return _Statistics(
+        totals=totals.tolist(),
+        averages=averages,
+        difficulty=difficulty,
+        discrimination=discrimination,
+        option_counts=option_counts,
+        unanswered=unanswered.tolist(),
+        other=other.tolist(),
+        histograms=[_histogram(scores[:, j], question.points) for j, question in enumerate(questions)],
+        score_histogram=_histogram(totals, key.max_score)
+    )
+
+
+def _statistics_python(questions, answers, reports, key, masked, masks) -> _Statistics:
+    n = len(answers)
+    scores = score_matrix(key, answers, reports, use_numpy=False)
+    columns = [[row[j] for row in scores] for j in range(len(questions))]
+    fractions = [
+        [score / question.points if question.points > 0 else 0.0 for score in column]
+        for question, column in zip(questions, columns)
+    ]
+    totals = [sum(row) for row in scores]
+
+    difficulty = [sum(column) / n for column in fractions] if n else None
+    averages = [sum(column) / n for column in columns] if n else None
+    discrimination = None
+    if n >= 2:
+        group = max(1, int(round(DISCRIMINATION_GROUP * n)))
+        order = sorted(range(n), key=totals.__getitem__)
+        upper, lower = order[-group:], order[:group]
+        discrimination = [
+            sum(column[i] for i in upper) / group - sum(column[i] for i in lower) / group
+            for column in fractions
+        ]
+
+    option_counts: Dict[int, Dict[str, int]] = {}
+    unanswered = [0] * len(questions)
+    other = [0] * len(questions)
+    for column, j in enumerate(masked):
+        column_masks = [row[column] for row in masks]
+        option_counts[j] = {
+            option: sum(1 for mask in column_masks if mask & bit)
+            for option, bit in questions[j].option_bits.items()
+        }
+        unanswered[j] = sum(1 for mask in column_masks if mask == 0)
+        other[j] = sum(1 for mask in column_masks if mask & OTHER_ANSWER_BIT)
+
+    return _Statistics(
+        totals=totals,
+        averages=averages,
+        difficulty=difficulty,
+        discrimination=discrimination,
+        option_counts=option_counts,
+        unanswered=unanswered,
+        other=other,
+        histograms=[_python_histogram(column, question.points) for question, column in zip(questions, columns)],
+        score_histogram=_python_histogram(totals, key.max_score)
+    )
+
+
+def compute_analytics(db: Session, quiz_id: int, use_numpy: Optional[bool] = None) -> Optional[QuizAnalytics]:
+    """
+    Item analytics of a quiz, computed now (None if the quiz does not exist)
+
+    use_numpy forces the NumPy (True) or pure-Python (False) path; default NumPy if installed
+    """
+    key = get_answer_key(db, quiz_id)
+    if key is None:
+        return None
+    questions = key.questions
+    if use_numpy is None:
+        use_numpy = NUMPY_AVAILABLE
+
+    with gc_paused():
+        _, answers, reports = load_finished_attempts(db, key)
+        masked = [j for j, question in enumerate(questions) if question.option_bits is not None]
+        masks = encode_choices([questions[j] for j in masked], answers)
+        statistics = (_statistics_numpy if use_numpy else _statistics_python)(
+            questions, answers, reports, key, masked, masks
+        )
+
+    n = len(answers)
+    for j, question in enumerate(questions):
+        if j not in statistics.option_counts:  # Free text (or too many options for a mask)
+            statistics.unanswered[j] = sum(1 for row in answers if not row.get(str(question.id)))
+
+    return QuizAnalytics(
+        quiz_id=quiz_id,
+        attempts=n,
+        max_score=key.max_score,
+        mean_score=sum(statistics.totals) / n if n else None,
+        score_histogram=statistics.score_histogram,
+        questions=[
+            QuestionAnalytics(
+                question_id=question.id,
+                question_type=question.question_type.value,
+                points=question.points,
+                average_score=statistics.averages[j] if statistics.averages is not None else None,
+                difficulty=statistics.difficulty[j] if statistics.difficulty is not None else None,
+                discrimination=statistics.discrimination[j] if statistics.discrimination is not None else None,
+                option_counts=statistics.option_counts.get(j),
+                unanswered=statistics.unanswered[j],
+                other_answers=statistics.other[j],
+                histogram=statistics.histograms[j]
+            )
+            for j, question in enumerate(questions)
+        ]
+    )
+
+
+def analytics_fingerprint(db: Session, quiz_id: int) -> Tuple:
+    """
+    What the analytics of a quiz depend on, in one query: the quiz version,
+    its finished attempts (count, latest completion, score sum) and the latest
+    change to their question scores and evaluation reports
+    """
+    finished_filter = (QuizAttempt.quiz_id == quiz_id, QuizAttempt.completed_at.isnot(None))
+    finished = select(QuizAttempt.id).where(*finished_filter)
+    return tuple(db.execute(select(
+        select(Quiz.version).where(Quiz.id == quiz_id).scalar_subquery(),
+        select(func.count(QuizAttempt.id)).where(*finished_filter).scalar_subquery(),
+        select(func.max(QuizAttempt.completed_at)).where(*finished_filter).scalar_subquery(),
+        select(func.sum(QuizAttempt.score)).where(*finished_filter).scalar_subquery(),
+        select(func.max(AttemptQuestionScore.updated_at)).where(
+            AttemptQuestionScore.attempt_id.in_(finished)
+        ).scalar_subquery(),
+        select(func.count(AIEvaluationReport.id)).where(
+            AIEvaluationReport.quiz_attempt_id.in_(finished)
+        ).scalar_subquery(),
+        select(func.max(AIEvaluationReport.reviewed_at)).where(
+            AIEvaluationReport.quiz_attempt_id.in_(finished)
+        ).scalar_subquery()
+    )).one())
+
+
+# (fingerprint, analytics) by quiz id, least recently used first
+_analytics: "OrderedDict[int, Tuple[Tuple, QuizAnalytics]]" = OrderedDict()
+_analytics_lock = threading.Lock()
+
+
+def get_quiz_analytics(db: Session, quiz_id: int) -> Optional[QuizAnalytics]:
+    """
+    Item analytics of a quiz (None if it does not exist)
+
+    Costs one fingerprint query while nothing changed; recomputed otherwise.
+    """
+    fingerprint = analytics_fingerprint(db, quiz_id)
+    if fingerprint[0] is None:
+        return None
+
+    with _analytics_lock:
+        cached = _analytics.get(quiz_id)
+        if cached is not None and cached[0] == fingerprint:
+            _analytics.move_to_end(quiz_id)
+            metrics.inc("analytics_cache_total", outcome="hit")
+            return cached[1]
+
+    started = time.perf_counter()
+    analytics = compute_analytics(db, quiz_id)
+    elapsed = time.perf_counter() - started
+    metrics.inc("analytics_cache_total", outcome="miss")
+    metrics.observe("item_analytics_seconds", elapsed)
+    logger.info(f"📊 Item analytics of quiz {quiz_id} ({analytics.attempts} attempts) in {elapsed * 1000:.0f} ms")
+
+    with _analytics_lock:
+        _analytics[quiz_id] = (fingerprint, analytics)
+        _analytics.move_to_end(quiz_id)
+        while len(_analytics) > max(1, settings.ANALYTICS_CACHE_SIZE):
+            _analytics.popitem(last=False)
+    return analytics
+
+
+def clear_analytics(quiz_id: Optional[int] = None):
+    """Drop the cached analytics of a quiz (every quiz if quiz_id is None)"""
+    with _analytics_lock:
+        if quiz_id is None:
+            _analytics.clear()
+        else:
+            _analytics.pop(quiz_id, None)
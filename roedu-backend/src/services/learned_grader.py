@@ -0,0 +1,481 @@
+"""
+Learned Grader
+Local scoring model trained on the scores professors corrected
+(AIEvaluationReport.new_score), used as a fast first pass before the AI.
+
+- Features per answer: coverage of the criteria keywords, TF-IDF similarity to
+  the criteria / reference answers and to the question, length
+- Trained on the reports professors reviewed: their corrected score, or the
+  AI's score when they confirmed it (not only the corrected ones, which are
+  mostly the AI's mistakes)
+- One model per question with at least LEARNED_GRADER_MIN_SAMPLES reviewed
+  answers; answers to any other question always go to the AI
+- Random forest on the score fraction. The spread of the trees' predictions
+  only ranks how sure the model is: the cut-off is calibrated on held-out
+  reviews, as the widest spread whose held-out error stays within
+  LEARNED_GRADER_MAX_ERROR. Models that never get there score nothing
+- Answers with a negation the reference answers lack always go to the AI (the
+  features cannot tell "is" from "is not")
+- Accuracy is measured on held-out reviews (next to the AI's accuracy on
+  the same answers) and reported at GET /api/v1/ai_evaluation_reports/learned-grader/accuracy
+- Retrained with train_learned_grader.py or every LEARNED_GRADER_RETRAIN_HOURS,
+  by one process at a time (a lock file next to the saved models)
+- numpy and scikit-learn are optional: without them the grader is disabled
+"""
+
+import asyncio
+import json
+import logging
+import os
+import pickle
+import random
+import re
+import threading
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from src.config import database
+from src.config.settings import settings
+from src.models.ai_evaluation_report import AIEvaluationReport
+from src.models.quiz import Question, QuestionType, QuizAttempt
+from src.services.answer_triage import triage_answer
+from src.utils.helpers import normalize_text
+from src.utils.metrics import metrics
+
+try:
+    import numpy as np
+    from sklearn.ensemble import RandomForestRegressor
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    SKLEARN_AVAILABLE = True
+except ImportError:
+    SKLEARN_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+LEARNED_GRADER_VERSION = "learned-grader-v1"
+
+# Share of each group's corrections held out to measure accuracy
+HOLDOUT_FRACTION = 0.2
+# A prediction this close to the professor's score (fraction of max) counts as correct
+ACCURACY_TOLERANCE = 0.1
+# Fewest held-out answers a confidence cut-off is calibrated on
+MIN_CALIBRATION_SAMPLES = 5
+# How often each process checks whether the models are due for retraining
+RETRAIN_CHECK_SECONDS = 600
+# A training lock older than this was left by a crashed process
+TRAINING_LOCK_STALE_SECONDS = 3600
+
+FEEDBACK = "Punctaj estimat automat pe baza corecturilor anterioare ale profesorilor."
+
+
+@dataclass
+class CorrectedAnswer:
+    """A free-text answer with the score a professor gave (or confirmed) for it"""
+    answer: Any  # grading_service.FreeTextAnswer
+    ai_score: float
+    professor_score: float
+
+    @property
+    def target(self) -> float:
+        """Professor's score as a fraction of the maximum"""
+        return min(max(self.professor_score / self.answer.max_score, 0.0), 1.0)
+
+
+@dataclass
+class GraderModel:
+    """A trained model for one question"""
+    key: str  # "question:<id>"
+    vectorizer: Any
+    regressor: Any
+    samples: int
+    trained_at: str
+    accuracy: Dict[str, Any] = field(default_factory=dict)
+    max_uncertainty: Optional[float] = None  # Calibrated cut-off, None: never confident
+
+    def predict(self, answers: List[Any]) -> List[Tuple[float, float]]:
+        """(score fraction, uncertainty) per answer"""
+        features = answer_features(answers, self.vectorizer)
+        per_tree = np.stack([tree.predict(features) for tree in self.regressor.estimators_])
+        fractions = np.clip(per_tree.mean(axis=0), 0.0, 1.0)
+        return list(zip(fractions.tolist(), per_tree.std(axis=0).tolist()))
+
+
+def _reference_text(answer) -> str:
+    return normalize_text(" ".join([answer.criteria, *answer.correct_answers]))
+
+
+def keyword_coverage(student_answer: str, criteria: str) -> float:
+    """Share of the comma-separated criteria keywords found in the answer"""
+    keywords = [normalize_text(keyword) for keyword in criteria.split(",") if keyword.strip()]
+    if not keywords:
+        return 0.0
+    text = normalize_text(student_answer)
+    return sum(1 for keyword in keywords if keyword in text) / len(keywords)
+
+
+def _cosine(vectorizer, texts: List[str], others: List[str]):
+    # TF-IDF rows are L2-normalized, so the row-wise dot product is the cosine
+    left = vectorizer.transform(texts)
+    right = vectorizer.transform(others)
+    return np.asarray(left.multiply(right).sum(axis=1)).ravel()
+
+
+def answer_features(answers: List[Any], vectorizer):
+    """Feature matrix: keyword coverage, similarity to the reference and question, length"""
+    texts = [normalize_text(answer.student_answer) for answer in answers]
+    references = [_reference_text(answer) for answer in answers]
+    words = np.array([len(text.split()) for text in texts], dtype=float)
+    reference_words = np.array([max(len(reference.split()), 1) for reference in references], dtype=float)
+    return np.column_stack([
+        [keyword_coverage(answer.student_answer, answer.criteria) for answer in answers],
+        _cosine(vectorizer, texts, references),
+        _cosine(vectorizer, texts, [normalize_text(answer.question_text) for answer in answers]),
+        np.log1p(words),
+        np.minimum(words / reference_words, 5.0)
+    ])
+
+
+def fit_model(key: str, corrections: List[CorrectedAnswer]) -> GraderModel:
+    """Fit the vectorizer and the forest on a group of corrections"""
+    answers = [correction.answer for correction in corrections]
+    vectorizer = TfidfVectorizer(analyzer="char_wb", ngram_range=(3, 5), sublinear_tf=True)
+    vectorizer.fit(
+        [normalize_text(answer.student_answer) for answer in answers]
+        + list({_reference_text(answer) for answer in answers})
+    )
+    regressor = RandomForestRegressor(n_estimators=100, min_samples_leaf=3, random_state=0)
+    regressor.fit(answer_features(answers, vectorizer), [correction.target for correction in corrections])
+    return GraderModel(key, vectorizer, regressor, len(corrections), datetime.utcnow().isoformat())
+
+
+def calibrate_cutoff(errors: List[float], uncertainties: List[float], max_error: float) -> Optional[float]:
+    """
+    Widest uncertainty cut-off whose held-out predictions (all those at or
+    below it) have a mean error within max_error, None if there is none
+    """
+    order = sorted(range(len(errors)), key=lambda i: uncertainties[i])
+    cutoff = None
+    total = 0.0
+    for count, i in enumerate(order, 1):
+        total += errors[i]
+        if count < len(order) and uncertainties[order[count]] == uncertainties[i]:
+            continue  # The cut-off would also let the next (tied) prediction in
+        if count >= MIN_CALIBRATION_SAMPLES and total / count <= max_error:
+            cutoff = uncertainties[i]
+    return cutoff
+
+
+def evaluate_model(model: GraderModel, corrections: List[CorrectedAnswer], max_error: float) -> Dict[str, Any]:
+    """Accuracy of a model (and of the AI) against professor reviews it was not trained on"""
+    predictions = model.predict([correction.answer for correction in corrections])
+    errors = [abs(fraction - correction.target) for (fraction, _), correction in zip(predictions, corrections)]
+    uncertainties = [uncertainty for _, uncertainty in predictions]
+    cutoff = calibrate_cutoff(errors, uncertainties, max_error)
+    confident = [
+        error for error, uncertainty in zip(errors, uncertainties) if cutoff is not None and uncertainty <= cutoff
+    ]
+    ai_errors = [
+        abs(min(max(correction.ai_score / correction.answer.max_score, 0.0), 1.0) - correction.target)
+        for correction in corrections
+    ]
+    return {
+        "test_samples": len(corrections),
+        "mae": round(sum(errors) / len(errors), 4),
+        "within_tolerance": round(sum(1 for error in errors if error <= ACCURACY_TOLERANCE) / len(errors), 4),
+        "max_uncertainty": cutoff,
+        "confident_share": round(len(confident) / len(errors), 4),
+        "confident_mae": round(sum(confident) / len(confident), 4) if confident else None,
+        "ai_mae": round(sum(ai_errors) / len(ai_errors), 4)
+    }
+
+
+def train_models(
+    corrections: List[CorrectedAnswer],
+    min_samples: Optional[int] = None,
+    max_error: Optional[float] = None
+) -> Dict[str, GraderModel]:
+    """
+    Train one model per question with enough reviewed answers
+
+    Each group is first fitted without a held-out share to measure accuracy
+    and calibrate the confidence cut-off, then refitted on all its answers.
+    """
+    if not SKLEARN_AVAILABLE:
+        raise RuntimeError("scikit-learn not installed. Install with: pip install numpy scikit-learn")
+    min_samples = min_samples or settings.LEARNED_GRADER_MIN_SAMPLES
+    max_error = settings.LEARNED_GRADER_MAX_ERROR if max_error is None else max_error
+
+    groups: Dict[str, List[CorrectedAnswer]] = defaultdict(list)
+    for correction in corrections:
+        groups[f"question:{correction.answer.question_id}"].append(correction)
+
+    models = {}
+    for key, group in groups.items():
+        if len(group) < min_samples:
+            continue
+        shuffled = group[:]
+        random.Random(0).shuffle(shuffled)
+        holdout = max(1, int(len(shuffled) * HOLDOUT_FRACTION))
+        accuracy = evaluate_model(fit_model(key, shuffled[holdout:]), shuffled[:holdout], max_error)
+
+        model = fit_model(key, group)
+        model.accuracy = accuracy
+        model.max_uncertainty = accuracy["max_uncertainty"]
+        models[key] = model
+        logger.info(
+            f"🎓 Learned grader {key}: {len(group)} reviews, MAE {accuracy['mae']:.3f} (AI {accuracy['ai_mae']:.3f}), "
+            f"{accuracy['confident_share']:.0%} confident"
+        )
+    return models
+
+
+def accuracy_report(models: Dict[str, GraderModel]) -> Dict[str, Any]:
+    """Per-model held-out accuracy plus the sample-weighted overall figures"""
+    rows = [{"key": key, "samples": model.samples, **model.accuracy} for key, model in sorted(models.items())]
+    tested = sum(row["test_samples"] for row in rows)
+
+    def weighted(name):
+        if not tested:
+            return None
+        return round(sum(row[name] * row["test_samples"] for row in rows) / tested, 4)
+
+    return {
+        "trained_at": max((model.trained_at for model in models.values()), default=None),
+        "models": rows,
+        "test_samples": tested,
+        "mae": weighted("mae"),
+        "within_tolerance": weighted("within_tolerance"),
+        "ai_mae": weighted("ai_mae")
+    }
+
+
+def load_corrections(db) -> List[CorrectedAnswer]:
+    """
+    Free-text answers a professor reviewed, with the corrected score (or the
+    AI's score if the professor kept it). Reports a professor created by editing
+    an ungraded score carry no model version and no real AI score, so they are skipped
+    """
+    from src.services.grading_service import free_text_answer_for
+
+    rows = db.query(AIEvaluationReport, Question, QuizAttempt.answers).join(
+        Question, AIEvaluationReport.question_id == Question.id
+    ).join(
+        QuizAttempt, AIEvaluationReport.quiz_attempt_id == QuizAttempt.id
+    ).filter(
+        AIEvaluationReport.reviewed_at != None,
+        AIEvaluationReport.ai_model_version != None,
+        Question.question_type == QuestionType.FREE_TEXT,
+        Question.points > 0
+    ).all()
+
+    corrections = []
+    for report, question, answers in rows:
+        answer = free_text_answer_for(question, json.loads(answers or "{}").get(str(question.id), []))
+        if answer:
+            professor_score = report.ai_score if report.new_score is None else report.new_score
+            corrections.append(CorrectedAnswer(answer, report.ai_score, professor_score))
+    return corrections
+
+
+def live_accuracy(db) -> Dict[str, Any]:
+    """Error of the learned grader's scores that professors corrected afterwards"""
+    rows = db.query(AIEvaluationReport.ai_score, AIEvaluationReport.new_score, Question.points).join(
+        Question, AIEvaluationReport.question_id == Question.id
+    ).filter(
+        AIEvaluationReport.ai_model_version == LEARNED_GRADER_VERSION,
+        AIEvaluationReport.new_score != None,
+        Question.points > 0
+    ).all()
+    errors = [abs(ai_score - new_score) / points for ai_score, new_score, points in rows]
+    return {
+        "live_corrections": len(errors),
+        "live_mae": round(sum(errors) / len(errors), 4) if errors else None
+    }
+
+
+def save_models(models: Dict[str, GraderModel], path: str):
+    """Write the models atomically (graders in other processes reload on change)"""
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    temporary = f"{path}.tmp"
+    with open(temporary, "wb") as f:
+        pickle.dump(models, f)
+    os.replace(temporary, path)
+
+
+def train_and_save(min_samples: Optional[int] = None) -> Dict[str, Any]:
+    """Retrain every model from the database, save them and return the accuracy report"""
+    db = database.SessionLocal()
+    try:
+        corrections = load_corrections(db)
+    finally:
+        db.close()
+
+    models = train_models(corrections, min_samples)
+    save_models(models, settings.LEARNED_GRADER_PATH)
+    get_learned_grader().reload()
+
+    report = accuracy_report(models)
+    if report["mae"] is not None:
+        metrics.set("learned_grader_mae", report["mae"])
+    logger.info(f"✅ Learned grader trained: {len(models)} models from {len(corrections)} reviews")
+    return report
+
+
+class LearnedGrader:
+    """Scores answers with the saved models, reloading them when the file changes"""
+
+    def __init__(self, path: Optional[str] = None):
+        self._path = path
+        self.models: Dict[str, GraderModel] = {}
+        self._mtime: Optional[float] = None
+        self._lock = threading.Lock()
+
+    @property
+    def path(self) -> str:
+        return self._path or settings.LEARNED_GRADER_PATH
+
+    def reload(self):
+        self._mtime = None
+        self.refresh()
+
+    def refresh(self) -> Dict[str, GraderModel]:
+        """Load the saved models if the file changed since the last load (blocking: call off the event loop)"""
+        with self._lock:
+            try:
+                mtime = os.path.getmtime(self.path)
+            except OSError:
+                self.models, self._mtime = {}, None
+                return self.models
+            if mtime == self._mtime:
+                return self.models
+            try:
+                with open(self.path, "rb") as f:
+                    self.models = pickle.load(f)
+                self._mtime = mtime
+            except Exception as e:
+                logger.error(f"Could not load learned grader models: {str(e)}")
+                self.models = {}
+            return self.models
+
+    def model_for(self, answer) -> Optional[GraderModel]:
+        """Model of the answer's question (None if the question was not in the training data)"""
+        return self.models.get(f"question:{answer.question_id}")
+
+    def grade(self, answers: List[Any]) -> List[Optional[Tuple[float, str, Dict[str, Any]]]]:
+        """
+        First-pass scores: (score, feedback, metadata) for confident predictions,
+        None for answers left to the AI (low confidence, no model for the
+        question, a negation, or trivial answers handled by triage)
+
+        Blocking (model loading and prediction): call it off the event loop.
+        """
+        from src.services.answer_clustering import NEGATION_WORDS
+
+        results: List[Optional[Tuple[float, str, Dict[str, Any]]]] = [None] * len(answers)
+        if not settings.LEARNED_GRADER_ENABLED or not SKLEARN_AVAILABLE:
+            return results
+        if not self.refresh():
+            return results
+
+        by_model: Dict[str, List[int]] = defaultdict(list)
+        for index, answer in enumerate(answers):
+            model = self.model_for(answer)
+            if model is None or model.max_uncertainty is None:
+                continue
+            negations = set(re.findall(r"\w+", normalize_text(answer.student_answer))) & NEGATION_WORDS
+            if negations - set(re.findall(r"\w+", _reference_text(answer))):
+                metrics.inc("grading_learned_total", outcome="negation")
+                continue
+            if settings.TRIAGE_ENABLED and triage_answer(
+                answer.question_text, answer.student_answer, answer.criteria, answer.max_score, answer.correct_answers
+            ):
+                continue
+            by_model[model.key].append(index)
+
+        for key, positions in by_model.items():
+            model = self.models[key]
+            try:
+                predictions = model.predict([answers[index] for index in positions])
+            except Exception as e:
+                logger.error(f"Learned grader {key} failed: {str(e)}")
+                continue
+            for index, (fraction, uncertainty) in zip(positions, predictions):
+                if uncertainty > model.max_uncertainty:
+                    metrics.inc("grading_learned_total", outcome="low_confidence")
+                    continue
+                metrics.inc("grading_learned_total", outcome="confident")
+                max_score = answers[index].max_score
+                results[index] = (round(fraction * max_score, 2), FEEDBACK, {
+                    "method": "learned_grader",
+                    "model": key,
+                    "version": LEARNED_GRADER_VERSION,
+                    "trained_at": model.trained_at,
+                    "uncertainty": round(uncertainty, 4),
+                    "max_score": max_score,
+                    "reasoning": f"Estimat de modelul local {key} (incertitudine ±{uncertainty * max_score:.2f} puncte)",
+                    "ai_generated": False
+                })
+        return results
+
+
+def _training_due(interval: float) -> bool:
+    try:
+        return time.time() - os.path.getmtime(settings.LEARNED_GRADER_PATH) >= interval
+    except OSError:
+        return True  # Never trained
+
+
+def _claim_training() -> Optional[str]:
+    """Create the training lock file (None if another process holds it)"""
+    lock_path = f"{settings.LEARNED_GRADER_PATH}.lock"
+    try:
+        if time.time() - os.path.getmtime(lock_path) > TRAINING_LOCK_STALE_SECONDS:
+            os.remove(lock_path)
+    except OSError:
+        pass
+    try:
+        os.makedirs(os.path.dirname(os.path.abspath(lock_path)), exist_ok=True)
+        os.close(os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+    except FileExistsError:
+        return None
+    return lock_path
+
+
+async def retrain_periodically():
+    """
+    Background task: retrain when the saved models are older than
+    LEARNED_GRADER_RETRAIN_HOURS (or missing). Every worker process runs it;
+    the lock file and the models' age make only one of them train.
+    """
+    interval = settings.LEARNED_GRADER_RETRAIN_HOURS * 3600
+    while True:
+        if _training_due(interval):
+            lock_path = _claim_training()
+            if lock_path:
+                try:
+                    if _training_due(interval):  # Not trained by the lock's previous holder
+                        await asyncio.to_thread(train_and_save)
+                except Exception as e:
+                    logger.error(f"❌ Learned grader training failed: {str(e)}")
+                finally:
+                    try:
+                        os.remove(lock_path)
+                    except OSError:
+                        pass
+        await asyncio.sleep(min(interval, RETRAIN_CHECK_SECONDS))
+
+
+# Global instance
+_learned_grader: Optional[LearnedGrader] = None
+
+
+def get_learned_grader() -> LearnedGrader:
+    """Get or create the learned grader instance"""
+    global _learned_grader
+    if _learned_grader is None:
+        _learned_grader = LearnedGrader()
+    return _learned_grader
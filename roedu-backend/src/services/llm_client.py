@@ -0,0 +1,610 @@
+"""
+LLM Client Layer
+Async, non-blocking clients for Gemini and OpenAI.
+All providers share one pooled HTTP client, so connections are reused and an
+in-flight call only holds a coroutine - never a threadpool thread.
+Providers support both one-shot (generate) and streamed (stream) output, and
+can be asked for JSON constrained to a schema (structured output).
+Every call goes through the shared rate limiter (llm_rate_limiter: RPM/TPM
+budgets, queued by priority) and the resilience layer (llm_resilience):
+circuit breaker, adaptive timeout and, for selected operations, hedged requests.
+"""
+
+import asyncio
+import json
+import logging
+import time
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Awaitable, Dict, Optional, Type, TypeVar
+
+import httpx
+from fastapi import HTTPException, Request
+
+from src.config.settings import settings
+from src.services import llm_rate_limiter
+from src.services.llm_rate_limiter import RateLimitExceeded, RateLimitGrant, estimate_tokens, prompt_tokens
+from src.services.llm_resilience import CircuitBreaker, call_timeout, get_circuit_breaker, get_latency_tracker, hedge_delay
+from src.utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class LLMError(Exception):
+    """An LLM provider call failed"""
+
+
+class LLMTimeoutError(LLMError):
+    """An LLM provider call exceeded its timeout"""
+
+
+class LLMNotConfiguredError(LLMError):
+    """The provider has no API key configured"""
+
+
+class LLMCircuitOpenError(LLMError):
+    """The provider's circuit breaker is open - the call was not attempted"""
+
+
+class LLMRateLimitedError(LLMError):
+    """No rate limit budget became available within LLM_RATE_LIMIT_MAX_WAIT_SECONDS"""
+
+
+@dataclass
+class LLMRequest:
+    """One generation call as seen by a provider"""
+    prompt: str
+    operation: str = "default"
+    system: Optional[str] = None
+    temperature: Optional[float] = None
+    max_output_tokens: Optional[int] = None
+    response_schema: Optional[Dict[str, Any]] = None  # JSON schema of the expected output
+
+
+@dataclass
+class LLMResponse:
+    """Text returned by a provider plus usage details"""
+    text: str
+    provider: str
+    model: str
+    latency_ms: float
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+
+
+# Shared HTTP client (one connection pool for all providers)
+_http_client: Optional[httpx.AsyncClient] = None
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Get or create the shared async HTTP client"""
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        _http_client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=settings.LLM_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.LLM_MAX_CONNECTIONS
+            ),
+            timeout=httpx.Timeout(settings.LLM_TIMEOUT_SECONDS, connect=10.0)
+        )
+    return _http_client
+
+
+async def close_http_client():
+    """Close the shared HTTP client (application shutdown)"""
+    global _http_client
+    if _http_client is not None and not _http_client.is_closed:
+        await _http_client.aclose()
+    _http_client = None
+
+
+async def _iter_sse_data(response: httpx.Response) -> AsyncIterator[str]:
+    """Yield the data payloads of a server-sent events response"""
+    async for line in response.aiter_lines():
+        if line.startswith("data:"):
+            yield line[5:].strip()
+
+
+async def _raise_for_stream_status(response: httpx.Response):
+    """raise_for_status for a streamed response (reads the error body first)"""
+    if response.is_error:
+        await response.aread()
+        response.raise_for_status()
+
+
+class LLMClient:
+    """Base class for async LLM providers"""
+
+    provider = "base"
+
+    def __init__(self, model: str, api_key: str = "", default_timeout: Optional[float] = None):
+        self.model = model
+        self.api_key = api_key
+        self.default_timeout = default_timeout or settings.LLM_TIMEOUT_SECONDS
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.api_key)
+
+    async def generate(
+        self,
+        prompt: str,
+        *,
+        operation: str = "default",
+        system: Optional[str] = None,
+        temperature: Optional[float] = None,
+        max_output_tokens: Optional[int] = None,
+        response_schema: Optional[Dict[str, Any]] = None,
+        timeout: Optional[float] = None
+    ) -> LLMResponse:
+        """
+        Generate a completion for the prompt
+
+        Args:
+            prompt: User prompt
+            operation: Logical operation name (e.g. "quiz_generation"), used for logging
+            system: Optional system instruction
+            temperature: Sampling temperature (provider default if None)
+            max_output_tokens: Output token limit (provider default if None)
+            response_schema: JSON schema (e.g. Model.model_json_schema()); asks the
+                provider for JSON output constrained to it
+            timeout: Per-call timeout in seconds (default: adaptive, see llm_resilience)
+
+        Returns:
+            LLMResponse with the generated text
+
+        Raises:
+            LLMCircuitOpenError: provider is failing, call not attempted
+            LLMTimeoutError / LLMError: call failed
+        """
+        if not self.enabled:
+            raise LLMNotConfiguredError(f"{self.provider} API key not configured")
+
+        request = LLMRequest(
+            prompt=prompt,
+            operation=operation,
+            system=system,
+            temperature=temperature,
+            max_output_tokens=max_output_tokens,
+            response_schema=response_schema
+        )
+        breaker = self._allow(operation)
+        grant = await self._acquire_budget(request, breaker)
+
+        timeout = timeout or call_timeout(self.provider, operation, self.default_timeout, breaker)
+        delay = hedge_delay(self.provider, operation)
+        started = time.perf_counter()
+        outcome = "error"
+        used_tokens = prompt_tokens(prompt, system)  # A failed call is charged its prompt
+        try:
+            if delay is not None and delay < timeout:
+                response = await self._hedged_call(request, timeout, delay)
+            else:
+                response = await self._call(request, timeout)
+            used_tokens = response.prompt_tokens + response.completion_tokens
+            outcome = "ok"
+        except Exception as e:
+            outcome = "timeout" if isinstance(e, LLMTimeoutError) else "error"
+            if outcome == "timeout":
+                # Counted at the timeout, so a slower provider raises the p95 instead of timing out forever
+                get_latency_tracker(self.provider, operation).record(timeout)
+            breaker.record_failure()
+            raise
+        except BaseException:
+            breaker.release()
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            metrics.inc("llm_requests_total", provider=self.provider, operation=operation, outcome=outcome)
+            metrics.observe("llm_request_duration_seconds", elapsed, provider=self.provider, operation=operation)
+            await llm_rate_limiter.settle(grant, used_tokens)
+
+        breaker.record_success()
+        get_latency_tracker(self.provider, operation).record(elapsed)
+        metrics.inc("llm_tokens_total", response.prompt_tokens, provider=self.provider, operation=operation, kind="prompt")
+        metrics.inc("llm_tokens_total", response.completion_tokens, provider=self.provider, operation=operation, kind="completion")
+        response.latency_ms = elapsed * 1000
+        logger.debug(f"LLM {self.provider}/{operation} took {response.latency_ms:.0f} ms")
+        return response
+
+    def _allow(self, operation: str) -> CircuitBreaker:
+        """The provider's breaker, checked before any budget is taken"""
+        breaker = get_circuit_breaker(self.provider)
+        if not breaker.allow():
+            metrics.inc("llm_requests_total", provider=self.provider, operation=operation, outcome="circuit_open")
+            raise LLMCircuitOpenError(f"{self.provider} circuit open, '{operation}' not attempted")
+        return breaker
+
+    async def _acquire_budget(self, request: LLMRequest, breaker: CircuitBreaker) -> Optional[RateLimitGrant]:
+        """Wait for rate limit budget (queued by the request's priority); frees the breaker's trial slot if none comes"""
+        try:
+            return await llm_rate_limiter.acquire(
+                self.provider,
+                request.operation,
+                estimate_tokens(request.prompt, request.system, request.max_output_tokens)
+            )
+        except RateLimitExceeded as e:
+            breaker.release()
+            metrics.inc("llm_requests_total", provider=self.provider, operation=request.operation, outcome="rate_limited")
+            raise LLMRateLimitedError(str(e))
+        except BaseException:
+            breaker.release()
+            raise
+
+    async def _call(self, request: LLMRequest, timeout: float) -> LLMResponse:
+        """One provider call with timeout and HTTP errors mapped to LLMError"""
+        try:
+            return await asyncio.wait_for(self._generate(request), timeout)
+        except asyncio.TimeoutError:
+            raise LLMTimeoutError(f"{self.provider} call '{request.operation}' timed out after {timeout:.1f}s")
+        except httpx.HTTPStatusError as e:
+            raise LLMError(f"{self.provider} returned HTTP {e.response.status_code}: {e.response.text[:200]}")
+        except httpx.HTTPError as e:
+            raise LLMError(f"{self.provider} request failed: {str(e)}")
+
+    async def _hedged_call(self, request: LLMRequest, timeout: float, delay: float) -> LLMResponse:
+        """
+        Send a second identical request if the first is still running after `delay`
+        The first successful response wins and the other call is cancelled
+        """
+        first = asyncio.ensure_future(self._call(request, timeout))
+        done, _ = await asyncio.wait({first}, timeout=delay)
+        if done:
+            return first.result()
+
+        # The hedge is optional: only sent if the rate limit has spare budget right now
+        tokens = estimate_tokens(request.prompt, request.system, request.max_output_tokens)
+        hedge_grant = await llm_rate_limiter.try_acquire_now(self.provider, tokens)
+        if hedge_grant is None:
+            return await first
+
+        metrics.inc("llm_hedged_requests_total", provider=self.provider, operation=request.operation)
+        pending = {first, asyncio.ensure_future(self._call(request, timeout - delay))}
+        error: Optional[BaseException] = None
+        hedge_tokens = prompt_tokens(request.prompt, request.system)  # If both fail, the hedge is charged its prompt
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is not first:
+                            metrics.inc("llm_hedge_wins_total", provider=self.provider, operation=request.operation)
+                        response = task.result()
+                        # Both requests were identical: charge the hedge what the winner used
+                        hedge_tokens = response.prompt_tokens + response.completion_tokens
+                        return response
+                    error = task.exception()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+            await llm_rate_limiter.settle(hedge_grant, hedge_tokens)
+
+    async def stream(
+        self,
+        prompt: str,
+        *,
+        operation: str = "default",
+        system: Optional[str] = None,
+        temperature: Optional[float] = None,
+        max_output_tokens: Optional[int] = None,
+        response_schema: Optional[Dict[str, Any]] = None,
+        timeout: Optional[float] = None
+    ) -> AsyncIterator[str]:
+        """
+        Stream a completion for the prompt as text chunks
+
+        Same arguments as generate(); here `timeout` (default: adaptive, see
+        llm_resilience) bounds the wait for each chunk (including the first),
+        not the whole generation. The duration of a complete stream is recorded
+        as the operation's latency.
+
+        Yields:
+            Text chunks in generation order
+        """
+        if not self.enabled:
+            raise LLMNotConfiguredError(f"{self.provider} API key not configured")
+
+        request = LLMRequest(
+            prompt=prompt,
+            operation=operation,
+            system=system,
+            temperature=temperature,
+            max_output_tokens=max_output_tokens,
+            response_schema=response_schema
+        )
+        breaker = self._allow(operation)
+        grant = await self._acquire_budget(request, breaker)
+
+        timeout = timeout or call_timeout(self.provider, operation, self.default_timeout, breaker)
+        started = time.perf_counter()
+        first_chunk_ms = None
+        streamed_chars = 0
+        outcome = "error"
+        chunks = self._stream(request).__aiter__()
+        try:
+            while True:
+                try:
+                    chunk = await asyncio.wait_for(chunks.__anext__(), timeout)
+                except StopAsyncIteration:
+                    break
+                except asyncio.TimeoutError:
+                    outcome = "timeout"
+                    raise LLMTimeoutError(f"{self.provider} stream '{operation}' stalled for {timeout:.1f}s")
+                except httpx.HTTPStatusError as e:
+                    raise LLMError(f"{self.provider} returned HTTP {e.response.status_code}: {e.response.text[:200]}")
+                except httpx.HTTPError as e:
+                    raise LLMError(f"{self.provider} request failed: {str(e)}")
+
+                if first_chunk_ms is None:
+                    first_chunk_ms = (time.perf_counter() - started) * 1000
+                streamed_chars += len(chunk)
+                yield chunk
+            outcome = "ok"
+            breaker.record_success()
+        except Exception as e:
+            outcome = "timeout" if isinstance(e, LLMTimeoutError) else "error"
+            if outcome == "timeout":
+                # Counted at the timeout, so a slower provider raises the p95 instead of timing out forever
+                get_latency_tracker(self.provider, operation).record(timeout)
+            breaker.record_failure()
+            raise
+        except BaseException:
+            breaker.release()
+            raise
+        finally:
+            await chunks.aclose()
+            elapsed = time.perf_counter() - started
+            metrics.inc("llm_requests_total", provider=self.provider, operation=operation, outcome=outcome)
+            metrics.observe("llm_request_duration_seconds", elapsed, provider=self.provider, operation=operation)
+            # Streams report no usage: return the unused output budget of the estimate
+            await llm_rate_limiter.settle(grant, prompt_tokens(prompt, system, streamed_chars))
+
+        get_latency_tracker(self.provider, operation).record(elapsed)
+        logger.debug(
+            f"LLM stream {self.provider}/{operation}: first chunk {first_chunk_ms or 0:.0f} ms, "
+            f"total {elapsed * 1000:.0f} ms"
+        )
+
+    async def _generate(self, request: LLMRequest) -> LLMResponse:
+        """Provider-specific call (implemented by subclasses)"""
+        raise NotImplementedError
+
+    async def _stream(self, request: LLMRequest) -> AsyncIterator[str]:
+        """Provider-specific streaming call (default: one chunk from _generate)"""
+        response = await self._generate(request)
+        yield response.text
+
+
+_GEMINI_SCHEMA_KEYS = {"type", "format", "description", "nullable", "enum", "properties", "required", "items", "minItems", "maxItems"}
+
+
+def to_gemini_schema(schema: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Convert a Pydantic JSON schema to the OpenAPI subset Gemini accepts
+    ($refs inlined, Optional[...] as nullable, unsupported keywords dropped)
+    """
+    definitions = schema.get("$defs", {})
+
+    def convert(node: Dict[str, Any]) -> Dict[str, Any]:
+        if "$ref" in node:
+            node = definitions[node["$ref"].rsplit("/", 1)[-1]]
+        if "anyOf" in node:
+            variants = [variant for variant in node["anyOf"] if variant.get("type") != "null"]
+            converted = convert(variants[0]) if variants else {"type": "STRING"}
+            if len(variants) < len(node["anyOf"]):
+                converted["nullable"] = True
+            return converted
+        if len(node.get("allOf", [])) == 1:
+            return convert(node["allOf"][0])
+
+        converted: Dict[str, Any] = {}
+        for key, value in node.items():
+            if key not in _GEMINI_SCHEMA_KEYS:
+                continue
+            if key == "type":
+                converted[key] = value.upper()
+            elif key == "properties":
+                converted[key] = {name: convert(prop) for name, prop in value.items()}
+            elif key == "items":
+                converted[key] = convert(value)
+            else:
+                converted[key] = value
+        return converted
+
+    return convert(schema)
+
+
+class GeminiClient(LLMClient):
+    """Google Gemini via the generateContent REST API"""
+
+    provider = "gemini"
+
+    def __init__(self):
+        super().__init__(settings.GEMINI_MODEL, settings.GEMINI_API_KEY)
+        self.base_url = settings.GEMINI_BASE_URL.rstrip("/")
+
+    def _build_body(self, request: LLMRequest) -> Dict[str, Any]:
+        body: Dict[str, Any] = {"contents": [{"role": "user", "parts": [{"text": request.prompt}]}]}
+        if request.system:
+            body["systemInstruction"] = {"parts": [{"text": request.system}]}
+
+        generation_config: Dict[str, Any] = {}
+        if request.temperature is not None:
+            generation_config["temperature"] = request.temperature
+        if request.max_output_tokens is not None:
+            generation_config["maxOutputTokens"] = request.max_output_tokens
+        if request.response_schema is not None:
+            generation_config["responseMimeType"] = "application/json"
+            generation_config["responseSchema"] = to_gemini_schema(request.response_schema)
+        if generation_config:
+            body["generationConfig"] = generation_config
+        return body
+
+    async def _generate(self, request: LLMRequest) -> LLMResponse:
+        http = get_http_client()
+        response = await http.post(
+            f"{self.base_url}/models/{self.model}:generateContent",
+            headers={"x-goog-api-key": self.api_key},
+            json=self._build_body(request)
+        )
+        response.raise_for_status()
+        data = response.json()
+
+        candidates = data.get("candidates") or []
+        if not candidates:
+            raise LLMError(f"Gemini returned no candidates: {data.get('promptFeedback', {})}")
+        parts = candidates[0].get("content", {}).get("parts", [])
+        usage = data.get("usageMetadata", {})
+
+        return LLMResponse(
+            text="".join(part.get("text", "") for part in parts),
+            provider=self.provider,
+            model=self.model,
+            latency_ms=0.0,
+            prompt_tokens=usage.get("promptTokenCount", 0),
+            completion_tokens=usage.get("candidatesTokenCount", 0)
+        )
+
+    async def _stream(self, request: LLMRequest) -> AsyncIterator[str]:
+        http = get_http_client()
+        async with http.stream(
+            "POST",
+            f"{self.base_url}/models/{self.model}:streamGenerateContent",
+            params={"alt": "sse"},
+            headers={"x-goog-api-key": self.api_key},
+            json=self._build_body(request)
+        ) as response:
+            await _raise_for_stream_status(response)
+            async for payload in _iter_sse_data(response):
+                candidates = json.loads(payload).get("candidates") or []
+                if not candidates:
+                    continue
+                parts = candidates[0].get("content", {}).get("parts", [])
+                text = "".join(part.get("text", "") for part in parts)
+                if text:
+                    yield text
+
+
+class OpenAIClient(LLMClient):
+    """OpenAI via the chat completions REST API"""
+
+    provider = "openai"
+
+    def __init__(self):
+        super().__init__(settings.OPENAI_MODEL, settings.OPENAI_API_KEY)
+        self.base_url = settings.OPENAI_BASE_URL.rstrip("/")
+
+    @property
+    def enabled(self) -> bool:
+        return settings.AI_ENABLED and bool(self.api_key)
+
+    def _build_body(self, request: LLMRequest) -> Dict[str, Any]:
+        messages = []
+        if request.system:
+            messages.append({"role": "system", "content": request.system})
+        messages.append({"role": "user", "content": request.prompt})
+
+        body: Dict[str, Any] = {"model": self.model, "messages": messages}
+        if request.temperature is not None:
+            body["temperature"] = request.temperature
+        if request.max_output_tokens is not None:
+            body["max_tokens"] = request.max_output_tokens
+        if request.response_schema is not None:
+            # JSON mode: output is guaranteed to parse; the schema itself is checked by the caller
+            body["response_format"] = {"type": "json_object"}
+        return body
+
+    async def _generate(self, request: LLMRequest) -> LLMResponse:
+        http = get_http_client()
+        response = await http.post(
+            f"{self.base_url}/chat/completions",
+            headers={"Authorization": f"Bearer {self.api_key}"},
+            json=self._build_body(request)
+        )
+        response.raise_for_status()
+        data = response.json()
+        usage = data.get("usage", {})
+
+        return LLMResponse(
+            text=data["choices"][0]["message"]["content"] or "",
+            provider=self.provider,
+            model=self.model,
+            latency_ms=0.0,
+            prompt_tokens=usage.get("prompt_tokens", 0),
+            completion_tokens=usage.get("completion_tokens", 0)
+        )
+
+    async def _stream(self, request: LLMRequest) -> AsyncIterator[str]:
+        http = get_http_client()
+        async with http.stream(
+            "POST",
+            f"{self.base_url}/chat/completions",
+            headers={"Authorization": f"Bearer {self.api_key}"},
+            json={**self._build_body(request), "stream": True}
+        ) as response:
+            await _raise_for_stream_status(response)
+            async for payload in _iter_sse_data(response):
+                if payload == "[DONE]":
+                    break
+                choices = json.loads(payload).get("choices") or []
+                text = choices[0].get("delta", {}).get("content") if choices else None
+                if text:
+                    yield text
+
+
+# Global instances
+_clients: Dict[str, LLMClient] = {}
+
+_CLIENT_CLASSES: Dict[str, Type[LLMClient]] = {
+    "gemini": GeminiClient,
+    "openai": OpenAIClient,
+}
+
+
+def register_llm_provider(name: str, client_class: Type[LLMClient]):
+    """Register an additional provider implementation under a name"""
+    _CLIENT_CLASSES[name] = client_class
+    _clients.pop(name, None)
+
+
+def get_llm_client(provider: str = "gemini") -> LLMClient:
+    """Get or create the client for a provider ("gemini", "openai", "replay", ...)"""
+    if provider not in _clients:
+        if provider == "replay" and provider not in _CLIENT_CLASSES:
+            import src.services.llm_replay  # noqa: F401 - registers the offline provider
+        if provider not in _CLIENT_CLASSES:
+            raise ValueError(f"Unknown LLM provider: {provider}")
+        _clients[provider] = _CLIENT_CLASSES[provider]()
+    return _clients[provider]
+
+
+def get_service_llm_client(default_provider: str) -> LLMClient:
+    """
+    Client used by an AI service
+    LLM_PROVIDER (e.g. "replay" for load tests) overrides the service's own provider
+    """
+    return get_llm_client(settings.LLM_PROVIDER or default_provider)
+
+
+async def cancel_on_disconnect(request: Request, awaitable: Awaitable[T], poll_interval: float = 0.5) -> T:
+    """
+    Await an LLM-backed coroutine, cancelling it if the HTTP client disconnects
+
+    Raises:
+        HTTPException(499) when the client went away before the result was ready
+    """
+    task = asyncio.ensure_future(awaitable)
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=poll_interval)
+            if done:
+                return task.result()
+            if await request.is_disconnected():
+                logger.info(f"Client disconnected from {request.url.path}, cancelling LLM call")
+                task.cancel()
+                raise HTTPException(status_code=499, detail="Client disconnected")
+    finally:
+        if not task.done():
+            task.cancel()
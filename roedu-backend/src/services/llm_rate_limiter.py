@@ -0,0 +1,384 @@
+"""
+LLM Rate Limiter
+Token buckets for each provider's requests-per-minute (LLM_RPM_LIMITS) and
+tokens-per-minute (LLM_TPM_LIMITS) quota, shared by every worker process
+through a small SQLite file (LLM_RATE_LIMIT_DB).
+
+- Calls wait in a queue instead of failing when the budget is exhausted
+  (up to LLM_RATE_LIMIT_MAX_WAIT_SECONDS)
+- The queue is ordered by priority class, then arrival: exam grading >
+  student ask-AI > practice generation > bulk jobs, so a burst of practice
+  quizzes cannot starve grading
+- Tokens are reserved from an estimate before the call and corrected with
+  the usage the provider reports afterwards
+- Waiters keep a heartbeat; entries of crashed processes expire after
+  WAITER_TTL_SECONDS
+- Only the head of the queue takes the write lock; the others check their
+  position with a plain read and back off exponentially (up to
+  MAX_POLL_SECONDS), so a long queue does not serialize on the SQLite file
+"""
+
+import asyncio
+import enum
+import logging
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+from src.config.settings import settings
+from src.services.llm_resilience import parse_operation_map
+from src.utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Waiter rows not refreshed for this long belong to a dead process
+WAITER_TTL_SECONDS = 30.0
+# Longest sleep between two attempts of a queued call
+MAX_POLL_SECONDS = 1.0
+# First sleep of a call waiting behind others (doubled on every check, up to MAX_POLL_SECONDS)
+MIN_POLL_SECONDS = 0.05
+# Output tokens assumed when the call sets no max_output_tokens
+DEFAULT_OUTPUT_TOKENS = 1024
+
+
+class LLMPriority(enum.IntEnum):
+    """Priority classes (lower value is served first)"""
+    EXAM_GRADING = 0
+    ASK_AI = 1
+    PRACTICE_GENERATION = 2
+    BULK = 3
+
+
+OPERATION_PRIORITIES = {
+    "free_text_evaluation": LLMPriority.EXAM_GRADING,
+    "free_text_batch_evaluation": LLMPriority.EXAM_GRADING,
+    "answer_question": LLMPriority.ASK_AI,
+    "quiz_generation": LLMPriority.PRACTICE_GENERATION,
+    "quiz_questions": LLMPriority.PRACTICE_GENERATION,
+}
+
+_priority_override: ContextVar[Optional[LLMPriority]] = ContextVar("llm_priority", default=None)
+
+
+@contextmanager
+def llm_priority(priority: LLMPriority) -> Iterator[None]:
+    """Run the LLM calls made inside the block with the given priority (e.g. bulk jobs)"""
+    token = _priority_override.set(priority)
+    try:
+        yield
+    finally:
+        _priority_override.reset(token)
+
+
+def request_priority(operation: str) -> LLMPriority:
+    """Priority of a call: the llm_priority() override, else the operation's class"""
+    override = _priority_override.get()
+    if override is not None:
+        return override
+    return OPERATION_PRIORITIES.get(operation, LLMPriority.PRACTICE_GENERATION)
+
+
+def prompt_tokens(prompt: str, system: Optional[str], output_chars: int = 0) -> int:
+    """Rough token count of the text sent (and `output_chars` received), 4 characters per token"""
+    return (len(prompt) + len(system or "") + output_chars) // 4
+
+
+def estimate_tokens(prompt: str, system: Optional[str], max_output_tokens: Optional[int]) -> int:
+    """Rough token count of a call (prompt plus the output budget)"""
+    return prompt_tokens(prompt, system) + (max_output_tokens or DEFAULT_OUTPUT_TOKENS)
+
+
+class RateLimitExceeded(Exception):
+    """A call waited longer than LLM_RATE_LIMIT_MAX_WAIT_SECONDS for budget"""
+
+
+@dataclass
+class RateLimitGrant:
+    """Budget taken for one call (tokens are corrected once usage is known)"""
+    provider: str
+    tokens: int
+    waited_seconds: float = 0.0
+
+
+class SQLiteRateLimiter:
+    """Token buckets and priority queue kept in SQLite (one row per provider / waiter)"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        self._init_lock = threading.Lock()
+        self._initialized = False
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            directory = os.path.dirname(os.path.abspath(self.path))
+            os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        with self._init_lock:
+            if not self._initialized:
+                conn.executescript("""
+                    CREATE TABLE IF NOT EXISTS llm_rate_buckets (
+                        provider TEXT PRIMARY KEY,
+                        requests REAL NOT NULL,
+                        tokens REAL NOT NULL,
+                        updated_at REAL NOT NULL
+                    );
+                    CREATE TABLE IF NOT EXISTS llm_rate_waiters (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        provider TEXT NOT NULL,
+                        priority INTEGER NOT NULL,
+                        enqueued_at REAL NOT NULL,
+                        heartbeat REAL NOT NULL
+                    );
+                """)
+                self._initialized = True
+        return conn
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    @staticmethod
+    def _refilled(conn, provider: str, rpm: float, tpm: float, now: float) -> Tuple[float, float]:
+        """Bucket levels after refilling for the time since the last update (0 limit: unused)"""
+        row = conn.execute(
+            "SELECT requests, tokens, updated_at FROM llm_rate_buckets WHERE provider = ?", (provider,)
+        ).fetchone()
+        if row is None:
+            return rpm, tpm
+        requests, tokens, updated_at = row
+        elapsed = max(0.0, now - updated_at)
+        return min(rpm, requests + elapsed * rpm / 60), min(tpm, tokens + elapsed * tpm / 60)
+
+    @staticmethod
+    def _save(conn, provider: str, requests: float, tokens: float, now: float):
+        conn.execute(
+            "INSERT INTO llm_rate_buckets (provider, requests, tokens, updated_at) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT(provider) DO UPDATE SET requests = excluded.requests, tokens = excluded.tokens, "
+            "updated_at = excluded.updated_at",
+            (provider, requests, tokens, now)
+        )
+
+    def enqueue(self, provider: str, priority: int) -> int:
+        """Join the provider's queue; returns the waiter id"""
+        now = time.time()
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                "INSERT INTO llm_rate_waiters (provider, priority, enqueued_at, heartbeat) VALUES (?, ?, ?, ?)",
+                (provider, priority, now, now)
+            )
+            return cursor.lastrowid
+
+    def leave(self, waiter_id: int):
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM llm_rate_waiters WHERE id = ?", (waiter_id,))
+
+    def _behind_others(self, waiter_id: int, provider: str, now: float) -> bool:
+        """
+        Whether a live waiter is ahead of this one (read only, no write lock);
+        refreshes the waiter's heartbeat when it is a third of the TTL old
+        """
+        conn = self._connect()
+        head = conn.execute(
+            "SELECT id FROM llm_rate_waiters WHERE provider = ? AND (heartbeat >= ? OR id = ?) "
+            "ORDER BY priority, enqueued_at, id LIMIT 1",
+            (provider, now - WAITER_TTL_SECONDS, waiter_id)
+        ).fetchone()
+        if head is None or head[0] == waiter_id:
+            return False
+        own = conn.execute("SELECT heartbeat FROM llm_rate_waiters WHERE id = ?", (waiter_id,)).fetchone()
+        if own is not None and now - own[0] >= WAITER_TTL_SECONDS / 3:
+            conn.execute("UPDATE llm_rate_waiters SET heartbeat = ? WHERE id = ?", (now, waiter_id))
+        return True
+
+    def try_acquire(self, waiter_id: int, provider: str, tokens: int, rpm: float, tpm: float) -> Optional[float]:
+        """
+        Take one request and `tokens` tokens if this waiter is first in line
+        (a limit of 0 means that dimension is unlimited)
+
+        Returns:
+            0 when the budget was taken (the waiter leaves the queue), None if
+            others are ahead in line, otherwise the seconds to wait before
+            trying again
+        """
+        now = time.time()
+        if self._behind_others(waiter_id, provider, now):
+            return None
+
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM llm_rate_waiters WHERE heartbeat < ?", (now - WAITER_TTL_SECONDS,))
+            conn.execute("UPDATE llm_rate_waiters SET heartbeat = ? WHERE id = ?", (now, waiter_id))
+            head = conn.execute(
+                "SELECT id FROM llm_rate_waiters WHERE provider = ? ORDER BY priority, enqueued_at, id LIMIT 1",
+                (provider,)
+            ).fetchone()
+
+            requests, available = self._refilled(conn, provider, rpm, tpm, now)
+            needed = min(tokens, tpm)  # a call larger than the whole bucket waits for a full one
+            if head is not None and head[0] != waiter_id:
+                # Someone got ahead since the read: wait for them to take their share first
+                return None
+
+            wait_requests = (1 - requests) * 60 / rpm if rpm and requests < 1 else 0.0
+            wait_tokens = (needed - available) * 60 / tpm if tpm and available < needed else 0.0
+            if not wait_requests and not wait_tokens:
+                self._save(conn, provider, requests - 1 if rpm else 0, available - tokens if tpm else 0, now)
+                conn.execute("DELETE FROM llm_rate_waiters WHERE id = ?", (waiter_id,))
+                return 0.0
+
+            self._save(conn, provider, requests, available, now)
+            return max(wait_requests, wait_tokens, 0.01)
+
+    def adjust_tokens(self, provider: str, rpm: float, tpm: float, delta: float):
+        """Return (positive) or charge (negative) tokens once the actual usage is known"""
+        now = time.time()
+        with self._transaction() as conn:
+            requests, tokens = self._refilled(conn, provider, rpm, tpm, now)
+            self._save(conn, provider, requests, min(tpm, tokens + delta), now)
+
+    def status(self) -> Dict[str, Any]:
+        now = time.time()
+        conn = self._connect()
+        buckets = {}
+        for provider, requests, tokens, updated_at in conn.execute(
+            "SELECT provider, requests, tokens, updated_at FROM llm_rate_buckets"
+        ):
+            rpm, tpm = provider_limits(provider)
+            elapsed = max(0.0, now - updated_at)
+            buckets[provider] = {
+                "rpm_limit": rpm,
+                "tpm_limit": tpm,
+                "requests_available": round(min(rpm, requests + elapsed * rpm / 60), 2) if rpm else None,
+                "tokens_available": round(min(tpm, tokens + elapsed * tpm / 60)) if tpm else None,
+            }
+        queued: Dict[str, Dict[str, int]] = {}
+        for provider, priority, count in conn.execute(
+            "SELECT provider, priority, COUNT(*) FROM llm_rate_waiters WHERE heartbeat >= ? GROUP BY provider, priority",
+            (now - WAITER_TTL_SECONDS,)
+        ):
+            queued.setdefault(provider, {})[LLMPriority(priority).name.lower()] = count
+        return {"buckets": buckets, "queued": queued}
+
+
+def provider_limits(provider: str) -> Tuple[float, float]:
+    """(requests per minute, tokens per minute) of a provider; 0 means unlimited"""
+    rpm = parse_operation_map(settings.LLM_RPM_LIMITS).get(provider, 0.0)
+    tpm = parse_operation_map(settings.LLM_TPM_LIMITS).get(provider, 0.0)
+    return rpm, tpm
+
+
+async def acquire(provider: str, operation: str, tokens: int) -> Optional[RateLimitGrant]:
+    """
+    Wait (queued by priority) until the provider's budget allows the call
+
+    Returns:
+        The grant, or None if the provider has no limits
+
+    Raises:
+        RateLimitExceeded: waited longer than LLM_RATE_LIMIT_MAX_WAIT_SECONDS
+    """
+    rpm, tpm = provider_limits(provider)
+    if not rpm and not tpm:
+        return None
+
+    limiter = get_rate_limiter()
+    priority = request_priority(operation)
+    started = time.monotonic()
+    waiter_id = await asyncio.to_thread(limiter.enqueue, provider, int(priority))
+    backoff = MIN_POLL_SECONDS
+    try:
+        while True:
+            wait = await asyncio.to_thread(limiter.try_acquire, waiter_id, provider, tokens, rpm, tpm)
+            if wait == 0:
+                break
+            if wait is None:
+                # Behind others in line: check again less and less often
+                wait, backoff = backoff, min(backoff * 2, MAX_POLL_SECONDS)
+            else:
+                backoff = MIN_POLL_SECONDS
+            waited = time.monotonic() - started
+            if waited + wait > settings.LLM_RATE_LIMIT_MAX_WAIT_SECONDS:
+                metrics.inc("llm_rate_limited_total", provider=provider, priority=priority.name.lower(), outcome="gave_up")
+                raise RateLimitExceeded(
+                    f"{provider} rate limit: '{operation}' waited {waited:.0f}s without budget"
+                )
+            await asyncio.sleep(min(wait, MAX_POLL_SECONDS))
+    except BaseException:
+        await asyncio.shield(asyncio.to_thread(limiter.leave, waiter_id))
+        raise
+
+    waited = time.monotonic() - started
+    metrics.observe("llm_rate_limit_wait_seconds", waited, provider=provider, priority=priority.name.lower())
+    if waited >= 0.5:
+        metrics.inc("llm_rate_limited_total", provider=provider, priority=priority.name.lower(), outcome="queued")
+        logger.info(f"⏳ {provider}/{operation} waited {waited:.1f}s for rate limit budget ({priority.name.lower()})")
+    return RateLimitGrant(provider, tokens, waited)
+
+
+async def try_acquire_now(provider: str, tokens: int) -> Optional[RateLimitGrant]:
+    """
+    Take budget only if it is available right away and nobody is queued
+    (optional extra calls such as hedged requests); None otherwise
+    """
+    rpm, tpm = provider_limits(provider)
+    if not rpm and not tpm:
+        return RateLimitGrant(provider, tokens)
+
+    limiter = get_rate_limiter()
+    waiter_id = await asyncio.to_thread(limiter.enqueue, provider, len(LLMPriority))  # behind every priority class
+    wait = None
+    try:
+        wait = await asyncio.to_thread(limiter.try_acquire, waiter_id, provider, tokens, rpm, tpm)
+    finally:
+        if wait != 0:
+            await asyncio.shield(asyncio.to_thread(limiter.leave, waiter_id))
+    return RateLimitGrant(provider, tokens) if wait == 0 else None
+
+
+async def settle(grant: Optional[RateLimitGrant], used_tokens: Optional[int]):
+    """Correct the reserved tokens with the usage reported by the provider"""
+    if grant is None or not used_tokens:
+        return
+    rpm, tpm = provider_limits(grant.provider)
+    if tpm and used_tokens != grant.tokens:
+        await asyncio.to_thread(get_rate_limiter().adjust_tokens, grant.provider, rpm, tpm, grant.tokens - used_tokens)
+
+
+def rate_limit_status() -> Dict[str, Any]:
+    """Bucket levels and queued calls per priority (status endpoint)"""
+    if not settings.LLM_RPM_LIMITS and not settings.LLM_TPM_LIMITS:
+        return {"buckets": {}, "queued": {}}
+    return get_rate_limiter().status()
+
+
+# Global instance
+_rate_limiter: Optional[SQLiteRateLimiter] = None
+
+
+def get_rate_limiter() -> SQLiteRateLimiter:
+    """Get or create the rate limiter instance"""
+    global _rate_limiter
+    if _rate_limiter is None:
+        _rate_limiter = SQLiteRateLimiter(settings.LLM_RATE_LIMIT_DB)
+    return _rate_limiter
+
+
+def reset_rate_limiter():
+    """Forget the limiter instance so the next call opens LLM_RATE_LIMIT_DB again (tests)"""
+    global _rate_limiter
+    _rate_limiter = None
@@ -0,0 +1,324 @@
+"""
+Offline LLM Provider (record / replay)
+Stand-in for Gemini/OpenAI so AI endpoints can be load-tested without quota.
+
+- Replay: returns recorded responses for known prompts; unknown prompts get a
+  deterministic, schema-valid synthetic response for the operation
+- Record: forwards calls to a real provider and appends the responses to the
+  recordings file
+- Latency is drawn from a configurable distribution and failures are injected
+  at a configurable rate, so concurrency behaviour matches a real provider
+- Streamed calls emit the text in chunks spread over the sampled latency
+
+Enable with LLM_PROVIDER=replay (see settings for the LLM_REPLAY_* options).
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import math
+import os
+import random
+import re
+import time
+from collections import defaultdict
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from src.config.settings import settings
+from src.services.llm_client import (
+    LLMClient,
+    LLMError,
+    LLMRequest,
+    LLMResponse,
+    get_llm_client,
+    register_llm_provider
+)
+
+logger = logging.getLogger(__name__)
+
+# Streaming: share of the latency spent before the first chunk, and chunk count
+STREAM_FIRST_CHUNK_SHARE = 0.2
+STREAM_CHUNKS = 8
+
+
+def request_key(request: LLMRequest) -> str:
+    """Stable key identifying a prompt (operation + system + prompt)"""
+    raw = json.dumps([request.operation, request.system or "", request.prompt], ensure_ascii=False)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def infer_operation(prompt: str) -> str:
+    """Guess the operation from a raw prompt (used when only the prompt is known)"""
+    if "RĂSPUNSURILE STUDENȚILOR" in prompt:
+        return "free_text_batch_evaluation"
+    if "CRITERII DE EVALUARE" in prompt:
+        return "free_text_evaluation"
+    if "TITLU MATERIAL:" in prompt:
+        return "quiz_generation"
+    if re.search(r"Generate \d+ quiz questions", prompt):
+        return "quiz_questions"
+    return "answer_question"
+
+
+def parse_latency_spec(spec: str):
+    """
+    Parse a latency distribution spec into a sampler (milliseconds)
+
+    Formats: "fixed:MS", "uniform:MIN,MAX", "lognormal:MEDIAN,SIGMA"
+    """
+    kind, _, args = spec.partition(":")
+    values = [float(v) for v in args.split(",") if v.strip()]
+
+    if kind == "fixed" and len(values) == 1:
+        return lambda rng: values[0]
+    if kind == "uniform" and len(values) == 2:
+        return lambda rng: rng.uniform(values[0], values[1])
+    if kind == "lognormal" and len(values) == 2:
+        mu = math.log(max(values[0], 1e-3))
+        return lambda rng: rng.lognormvariate(mu, values[1])
+    raise ValueError(f"Invalid LLM_REPLAY_LATENCY spec: {spec}")
+
+
+def _search(pattern: str, text: str, default: str = "") -> str:
+    match = re.search(pattern, text)
+    return match.group(1).strip() if match else default
+
+
+def _synthesize_quiz(prompt: str, rng: random.Random) -> Dict[str, Any]:
+    title = _search(r"TITLU MATERIAL:\s*(.+)", prompt, "Material")
+    subject = _search(r"SUBIECT:\s*(.+)", prompt, "General")
+    grade_level = int(_search(r"NIVEL:\s*Clasa\s*(\d+)", prompt, "10"))
+
+    options = [f"Varianta {letter}" for letter in "ABCD"]
+    single = rng.choice(options)
+    multiple = sorted(rng.sample(options, 2))
+
+    return {
+        "title": f"Test {subject} - {title}",
+        "description": "Test de antrenament bazat pe material",
+        "subject": subject,
+        "grade_level": grade_level,
+        "questions": [
+            {
+                "question_text": f"Care afirmație despre {title} este corectă?",
+                "question_type": "single_choice",
+                "options": options,
+                "correct_answers": [single],
+                "points": 1.0
+            },
+            {
+                "question_text": f"Care dintre următoarele se aplică pentru {title}?",
+                "question_type": "multiple_choice",
+                "options": options,
+                "correct_answers": multiple,
+                "points": 2.0
+            },
+            {
+                "question_text": f"Explică pe scurt ideea principală din {title}.",
+                "question_type": "free_text",
+                "options": None,
+                "correct_answers": [title.lower()],
+                "evaluation_criteria": f"Răspunsul trebuie să explice: {title}",
+                "points": 2.0
+            }
+        ]
+    }
+
+
+def _synthesize_evaluation(prompt: str, rng: random.Random) -> Dict[str, Any]:
+    max_score = float(_search(r"PUNCTAJ MAXIM:\s*(\d+)", prompt, "1"))
+    score = round(max_score * rng.choice([0.2, 0.4, 0.6, 0.8, 1.0]), 2)
+
+    return {
+        "score": score,
+        "feedback": "Răspunsul acoperă o parte din punctele cheie ale întrebării.",
+        "reasoning": "Evaluare sintetică generată offline.",
+        "score_breakdown_percentage": {
+            "correctness_percent": 50,
+            "completeness_percent": 30,
+            "clarity_percent": 20
+        },
+        "score_breakdown": {
+            "corectitudine": round(score * 0.5, 2),
+            "completitudine": round(score * 0.3, 2),
+            "claritate": round(score * 0.2, 2)
+        },
+        "strengths": ["Răspuns relevant", "Exprimare clară"],
+        "improvements": ["Mai multe detalii", "Exemple concrete"],
+        "suggestions": ["Recitește materialul", "Exersează cu întrebări similare"]
+    }
+
+
+def _synthesize_batch_evaluation(prompt: str, rng: random.Random) -> Dict[str, Any]:
+    answer_ids = re.findall(r"--- RĂSPUNS ID: (\d+) ---", prompt)
+    evaluations = []
+    for answer_id in answer_ids:
+        evaluation = _synthesize_evaluation(prompt, rng)
+        evaluation.pop("score_breakdown_percentage")
+        evaluations.append({"answer_id": answer_id, **evaluation})
+    return {"evaluations": evaluations}
+
+
+def _synthesize_questions(prompt: str, rng: random.Random) -> Dict[str, Any]:
+    count = int(_search(r"Generate (\d+) quiz questions", prompt, "5"))
+    topic = _search(r"quiz questions about (.+?) for ", prompt, "subiect")
+
+    questions = []
+    for i in range(count):
+        options = [f"Răspuns {letter} ({i + 1})" for letter in "ABCD"]
+        questions.append({
+            "question": f"Întrebarea {i + 1} despre {topic}?",
+            "type": "single_choice",
+            "options": options,
+            "correct_answers": [rng.choice(options)]
+        })
+    return {"questions": questions}
+
+
+def synthesize_response(operation: str, prompt: str, rng: random.Random) -> str:
+    """Deterministic, schema-valid response text for an operation"""
+    if operation == "quiz_generation":
+        return json.dumps(_synthesize_quiz(prompt, rng), ensure_ascii=False)
+    if operation == "free_text_evaluation":
+        return json.dumps(_synthesize_evaluation(prompt, rng), ensure_ascii=False)
+    if operation == "free_text_batch_evaluation":
+        return json.dumps(_synthesize_batch_evaluation(prompt, rng), ensure_ascii=False)
+    if operation == "quiz_questions":
+        return json.dumps(_synthesize_questions(prompt, rng), ensure_ascii=False)
+    return "Acesta este un răspuns generat offline pentru testare."
+
+
+class ReplayLLMClient(LLMClient):
+    """Offline provider replaying recorded responses (or recording real ones)"""
+
+    provider = "replay"
+
+    def __init__(
+        self,
+        recordings_file: Optional[str] = None,
+        record: Optional[bool] = None,
+        latency: Optional[str] = None,
+        failure_rate: Optional[float] = None,
+        seed: Optional[int] = None
+    ):
+        super().__init__(model="replay", api_key="offline")
+        self.recordings_file = recordings_file or settings.LLM_REPLAY_FILE
+        self.record = settings.LLM_REPLAY_RECORD if record is None else record
+        self.sample_latency = parse_latency_spec(latency or settings.LLM_REPLAY_LATENCY)
+        self.failure_rate = settings.LLM_REPLAY_FAILURE_RATE if failure_rate is None else failure_rate
+        self.seed = settings.LLM_REPLAY_SEED if seed is None else seed
+
+        self._recordings: Dict[str, List[str]] = defaultdict(list)
+        self._call_counts: Dict[str, int] = defaultdict(int)
+        self._load_recordings()
+
+    def _load_recordings(self):
+        if not os.path.exists(self.recordings_file):
+            return
+        with open(self.recordings_file, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    entry = json.loads(line)
+                    self._recordings[entry["key"]].append(entry["text"])
+        logger.info(f"🎞️  Loaded {sum(len(v) for v in self._recordings.values())} LLM recordings")
+
+    def _append_recording(self, key: str, request: LLMRequest, response: LLMResponse):
+        entry = {
+            "key": key,
+            "operation": request.operation,
+            "text": response.text,
+            "latency_ms": round(response.latency_ms, 1),
+            "prompt_tokens": response.prompt_tokens,
+            "completion_tokens": response.completion_tokens
+        }
+        with open(self.recordings_file, "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        self._recordings[key].append(response.text)
+
+    def _record_response(self, key: str, request: LLMRequest, text: str, latency_ms: float):
+        self._append_recording(key, request, LLMResponse(
+            text=text,
+            provider=settings.LLM_RECORD_PROVIDER,
+            model="",
+            latency_ms=latency_ms,
+            prompt_tokens=len(request.prompt) // 4,
+            completion_tokens=len(text) // 4
+        ))
+
+    def _replay(self, key: str, request: LLMRequest) -> Tuple[str, float, bool]:
+        """Pick the response text, sampled latency (ms) and whether the call fails"""
+        # Per-call RNG: deterministic for a given prompt and call number
+        call_number = self._call_counts[key]
+        self._call_counts[key] += 1
+        rng = random.Random(f"{self.seed}:{key}:{call_number}")
+
+        latency_ms = max(0.0, self.sample_latency(rng))
+        failed = rng.random() < self.failure_rate
+
+        recorded = self._recordings.get(key)
+        if recorded:
+            text = recorded[call_number % len(recorded)]
+        else:
+            text = synthesize_response(request.operation, request.prompt, random.Random(f"{self.seed}:{key}"))
+        return text, latency_ms, failed
+
+    def _upstream_kwargs(self, request: LLMRequest) -> Dict[str, Any]:
+        return {
+            "operation": request.operation,
+            "system": request.system,
+            "temperature": request.temperature,
+            "max_output_tokens": request.max_output_tokens,
+            "response_schema": request.response_schema
+        }
+
+    async def _generate(self, request: LLMRequest) -> LLMResponse:
+        key = request_key(request)
+
+        if self.record:
+            upstream = get_llm_client(settings.LLM_RECORD_PROVIDER)
+            response = await upstream.generate(request.prompt, **self._upstream_kwargs(request))
+            self._append_recording(key, request, response)
+            return response
+
+        text, latency_ms, failed = self._replay(key, request)
+        await asyncio.sleep(latency_ms / 1000)
+        if failed:
+            raise LLMError("Injected failure (replay provider)")
+
+        return LLMResponse(
+            text=text,
+            provider=self.provider,
+            model=self.model,
+            latency_ms=0.0,
+            prompt_tokens=len(request.prompt) // 4,
+            completion_tokens=len(text) // 4
+        )
+
+    async def _stream(self, request: LLMRequest) -> AsyncIterator[str]:
+        key = request_key(request)
+
+        if self.record:
+            upstream = get_llm_client(settings.LLM_RECORD_PROVIDER)
+            started = time.perf_counter()
+            chunks = []
+            async for chunk in upstream.stream(request.prompt, **self._upstream_kwargs(request)):
+                chunks.append(chunk)
+                yield chunk
+            self._record_response(key, request, "".join(chunks), (time.perf_counter() - started) * 1000)
+            return
+
+        text, latency_ms, failed = self._replay(key, request)
+        await asyncio.sleep(latency_ms * STREAM_FIRST_CHUNK_SHARE / 1000)
+        if failed:
+            raise LLMError("Injected failure (replay provider)")
+
+        size = max(1, math.ceil(len(text) / STREAM_CHUNKS))
+        pause = latency_ms * (1 - STREAM_FIRST_CHUNK_SHARE) / STREAM_CHUNKS / 1000
+        for start in range(0, len(text), size):
+            if start:
+                await asyncio.sleep(pause)
+            yield text[start:start + size]
+
+
+register_llm_provider("replay", ReplayLLMClient)
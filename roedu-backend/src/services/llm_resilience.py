@@ -0,0 +1,243 @@
+"""
+LLM Resilience
+Keeps AI calls from hanging when a provider degrades:
+
+- Latency SLO per operation (LLM_SLO_SECONDS) - the most a call may take
+- Adaptive timeout - recent p95 latency x LLM_TIMEOUT_P95_MULTIPLIER, clamped
+  to [LLM_MIN_TIMEOUT_SECONDS, SLO]. Timed-out calls count as samples at the
+  timeout, so the timeout grows when the provider slows down, and a breaker's
+  half-open trial call gets the whole SLO
+- Circuit breaker per provider - after LLM_BREAKER_FAILURES consecutive
+  failures calls fail fast (callers use their fallback) until a trial call
+  succeeds LLM_BREAKER_RESET_SECONDS later
+- Hedging - for LLM_HEDGE_OPERATIONS a second request is sent when the first
+  is slower than the recent p95 (at least LLM_HEDGE_MIN_DELAY_SECONDS); the
+  first response wins. No hedging until the p95 is known, so a cold start
+  does not double the quota spent
+
+State is per process and shown on GET /health/ai.
+"""
+
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, Optional, Tuple
+
+from src.config.settings import settings
+from src.utils.metrics import DEFAULT_BUCKETS, metrics
+
+# Samples needed before the p95 is trusted for timeouts and hedging
+MIN_LATENCY_SAMPLES = 20
+
+
+def parse_operation_map(spec: str) -> Dict[str, float]:
+    """Parse "operation=seconds,operation=seconds" into a dict"""
+    result = {}
+    for item in spec.split(","):
+        name, _, value = item.partition("=")
+        if name.strip() and value.strip():
+            result[name.strip()] = float(value)
+    return result
+
+
+class LatencyTracker:
+    """Rolling window of recent call latencies (seconds; timed-out calls at their timeout)"""
+
+    def __init__(self, window: int = 200):
+        self._samples: deque = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def percentile(self, p: float) -> Optional[float]:
+        """Nearest-rank percentile of the window (None if empty)"""
+        with self._lock:
+            samples = sorted(self._samples)
+        if not samples:
+            return None
+        index = min(len(samples) - 1, max(0, int(round(p / 100 * len(samples))) - 1))
+        return samples[index]
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            samples = list(self._samples)
+        histogram = {f"le_{bound:g}": sum(1 for s in samples if s <= bound) for bound in DEFAULT_BUCKETS}
+        histogram["le_inf"] = len(samples)
+        return {
+            "samples": len(samples),
+            "p50_seconds": self.percentile(50),
+            "p95_seconds": self.percentile(95),
+            "p99_seconds": self.percentile(99),
+            "max_seconds": max(samples) if samples else None,
+            "histogram": histogram
+        }
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker
+
+    closed -> open after `failure_threshold` consecutive failures;
+    open -> half_open after `reset_timeout` seconds (one trial call allowed);
+    half_open -> closed on success, back to open on failure
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name: str, failure_threshold: int, reset_timeout: float):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at: Optional[float] = None
+        self.times_opened = 0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """Whether a call may go to the provider now"""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self._set_state(self.HALF_OPEN)
+            if self.state == self.HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.consecutive_failures = 0
+            self._trial_in_flight = False
+            if self.state != self.CLOSED:
+                self._set_state(self.CLOSED)
+
+    def record_failure(self):
+        with self._lock:
+            self.consecutive_failures += 1
+            self._trial_in_flight = False
+            if self.state == self.HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    self.times_opened += 1
+                self.opened_at = time.monotonic()
+                self._set_state(self.OPEN)
+
+    def release(self):
+        """A call ended without an outcome (e.g. cancelled): free the trial slot"""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def _set_state(self, state: str):
+        self.state = state
+        metrics.set("llm_circuit_open", 1 if state == self.OPEN else 0, provider=self.name)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            retry_in = None
+            if self.state == self.OPEN:
+                retry_in = max(0.0, self.reset_timeout - (time.monotonic() - self.opened_at))
+            return {
+                "state": self.state,
+                "consecutive_failures": self.consecutive_failures,
+                "failure_threshold": self.failure_threshold,
+                "times_opened": self.times_opened,
+                "retry_in_seconds": retry_in
+            }
+
+
+# Global state
+_breakers: Dict[str, CircuitBreaker] = {}
+_trackers: Dict[Tuple[str, str], LatencyTracker] = {}
+_state_lock = threading.Lock()
+
+
+def get_circuit_breaker(provider: str) -> CircuitBreaker:
+    """Circuit breaker shared by all operations of a provider"""
+    with _state_lock:
+        if provider not in _breakers:
+            _breakers[provider] = CircuitBreaker(
+                provider,
+                settings.LLM_BREAKER_FAILURES,
+                settings.LLM_BREAKER_RESET_SECONDS
+            )
+        return _breakers[provider]
+
+
+def get_latency_tracker(provider: str, operation: str) -> LatencyTracker:
+    """Recent latencies of one operation on one provider"""
+    with _state_lock:
+        return _trackers.setdefault((provider, operation), LatencyTracker())
+
+
+def operation_slo(operation: str, default: float) -> float:
+    """Latency SLO (seconds) of an operation"""
+    return parse_operation_map(settings.LLM_SLO_SECONDS).get(operation, default)
+
+
+def adaptive_timeout(provider: str, operation: str, default: float) -> float:
+    """Timeout from recent p95 latency, clamped to [LLM_MIN_TIMEOUT_SECONDS, SLO]"""
+    slo = operation_slo(operation, default)
+    tracker = get_latency_tracker(provider, operation)
+    if len(tracker) < MIN_LATENCY_SAMPLES:
+        return slo
+    p95 = tracker.percentile(95)
+    return max(min(settings.LLM_MIN_TIMEOUT_SECONDS, slo), min(slo, p95 * settings.LLM_TIMEOUT_P95_MULTIPLIER))
+
+
+def call_timeout(provider: str, operation: str, default: float, breaker: CircuitBreaker) -> float:
+    """Timeout of a call let through by `breaker`: the whole SLO for a half-open trial, else adaptive"""
+    if breaker.state == CircuitBreaker.HALF_OPEN:
+        return operation_slo(operation, default)
+    return adaptive_timeout(provider, operation, default)
+
+
+def hedge_delay(provider: str, operation: str) -> Optional[float]:
+    """
+    Seconds to wait before hedging a call (None if the operation is not hedged,
+    or has fewer than MIN_LATENCY_SAMPLES latencies to learn its p95 from)
+    """
+    hedged = {name.strip() for name in settings.LLM_HEDGE_OPERATIONS.split(",") if name.strip()}
+    if operation not in hedged:
+        return None
+    tracker = get_latency_tracker(provider, operation)
+    if len(tracker) < MIN_LATENCY_SAMPLES:
+        return None
+    return max(settings.LLM_HEDGE_MIN_DELAY_SECONDS, tracker.percentile(95))
+
+
+def resilience_status() -> Dict[str, Any]:
+    """Breaker states and latency statistics (status endpoint)"""
+    with _state_lock:
+        breakers = dict(_breakers)
+        trackers = dict(_trackers)
+
+    operations = {}
+    for (provider, operation), tracker in sorted(trackers.items()):
+        default = settings.LLM_TIMEOUT_SECONDS
+        operations[f"{provider}/{operation}"] = {
+            **tracker.snapshot(),
+            "slo_seconds": operation_slo(operation, default),
+            "timeout_seconds": adaptive_timeout(provider, operation, default),
+            "hedge_after_seconds": hedge_delay(provider, operation)
+        }
+
+    return {
+        "circuit_breakers": {name: breaker.snapshot() for name, breaker in sorted(breakers.items())},
+        "operations": operations
+    }
+
+
+def reset_resilience_state():
+    """Forget breaker states and latency samples (tests)"""
+    with _state_lock:
+        _breakers.clear()
+        _trackers.clear()
@@ -0,0 +1,124 @@
+"""
+Quiz Access
+Cached start-of-attempt data of a quiz: who may take it and its time limit,
+so a whole class starting at once does not reload the quiz and every
+student's groups.
+
+- One entry per quiz (QUIZ_ACCESS_CACHE_SIZE quizzes, least recently used
+  evicted): the quiz's owner student / group, the group's member ids and the
+  time limit
+- Entries expire after QUIZ_ACCESS_CACHE_TTL_SECONDS (edits made by another
+  process) and are dropped on quiz and group membership edits in this one
+- Concurrent misses for a quiz are loaded once (the other requests wait for
+  that load), and a professor can prewarm a quiz before the class starts
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, FrozenSet, Optional
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from src.config.settings import settings
+from src.models.quiz import Quiz
+from src.models.student import student_groups
+from src.utils.metrics import metrics
+
+
+@dataclass(frozen=True)
+class QuizAccess:
+    quiz_id: int
+    professor_id: int
+    group_id: Optional[int]
+    created_by_student_id: Optional[int]
+    time_limit: Optional[int]  # in minutes, like Quiz.time_limit
+    member_ids: Optional[FrozenSet[int]]  # Students of the quiz's group (None without a group)
+    loaded_at: float
+
+    def allows(self, student_id: int) -> bool:
+        """Whether the student may take the quiz"""
+        if self.created_by_student_id and self.created_by_student_id != student_id:
+            return False  # AI-generated quiz of another student
+        return self.member_ids is None or student_id in self.member_ids
+
+
+# Access entries by quiz id, least recently used first
+_access: "OrderedDict[int, QuizAccess]" = OrderedDict()
+_access_lock = threading.Lock()
+_load_locks: Dict[int, threading.Lock] = {}
+
+
+def _cached(quiz_id: int) -> Optional[QuizAccess]:
+    with _access_lock:
+        access = _access.get(quiz_id)
+        if access is None or time.monotonic() - access.loaded_at > settings.QUIZ_ACCESS_CACHE_TTL_SECONDS:
+            return None
+        _access.move_to_end(quiz_id)
+        return access
+
+
+def _load(db: Session, quiz_id: int) -> Optional[QuizAccess]:
+    quiz = db.query(
+        Quiz.professor_id, Quiz.group_id, Quiz.created_by_student_id, Quiz.time_limit
+    ).filter(Quiz.id == quiz_id).first()
+    if quiz is None:
+        return None
+    member_ids = None
+    if quiz.group_id:
+        member_ids = frozenset(db.execute(
+            select(student_groups.c.student_id).where(student_groups.c.group_id == quiz.group_id)
+        ).scalars())
+    return QuizAccess(
+        quiz_id=quiz_id,
+        professor_id=quiz.professor_id,
+        group_id=quiz.group_id,
+        created_by_student_id=quiz.created_by_student_id,
+        time_limit=quiz.time_limit,
+        member_ids=member_ids,
+        loaded_at=time.monotonic()
+    )
+
+
+def get_quiz_access(db: Session, quiz_id: int) -> Optional[QuizAccess]:
+    """Access data of a quiz (None if it does not exist); loaded once per quiz on concurrent misses"""
+    access = _cached(quiz_id)
+    if access is not None:
+        metrics.inc("quiz_access_cache_total", outcome="hit")
+        return access
+
+    with _access_lock:
+        load_lock = _load_locks.setdefault(quiz_id, threading.Lock())
+    with load_lock:
+        access = _cached(quiz_id)  # Loaded by the request we waited for
+        if access is not None:
+            metrics.inc("quiz_access_cache_total", outcome="hit")
+            return access
+        access = _load(db, quiz_id)
+        metrics.inc("quiz_access_cache_total", outcome="miss")
+        with _access_lock:
+            _load_locks.pop(quiz_id, None)
+            if access is not None:
+                _access[quiz_id] = access
+                _access.move_to_end(quiz_id)
+                while len(_access) > max(1, settings.QUIZ_ACCESS_CACHE_SIZE):
+                    _access.popitem(last=False)
+    return access
+
+
+def clear_quiz_access(quiz_id: Optional[int] = None):
+    """Drop the cached access of a quiz (every quiz if quiz_id is None)"""
+    with _access_lock:
+        if quiz_id is None:
+            _access.clear()
+        else:
+            _access.pop(quiz_id, None)
+
+
+def clear_group_access(group_id: int):
+    """Drop the cached access of the quizzes of a group (call on membership edits)"""
+    with _access_lock:
+        for quiz_id in [quiz_id for quiz_id, access in _access.items() if access.group_id == group_id]:
+            del _access[quiz_id]
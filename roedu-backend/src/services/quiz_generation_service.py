@@ -5,9 +5,15 @@ Generates quizzes from material content using Google Gemini
 
 import json
 import logging
-from typing import Dict, List, Any, Optional
-import google.generativeai as genai
-import os
+from typing import AsyncIterator, Dict, List, Any, Optional, Tuple
+
+from pydantic import ValidationError
+
+from src.schemas.ai_output_schema import GeneratedQuestion, GeneratedQuiz
+from src.services.llm_client import LLMCircuitOpenError, get_service_llm_client
+from src.utils.json_repair import parse_json_object
+from src.utils.json_stream import JSONArrayItemStream
+from src.utils.metrics import metrics
 
 logger = logging.getLogger(__name__)
 
@@ -17,16 +23,12 @@ class QuizGenerationService:
     
     def __init__(self):
         """Initialize Gemini AI client"""
-        api_key = os.getenv("GEMINI_API_KEY")
-        if not api_key:
+        self.llm = get_service_llm_client("gemini")
+        self.enabled = self.llm.enabled
+        if not self.enabled:
             logger.warning("GEMINI_API_KEY not set - Quiz generation disabled")
-            self.enabled = False
-        else:
-            genai.configure(api_key=api_key)
-            self.model = genai.GenerativeModel('gemini-2.5-flash')
-            self.enabled = True
     
-    def generate_quiz_from_material(
+    async def generate_quiz_from_material(
         self,
         material_title: str,
         material_content: str,
@@ -39,6 +41,8 @@ class QuizGenerationService:
         Creates one question of each type: single_choice, multiple_choice, free_text
         
         WITH RETRY: Attempts generation twice before raising exception
+        The provider is asked for JSON matching GeneratedQuiz; malformed output is
+        repaired locally first, so only unusable responses cost a retry
         
         Args:
             material_title: Title of the material
@@ -53,13 +57,7 @@ class QuizGenerationService:
         if not self.enabled:
             raise Exception("AI service not configured. Set GEMINI_API_KEY.")
         
-        # If content is too short, use title as basis - be more lenient
-        if not material_content or len(material_content.strip()) < 20:
-            # If content is really short, use title + default context
-            if material_title:
-                material_content = f"Tema: {material_title}. Please generate questions about this topic based on typical {grade_level} grade curriculum."
-            else:
-                raise Exception("Provide at least a material title for quiz generation.")
+        material_content = self._prepare_content(material_title, material_content, grade_level)
         
         # Retry logic: attempt twice
         max_attempts = 2
@@ -76,7 +74,11 @@ class QuizGenerationService:
                     grade_level
                 )
                 
-                response = self.model.generate_content(prompt)
+                response = await self.llm.generate(
+                    prompt,
+                    operation="quiz_generation",
+                    response_schema=GeneratedQuiz.model_json_schema()
+                )
                 response_text = response.text
                 
                 # Parse JSON from response
@@ -85,6 +87,10 @@ class QuizGenerationService:
                 logger.info(f"✅ Quiz generation successful on attempt {attempt}")
                 return quiz_data
                 
+            except LLMCircuitOpenError as e:
+                # Provider is failing - a retry would fail fast as well
+                logger.error(f"❌ Quiz generation unavailable: {str(e)}")
+                raise Exception(f"AI service temporarily unavailable, try again later ({str(e)})")
             except Exception as e:
                 last_error = e
                 logger.warning(f"⚠️  Attempt {attempt}/{max_attempts} failed: {str(e)}")
@@ -96,8 +102,76 @@ class QuizGenerationService:
                 else:
                     # More attempts remaining, continue the loop
                     logger.info(f"Retrying... (attempt {attempt + 1} of {max_attempts})")
+                    metrics.inc("llm_retries_total", operation="quiz_generation")
                     continue
     
+    async def stream_quiz_from_material(
+        self,
+        material_title: str,
+        material_content: str,
+        subject: str = "General Knowledge",
+        grade_level: int = 10
+    ) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+        """
+        Generate a quiz with the provider's streaming API
+        Questions are yielded as soon as each JSON object is complete
+        
+        No retry: questions already yielded cannot be taken back
+        
+        Yields:
+            ("question", question_data) for each question, then
+            ("quiz", quiz_metadata) once the stream ended (title, description, ...)
+        """
+        if not self.enabled:
+            raise Exception("AI service not configured. Set GEMINI_API_KEY.")
+        
+        material_content = self._prepare_content(material_title, material_content, grade_level)
+        prompt = self._build_generation_prompt(material_title, material_content, subject, grade_level)
+        
+        parser = JSONArrayItemStream("questions")
+        question_count = 0
+        invalid_count = 0
+        async for chunk in self.llm.stream(
+            prompt,
+            operation="quiz_generation",
+            response_schema=GeneratedQuiz.model_json_schema()
+        ):
+            for raw_question in parser.feed(chunk):
+                try:
+                    question = GeneratedQuestion.model_validate(raw_question)
+                except ValidationError as e:
+                    invalid_count += 1
+                    logger.warning(f"⚠️  Skipping invalid streamed question: {str(e)}")
+                    continue
+                question_count += 1
+                yield "question", question.model_dump(mode="json", exclude_none=True)
+        
+        skipped = parser.skipped + invalid_count
+        metrics.inc("llm_parse_total", question_count, operation="quiz_generation_stream", outcome="ok")
+        if skipped:
+            metrics.inc("llm_parse_total", skipped, operation="quiz_generation_stream", outcome="invalid")
+            logger.warning(f"⚠️  Skipped {skipped} malformed question(s) in streamed quiz")
+        if question_count == 0:
+            raise ValueError("No questions found in AI response")
+        
+        # Quiz-level fields (the document may be cut off after the questions)
+        try:
+            document, _ = parse_json_object(parser.text)
+        except ValueError:
+            document = {}
+        metadata = {k: v for k, v in document.items() if k in ("title", "description", "subject", "grade_level") and v}
+        yield "quiz", metadata
+    
+    def _prepare_content(self, material_title: str, material_content: str, grade_level: int) -> str:
+        """Fall back to the title when the material has (almost) no content"""
+        # If content is too short, use title as basis - be more lenient
+        if not material_content or len(material_content.strip()) < 20:
+            # If content is really short, use title + default context
+            if material_title:
+                return f"Tema: {material_title}. Please generate questions about this topic based on typical {grade_level} grade curriculum."
+            raise Exception("Provide at least a material title for quiz generation.")
+        return material_content
+    
     def _build_generation_prompt(
         self,
         material_title: str,
@@ -165,48 +239,116 @@ INSTRUCȚIUNI IMPORTANTE:
         return prompt
     
     def _parse_quiz_response(self, response_text: str) -> Dict[str, Any]:
-        """Parse AI response and extract quiz data"""
+        """
+        Parse AI response and extract quiz data
         
+        Raises:
+            ValueError: if the response cannot be parsed/repaired or fails validation
+        """
         try:
-            # Extract JSON from response
-            json_start = response_text.find('{')
-            json_end = response_text.rfind('}') + 1
-            
-            if json_start == -1 or json_end <= json_start:
-                raise ValueError("No JSON found in AI response")
-            
-            json_str = response_text[json_start:json_end]
-            quiz_data = json.loads(json_str)
-            
-            # Validate structure
-            if "questions" not in quiz_data:
-                raise ValueError("Missing 'questions' in quiz data")
-            
-            if len(quiz_data["questions"]) < 3:
-                raise ValueError("Expected at least 3 questions")
-            
-            # Ensure JSON fields are properly formatted
-            for question in quiz_data["questions"]:
-                # Ensure options is list or null
-                if question.get("options") and not isinstance(question["options"], list):
-                    question["options"] = [str(question["options"])]
-                
-                # Ensure correct_answers is list
-                if not isinstance(question.get("correct_answers"), list):
-                    question["correct_answers"] = [str(question.get("correct_answers", ""))]
-                
-                # Set points if missing
-                if "points" not in question:
-                    question["points"] = 1.0
-            
-            return quiz_data
-            
-        except json.JSONDecodeError as e:
-            logger.error(f"Failed to parse quiz JSON: {str(e)}")
-            raise ValueError(f"Invalid JSON in AI response: {str(e)}")
-        except Exception as e:
+            data, repaired = parse_json_object(response_text)
+            quiz = GeneratedQuiz.model_validate(data)
+        except (ValueError, ValidationError) as e:
+            metrics.inc("llm_parse_total", operation="quiz_generation", outcome="invalid")
             logger.error(f"Failed to parse quiz response: {str(e)}")
-            raise
+            raise ValueError(f"Invalid quiz JSON in AI response: {str(e)}")
+        
+        if repaired:
+            logger.info("🔧 Repaired malformed quiz JSON locally")
+        metrics.inc("llm_parse_total", operation="quiz_generation", outcome="repaired" if repaired else "ok")
+        return quiz.model_dump(mode="json", exclude_none=True)
+
+
+def build_material_content(material) -> str:
+    """
+    Combine material text with text extracted from attached PDF files
+    
+    Args:
+        material: Material model instance
+    
+    Returns:
+        Content string to send to the quiz generator
+    """
+    from src.utils.pdf_extractor import extract_text_from_multiple_pdfs
+    from src.utils.helpers import parse_json_field
+    
+    material_content = material.content or material.description or ""
+    
+    # Extract content from attached PDF files
+    if material.file_paths:
+        try:
+            file_paths = parse_json_field(material.file_paths)
+            if file_paths:
+                pdf_content = extract_text_from_multiple_pdfs(file_paths)
+                if pdf_content:
+                    material_content += f"\n\n--- Content from attached files ---\n{pdf_content}"
+        except Exception as e:
+            logger.warning(f"Failed to extract PDF content: {str(e)}")
+            # Continue anyway, just use material content
+    
+    return material_content
+
+
+def create_quiz_from_generated_data(
+    db,
+    quiz_data: Dict[str, Any],
+    material,
+    professor_id: int,
+    created_by_student_id: Optional[int] = None
+):
+    """
+    Add a generated quiz and its questions to the session (flushes, does not commit)
+    
+    Args:
+        db: Database session
+        quiz_data: Parsed generator output
+        material: Material the quiz was generated from
+        professor_id: Owner professor of the new quiz
+        created_by_student_id: Student who requested the quiz, if any
+    
+    Returns:
+        The new Quiz instance
+    """
+    from src.models.quiz import Quiz
+    
+    new_quiz = Quiz(
+        title=quiz_data.get("title", f"Quiz - {material.title}"),
+        description=quiz_data.get("description", f"Practice quiz from material: {material.title}"),
+        subject=quiz_data.get("subject", material.subject),
+        grade_level=quiz_data.get("grade_level", material.grade_level),
+        professor_id=professor_id,
+        created_by_student_id=created_by_student_id,
+        is_ai_generated=True,
+        time_limit=30  # 30 minutes default
+    )
+    
+    db.add(new_quiz)
+    db.flush()  # Get quiz ID
+    
+    # Add questions
+    for idx, question_data in enumerate(quiz_data.get("questions", [])):
+        db.add(build_generated_question(question_data, new_quiz.id, idx))
+    
+    return new_quiz
+
+
+def build_generated_question(question_data: Dict[str, Any], quiz_id: int, order_index: int):
+    """Question model instance for one generated question (not added to a session)"""
+    from src.models.quiz import Question
+    
+    options = question_data.get("options")
+    correct_answers = question_data.get("correct_answers", [])
+    
+    return Question(
+        quiz_id=quiz_id,
+        question_text=question_data.get("question_text"),
+        question_type=question_data.get("question_type"),
+        options=json.dumps(options) if options else None,
+        correct_answers=json.dumps(correct_answers),
+        evaluation_criteria=question_data.get("evaluation_criteria"),
+        points=question_data.get("points", 1.0),
+        order_index=order_index
+    )
 
 
 # Global instance
@@ -0,0 +1,292 @@
+"""
+Regrade Service
+Re-evaluates every graded answer to a free-text question after its evaluation
+criteria changed, instead of one edit_question_score call per answer.
+
+- Answers are graded in batches of GRADING_BATCH_SIZE (batched AI calls, with
+  the evaluation cache and clustering), at bulk priority so exam grading and
+  interactive calls go first
+- Reports get the new evaluation; professor overrides (new_score) and student
+  disputes are kept
+- Attempt totals and their materialized question scores are adjusted with
+  set-based UPDATEs per batch, in the same transaction as its reports, so a
+  cancelled job leaves consistent scores. The change to a total is measured
+  against the answer's stored question score (which already counts e.g. the
+  keyword score of a submitted attempt), not against its old report
+- One job per question at a time: a new one is refused while another is
+  pending or running
+- Progress is stored on the job after every batch; cancellation is checked
+  before each batch
+"""
+
+import asyncio
+import json
+import logging
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import bindparam, func, insert, update
+from sqlalchemy.orm import Session
+
+from src.config import database
+from src.config.settings import settings
+from src.models.ai_evaluation_report import AIEvaluationReport
+from src.models.attempt_question_score import AttemptQuestionScore, ScoreSource
+from src.models.quiz import GradingStatus, Question, QuizAttempt
+from src.models.regrade_job import RegradeJob, RegradeJobStatus
+from src.services.evaluation_cache_service import grade_with_cache
+from src.services.grading_service import (
+    FreeTextAnswer,
+    FreeTextGrade,
+    evaluation_report_row,
+    free_text_answer_for
+)
+from src.services.llm_rate_limiter import LLMPriority, llm_priority
+from src.services.scoring import get_answer_key
+
+logger = logging.getLogger(__name__)
+
+# Report columns rewritten by a regrade (professor review and dispute fields are kept)
+EVALUATION_COLUMNS = (
+    "ai_score", "ai_feedback", "ai_reasoning", "ai_model_version", "ai_score_breakdown",
+    "ai_strengths", "ai_improvements", "ai_suggestions", "cache_hit", "cluster_id", "cluster_similarity"
+)
+
+# Jobs currently executing in this process (job_id -> question_id)
+_running_jobs: Dict[int, int] = {}
+
+RegradeTarget = Tuple[int, int, FreeTextAnswer]  # (attempt_id, student_id, answer)
+
+
+def regrade_targets(db: Session, question: Question) -> List[RegradeTarget]:
+    """Answers to the question in finished attempts (pending attempts are left to the grading worker)"""
+    attempts = db.query(QuizAttempt.id, QuizAttempt.student_id, QuizAttempt.answers).filter(
+        QuizAttempt.quiz_id == question.quiz_id,
+        QuizAttempt.completed_at != None,
+        func.coalesce(QuizAttempt.grading_status, GradingStatus.GRADED.value) != GradingStatus.PENDING.value
+    ).order_by(QuizAttempt.id).all()
+
+    targets = []
+    for attempt_id, student_id, answers in attempts:
+        answer = free_text_answer_for(question, json.loads(answers or "{}").get(str(question.id), []))
+        if answer:
+            targets.append((attempt_id, student_id, answer))
+    return targets
+
+
+def create_regrade_job(db: Session, question: Question, created_by: Optional[int] = None) -> RegradeJob:
+    """Create a pending job covering every answer to the question"""
+    job = RegradeJob(
+        question_id=question.id,
+        created_by=created_by,
+        status=RegradeJobStatus.PENDING,
+        total=len(regrade_targets(db, question))
+    )
+    db.add(job)
+    db.commit()
+    db.refresh(job)
+
+    logger.info(f"🔁 Created regrade job {job.id} for question {question.id} ({job.total} answers)")
+    return job
+
+
+def is_regrade_running(db: Session, question_id: int) -> bool:
+    """Whether a regrade of the question is pending or running (in any process)"""
+    return db.query(RegradeJob.id).filter(
+        RegradeJob.question_id == question_id,
+        RegradeJob.status.in_([RegradeJobStatus.PENDING, RegradeJobStatus.RUNNING])
+    ).first() is not None
+
+
+def summarize_regrade_job(job: RegradeJob) -> Dict[str, Any]:
+    """API view of a job and its progress"""
+    return {
+        "id": job.id,
+        "question_id": job.question_id,
+        "status": job.status.value,
+        "cancel_requested": bool(job.cancel_requested),
+        "total": job.total or 0,
+        "processed": job.processed or 0,
+        "updated": job.updated or 0,
+        "overridden": job.overridden or 0,
+        "failed": job.failed or 0,
+        "progress": round((job.processed or 0) / job.total, 3) if job.total else 1.0,
+        "error": job.error,
+        "created_at": job.created_at,
+        "started_at": job.started_at,
+        "finished_at": job.finished_at
+    }
+
+
+def cancel_regrade_job(db: Session, job: RegradeJob) -> RegradeJob:
+    """Ask a job to stop before its next batch (a job not running here is cancelled at once)"""
+    if job.status in (RegradeJobStatus.PENDING, RegradeJobStatus.RUNNING):
+        job.cancel_requested = True
+        if job.id not in _running_jobs:
+            job.status = RegradeJobStatus.CANCELLED
+            job.finished_at = datetime.utcnow()
+        db.commit()
+        db.refresh(job)
+    return job
+
+
+def _start_job(job_id: int) -> Tuple[Optional[int], List[RegradeTarget]]:
+    """Mark a pending job running; returns its question id (None if not pending) and the answers"""
+    db = database.SessionLocal()
+    try:
+        job = db.query(RegradeJob).filter(RegradeJob.id == job_id).first()
+        if not job or job.status != RegradeJobStatus.PENDING or job.cancel_requested:
+            return None, []
+
+        targets = regrade_targets(db, job.question)
+        job.status = RegradeJobStatus.RUNNING
+        job.started_at = datetime.utcnow()
+        job.total = len(targets)
+        question_id = job.question_id
+        db.commit()
+        return question_id, targets
+    finally:
+        db.close()
+
+
+def _cancel_requested(job_id: int) -> bool:
+    db = database.SessionLocal()
+    try:
+        return bool(db.query(RegradeJob.cancel_requested).filter(RegradeJob.id == job_id).scalar())
+    finally:
+        db.close()
+
+
+def _keyword_score(db: Session, question_id: int, answer: FreeTextAnswer) -> float:
+    """Keyword score of an answer, as submit counted it in attempts without stored question scores"""
+    quiz_id = db.query(Question.quiz_id).filter(Question.id == question_id).scalar()
+    key = get_answer_key(db, quiz_id)
+    question = next(question for question in key.questions if question.id == question_id)
+    return question.keyword_fraction(answer.student_answer) * question.points
+
+
+def _store_batch(job_id: int, question_id: int, batch: List[RegradeTarget], grades: List[FreeTextGrade]):
+    """Rewrite the reports of a batch, adjust the attempt totals and record progress (one transaction)"""
+    db = database.SessionLocal()
+    try:
+        attempt_ids = [attempt_id for attempt_id, _, _ in batch]
+        reports = {
+            report.quiz_attempt_id: report
+            for report in db.query(AIEvaluationReport).filter(
+                AIEvaluationReport.question_id == question_id,
+                AIEvaluationReport.quiz_attempt_id.in_(attempt_ids)
+            )
+        }
+        stored_scores = dict(db.query(AttemptQuestionScore.attempt_id, AttemptQuestionScore.score).filter(
+            AttemptQuestionScore.question_id == question_id,
+            AttemptQuestionScore.attempt_id.in_(attempt_ids)
+        ))
+
+        new_rows = []
+        deltas = []
+        updated = overridden = failed = 0
+        for (attempt_id, student_id, answer), grade in zip(batch, grades):
+            if grade.error is not None:
+                failed += 1
+                continue
+            row = evaluation_report_row(attempt_id, student_id, grade)
+            report = reports.get(attempt_id)
+            if report is not None and report.new_score is not None:
+                overridden += 1  # The professor's score still counts
+            else:
+                counted = stored_scores.get(attempt_id)
+                if counted is None and report is not None:
+                    counted = report.ai_score or 0.0
+                elif counted is None:
+                    counted = _keyword_score(db, question_id, answer)
+                deltas.append({"attempt_id": attempt_id, "delta": grade.score - counted, "score": grade.score})
+            if report is None:
+                new_rows.append(row)
+            else:
+                for column in EVALUATION_COLUMNS:
+                    setattr(report, column, row[column])
+            updated += 1
+
+        if new_rows:
+            db.execute(insert(AIEvaluationReport), new_rows)
+        if deltas:
+            attempts = QuizAttempt.__table__
+            db.execute(
+                update(attempts)
+                .where(attempts.c.id == bindparam("attempt_id"))
+                .values(score=func.coalesce(attempts.c.score, 0.0) + bindparam("delta")),
+                deltas
+            )
+            question_scores = AttemptQuestionScore.__table__
+            db.execute(
+                update(question_scores)
+                .where(
+                    question_scores.c.attempt_id == bindparam("scored_attempt_id"),
+                    question_scores.c.question_id == question_id
+                )
+                .values(score=bindparam("new_score"), source=ScoreSource.AI.value, updated_at=datetime.utcnow()),
+                [{"scored_attempt_id": delta["attempt_id"], "new_score": delta["score"]} for delta in deltas]
+            )
+
+        job = db.query(RegradeJob).filter(RegradeJob.id == job_id).first()
+        job.processed = (job.processed or 0) + len(batch)
+        job.updated = (job.updated or 0) + updated
+        job.overridden = (job.overridden or 0) + overridden
+        job.failed = (job.failed or 0) + failed
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+def _finish_job(job_id: int, status: RegradeJobStatus, error: Optional[str] = None) -> Dict[str, Any]:
+    db = database.SessionLocal()
+    try:
+        job = db.query(RegradeJob).filter(RegradeJob.id == job_id).first()
+        job.status = status
+        job.error = error
+        job.finished_at = datetime.utcnow()
+        db.commit()
+        db.refresh(job)
+        return summarize_regrade_job(job)
+    finally:
+        db.close()
+
+
+async def run_regrade_job(job_id: int, batch_size: Optional[int] = None) -> Optional[Dict[str, Any]]:
+    """
+    Run a pending regrade job to completion or cancellation
+
+    Returns:
+        Job summary (see summarize_regrade_job), None if the job was not pending
+    """
+    if job_id in _running_jobs:
+        raise Exception(f"Regrade job {job_id} is already running")
+
+    question_id, targets = await asyncio.to_thread(_start_job, job_id)
+    if question_id is None:
+        return None
+
+    batch_size = max(1, batch_size or settings.GRADING_BATCH_SIZE)
+    _running_jobs[job_id] = question_id
+    status = RegradeJobStatus.COMPLETED
+    try:
+        logger.info(f"🔁 Regrade job {job_id}: {len(targets)} answers to question {question_id}")
+        for start in range(0, len(targets), batch_size):
+            if await asyncio.to_thread(_cancel_requested, job_id):
+                status = RegradeJobStatus.CANCELLED
+                break
+            batch = targets[start:start + batch_size]
+            with llm_priority(LLMPriority.BULK):
+                grades = await grade_with_cache([answer for _, _, answer in batch])
+            await asyncio.to_thread(_store_batch, job_id, question_id, batch, grades)
+    except Exception as e:
+        logger.error(f"❌ Regrade job {job_id} failed: {str(e)}")
+        return await asyncio.to_thread(_finish_job, job_id, RegradeJobStatus.FAILED, str(e))
+    finally:
+        _running_jobs.pop(job_id, None)
+
+    logger.info(f"✅ Regrade job {job_id} finished with status {status.value}")
+    return await asyncio.to_thread(_finish_job, job_id, status)
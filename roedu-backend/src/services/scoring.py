@@ -0,0 +1,387 @@
+"""
+Scoring Engine
+Every scoring path (submit, auto-submit, result page, score recalculation and
+the grading worker) scores attempts against a compiled answer key instead of
+loading the quiz's questions and parsing their JSON on every call.
+
+- AnswerKey: immutable, __slots__-based view of a quiz - frozensets of correct
+  options, pre-lowered reference answers and keywords, points
+- Keys are cached in memory (ANSWER_KEY_CACHE_SIZE quizzes) and checked against
+  Quiz.version, which quiz and question edits bump; a stale key is recompiled
+  on its next use (also in other processes, since the version is in the database)
+- Professor overrides (new_score) win over any computed score; free-text answers
+  without an evaluation are deferred to the grading worker, scored by keyword
+  matching or counted as 0, depending on the caller
+- Scores are materialized per question (attempt_question_scores, with their
+  source) whenever an attempt is scored, graded or overridden, and rewritten
+  for every finished attempt when a question edit changes how answers score
+"""
+
+import enum
+import json
+import threading
+from collections import OrderedDict, defaultdict
+from dataclasses import dataclass, field
+from types import MappingProxyType
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Tuple
+
+from sqlalchemy import func, insert, select, update
+from sqlalchemy.orm import Session
+
+from src.config.settings import settings
+from src.models.attempt_question_score import AttemptQuestionScore, ScoreSource
+from src.models.ai_evaluation_report import AIEvaluationReport
+from src.models.quiz import GradingStatus, Question, QuestionType, Quiz, QuizAttempt
+from src.services.grading_service import DEFAULT_EVALUATION_CRITERIA, FreeTextAnswer
+from src.utils.metrics import metrics
+
+
+# Choice answers as bitmasks over the question's options (see option_bits);
+# the top bit marks an answer that is not one of the options
+OTHER_ANSWER_BIT = 1 << 63
+MAX_MASK_OPTIONS = 63
+
+
+class FreeTextScoring(str, enum.Enum):
+    """How a free-text answer without an AI evaluation is scored"""
+    DEFER = "defer"  # 0 for now; returned in free_text_answers for the grading worker
+    KEYWORDS = "keywords"  # Exact match / keyword fallback
+    EVALUATED_ONLY = "evaluated_only"  # 0
+
+
+def unevaluated_free_text(grading_status: Optional[str]) -> FreeTextScoring:
+    """
+    How to rescore the free-text answers of a finished attempt that have no
+    report: 0 while the grading worker still has them, otherwise the keyword
+    fallback they were scored with at submit
+    """
+    if grading_status == GradingStatus.PENDING.value:
+        return FreeTextScoring.EVALUATED_ONLY
+    return FreeTextScoring.KEYWORDS
+
+
+def _as_list(student_answers) -> List[str]:
+    if student_answers is None:
+        return []
+    if isinstance(student_answers, str):
+        return [student_answers]
+    return list(student_answers)
+
+
+class _Frozen:
+    """Attributes are set once in __init__"""
+    __slots__ = ()
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def _set(self, **values):
+        for name, value in values.items():
+            object.__setattr__(self, name, value)
+
+
+class CompiledQuestion(_Frozen):
+    """Answer key of one question"""
+    __slots__ = (
+        "id", "question_type", "points", "question_text", "criteria",
+        "correct_answers", "correct", "correct_lower", "keywords", "option_bits", "correct_mask"
+    )
+
+    def __init__(self, question: Question):
+        question_type = QuestionType(question.question_type)
+        correct_answers = tuple(json.loads(question.correct_answers or "[]"))
+        option_bits = None
+        if question_type != QuestionType.FREE_TEXT:
+            option_bits = self._option_bits(json.loads(question.options or "[]"), correct_answers)
+        self._set(
+            id=question.id,
+            question_type=question_type,
+            points=float(question.points or 0.0),
+            question_text=question.question_text,
+            criteria=question.evaluation_criteria or "",
+            correct_answers=correct_answers,
+            correct=frozenset(correct_answers),
+            correct_lower=frozenset(answer.lower() for answer in correct_answers),
+            keywords=self._keywords(question.evaluation_criteria),
+            option_bits=option_bits,
+            correct_mask=self._mask(option_bits, correct_answers) if option_bits is not None else None
+        )
+
+    @staticmethod
+    def _keywords(evaluation_criteria: Optional[str]) -> Tuple[str, ...]:
+        """Keywords of a JSON-list criteria, lowered (other criteria have none)"""
+        try:
+            criteria = json.loads(evaluation_criteria or "")
+        except (json.JSONDecodeError, TypeError):
+            return ()
+        if not isinstance(criteria, list):
+            return ()
+        return tuple(str(keyword).lower() for keyword in criteria)
+
+    @staticmethod
+    def _option_bits(options, correct_answers) -> Optional[Mapping[str, int]]:
+        """Bit of every option of a choice question (None if there are too many for a 64-bit mask)"""
+        bits = {}
+        for option in list(options) + list(correct_answers):
+            if option not in bits:
+                bits[option] = 1 << len(bits)
+        return MappingProxyType(bits) if len(bits) <= MAX_MASK_OPTIONS else None
+
+    @staticmethod
+    def _mask(option_bits: Mapping[str, int], chosen: Iterable[str]) -> int:
+        mask = 0
+        for answer in chosen:
+            mask |= option_bits.get(answer, OTHER_ANSWER_BIT)
+        return mask
+
+    def answers_in(self, answers: Mapping[str, Any]) -> List[str]:
+        """This question's answers in an attempt's answers (keyed by question id string)"""
+        return _as_list(answers.get(str(self.id)))
+
+    def answer_mask(self, student_answers: List[str]) -> int:
+        """Choice answer as a bitmask (questions with a correct_mask only)"""
+        return self._mask(self.option_bits, student_answers)
+
+    @property
+    def is_free_text(self) -> bool:
+        return self.question_type == QuestionType.FREE_TEXT
+
+    def score_choice(self, student_answers: List[str]) -> float:
+        """Points for a single/multiple choice answer (all or nothing)"""
+        if self.question_type == QuestionType.SINGLE_CHOICE:
+            chosen = set(student_answers)
+            return self.points if len(chosen) == 1 and chosen <= self.correct else 0.0
+        return self.points if frozenset(student_answers) == self.correct else 0.0
+
+    def keyword_fraction(self, student_text: str) -> float:
+        """Fallback free-text score: 1 for a reference answer, 0.5 if a keyword is present"""
+        text = (student_text or "").lower().strip()
+        if not text:
+            return 0.0
+        if text in self.correct_lower:
+            return 1.0
+        if any(keyword in text for keyword in self.keywords):
+            return 0.5
+        return 0.0
+
+    def free_text_answer(self, student_answers: List[str], subject: Optional[str]) -> Optional[FreeTextAnswer]:
+        """Grading input for the AI (None if unanswered or blank)"""
+        text = str(student_answers[0] or "").strip() if student_answers else ""
+        if not text:
+            return None
+        return FreeTextAnswer(
+            question_id=self.id,
+            question_text=self.question_text,
+            student_answer=text,
+            criteria=self.criteria or DEFAULT_EVALUATION_CRITERIA,
+            max_score=self.points,
+            correct_answers=list(self.correct_answers),
+            subject=subject
+        )
+
+
+class AnswerKey(_Frozen):
+    """Compiled answer key of a quiz at one version"""
+    __slots__ = ("quiz_id", "version", "subject", "questions", "max_score")
+
+    def __init__(self, quiz_id: int, version: int, subject: Optional[str], questions: Iterable[Question]):
+        compiled = tuple(CompiledQuestion(question) for question in questions)
+        self._set(
+            quiz_id=quiz_id,
+            version=version,
+            subject=subject,
+            questions=compiled,
+            max_score=sum(question.points for question in compiled)
+        )
+
+
+@dataclass
+class AttemptScore:
+    """Score of an attempt against an answer key"""
+    score: float = 0.0
+    max_score: float = 0.0
+    question_scores: Dict[int, float] = field(default_factory=dict)
+    sources: Dict[int, ScoreSource] = field(default_factory=dict)
+    free_text_answers: List[FreeTextAnswer] = field(default_factory=list)  # To grade (DEFER only)
+    pending_questions: List[int] = field(default_factory=list)
+
+
+def score_answers(
+    key: AnswerKey,
+    answers: Mapping[str, Any],
+    reports: Optional[Mapping[int, Any]] = None,
+    free_text: FreeTextScoring = FreeTextScoring.DEFER
+) -> AttemptScore:
+    """
+    Score submitted answers
+
+    Args:
+        key: Compiled answer key of the quiz
+        answers: Submitted answers keyed by question id (string)
+        reports: Evaluation reports of the attempt by question id (anything with
+            ai_score and new_score); professor overrides apply to every question
+        free_text: How free-text answers without a report are scored
+    """
+    reports = reports or {}
+    result = AttemptScore(max_score=key.max_score)
+    for question in key.questions:
+        student_answers = question.answers_in(answers)
+        report = reports.get(question.id)
+
+        source = ScoreSource.AUTO
+        if report is not None and report.new_score is not None:
+            score, source = report.new_score, ScoreSource.PROFESSOR
+        elif not question.is_free_text:
+            score = question.score_choice(student_answers)
+        elif report is not None:
+            score, source = report.ai_score, ScoreSource.AI
+        elif free_text == FreeTextScoring.KEYWORDS:
+            score = question.keyword_fraction(student_answers[0] if student_answers else "") * question.points
+        else:
+            score = 0.0
+            answer = question.free_text_answer(student_answers, key.subject)
+            if answer:
+                source = ScoreSource.PENDING
+                if free_text == FreeTextScoring.DEFER:
+                    result.free_text_answers.append(answer)
+                    result.pending_questions.append(question.id)
+
+        result.question_scores[question.id] = score
+        result.sources[question.id] = source
+        result.score += score
+    return result
+
+
+def reports_by_question(reports: Iterable[Any]) -> Dict[int, Any]:
+    """Index an attempt's evaluation reports for score_answers"""
+    return {report.question_id: report for report in reports}
+
+
+def _question_score_rows(attempt_id: int, result: AttemptScore) -> List[Dict[str, Any]]:
+    return [
+        {
+            "attempt_id": attempt_id,
+            "question_id": question_id,
+            "score": score,
+            "source": result.sources[question_id].value
+        }
+        for question_id, score in result.question_scores.items()
+    ]
+
+
+def save_question_scores(db: Session, attempt_id: int, result: AttemptScore):
+    """Materialize an attempt's per-question scores, replacing earlier ones (does not commit)"""
+    db.query(AttemptQuestionScore).filter(
+        AttemptQuestionScore.attempt_id == attempt_id
+    ).delete(synchronize_session=False)
+    if result.question_scores:
+        db.execute(insert(AttemptQuestionScore), _question_score_rows(attempt_id, result))
+
+
+def rescore_finished_attempts(db: Session, quiz_id: int) -> int:
+    """
+    Rescore every finished attempt of a quiz against its current questions and
+    rewrite their stored per-question scores and totals (call after an edit that
+    changes how answers score; does not commit)
+
+    AI scores and professor overrides are kept as they are; choice answers and
+    keyword-scored free-text answers follow the new answer key.
+
+    Returns:
+        Number of attempts rescored
+    """
+    db.flush()
+    quiz = db.query(Quiz.version, Quiz.subject).filter(Quiz.id == quiz_id).first()
+    if quiz is None:
+        return 0
+    # Compiled directly, not cached: the edit is not committed yet
+    questions = db.query(Question).filter(Question.quiz_id == quiz_id).order_by(Question.id).all()
+    key = AnswerKey(quiz_id, quiz.version or 0, quiz.subject, questions)
+
+    finished = select(QuizAttempt.id).where(QuizAttempt.quiz_id == quiz_id, QuizAttempt.completed_at.isnot(None))
+    attempts = db.query(QuizAttempt.id, QuizAttempt.answers, QuizAttempt.grading_status).filter(
+        QuizAttempt.id.in_(finished)
+    ).all()
+    if not attempts:
+        return 0
+
+    reports: Dict[int, Dict[int, Any]] = defaultdict(dict)
+    for report in db.query(
+        AIEvaluationReport.quiz_attempt_id, AIEvaluationReport.question_id,
+        AIEvaluationReport.ai_score, AIEvaluationReport.new_score
+    ).filter(AIEvaluationReport.quiz_attempt_id.in_(finished)):
+        reports[report.quiz_attempt_id][report.question_id] = report
+
+    totals, rows = [], []
+    for attempt in attempts:
+        result = score_answers(
+            key,
+            json.loads(attempt.answers or "{}"),
+            reports.get(attempt.id),
+            unevaluated_free_text(attempt.grading_status)
+        )
+        totals.append({"id": attempt.id, "score": result.score, "max_score": result.max_score})
+        rows.extend(_question_score_rows(attempt.id, result))
+
+    db.query(AttemptQuestionScore).filter(
+        AttemptQuestionScore.attempt_id.in_(finished)
+    ).delete(synchronize_session=False)
+    if rows:
+        db.execute(insert(AttemptQuestionScore), rows)
+    db.execute(update(QuizAttempt), totals)
+    return len(attempts)
+
+
+# Compiled keys by quiz id, least recently used first
+_answer_keys: "OrderedDict[int, AnswerKey]" = OrderedDict()
+_answer_keys_lock = threading.Lock()
+
+
+def get_answer_key(db: Session, quiz_id: int, quiz: Optional[Quiz] = None) -> Optional[AnswerKey]:
+    """
+    Compiled answer key of a quiz (None if the quiz does not exist)
+
+    Costs one single-row query when the cached key is current, none if the
+    caller passes the already loaded quiz.
+    """
+    row = quiz if quiz is not None else db.query(Quiz.version, Quiz.subject).filter(Quiz.id == quiz_id).first()
+    if row is None:
+        return None
+    version = row.version or 0
+
+    with _answer_keys_lock:
+        key = _answer_keys.get(quiz_id)
+        if key is not None and key.version == version:
+            _answer_keys.move_to_end(quiz_id)
+            metrics.inc("answer_key_cache_total", outcome="hit")
+            return key
+
+    questions = db.query(Question).filter(Question.quiz_id == quiz_id).order_by(Question.id).all()
+    key = AnswerKey(quiz_id, version, row.subject, questions)
+    metrics.inc("answer_key_cache_total", outcome="miss")
+
+    with _answer_keys_lock:
+        _answer_keys[quiz_id] = key
+        _answer_keys.move_to_end(quiz_id)
+        while len(_answer_keys) > max(1, settings.ANSWER_KEY_CACHE_SIZE):
+            _answer_keys.popitem(last=False)
+    return key
+
+
+def bump_quiz_version(db: Session, quiz_id: int):
+    """Invalidate the quiz's compiled answer key (call on quiz/question edits; does not commit)"""
+    db.execute(
+        update(Quiz)
+        .where(Quiz.id == quiz_id)
+        .values(version=func.coalesce(Quiz.version, 0) + 1)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def clear_answer_keys(quiz_id: Optional[int] = None):
+    """Drop the cached key of a quiz (every key if quiz_id is None)"""
+    with _answer_keys_lock:
+        if quiz_id is None:
+            _answer_keys.clear()
+        else:
+            _answer_keys.pop(quiz_id, None)
@@ -1,4 +1,6 @@
 import json
+import re
+import unicodedata
 from typing import Any, Optional, List
 from datetime import datetime
 from sqlalchemy.orm import Query
@@ -83,4 +85,10 @@ def validate_email_domain(email: str, allowed_domains: Optional[List[str]] = Non
         return True
     
     domain = email.split("@")[-1]
-    return domain in allowed_domains
\ No newline at end of file
+    return domain in allowed_domains
+
+def normalize_text(text: Optional[str]) -> str:
+    """Fold case, whitespace and diacritics ("  Fotosinteză " -> "fotosinteza")"""
+    decomposed = unicodedata.normalize("NFKD", text or "")
+    without_marks = "".join(char for char in decomposed if not unicodedata.combining(char))
+    return re.sub(r"\s+", " ", without_marks.casefold()).strip()
@@ -0,0 +1,141 @@
+"""
+Local repair of malformed JSON from LLM responses
+Fixes the usual defects - prose or ```json fences around the object, trailing
+commas, output truncated mid-string/array/object - so a response can still be
+used without paying for a retry.
+"""
+
+import json
+from typing import Any, Dict, List, Tuple
+
+_CLOSERS = {"{": "}", "[": "]"}
+
+# How many cut-back points to try on truncated output before giving up
+_MAX_CUTBACKS = 20
+
+
+def extract_json_object(text: str) -> str:
+    """
+    Slice the first JSON object out of a response
+    Returns the text from the first "{" to its matching "}" (or to the end
+    of the text if the object is never closed)
+    """
+    start = text.find("{")
+    if start == -1:
+        raise ValueError("No JSON found in AI response")
+
+    depth = 0
+    in_string = False
+    escape = False
+    for index in range(start, len(text)):
+        char = text[index]
+        if in_string:
+            if escape:
+                escape = False
+            elif char == "\\":
+                escape = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char in "{[":
+            depth += 1
+        elif char in "}]":
+            depth -= 1
+            if depth == 0:
+                return text[start:index + 1]
+    return text[start:]
+
+
+def _close(text: str, stack: List[str]) -> str:
+    """Terminate a truncated document: drop a dangling comma/colon and close brackets"""
+    text = text.rstrip()
+    if text.endswith(","):
+        text = text[:-1]
+    elif text.endswith(":"):
+        text += " null"
+    return text + "".join(reversed(stack))
+
+
+def repair_json(text: str) -> Any:
+    """
+    Parse a JSON object, repairing trailing commas and truncation
+
+    Raises:
+        ValueError: if the text cannot be turned into valid JSON
+    """
+    output: List[str] = []
+    stack: List[str] = []
+    # (output length, open brackets) after each comma / opening bracket
+    cutbacks: List[Tuple[int, List[str]]] = []
+    in_string = False
+    escape = False
+
+    for char in extract_json_object(text):
+        if in_string:
+            output.append(char)
+            if escape:
+                escape = False
+            elif char == "\\":
+                escape = True
+            elif char == '"':
+                in_string = False
+            continue
+
+        if char == '"':
+            in_string = True
+        elif char in "{[":
+            stack.append(_CLOSERS[char])
+            cutbacks.append((len(output) + 1, list(stack)))
+        elif char in "}]":
+            # Drop a trailing comma before the closing bracket
+            while output and output[-1].isspace():
+                output.pop()
+            if output and output[-1] == ",":
+                output.pop()
+            if stack:
+                stack.pop()
+        elif char == ",":
+            cutbacks.append((len(output), list(stack)))
+        output.append(char)
+
+    repaired = "".join(output)
+    if in_string:
+        if escape:
+            repaired = repaired[:-1]
+        repaired += '"'
+
+    try:
+        return json.loads(_close(repaired, stack))
+    except json.JSONDecodeError as e:
+        error = e
+
+    # Truncated inside a value or key: cut back to the last complete element
+    # (or to an empty container)
+    for length, open_brackets in reversed(cutbacks[-_MAX_CUTBACKS:]):
+        try:
+            return json.loads(_close("".join(output[:length]), open_brackets))
+        except json.JSONDecodeError:
+            continue
+    raise ValueError(f"Invalid JSON in AI response: {str(error)}")
+
+
+def parse_json_object(text: str) -> Tuple[Dict[str, Any], bool]:
+    """
+    Parse the JSON object in an AI response, repairing it locally if needed
+
+    Returns:
+        Tuple of (parsed object, whether a repair was needed)
+
+    Raises:
+        ValueError: if no JSON object can be recovered
+    """
+    raw = extract_json_object(text)
+    try:
+        data, repaired = json.loads(raw), False
+    except json.JSONDecodeError:
+        data, repaired = repair_json(raw), True
+
+    if not isinstance(data, dict):
+        raise ValueError("AI response JSON is not an object")
+    return data, repaired
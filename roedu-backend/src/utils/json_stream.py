@@ -0,0 +1,116 @@
+"""
+Incremental JSON parsing for streamed LLM output
+Emits each object of a top-level array (e.g. "questions") as soon as its
+closing brace arrives, without waiting for the rest of the document.
+"""
+
+import json
+from typing import Any, Dict, List, Optional
+
+
+class JSONArrayItemStream:
+    """
+    Feed text chunks, get back the completed objects of one top-level array
+
+    Example:
+        parser = JSONArrayItemStream("questions")
+        for chunk in chunks:
+            for question in parser.feed(chunk):
+                ...
+        metadata = parser.document()  # whole document once the stream ended
+
+    Text before the first "{" (e.g. a ```json fence) is ignored. Objects that
+    fail to parse are skipped and counted in `skipped`.
+    """
+
+    def __init__(self, array_key: str):
+        self.array_key = array_key
+        self.skipped = 0
+        self._text: List[str] = []
+        self._length = 0
+        self._buffer = ""  # text of the object currently being captured
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._string_start = 0
+        self._last_key: Optional[str] = None
+        self._array_depth: Optional[int] = None  # depth inside the target array
+        self._capturing = False
+
+    @property
+    def text(self) -> str:
+        """All text fed so far"""
+        return "".join(self._text)
+
+    def feed(self, chunk: str) -> List[Dict[str, Any]]:
+        """Consume a chunk and return the array items completed by it"""
+        completed: List[Dict[str, Any]] = []
+        offset = self._length
+        self._text.append(chunk)
+        self._length += len(chunk)
+
+        for index, char in enumerate(chunk):
+            if self._capturing:
+                self._buffer += char
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+                    if self._depth == 1 and not self._capturing:
+                        # Possible key of a top-level field
+                        self._last_key = self.text[self._string_start + 1:offset + index]
+                continue
+
+            if char == '"':
+                self._in_string = True
+                self._string_start = offset + index
+            elif char in "{[":
+                if (
+                    char == "[" and self._depth == 1 and self._array_depth is None
+                    and self._last_key == self.array_key
+                ):
+                    self._array_depth = 2
+                elif char == "{" and self._depth == self._array_depth and not self._capturing:
+                    self._capturing = True
+                    self._buffer = char
+                self._depth += 1
+            elif char in "}]":
+                self._depth -= 1
+                if self._capturing and char == "}" and self._depth == self._array_depth:
+                    self._capturing = False
+                    item = self._load(self._buffer)
+                    if item is not None:
+                        completed.append(item)
+                elif char == "]" and self._array_depth is not None and self._depth == 1:
+                    self._array_depth = -1  # array closed, ignore later arrays
+            elif char == "," and self._depth == 1:
+                self._last_key = None
+
+        return completed
+
+    def _load(self, raw: str) -> Optional[Dict[str, Any]]:
+        try:
+            item = json.loads(raw)
+        except json.JSONDecodeError:
+            self.skipped += 1
+            return None
+        if not isinstance(item, dict):
+            self.skipped += 1
+            return None
+        return item
+
+    def document(self) -> Optional[Dict[str, Any]]:
+        """Parse the whole text fed so far (None if it is not a JSON object)"""
+        text = self.text
+        start, end = text.find("{"), text.rfind("}") + 1
+        if start == -1 or end <= start:
+            return None
+        try:
+            data = json.loads(text[start:end])
+        except json.JSONDecodeError:
+            return None
+        return data if isinstance(data, dict) else None
@@ -0,0 +1,142 @@
+"""
+In-process metrics
+Counters and histograms kept in memory and exported in the Prometheus text
+format on GET /metrics. Values are per process and reset on restart.
+"""
+
+import threading
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+DEFAULT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _label_key(labels: Dict[str, str]) -> LabelKey:
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+
+def _format_labels(key: LabelKey, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(key) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    escaped = (value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, value in pairs)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+
+class MetricsRegistry:
+    """Thread-safe registry of labelled counters and histograms"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._help: Dict[str, Tuple[str, str]] = {}  # name -> (type, help)
+        self._counters: Dict[str, Dict[LabelKey, float]] = defaultdict(lambda: defaultdict(float))
+        self._gauges: Dict[str, Dict[LabelKey, float]] = defaultdict(dict)
+        self._buckets: Dict[str, Tuple[float, ...]] = {}
+        self._histograms: Dict[str, Dict[LabelKey, List[float]]] = defaultdict(dict)
+
+    def describe(self, name: str, metric_type: str, help_text: str, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        """Register HELP/TYPE for a metric (histogram buckets in seconds)"""
+        with self._lock:
+            self._help[name] = (metric_type, help_text)
+            if metric_type == "histogram":
+                self._buckets[name] = tuple(sorted(buckets))
+
+    def inc(self, name: str, value: float = 1.0, **labels):
+        """Increment a counter"""
+        with self._lock:
+            self._counters[name][_label_key(labels)] += value
+
+    def set(self, name: str, value: float, **labels):
+        """Set a gauge"""
+        with self._lock:
+            self._gauges[name][_label_key(labels)] = value
+
+    def observe(self, name: str, value: float, **labels):
+        """Record one observation in a histogram"""
+        with self._lock:
+            buckets = self._buckets.setdefault(name, DEFAULT_BUCKETS)
+            key = _label_key(labels)
+            # Layout: one cumulative count per bucket, then +Inf count, then sum
+            series = self._histograms[name].setdefault(key, [0.0] * (len(buckets) + 2))
+            for index, bound in enumerate(buckets):
+                if value <= bound:
+                    series[index] += 1
+            series[-2] += 1
+            series[-1] += value
+
+    def get(self, name: str, **labels) -> float:
+        """Current value of a counter or gauge (0 if never set)"""
+        with self._lock:
+            key = _label_key(labels)
+            if name in self._gauges:
+                return self._gauges[name].get(key, 0.0)
+            return self._counters.get(name, {}).get(key, 0.0)
+
+    def render(self) -> str:
+        """Export all metrics in the Prometheus text exposition format"""
+        lines: List[str] = []
+        with self._lock:
+            for kind, store in (("counter", self._counters), ("gauge", self._gauges)):
+                for name in sorted(store):
+                    self._header(lines, name, kind)
+                    for key, value in sorted(store[name].items()):
+                        lines.append(f"{name}{_format_labels(key)} {value:g}")
+
+            for name in sorted(self._histograms):
+                self._header(lines, name, "histogram")
+                buckets = self._buckets[name]
+                for key, series in sorted(self._histograms[name].items()):
+                    for bound, count in zip(buckets, series):
+                        lines.append(f"{name}_bucket{_format_labels(key, ('le', f'{bound:g}'))} {count:g}")
+                    lines.append(f"{name}_bucket{_format_labels(key, ('le', '+Inf'))} {series[-2]:g}")
+                    lines.append(f"{name}_count{_format_labels(key)} {series[-2]:g}")
+                    lines.append(f"{name}_sum{_format_labels(key)} {series[-1]:g}")
+        return "\n".join(lines) + "\n"
+
+    def _header(self, lines: List[str], name: str, default_type: str):
+        metric_type, help_text = self._help.get(name, (default_type, ""))
+        if help_text:
+            lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {metric_type}")
+
+    def reset(self):
+        """Clear all recorded values (tests)"""
+        with self._lock:
+            self._counters.clear()
+            self._gauges.clear()
+            self._histograms.clear()
+
+
+# Global registry
+metrics = MetricsRegistry()
+
+metrics.describe("llm_requests_total", "counter", "LLM provider calls by outcome (ok, error, timeout)")
+metrics.describe("llm_request_duration_seconds", "histogram", "LLM provider call latency")
+metrics.describe("llm_parse_total", "counter", "Parsing of LLM JSON responses by outcome (ok, repaired, invalid)")
+metrics.describe("llm_retries_total", "counter", "LLM calls repeated because the previous response was unusable")
+metrics.describe("llm_fallbacks_total", "counter", "AI results replaced by the local fallback, by reason")
+metrics.describe("llm_circuit_open", "gauge", "1 while the provider's circuit breaker is open")
+metrics.describe("llm_hedged_requests_total", "counter", "Second (hedged) requests sent for slow LLM calls")
+metrics.describe("llm_hedge_wins_total", "counter", "Hedged requests that answered before the original call")
+metrics.describe("llm_tokens_total", "counter", "Tokens reported by the provider, by kind (prompt, completion)")
+metrics.describe("grading_batch_answers_total", "counter", "Free-text answers of batch grading, by how they were evaluated (batched, individual)")
+metrics.describe("evaluation_cache_total", "counter", "Free-text answers graded, by evaluation cache outcome (hit, miss)")
+metrics.describe("grading_cluster_answers_total", "counter", "Free-text answers by clustering outcome (evaluated, propagated, borderline)")
+metrics.describe("llm_rate_limit_wait_seconds", "histogram", "Time LLM calls waited for rate limit budget, by priority")
+metrics.describe("llm_rate_limited_total", "counter", "LLM calls delayed (queued) or dropped (gave_up) by the rate limiter")
+metrics.describe("grading_triage_total", "counter", "Free-text answers by triage outcome (local rule or sent to the LLM)")
+metrics.describe("grading_triage_local_ratio", "gauge", "Fraction of free-text answers scored locally by triage")
+metrics.describe("grading_learned_total", "counter", "Free-text answers scored by the learned grader (confident) or sent on to the AI (low_confidence)")
+metrics.describe("learned_grader_mae", "gauge", "Held-out mean absolute error of the learned grader (fraction of max score)")
+metrics.describe("answer_key_cache_total", "counter", "Compiled quiz answer key lookups (hit, miss)")
+metrics.describe("bulk_scoring_seconds", "histogram", "Time to score all attempts of a quiz (GET /quizzes/{id}/scores)")
+metrics.describe("attempts_expired_total", "counter", "Open attempts auto-submitted by the deadline sweeper")
+metrics.describe("attempt_timer_lookups_total", "counter", "Attempt timer state lookups (cache, database)")
+metrics.describe("autosave_deltas_total", "counter", "Answer deltas received by PATCH /quizzes/attempts/{id}/answers")
+metrics.describe("autosave_flushed_attempts_total", "counter", "Attempts whose buffered answers were written by an autosave flush")
+metrics.describe("attempt_channel_connections", "gauge", "Open live attempt channels (WebSocket)")
+metrics.describe("quiz_access_cache_total", "counter", "Quiz access lookups when starting attempts (hit, miss)")
+metrics.describe("analytics_cache_total", "counter", "Item analytics lookups (hit: fingerprint unchanged, miss: recomputed)")
+metrics.describe("item_analytics_seconds", "histogram", "Time to compute the item analytics of a quiz")
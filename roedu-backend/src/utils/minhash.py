@@ -0,0 +1,77 @@
+"""
+MinHash signatures and an LSH index for near-duplicate text detection
+
+Pure Python (no numpy), sized for the answers to one quiz question: a few
+hundred short texts. Texts are compared as sets of character shingles;
+the LSH index splits each signature into bands, so texts sharing a band
+become candidates whose similarity is then checked exactly.
+"""
+
+import hashlib
+import random
+from collections import defaultdict
+from typing import Dict, Hashable, List, Sequence, Set, Tuple
+
+MERSENNE_PRIME = (1 << 61) - 1
+MAX_HASH = (1 << 32) - 1
+
+
+def shingles(text: str, size: int = 3) -> Set[str]:
+    """Character shingles of a (normalized) text; short texts give themselves"""
+    padded = f" {text} "
+    if len(padded) <= size:
+        return {padded}
+    return {padded[i:i + size] for i in range(len(padded) - size + 1)}
+
+
+def jaccard(a: Set[str], b: Set[str]) -> float:
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+
+def _base_hash(shingle: str) -> int:
+    return int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+class MinHasher:
+    """Computes fixed-length MinHash signatures (deterministic for a seed)"""
+
+    def __init__(self, num_perm: int = 64, seed: int = 1):
+        rng = random.Random(seed)
+        self.num_perm = num_perm
+        self._params = [(rng.randrange(1, MERSENNE_PRIME), rng.randrange(0, MERSENNE_PRIME)) for _ in range(num_perm)]
+
+    def signature(self, shingle_set: Set[str]) -> Tuple[int, ...]:
+        hashes = [_base_hash(shingle) for shingle in shingle_set] or [0]
+        return tuple(
+            min(((a * h + b) % MERSENNE_PRIME) & MAX_HASH for h in hashes)
+            for a, b in self._params
+        )
+
+
+def estimated_similarity(sig_a: Sequence[int], sig_b: Sequence[int]) -> float:
+    """Fraction of equal MinHash values (estimates the Jaccard similarity)"""
+    return sum(1 for x, y in zip(sig_a, sig_b) if x == y) / len(sig_a)
+
+
+class LSHIndex:
+    """Banded LSH over MinHash signatures (bands x rows = num_perm)"""
+
+    def __init__(self, bands: int = 16, rows: int = 4):
+        self.bands = bands
+        self.rows = rows
+        self._buckets: List[Dict[Tuple[int, ...], List[Hashable]]] = [defaultdict(list) for _ in range(bands)]
+
+    def add(self, key: Hashable, signature: Sequence[int]):
+        for band in range(self.bands):
+            chunk = tuple(signature[band * self.rows:(band + 1) * self.rows])
+            self._buckets[band][chunk].append(key)
+
+    def candidates(self, signature: Sequence[int]) -> Set[Hashable]:
+        """Keys sharing at least one band with the signature"""
+        found: Set[Hashable] = set()
+        for band in range(self.bands):
+            chunk = tuple(signature[band * self.rows:(band + 1) * self.rows])
+            found.update(self._buckets[band].get(chunk, ()))
+        return found
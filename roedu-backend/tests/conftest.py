@@ -0,0 +1,219 @@
+import asyncio
+import json
+from contextlib import contextmanager
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from src.config.database import Base
+import src.models  # noqa: F401 - register all tables
+
+
+@pytest.fixture
+def session_factory(tmp_path):
+    """Session factory bound to a fresh SQLite database file"""
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'test.db'}",
+        connect_args={"check_same_thread": False}
+    )
+    Base.metadata.create_all(bind=engine)
+    yield sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    engine.dispose()
+
+
+@pytest.fixture
+def db(session_factory):
+    """Database session on the test database"""
+    session = session_factory()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture
+def make_quiz(db):
+    """
+    Create a professor, a student (user id 2) and a quiz
+    `questions` are (question_type, correct_answers, points) tuples
+    """
+    from src.models.user import User, UserRole
+    from src.models.professor import Professor
+    from src.models.student import Student
+    from src.models.quiz import Quiz, Question
+
+    def _make(questions, time_limit=30):
+        if db.get(User, 1) is None:
+            db.add(User(id=1, username="prof", email="prof@roedu.ro", hashed_password="x", role=UserRole.PROFESSOR))
+            db.add(User(id=2, username="elev", email="elev@roedu.ro", hashed_password="x", role=UserRole.STUDENT))
+            db.add(Professor(id=1))
+            db.add(Student(id=2))
+        quiz = Quiz(title="Test", professor_id=1, time_limit=time_limit)
+        db.add(quiz)
+        db.flush()
+        for index, (question_type, correct_answers, points) in enumerate(questions):
+            db.add(Question(
+                quiz_id=quiz.id,
+                question_text=f"Întrebarea {index + 1}",
+                question_type=question_type,
+                options=json.dumps(["A", "B", "C"]) if question_type != "free_text" else None,
+                correct_answers=json.dumps(correct_answers),
+                evaluation_criteria="fotosinteza, clorofila" if question_type == "free_text" else None,
+                points=points,
+                order_index=index
+            ))
+        db.commit()
+        db.refresh(quiz)
+        return quiz
+
+    return _make
+
+
+class SlowEvaluator:
+    """AI evaluator stand-in: half marks after `delay` seconds, raises on the answer boom"""
+
+    def __init__(self, delay=0.2):
+        self.delay = delay
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.answers = []
+
+    async def evaluate_free_text_answer(self, question_text, student_answer, criteria, max_score, question_type, **kwargs):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(self.delay)
+        self.in_flight -= 1
+        if student_answer == "boom":
+            raise RuntimeError("provider down")
+        self.answers.append(student_answer)
+        return max_score / 2, "Parțial corect", {"reasoning": "ok", "version": "test", "ai_generated": True}
+
+
+@pytest.fixture
+def slow_evaluator():
+    """The SlowEvaluator class (tests instantiate or subclass it)"""
+    return SlowEvaluator
+
+
+@pytest.fixture
+def submit(db):
+    """Start an attempt of the student (user id 2) and submit `answers` through the API"""
+    from src.api.v1.quizzes import auto_submit_quiz_attempt
+    from src.models.quiz import QuizAttempt
+    from src.models.user import User
+
+    def _submit(quiz, answers):
+        attempt = QuizAttempt(quiz_id=quiz.id, student_id=2)
+        db.add(attempt)
+        db.commit()
+        student = db.get(User, 2)
+        return asyncio.run(auto_submit_quiz_attempt(attempt.id, {"answers": answers}, db=db, current_user=student))
+
+    return _submit
+
+
+@pytest.fixture
+def worker_db(session_factory, monkeypatch):
+    """Point the worker's own sessions at the test database"""
+    from src.config import database
+    from src.services import grading_service
+    monkeypatch.setattr(database, "SessionLocal", session_factory)
+    monkeypatch.setattr(grading_service.settings, "GRADING_BATCH_WINDOW_SECONDS", 0)
+
+
+@pytest.fixture
+def count_queries():
+    """Context manager collecting the SQL statements run on an engine"""
+    @contextmanager
+    def _count(engine):
+        statements = []
+
+        def record(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+        event.listen(engine, "before_cursor_execute", record)
+        try:
+            yield statements
+        finally:
+            event.remove(engine, "before_cursor_execute", record)
+
+    return _count
+
+
+@pytest.fixture(autouse=True)
+def _reset_llm_resilience():
+    """Circuit breakers and latency windows are process-wide; start each test clean"""
+    from src.services.llm_resilience import reset_resilience_state
+    reset_resilience_state()
+    yield
+    reset_resilience_state()
+
+
+@pytest.fixture(autouse=True)
+def _isolated_rate_limiter(tmp_path, monkeypatch):
+    """Each test gets its own rate limiter state file"""
+    from src.config.settings import settings
+    from src.services.llm_rate_limiter import reset_rate_limiter
+    monkeypatch.setattr(settings, "LLM_RATE_LIMIT_DB", str(tmp_path / "llm_rate_limit.db"))
+    reset_rate_limiter()
+    yield
+    reset_rate_limiter()
+
+
+@pytest.fixture(autouse=True)
+def _isolated_learned_grader(tmp_path, monkeypatch):
+    """No learned grader models unless a test trains them"""
+    from src.config.settings import settings
+    from src.services import learned_grader
+    monkeypatch.setattr(settings, "LEARNED_GRADER_PATH", str(tmp_path / "learned_grader.pkl"))
+    monkeypatch.setattr(learned_grader, "_learned_grader", None)
+
+
+@pytest.fixture(autouse=True)
+def _clear_answer_keys():
+    """Compiled answer keys are cached by quiz id, which repeats across test databases"""
+    from src.services.scoring import clear_answer_keys
+    clear_answer_keys()
+    yield
+    clear_answer_keys()
+
+
+@pytest.fixture(autouse=True)
+def _clear_attempt_timers():
+    """Timer states are cached by attempt id, which repeats across test databases"""
+    from src.services.attempt_timer import forget_timer
+    forget_timer()
+    yield
+    forget_timer()
+
+
+@pytest.fixture(autouse=True)
+def _fresh_answer_autosave(monkeypatch):
+    """Buffered answers are kept by attempt id, which repeats across test databases"""
+    from src.services import answer_autosave
+    monkeypatch.setattr(answer_autosave, "_answer_autosave", None)
+
+
+@pytest.fixture(autouse=True)
+def _fresh_attempt_channel_hub(monkeypatch):
+    """The channel hub's ticker task belongs to the event loop of the test that started it"""
+    from src.services import attempt_channel
+    monkeypatch.setattr(attempt_channel, "_attempt_channel_hub", None)
+
+
+@pytest.fixture(autouse=True)
+def _clear_quiz_access():
+    """Quiz access is cached by quiz id, which repeats across test databases"""
+    from src.services.quiz_access import clear_quiz_access
+    clear_quiz_access()
+    yield
+    clear_quiz_access()
+
+
+@pytest.fixture(autouse=True)
+def _clear_analytics():
+    """Item analytics are cached by quiz id, which repeats across test databases"""
+    from src.services.item_analytics import clear_analytics
+    clear_analytics()
+    yield
+    clear_analytics()
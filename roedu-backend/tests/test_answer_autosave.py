@@ -0,0 +1,93 @@
+import asyncio
+import json
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import HTTPException
+
+from src.api.v1.quizzes import auto_submit_quiz_attempt, autosave_answers, start_quiz_attempt
+from src.models.quiz import QuizAttempt
+from src.models.user import User
+from src.schemas.quiz_schema import AnswerAutosaveRequest
+from src.schemas.user_schema import TokenData
+from src.services.answer_autosave import get_answer_autosave
+from src.services.deadline_sweeper import expire_overdue_attempts
+
+STUDENT = TokenData(user_id=2, role="student")
+
+
+def _autosave(attempt_id, answers):
+    return autosave_answers(attempt_id, AnswerAutosaveRequest(answers=answers), token_data=STUDENT)
+
+
+def test_autosaves_are_coalesced_into_one_write_per_flush(db, make_quiz, worker_db, count_queries):
+    quizzes = [make_quiz([("single_choice", ["A"], 1.0), ("free_text", ["x"], 2.0)]) for _ in range(2)]
+    single, free_text = (q.id for q in quizzes[0].questions)
+    attempts = [start_quiz_attempt(quiz.id, db=db, current_user=db.get(User, 2)).id for quiz in quizzes]
+
+    with count_queries(db.get_bind()) as statements:
+        for length in range(1, 30):
+            _autosave(attempts[0], {free_text: "Clorofila"[:length % 9 + 1]})
+        _autosave(attempts[0], {single: ["B"]})
+        _autosave(attempts[0], {single: ["A"]})
+        response = _autosave(attempts[1], {single: ["C"]})
+    assert statements == []
+    assert response == {"attempt_id": attempts[1], "buffered_questions": 1}
+
+    with count_queries(db.get_bind()) as statements:
+        assert get_answer_autosave().flush() == 2
+    assert len([s for s in statements if s.lstrip().upper().startswith("UPDATE")]) == 2
+
+    db.expire_all()
+    assert json.loads(db.get(QuizAttempt, attempts[0]).answers) == {str(single): ["A"], str(free_text): "Clorofila"[:29 % 9 + 1]}
+    assert json.loads(db.get(QuizAttempt, attempts[1]).answers) == {str(single): ["C"]}
+    assert get_answer_autosave().flush() == 0
+
+    _autosave(attempts[1], {single: None})
+    get_answer_autosave().flush()
+    db.expire_all()
+    assert json.loads(db.get(QuizAttempt, attempts[1]).answers) == {}
+
+
+def test_submit_merges_buffered_answers(db, make_quiz, worker_db):
+    quiz = make_quiz([("single_choice", ["A"], 1.0), ("single_choice", ["B"], 1.0), ("single_choice", ["C"], 1.0)])
+    first, second, third = (str(q.id) for q in quiz.questions)
+    attempt_id = start_quiz_attempt(quiz.id, db=db, current_user=db.get(User, 2)).id
+
+    _autosave(attempt_id, {first: ["A"], second: ["A"]})
+    get_answer_autosave().flush()
+    _autosave(attempt_id, {second: ["B"]})  # Still buffered at submit
+    attempt = asyncio.run(auto_submit_quiz_attempt(
+        attempt_id, {"answers": {third: ["C"]}}, db=db, current_user=db.get(User, 2)
+    ))
+
+    assert json.loads(attempt.answers) == {first: ["A"], second: ["B"], third: ["C"]}
+    assert attempt.score == 3.0
+    assert get_answer_autosave().flush() == 0
+
+    with pytest.raises(HTTPException) as error:
+        _autosave(attempt_id, {first: ["B"]})
+    assert error.value.status_code == 409
+
+
+def test_expired_attempts_keep_their_buffered_answers(db, make_quiz, worker_db):
+    quiz = make_quiz([("single_choice", ["A"], 1.0)])
+    question_id = str(quiz.questions[0].id)
+    attempt = QuizAttempt(
+        quiz_id=quiz.id,
+        student_id=2,
+        started_at=datetime.utcnow() - timedelta(minutes=30),
+        deadline_at=datetime.utcnow() - timedelta(seconds=1)
+    )
+    db.add(attempt)
+    db.commit()
+
+    _autosave(attempt.id, {question_id: ["A"]})  # Within the grace period
+    expired, _ = expire_overdue_attempts(now=datetime.utcnow() + timedelta(minutes=1))
+
+    assert expired == [attempt.id]
+    db.expire_all()
+    assert db.get(QuizAttempt, attempt.id).score == 1.0
+    with pytest.raises(HTTPException) as error:
+        _autosave(attempt.id + 1, {question_id: ["A"]})
+    assert error.value.status_code == 404
@@ -0,0 +1,89 @@
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from starlette.websockets import WebSocketDisconnect
+
+from src.api.v1 import quizzes
+from src.api.v1.quizzes import start_quiz_attempt
+from src.models.quiz import QuizAttempt
+from src.models.user import User
+from src.services.answer_autosave import get_answer_autosave
+from src.services.auth_service import AuthService
+
+
+@pytest.fixture
+def client(worker_db):
+    app = FastAPI()
+    app.include_router(quizzes.router, prefix="/api/v1/quizzes")
+    return TestClient(app)
+
+
+def _channel(client, attempt_id, user_id=2):
+    token = AuthService.create_access_token({"user_id": user_id, "role": "student"})
+    return client.websocket_connect(f"/api/v1/quizzes/attempts/{attempt_id}/live?token={token}")
+
+
+def test_channel_pushes_the_countdown_and_takes_answer_deltas(client, db, make_quiz):
+    quiz = make_quiz([("single_choice", ["A"], 1.0)], time_limit=20)
+    question_id = str(quiz.questions[0].id)
+    attempt_id = start_quiz_attempt(quiz.id, db=db, current_user=db.get(User, 2)).id
+
+    with _channel(client, attempt_id) as websocket:
+        tick = websocket.receive_json()
+        assert tick["type"] == "tick" and 19 * 60 < tick["time_remaining"] <= 20 * 60
+
+        websocket.send_json({"type": "answers", "answers": {question_id: ["A"]}})
+        replies = [websocket.receive_json() for _ in range(2)]  # The ticker's first tick may come first
+        assert {"type": "saved", "attempt_id": attempt_id, "buffered_questions": 1} in replies
+
+        websocket.send_json({"type": "submit"})
+        assert websocket.receive_json()["type"] == "error"
+
+    get_answer_autosave().flush()
+    db.expire_all()
+    assert db.get(QuizAttempt, attempt_id).answers == f'{{"{question_id}": ["A"]}}'
+
+
+def test_channel_expires_the_attempt_at_its_deadline(client, db, make_quiz):
+    quiz = make_quiz([("single_choice", ["A"], 1.0)])
+    attempt = QuizAttempt(
+        quiz_id=quiz.id,
+        student_id=2,
+        started_at=datetime.utcnow() - timedelta(minutes=30),
+        deadline_at=datetime.utcnow() + timedelta(seconds=1.5)
+    )
+    db.add(attempt)
+    db.commit()
+
+    with _channel(client, attempt.id) as websocket:
+        messages = [websocket.receive_json()]
+        while messages[-1]["type"] == "tick":
+            messages.append(websocket.receive_json())
+        assert messages[0]["type"] == "tick" and messages[0]["time_remaining"] in (1, 2)
+        assert messages[-1] == {"type": "expired", "attempt_id": attempt.id}
+        with pytest.raises(WebSocketDisconnect):
+            websocket.receive_json()
+
+    db.expire_all()
+    assert db.get(QuizAttempt, attempt.id).is_expired == 1
+
+
+def test_channel_rejects_other_students_and_bad_tokens(client, db, make_quiz):
+    quiz = make_quiz([("single_choice", ["A"], 1.0)])
+    attempt_id = start_quiz_attempt(quiz.id, db=db, current_user=db.get(User, 2)).id
+
+    for url in (
+        f"/api/v1/quizzes/attempts/{attempt_id}/live?token=invalid",
+        f"/api/v1/quizzes/attempts/{attempt_id + 1}/live?token=" + AuthService.create_access_token({"user_id": 2})
+    ):
+        with pytest.raises(WebSocketDisconnect) as closed:
+            with client.websocket_connect(url) as websocket:
+                websocket.receive_json()
+        assert closed.value.code == 1008
+
+    with pytest.raises(WebSocketDisconnect) as closed:
+        with _channel(client, attempt_id, user_id=1) as websocket:
+            websocket.receive_json()
+    assert closed.value.code == 1008
@@ -0,0 +1,117 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import HTTPException
+
+from src.api.v1.quizzes import auto_submit_quiz_attempt, get_attempt_timer, start_quiz_attempt, sync_timer
+from src.models.quiz import QuizAttempt
+from src.models.user import User
+from src.schemas.user_schema import TokenData
+from src.services import attempt_timer
+from src.services.attempt_timer import forget_timer
+
+STUDENT = TokenData(user_id=2, role="student")
+
+
+def test_timer_polls_of_a_started_attempt_do_not_touch_the_database(db, make_quiz, worker_db, count_queries):
+    quiz = make_quiz([("single_choice", ["A"], 1.0)], time_limit=20)
+    attempt = start_quiz_attempt(quiz.id, db=db, current_user=db.get(User, 2))
+
+    with count_queries(db.get_bind()) as statements:
+        timers = [get_attempt_timer(attempt.id, token_data=STUDENT) for _ in range(50)]
+
+    assert statements == []
+    assert all(19 * 60 < timer["time_remaining"] <= 20 * 60 for timer in timers)
+    assert timers[-1]["deadline_at"] == attempt.deadline_at
+    assert not timers[-1]["is_expired"] and not timers[-1]["completed"]
+
+
+def test_timer_cache_miss_reads_once(db, make_quiz, worker_db, count_queries):
+    quiz = make_quiz([("single_choice", ["A"], 1.0)])
+    attempt_id = start_quiz_attempt(quiz.id, db=db, current_user=db.get(User, 2)).id
+    forget_timer()
+
+    with count_queries(db.get_bind()) as statements:
+        for _ in range(10):
+            get_attempt_timer(attempt_id, token_data=STUDENT)
+    assert len([s for s in statements if s.lstrip().upper().startswith("SELECT")]) == 1
+    assert not any(s.lstrip().upper().startswith("UPDATE") for s in statements)
+
+    with pytest.raises(HTTPException) as error:
+        get_attempt_timer(attempt_id, token_data=TokenData(user_id=1, role="professor"))
+    assert error.value.status_code == 403
+    with pytest.raises(HTTPException) as error:
+        get_attempt_timer(attempt_id + 1, token_data=STUDENT)
+    assert error.value.status_code == 404
+
+
+def test_expiry_is_the_only_write(db, make_quiz, worker_db, count_queries):
+    quiz = make_quiz([("single_choice", ["A"], 1.0)])
+    attempt = QuizAttempt(
+        quiz_id=quiz.id,
+        student_id=2,
+        started_at=datetime.utcnow() - timedelta(minutes=31),
+        deadline_at=datetime.utcnow() - timedelta(minutes=1),
+        time_remaining=30 * 60
+    )
+    db.add(attempt)
+    db.commit()
+
+    with count_queries(db.get_bind()) as statements:
+        timers = [get_attempt_timer(attempt.id, token_data=STUDENT) for _ in range(5)]
+        db.expire_all()  # A later request's session
+        synced = sync_timer(attempt.id, db=db, current_user=db.get(User, 2))
+
+    assert len([s for s in statements if s.lstrip().upper().startswith("UPDATE")]) == 1
+    assert all(timer["is_expired"] and timer["time_remaining"] == 0 for timer in timers)
+    assert (synced.is_expired, synced.time_remaining) == (1, 0)
+    db.expire_all()
+    stored = db.get(QuizAttempt, attempt.id)
+    assert (stored.is_expired, stored.time_remaining, stored.completed_at) == (1, 0, None)
+
+
+def test_sync_timer_does_not_write_and_submit_stops_the_timer(db, make_quiz, worker_db, count_queries):
+    quiz = make_quiz([("single_choice", ["A"], 1.0)])
+    attempt_id = start_quiz_attempt(quiz.id, db=db, current_user=db.get(User, 2)).id
+
+    with count_queries(db.get_bind()) as statements:
+        for _ in range(5):
+            synced = sync_timer(attempt_id, db=db, current_user=db.get(User, 2))
+    assert not any(s.lstrip().upper().startswith("UPDATE") for s in statements)
+    assert 29 * 60 < synced.time_remaining <= 30 * 60
+
+    asyncio.run(auto_submit_quiz_attempt(attempt_id, {"answers": {str(quiz.questions[0].id): ["A"]}}, db=db, current_user=db.get(User, 2)))
+
+    timer = get_attempt_timer(attempt_id, token_data=STUDENT)
+    assert timer["completed"] and timer["time_remaining"] == 0
+
+
+def test_attempts_submitted_by_another_process_are_seen_as_completed(db, make_quiz, worker_db, monkeypatch):
+    quiz = make_quiz([("single_choice", ["A"], 1.0)])
+    attempt = start_quiz_attempt(quiz.id, db=db, current_user=db.get(User, 2))
+    assert not get_attempt_timer(attempt.id, token_data=STUDENT)["completed"]
+
+    # Submitted through another process: this one's cached state still says open
+    db.query(QuizAttempt).filter(QuizAttempt.id == attempt.id).update({"completed_at": datetime.utcnow(), "is_expired": 1})
+    db.commit()
+    assert not get_attempt_timer(attempt.id, token_data=STUDENT)["completed"]
+
+    monkeypatch.setattr(attempt_timer, "OPEN_STATE_RECHECK_SECONDS", 0)
+    assert get_attempt_timer(attempt.id, token_data=STUDENT)["completed"]
+
+
+def test_the_expiry_path_rereads_an_attempt_submitted_elsewhere(db, make_quiz, worker_db):
+    quiz = make_quiz([("single_choice", ["A"], 1.0)])
+    attempt = QuizAttempt(quiz_id=quiz.id, student_id=2, deadline_at=datetime.utcnow() + timedelta(seconds=1))
+    db.add(attempt)
+    db.commit()
+    state = attempt_timer.timer_state_of(attempt)
+
+    db.query(QuizAttempt).filter(QuizAttempt.id == attempt.id).update({"completed_at": datetime.utcnow()})
+    db.commit()
+    timer = attempt_timer.check_expiry(state, datetime.utcnow() + timedelta(seconds=5))
+
+    assert timer.completed and not timer.expired
+    db.expire_all()
+    assert db.get(QuizAttempt, attempt.id).is_expired == 0
@@ -0,0 +1,59 @@
+import asyncio
+
+from src.models.user import User, UserRole
+from src.models.professor import Professor
+from src.models.material import Material
+from src.models.quiz import Quiz
+from src.services import bulk_quiz_generation_service as bulk
+
+
+class FakeQuizGenerator:
+    def __init__(self, failing_titles=()):
+        self.failing_titles = set(failing_titles)
+        self.calls = []
+
+    async def generate_quiz_from_material(self, material_title, material_content, subject, grade_level):
+        self.calls.append(material_title)
+        if material_title in self.failing_titles:
+            raise Exception("Gemini unavailable")
+        return {
+            "title": f"Test {material_title}",
+            "questions": [{
+                "question_text": "2 + 2 = ?",
+                "question_type": "single_choice",
+                "options": ["3", "4"],
+                "correct_answers": ["4"],
+                "points": 1.0
+            }]
+        }
+
+
+def _seed(db):
+    db.add(User(id=1, username="prof", email="prof@roedu.ro", hashed_password="x", role=UserRole.PROFESSOR))
+    db.add(Professor(id=1))
+    for idx, (title, subject) in enumerate([("Algebra", "Matematica"), ("Geometrie", "Matematica"), ("Poezie", "Romana")]):
+        db.add(Material(id=idx + 1, title=title, subject=subject, grade_level=10, content="x" * 50, professor_id=1))
+    db.commit()
+
+
+def test_bulk_job_reports_outcomes_and_resumes(db, session_factory, monkeypatch):
+    _seed(db)
+    generator = FakeQuizGenerator(failing_titles={"Geometrie"})
+    monkeypatch.setattr(bulk, "SessionLocal", session_factory)
+    monkeypatch.setattr(bulk, "get_quiz_generation_service", lambda: generator)
+
+    job = bulk.create_bulk_job(db, subject="Matematica", concurrency=2, requests_per_minute=6000)
+    assert len(job.items) == 2
+
+    summary = asyncio.run(bulk.run_bulk_job(job.id))
+    assert summary["status"] == "completed"
+    assert (summary["succeeded"], summary["failed"]) == (1, 1)
+    assert db.query(Quiz).count() == 1
+
+    # Resuming only retries what did not succeed
+    generator.failing_titles.clear()
+    generator.calls.clear()
+    summary = asyncio.run(bulk.run_bulk_job(job.id, retry_failed=True))
+    assert generator.calls == ["Geometrie"]
+    assert (summary["succeeded"], summary["failed"], summary["pending"]) == (2, 0, 0)
+    assert db.query(Quiz).count() == 2
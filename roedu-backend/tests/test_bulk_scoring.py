@@ -0,0 +1,109 @@
+import json
+import random
+import time
+from datetime import datetime
+
+import pytest
+from sqlalchemy import insert
+
+from src.api.v1.quizzes import get_quiz_scores
+from src.models.ai_evaluation_report import AIEvaluationReport
+from src.models.quiz import QuizAttempt
+from src.models.user import User
+from src.services.bulk_scoring import score_quiz_attempts
+from src.services.scoring import FreeTextScoring, get_answer_key, reports_by_question, score_answers
+
+QUESTIONS = [
+    ("single_choice", ["A"], 1.0),
+    ("multiple_choice", ["A", "C"], 2.0),
+    ("free_text", ["Clorofila"], 3.0),
+]
+CHOICES = [[], ["A"], ["B"], ["A", "C"], ["C", "A"], ["A", "B"], ["A", "A"], ["D"], "A"]
+
+
+def _attempts(db, quiz, count, seed=7):
+    """Insert `count` finished attempts with random answers; a third of the free-text ones evaluated"""
+    rng = random.Random(seed)
+    single, multiple, free_text = (q.id for q in quiz.questions)
+    rows = [{
+        "quiz_id": quiz.id,
+        "student_id": 2,
+        "answers": json.dumps({
+            str(single): rng.choice(CHOICES),
+            str(multiple): rng.choice(CHOICES),
+            str(free_text): "Clorofila absoarbe lumina",
+        }),
+        "completed_at": datetime.utcnow(),
+    } for _ in range(count)]
+    db.execute(insert(QuizAttempt), rows)
+    db.commit()
+
+    attempt_ids = [attempt_id for (attempt_id,) in db.query(QuizAttempt.id).order_by(QuizAttempt.id)]
+    reports = []
+    for attempt_id in attempt_ids[::3]:
+        reports.append({
+            "quiz_attempt_id": attempt_id, "question_id": free_text, "student_id": 2,
+            "ai_score": rng.choice([0.0, 1.5, 3.0]), "reason": "Auto-evaluated by AI system",
+        })
+    for attempt_id in attempt_ids[1::10]:  # Professor overrides, also on a choice question
+        reports.append({
+            "quiz_attempt_id": attempt_id, "question_id": multiple, "student_id": 2,
+            "ai_score": 0.0, "new_score": 1.0, "reason": "Contestație",
+        })
+    db.execute(insert(AIEvaluationReport), reports)
+    db.commit()
+
+
+@pytest.mark.parametrize("use_numpy", [True, False])
+def test_bulk_scores_match_per_attempt_scoring(db, make_quiz, use_numpy):
+    if use_numpy:
+        pytest.importorskip("numpy")
+    quiz = make_quiz(QUESTIONS)
+    _attempts(db, quiz, 60)
+
+    scores = score_quiz_attempts(db, quiz.id, use_numpy=use_numpy)
+
+    key = get_answer_key(db, quiz.id)
+    expected = []
+    for attempt in db.query(QuizAttempt).order_by(QuizAttempt.id):
+        reports = db.query(AIEvaluationReport).filter(AIEvaluationReport.quiz_attempt_id == attempt.id)
+        expected.append(score_answers(
+            key, json.loads(attempt.answers), reports_by_question(reports), FreeTextScoring.EVALUATED_ONLY
+        ))
+    assert scores.question_ids == [q.id for q in quiz.questions]
+    assert [list(row) for row in scores.question_scores] == [
+        [result.question_scores[q.id] for q in quiz.questions] for result in expected
+    ]
+    assert scores.totals == pytest.approx([result.score for result in expected])
+    assert scores.max_score == 6.0
+
+
+def test_quiz_scores_endpoint(db, make_quiz):
+    quiz = make_quiz(QUESTIONS)
+    _attempts(db, quiz, 3)
+
+    response = get_quiz_scores(quiz.id, db=db, current_user=db.get(User, 1))
+
+    assert [attempt["attempt_id"] for attempt in response["attempts"]] == [1, 2, 3]
+    assert set(response["question_averages"]) == {q.id for q in quiz.questions}
+    assert all(set(attempt["question_scores"]) == set(response["question_averages"]) for attempt in response["attempts"])
+
+
+def test_scoring_ten_thousand_attempts_takes_under_a_second(db, make_quiz):
+    pytest.importorskip("numpy")
+    quiz = make_quiz(QUESTIONS * 7)
+    rng = random.Random(3)
+    db.execute(insert(QuizAttempt), [{
+        "quiz_id": quiz.id,
+        "student_id": 2,
+        "answers": json.dumps({str(q.id): rng.choice(CHOICES) for q in quiz.questions}),
+        "completed_at": datetime.utcnow(),
+    } for _ in range(10_000)])
+    db.commit()
+
+    started = time.perf_counter()
+    scores = score_quiz_attempts(db, quiz.id)
+    elapsed = time.perf_counter() - started
+
+    assert len(scores.totals) == 10_000
+    assert elapsed < 1.0
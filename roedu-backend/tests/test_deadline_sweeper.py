@@ -0,0 +1,125 @@
+import asyncio
+import json
+from datetime import datetime, timedelta
+
+from sqlalchemy import text
+
+from src.api.v1.quizzes import start_quiz_attempt
+from src.models.attempt_question_score import AttemptQuestionScore
+from src.models.quiz import QuizAttempt
+from src.models.user import User
+from src.services import deadline_sweeper, grading_service
+from src.services.answer_autosave import get_answer_autosave
+from src.services.deadline_sweeper import DeadlineSweeper, expire_overdue_attempts, overdue_attempts_query
+from src.services.grading_worker import GradingWorker
+
+NOW = datetime(2026, 3, 2, 10, 0, 0)
+
+
+def _open_attempt(db, quiz, deadline_at, answers=None, completed_at=None):
+    # One student per attempt: a student has at most one open attempt per quiz
+    attempt = QuizAttempt(
+        quiz_id=quiz.id,
+        student_id=100 + db.query(QuizAttempt).count(),
+        started_at=deadline_at - timedelta(minutes=30),
+        deadline_at=deadline_at,
+        answers=json.dumps(answers) if answers is not None else None,
+        completed_at=completed_at
+    )
+    db.add(attempt)
+    db.commit()
+    return attempt.id
+
+
+def test_start_sets_the_deadline(db, make_quiz):
+    quiz = make_quiz([("single_choice", ["A"], 1.0)], time_limit=20)
+
+    attempt = start_quiz_attempt(quiz.id, db=db, current_user=db.get(User, 2))
+
+    assert attempt.deadline_at - attempt.started_at == timedelta(minutes=20)
+    assert attempt.time_remaining == 20 * 60
+
+
+def test_overdue_attempts_are_auto_submitted_in_batches(db, make_quiz, worker_db):
+    quiz = make_quiz([("single_choice", ["A"], 1.0), ("free_text", ["x"], 2.0)])
+    single, free_text = (str(q.id) for q in quiz.questions)
+    overdue = [
+        _open_attempt(db, quiz, NOW - timedelta(minutes=5), {single: ["A"], free_text: "Clorofila"}),
+        _open_attempt(db, quiz, NOW - timedelta(minutes=2), {single: ["B"]}),
+        _open_attempt(db, quiz, NOW - timedelta(minutes=1)),  # Nothing autosaved
+    ]
+    in_grace_period = _open_attempt(db, quiz, NOW - timedelta(seconds=5))
+    not_due = _open_attempt(db, quiz, NOW + timedelta(minutes=10))
+    submitted = _open_attempt(db, quiz, NOW - timedelta(minutes=8), {single: ["A"]}, completed_at=NOW - timedelta(minutes=9))
+
+    expired, pending = expire_overdue_attempts(now=NOW, batch_size=2)
+
+    assert expired == overdue
+    assert pending == overdue[:1]
+    db.expire_all()
+    attempts = {attempt.id: attempt for attempt in db.query(QuizAttempt)}
+    assert [(attempts[i].score, attempts[i].grading_status, attempts[i].is_expired) for i in overdue] == [
+        (1.0, "pending", 1), (0.0, "graded", 1), (None, "graded", 1)
+    ]
+    assert all(attempts[i].completed_at == NOW for i in overdue)
+    assert attempts[in_grace_period].completed_at is None and attempts[not_due].completed_at is None
+    assert attempts[submitted].completed_at == NOW - timedelta(minutes=9)
+    assert db.query(AttemptQuestionScore).filter(AttemptQuestionScore.attempt_id == overdue[0]).count() == 2
+
+    assert expire_overdue_attempts(now=NOW) == ([], [])
+
+
+def test_one_failing_attempt_does_not_block_the_sweep(db, make_quiz, monkeypatch, worker_db):
+    quiz = make_quiz([("single_choice", ["A"], 1.0)])
+    single = str(quiz.questions[0].id)
+    attempt_ids = [_open_attempt(db, quiz, NOW - timedelta(minutes=5 - i), {single: ["A"]}) for i in range(5)]
+    poison = attempt_ids[1]
+    autosave = get_answer_autosave()
+    autosave.record(poison, {single: ["B"]})
+
+    finalize = deadline_sweeper.finalize_attempt
+
+    def failing_finalize(db, attempt):
+        if attempt.id == poison:
+            raise ValueError("corrupt attempt")
+        return finalize(db, attempt)
+    monkeypatch.setattr(deadline_sweeper, "finalize_attempt", failing_finalize)
+
+    try:
+        expired, pending = expire_overdue_attempts(now=NOW, batch_size=2)
+
+        assert expired == [i for i in attempt_ids if i != poison] and pending == []
+        db.expire_all()
+        assert db.get(QuizAttempt, poison).completed_at is None
+        assert autosave.take(poison) == {single: ["B"]}  # Buffered answers kept for the next sweep
+    finally:
+        autosave.discard(poison)
+
+
+def test_overdue_lookup_uses_the_open_deadline_index(db):
+    query = overdue_attempts_query(db, NOW, 100).statement.compile(
+        dialect=db.get_bind().dialect, compile_kwargs={"literal_binds": True}
+    )
+    plan = " ".join(str(row[-1]) for row in db.execute(text(f"EXPLAIN QUERY PLAN {query}")))
+
+    assert "ix_quiz_attempts_open_deadline" in plan
+
+
+def test_sweeper_queues_expired_free_text_answers_for_grading(db, make_quiz, monkeypatch, worker_db, slow_evaluator):
+    quiz = make_quiz([("free_text", ["x"], 2.0)])
+    attempt_id = _open_attempt(db, quiz, datetime.utcnow() - timedelta(minutes=1), {str(quiz.questions[0].id): "Clorofila"})
+    monkeypatch.setattr(grading_service, "get_ai_evaluation_service", lambda: slow_evaluator(delay=0))
+    worker = GradingWorker(workers=1)
+    monkeypatch.setattr(deadline_sweeper, "get_grading_worker", lambda: worker)
+
+    async def run():
+        await worker.start()
+        expired = await DeadlineSweeper().sweep()
+        await worker.join()
+        await worker.stop()
+        return expired
+
+    assert asyncio.run(run()) == [attempt_id]
+    db.expire_all()
+    attempt = db.get(QuizAttempt, attempt_id)
+    assert (attempt.score, attempt.grading_status) == (1.0, "graded")
@@ -0,0 +1,431 @@
+import asyncio
+import json
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import event
+
+import pytest
+
+from src.api.v1.ai_evaluation_reports import get_answer_clusters
+from src.api.v1.quizzes import get_quiz_result
+from src.models.ai_evaluation_report import AIEvaluationReport
+from src.models.quiz import QuizAttempt
+from src.models.user import User
+from src.models.evaluation_cache import EvaluationCacheEntry
+from src.services import grading_service, grading_worker
+from src.services.evaluation_cache_service import invalidate_question
+from src.services.ai_evaluation_service import AIEvaluationService
+from src.services.answer_clustering import cluster_answers
+from src.services.answer_triage import triage_answer
+from src.services.grading_worker import GradingWorker
+from src.services.scoring import bump_quiz_version, get_answer_key, score_answers
+from src.services.llm_client import LLMResponse
+from src.services.llm_replay import ReplayLLMClient
+from src.utils.helpers import normalize_text
+from src.utils.metrics import metrics
+
+
+def test_submit_scores_objective_questions_without_waiting_for_ai(db, make_quiz, monkeypatch, submit, slow_evaluator):
+    quiz = make_quiz([("single_choice", ["A"], 1.0), ("multiple_choice", ["A", "B"], 2.0), ("free_text", ["x"], 2.0)])
+    evaluator = slow_evaluator()
+    monkeypatch.setattr(grading_service, "get_ai_evaluation_service", lambda: evaluator)
+    single, multiple, free_text = quiz.questions
+
+    started = time.perf_counter()
+    attempt = submit(quiz, {str(single.id): "A", str(multiple.id): ["B", "A"], str(free_text.id): "Clorofila"})
+
+    assert time.perf_counter() - started < 0.1
+    assert evaluator.max_in_flight == 0
+    assert (attempt.score, attempt.max_score, attempt.grading_status) == (3.0, 5.0, "pending")
+
+    result = get_quiz_result(attempt.id, db=db, current_user=db.get(User, 2))
+    assert result["pending_questions"] == [free_text.id]
+    assert result["question_scores"][free_text.id] == 0.0
+
+
+def test_objective_only_submission_is_graded_immediately(db, make_quiz, submit):
+    quiz = make_quiz([("single_choice", ["A"], 1.0)])
+
+    attempt = submit(quiz, {str(quiz.questions[0].id): "B"})
+
+    assert (attempt.score, attempt.grading_status) == (0.0, "graded")
+
+
+@pytest.mark.parametrize("blank", ["", "   ", [""], [" \n"], [], None])
+def test_blank_free_text_answers_are_not_sent_for_grading(db, make_quiz, blank):
+    quiz = make_quiz([("free_text", ["x"], 2.0)])
+    question = quiz.questions[0]
+
+    assert grading_service.free_text_answer_for(question, blank) is None
+    result = score_answers(get_answer_key(db, quiz.id), {str(question.id): blank})
+    assert (result.free_text_answers, result.pending_questions) == ([], [])
+    assert grading_service.free_text_answer_for(question, ["  Clorofila "]).student_answer == "Clorofila"
+
+
+def test_worker_grades_concurrently_and_bulk_inserts(db, make_quiz, monkeypatch, worker_db, submit, slow_evaluator):
+    quiz = make_quiz([("single_choice", ["A"], 1.0)] + [("free_text", ["x"], 2.0)] * 5)
+    evaluator = slow_evaluator()
+    monkeypatch.setattr(grading_service, "get_ai_evaluation_service", lambda: evaluator)
+    answers = {str(q.id): ("A" if q.question_type == "single_choice" else "Clorofila") for q in quiz.questions}
+    answers[str(quiz.questions[-1].id)] = "boom"
+    attempt = submit(quiz, answers)
+
+    inserts = []
+    listener = lambda conn, cursor, statement, params, context, executemany: (
+        inserts.append(executemany) if statement.startswith("INSERT INTO ai_evaluation_reports") else None
+    )
+    event.listen(db.get_bind(), "before_cursor_execute", listener)
+    started = time.perf_counter()
+    asyncio.run(GradingWorker(workers=1).grade_attempt(attempt.id))
+    elapsed = time.perf_counter() - started
+    event.remove(db.get_bind(), "before_cursor_execute", listener)
+
+    assert elapsed < 0.6  # five 0.2s evaluations, not 1s serially
+    assert evaluator.max_in_flight == 5
+    assert inserts == [True]  # one executemany for all reports
+    db.refresh(attempt)
+    # The failed evaluation keeps the attempt pending with its objective score
+    assert (attempt.score, attempt.grading_status, attempt.grading_claimed_at) == (1.0, "pending", None)
+    reports = db.query(AIEvaluationReport).filter_by(quiz_attempt_id=attempt.id).all()
+    assert len(reports) == 4
+    assert {r.reason for r in reports} == {grading_service.AUTO_EVALUATION_REASON}
+    assert json.loads(reports[0].ai_strengths) == []
+
+    retry = slow_evaluator(delay=0)
+    monkeypatch.setattr(grading_service, "get_ai_evaluation_service", lambda: retry)
+    attempt.answers = json.dumps({**answers, str(quiz.questions[-1].id): "Clorofila verde"})
+    db.commit()
+    asyncio.run(GradingWorker(workers=1).grade_attempt(attempt.id))
+
+    assert retry.answers == ["Clorofila verde"]  # only the answer without a report
+    db.refresh(attempt)
+    assert (attempt.score, attempt.max_score, attempt.grading_status) == (1.0 + 5 * 1.0, 11.0, "graded")
+
+
+def test_claimed_attempts_are_not_graded_twice(db, make_quiz, monkeypatch, worker_db, submit, slow_evaluator):
+    quiz = make_quiz([("free_text", ["x"], 2.0)])
+    evaluator = slow_evaluator(delay=0)
+    monkeypatch.setattr(grading_service, "get_ai_evaluation_service", lambda: evaluator)
+    attempt = submit(quiz, {str(quiz.questions[0].id): "Clorofila"})
+    attempt.grading_claimed_at = datetime.utcnow()  # Another process is grading it
+    db.commit()
+
+    async def run():
+        worker = GradingWorker(workers=1)
+        await worker.start()  # Recovers the attempt unless it is claimed
+        await worker.join()
+        await worker.grade_attempt(attempt.id)
+        await worker.stop()
+
+    asyncio.run(run())
+    assert evaluator.answers == []
+    db.refresh(attempt)
+    assert attempt.grading_status == "pending"
+
+    # A claim left by a crashed worker expires
+    attempt.grading_claimed_at = datetime.utcnow() - timedelta(seconds=grading_worker.CLAIM_STALE_SECONDS + 1)
+    db.commit()
+    asyncio.run(run())
+    assert evaluator.answers == ["Clorofila"]
+    db.refresh(attempt)
+    assert (attempt.grading_status, attempt.grading_claimed_at) == ("graded", None)
+
+
+def test_worker_recovers_pending_attempts_on_start(db, make_quiz, monkeypatch, worker_db, submit, slow_evaluator):
+    quiz = make_quiz([("free_text", ["x"], 2.0)] * 2)
+    monkeypatch.setattr(grading_service, "get_ai_evaluation_service", lambda: slow_evaluator(delay=0.01))
+    attempt = submit(quiz, {str(q.id): "Clorofila" for q in quiz.questions})
+
+    async def run():
+        worker = GradingWorker(workers=2)
+        await worker.start()
+        await worker.join()
+        await worker.stop()
+
+    asyncio.run(run())
+
+    db.refresh(attempt)
+    assert (attempt.score, attempt.grading_status) == (2.0, "graded")
+    result = get_quiz_result(attempt.id, db=db, current_user=db.get(User, 2))
+    assert result["pending_questions"] == []
+    assert set(result["ai_evaluations"]) == {q.id for q in quiz.questions}
+
+
+def test_a_round_waits_for_the_batch_window_only_while_under_filled(monkeypatch):
+    monkeypatch.setattr(grading_service.settings, "GRADING_BATCH_WINDOW_SECONDS", 0.3)
+    monkeypatch.setattr(grading_service.settings, "GRADING_ROUND_SIZE", 2)
+    worker = GradingWorker(workers=1)
+
+    async def next_round(*arrivals):
+        worker._queue = asyncio.Queue()
+        for delay, attempt_id in arrivals:
+            asyncio.get_running_loop().call_later(delay, worker._queue.put_nowait, attempt_id)
+        started = time.perf_counter()
+        return await worker._next_round(), time.perf_counter() - started
+
+    attempt_ids, elapsed = asyncio.run(next_round((0, 1), (0, 2), (0, 3)))
+    assert attempt_ids == [1, 2] and elapsed < 0.1  # Full: no wait
+    attempt_ids, elapsed = asyncio.run(next_round((0, 1), (0.1, 2)))
+    assert attempt_ids == [1, 2] and elapsed < 0.2  # Filled by a late arrival
+    attempt_ids, elapsed = asyncio.run(next_round((0, 1)))
+    assert attempt_ids == [1] and elapsed >= 0.3
+
+
+def test_concurrency_is_bounded(db, make_quiz, monkeypatch, slow_evaluator):
+    quiz = make_quiz([("free_text", ["x"], 1.0)] * 6)
+    evaluator = slow_evaluator(delay=0.01)
+    monkeypatch.setattr(grading_service, "get_ai_evaluation_service", lambda: evaluator)
+    monkeypatch.setattr(grading_service.settings, "GRADING_CONCURRENCY", 2)
+    answers = score_answers(get_answer_key(db, quiz.id), {str(q.id): "Clorofila" for q in quiz.questions})
+
+    asyncio.run(grading_service.grade_free_text_answers(answers.free_text_answers))
+
+    assert evaluator.max_in_flight == 2
+
+
+def test_class_answers_to_the_same_question_are_graded_in_batches(db, make_quiz, monkeypatch, worker_db, submit, slow_evaluator):
+    class BatchEvaluator(slow_evaluator):
+        def __init__(self):
+            super().__init__(delay=0)
+            self.batches = []
+
+        async def evaluate_free_text_batch(self, question_text, student_answers, criteria, max_score, question_type, **kwargs):
+            self.batches.append(list(student_answers))
+            return [(max_score, "Corect", {"version": "test"}) for _ in student_answers]
+
+    quiz = make_quiz([("single_choice", ["A"], 1.0), ("free_text", ["x"], 2.0)])
+    evaluator = BatchEvaluator()
+    monkeypatch.setattr(grading_service, "get_ai_evaluation_service", lambda: evaluator)
+    monkeypatch.setattr(grading_service.settings, "GRADING_BATCH_SIZE", 4)
+    free_text = quiz.questions[1]
+    attempts = [submit(quiz, {str(free_text.id): f"Clorofila {i}"}) for i in range(6)]
+
+    asyncio.run(GradingWorker(workers=1).grade_attempts([attempt.id for attempt in attempts]))
+
+    assert [len(batch) for batch in evaluator.batches] == [4, 2]
+    assert evaluator.max_in_flight == 0  # no individual calls
+    for attempt in attempts:
+        db.refresh(attempt)
+        assert (attempt.score, attempt.grading_status) == (2.0, "graded")
+    assert db.query(AIEvaluationReport).count() == 6
+
+
+class ScriptedLLM:
+    enabled = True
+
+    def __init__(self, text):
+        self.text = text
+        self.operations = []
+
+    async def generate(self, prompt, operation="default", **kwargs):
+        self.operations.append(operation)
+        if operation == "free_text_batch_evaluation":
+            return LLMResponse(text=self.text, provider="test", model="test", latency_ms=0.0)
+        return LLMResponse(text='{"score": 1, "feedback": "individual"}', provider="test", model="test", latency_ms=0.0)
+
+
+def test_invalid_or_missing_batch_items_fall_back_to_individual_calls():
+    metrics.reset()
+    service = AIEvaluationService()
+    service.llm = ScriptedLLM(json.dumps({"evaluations": [
+        {"answer_id": "1", "score": 3, "feedback": "batch"},
+        {"answer_id": "2", "feedback": "fără scor"},
+        {"answer_id": "9", "score": 2, "feedback": "ID necunoscut"},
+    ]}))
+    service.enabled = True
+
+    results = asyncio.run(service.evaluate_free_text_batch("Q", ["a", "b", "c"], "criterii", 4.0))
+
+    assert [feedback for _, feedback, _ in results] == ["batch", "individual", "individual"]
+    assert results[0][2]["batch_size"] == 3
+    assert service.llm.operations == ["free_text_batch_evaluation"] + ["free_text_evaluation"] * 2
+    assert metrics.get("grading_batch_answers_total", outcome="individual") == 2
+
+
+def test_batch_grading_sends_far_fewer_prompt_tokens(tmp_path, monkeypatch):
+    metrics.reset()
+    service = AIEvaluationService()
+    service.llm = ReplayLLMClient(recordings_file=str(tmp_path / "rec.jsonl"), record=False, latency="fixed:0", failure_rate=0.0)
+    service.enabled = True
+    monkeypatch.setattr(grading_service, "get_ai_evaluation_service", lambda: service)
+    answers = [
+        grading_service.FreeTextAnswer(1, "Ce este fotosinteza?", f"Procesul prin care plantele {i}", "clorofila", 4.0)
+        for i in range(30)
+    ]
+
+    batched = asyncio.run(grading_service.grade_free_text_answers(answers, batch_size=30))
+    individual = asyncio.run(grading_service.grade_free_text_answers(answers, batch_size=1))
+
+    assert all(grade.error is None and grade.metadata["ai_generated"] for grade in batched + individual)
+    tokens = lambda operation: metrics.get("llm_tokens_total", provider="replay", operation=operation, kind="prompt")
+    assert tokens("free_text_evaluation") > 10 * tokens("free_text_batch_evaluation")
+
+
+def test_normalize_text_folds_case_whitespace_and_diacritics():
+    assert normalize_text("  Fotosinteză\n  CLOROFILĂ ") == "fotosinteza clorofila"
+    assert normalize_text("şi") == normalize_text("și") == "si"
+
+
+def test_identical_answers_reuse_the_cached_evaluation(db, make_quiz, monkeypatch, worker_db, submit, slow_evaluator):
+    quiz = make_quiz([("free_text", ["x"], 2.0)])
+    evaluator = slow_evaluator(delay=0)
+    monkeypatch.setattr(grading_service, "get_ai_evaluation_service", lambda: evaluator)
+    monkeypatch.setattr(grading_service.settings, "GRADING_BATCH_SIZE", 1)
+    question_id = str(quiz.questions[0].id)
+    grade = lambda *answers: asyncio.run(GradingWorker(workers=1).grade_attempts(
+        [submit(quiz, {question_id: answer}).id for answer in answers]
+    ))
+
+    grade("Clorofila", "  clorofilă ", "Altceva")
+    grade("CLOROFILA")
+
+    assert evaluator.answers == ["Clorofila", "Altceva"]
+    reports = db.query(AIEvaluationReport).order_by(AIEvaluationReport.id).all()
+    assert [r.cache_hit for r in reports] == [False, True, False, True]
+    assert {r.ai_score for r in reports} == {1.0}
+    assert db.query(EvaluationCacheEntry).count() == 2
+
+    # Editing the question's points or criteria invalidates the cache
+    quiz.questions[0].points = 4.0
+    bump_quiz_version(db, quiz.id)
+    db.commit()
+    grade("Clorofila")
+    assert evaluator.answers[-1] == "Clorofila"
+    assert db.query(EvaluationCacheEntry).count() == 1
+
+    invalidate_question(db, quiz.questions[0].id)
+    db.commit()
+    assert db.query(EvaluationCacheEntry).count() == 0
+
+
+def test_keyword_fallback_results_are_not_cached(db, make_quiz, monkeypatch, worker_db, submit):
+    quiz = make_quiz([("free_text", ["x"], 2.0)])
+    service = AIEvaluationService()
+    service.enabled = False  # keyword matching
+    monkeypatch.setattr(grading_service, "get_ai_evaluation_service", lambda: service)
+
+    attempt = submit(quiz, {str(quiz.questions[0].id): "clorofila"})
+    asyncio.run(GradingWorker(workers=1).grade_attempt(attempt.id))
+
+    assert db.query(AIEvaluationReport).one().cache_hit is False
+    assert db.query(EvaluationCacheEntry).count() == 0
+
+
+CLUSTER_ANSWERS = [
+    "Clorofila absoarbe lumina solara si produce oxigen",
+    "Clorofila absoarbe lumina solară și produce oxigen.",
+    "Clorofila absoarbe lumina solara si produce oxigenul",
+    "Clorofila nu absoarbe lumina solara si produce oxigen",  # negation: graded on its own
+    "Clorofila absoarbe lumina solara si elibereaza oxigen",  # borderline
+    "Plantele respira noaptea",
+]
+
+
+def test_near_duplicate_answers_are_clustered():
+    answers = [grading_service.FreeTextAnswer(7, "Q", text, "criterii", 2.0) for text in CLUSTER_ANSWERS]
+
+    clusters = cluster_answers(answers, threshold=0.85, borderline=0.6)
+
+    assert [(c.representative, [m for m, _ in c.members]) for c in clusters] == [(0, [1, 2]), (3, []), (4, []), (5, [])]
+    assert 4 in clusters[0].borderline
+    assert all(similarity >= 0.85 for _, similarity in clusters[0].members)
+    assert clusters[0].cluster_id.startswith("7:")
+
+
+@pytest.mark.parametrize("first, second", [
+    ("Viteza luminii este 300000 km/s", "Viteza luminii este 300 km/s"),
+    ("Aria cercului este pi ori raza la patrat", "Aria cercului este pi ori raza la cub"),
+    ("Temperatura minima a fost de -5 grade Celsius.", "Temperatura minima a fost de 5 grade Celsius."),
+])
+def test_answers_differing_in_a_decisive_token_are_not_clustered(first, second):
+    answers = [grading_service.FreeTextAnswer(7, "Q", text, "criterii", 2.0) for text in (first, second)]
+
+    clusters = cluster_answers(answers, threshold=0.5, borderline=0.5)
+
+    assert [(c.members, c.borderline) for c in clusters] == [([], [1]), ([], [])]  # Similar, graded apart
+
+
+def test_cluster_is_graded_once_and_reviewable(db, make_quiz, monkeypatch, worker_db, submit, slow_evaluator):
+    quiz = make_quiz([("free_text", ["x"], 2.0)])
+    evaluator = slow_evaluator(delay=0)
+    monkeypatch.setattr(grading_service, "get_ai_evaluation_service", lambda: evaluator)
+    monkeypatch.setattr(grading_service.settings, "GRADING_BATCH_SIZE", 1)
+    question = quiz.questions[0]
+    attempts = [submit(quiz, {str(question.id): text}) for text in CLUSTER_ANSWERS]
+
+    asyncio.run(GradingWorker(workers=1).grade_attempts([attempt.id for attempt in attempts]))
+
+    assert len(evaluator.answers) == 4
+    reports = db.query(AIEvaluationReport).order_by(AIEvaluationReport.quiz_attempt_id).all()
+    assert len(reports) == 6
+    assert len({r.cluster_id for r in reports[:3]}) == 1 and reports[0].cluster_id is not None
+    assert [r.cluster_id for r in reports[3:]] == [None, None, None]
+    assert reports[0].cluster_similarity == 1.0 and reports[1].cluster_similarity >= 0.85
+    db.expire_all()
+    assert all(attempt.score == 1.0 for attempt in db.query(QuizAttempt))
+
+    clusters = get_answer_clusters(question.id, db=db, current_user=db.get(User, 1))
+    assert [(c["size"], c["members"][1]["student_answer"]) for c in clusters] == [(3, CLUSTER_ANSWERS[1])]
+
+
+@pytest.mark.parametrize("answer, rule, score", [
+    ("   ", "empty", 0.0),
+    ("Plantele produc glucoză din CO2 și  apă folosind lumina!", "correct_answer", 4.0),
+    ("ce este fotosinteza", "question_copy", 0.0),
+])
+def test_trivial_answers_are_triaged_locally(answer, rule, score):
+    result = triage_answer(
+        "Ce este fotosinteza?",
+        answer,
+        "fotosinteza, clorofila",
+        4.0,
+        ["Plantele produc glucoza din CO2 si apa folosind lumina"]
+    )
+
+    assert (result.rule, result.score) == (rule, score)
+    assert result.metadata["method"] == "local_triage"
+
+
+@pytest.mark.parametrize("answer", [
+    "clorofila",
+    "plante",  # a single word may still be right
+    "Plantele transformă lumina în energie chimică",
+    "Plantele nu produc glucoza din CO2 si apa folosind lumina",
+    "Plantele produc glucoza din O2 si apa folosind lumina",
+])
+def test_ambiguous_answers_are_not_triaged(answer):
+    references = ["Plantele produc glucoza din CO2 si apa folosind lumina"]
+    assert triage_answer("Ce este fotosinteza?", answer, "fotosinteza, clorofila", 4.0, references) is None
+
+
+@pytest.mark.parametrize("answer, reference", [
+    ("-5", "5"),
+    ("−5", "5"),
+    ("x<5", "x>5"),
+    ("0,5", "0.5"),
+    ("1/2", "12"),
+])
+def test_answers_differing_in_a_sign_or_operator_are_not_full_marks(answer, reference):
+    assert triage_answer("Cât este x?", answer, "", 2.0, [reference]) is None
+    assert triage_answer("Cât este x?", f"{reference}.", "", 2.0, [reference]).rule == "correct_answer"
+
+
+def test_only_ambiguous_answers_reach_the_llm():
+    metrics.reset()
+    service = AIEvaluationService()
+    service.llm = ScriptedLLM(json.dumps({"evaluations": [{"answer_id": "1", "score": 2, "feedback": "batch"}]}))
+    service.enabled = True
+
+    results = asyncio.run(service.evaluate_free_text_batch(
+        "Ce este fotosinteza?",
+        ["", "Ce este fotosinteza?", "Procesul prin care plantele fac hrană", "apa si lumina"],
+        "clorofila",
+        4.0,
+        correct_answers=["Apă și lumină"]
+    ))
+
+    assert [score for score, _, _ in results] == [0.0, 0.0, 2.0, 4.0]
+    assert service.llm.operations == ["free_text_batch_evaluation"]
+    assert metrics.get("grading_triage_total", outcome="llm", rule="none") == 1
+    assert metrics.get("grading_triage_local_ratio") == 0.75
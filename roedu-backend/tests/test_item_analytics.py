@@ -0,0 +1,129 @@
+import json
+from datetime import datetime
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import insert
+
+from src.api.v1.quizzes import get_quiz_analytics
+from src.models.ai_evaluation_report import AIEvaluationReport
+from src.models.quiz import QuizAttempt
+from src.models.user import User
+from src.schemas.quiz_schema import QuizAnalyticsResponse
+from src.services import item_analytics
+from src.services.item_analytics import get_quiz_analytics as cached_analytics
+from src.utils.metrics import metrics
+
+QUESTIONS = [
+    ("single_choice", ["A"], 1.0),
+    ("multiple_choice", ["A", "C"], 2.0),
+    ("free_text", ["Clorofila"], 3.0),
+]
+
+
+def _quiz_with_attempts(db, make_quiz):
+    """
+    Four finished attempts, totals 6, 1, 2 and 0:
+    strong   A   [A, C]  free text graded 3/3
+    medium   A   [A]     -
+    weak     B   [A, C]  free text graded 0/3
+    blank    -   [D]     -
+    """
+    quiz = make_quiz(QUESTIONS)
+    single, multiple, free_text = (str(q.id) for q in quiz.questions)
+    answers = [
+        {single: ["A"], multiple: ["A", "C"], free_text: "Clorofila absoarbe lumina"},
+        {single: ["A"], multiple: ["A"]},
+        {single: ["B"], multiple: ["C", "A"], free_text: "Nu știu"},
+        {single: [], multiple: ["D"]},
+    ]
+    db.execute(insert(QuizAttempt), [
+        {"quiz_id": quiz.id, "student_id": 10 + i, "answers": json.dumps(row), "completed_at": datetime.utcnow()}
+        for i, row in enumerate(answers)
+    ])
+    attempt_ids = [attempt_id for (attempt_id,) in db.query(QuizAttempt.id).order_by(QuizAttempt.id)]
+    db.execute(insert(AIEvaluationReport), [
+        {"quiz_attempt_id": attempt_ids[i], "question_id": int(free_text), "student_id": 10 + i,
+         "ai_score": score, "reason": "Auto-evaluated by AI system"}
+        for i, score in ((0, 3.0), (2, 0.0))
+    ])
+    db.commit()
+    return quiz, attempt_ids
+
+
+@pytest.mark.parametrize("use_numpy", [True, False])
+def test_item_statistics(db, make_quiz, monkeypatch, use_numpy):
+    if use_numpy:
+        pytest.importorskip("numpy")
+    monkeypatch.setattr(item_analytics, "NUMPY_AVAILABLE", use_numpy)
+    quiz, _ = _quiz_with_attempts(db, make_quiz)
+
+    analytics = get_quiz_analytics(quiz.id, db=db, current_user=db.get(User, 1))
+    QuizAnalyticsResponse.model_validate(analytics)
+
+    assert (analytics.attempts, analytics.max_score, analytics.mean_score) == (4, 6.0, 2.25)
+    assert sum(analytics.score_histogram.counts) == 4
+    single, multiple, free_text = analytics.questions
+    assert [q.difficulty for q in analytics.questions] == [0.5, 0.5, 0.25]
+    assert [q.average_score for q in analytics.questions] == [0.5, 1.0, 0.75]
+    # Upper group: the 6-point attempt, lower group: the blank one
+    assert [q.discrimination for q in analytics.questions] == [1.0, 1.0, 1.0]
+
+    assert single.option_counts == {"A": 2, "B": 1, "C": 0}
+    assert (single.unanswered, single.other_answers) == (1, 0)
+    assert multiple.option_counts == {"A": 3, "B": 0, "C": 2}
+    assert (multiple.unanswered, multiple.other_answers) == (0, 1)
+    assert free_text.option_counts is None and free_text.unanswered == 2
+    assert free_text.histogram.counts[0] == 3 and free_text.histogram.counts[-1] == 1
+    assert free_text.histogram.bin_edges[0] == 0.0 and free_text.histogram.bin_edges[-1] == 3.0
+
+
+def test_analytics_are_recomputed_only_when_attempts_or_scores_change(db, make_quiz, count_queries):
+    quiz, attempt_ids = _quiz_with_attempts(db, make_quiz)
+    first = cached_analytics(db, quiz.id)
+
+    hits = metrics.get("analytics_cache_total", outcome="hit")
+    with count_queries(db.get_bind()) as statements:
+        assert cached_analytics(db, quiz.id) is first
+    assert len(statements) == 1  # The fingerprint
+    assert metrics.get("analytics_cache_total", outcome="hit") == hits + 1
+
+    db.add(QuizAttempt(quiz_id=quiz.id, student_id=2, answers="{}"))  # Still open
+    db.commit()
+    assert cached_analytics(db, quiz.id) is first
+
+    report = db.query(AIEvaluationReport).filter(AIEvaluationReport.quiz_attempt_id == attempt_ids[2]).one()
+    report.new_score = 3.0
+    report.reviewed_at = datetime.utcnow()
+    db.commit()
+    rescored = cached_analytics(db, quiz.id)
+    assert rescored is not first and rescored.questions[2].difficulty == 0.5
+
+    open_attempt = db.query(QuizAttempt).filter(QuizAttempt.completed_at.is_(None)).one()
+    open_attempt.completed_at = datetime.utcnow()
+    db.commit()
+    assert cached_analytics(db, quiz.id).attempts == 5
+
+
+def test_analytics_are_for_the_quiz_owner(db, make_quiz):
+    quiz = make_quiz(QUESTIONS)
+
+    with pytest.raises(HTTPException) as error:
+        get_quiz_analytics(quiz.id, db=db, current_user=db.get(User, 2))
+    assert error.value.status_code == 403
+
+    empty = get_quiz_analytics(quiz.id, db=db, current_user=db.get(User, 1))
+    assert empty.attempts == 0 and empty.mean_score is None
+    assert all(q.difficulty is None and q.discrimination is None for q in empty.questions)
+
+
+def test_pure_python_analytics_match_numpy(db, make_quiz):
+    pytest.importorskip("numpy")
+    quiz, _ = _quiz_with_attempts(db, make_quiz)
+    db.add(QuizAttempt(quiz_id=quiz.id, student_id=2, answers="{}", completed_at=datetime.utcnow()))
+    db.commit()
+
+    vectorized = item_analytics.compute_analytics(db, quiz.id, use_numpy=True)
+    python = item_analytics.compute_analytics(db, quiz.id, use_numpy=False)
+    python.computed_at = vectorized.computed_at
+    assert python == vectorized
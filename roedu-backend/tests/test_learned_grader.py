@@ -0,0 +1,129 @@
+import asyncio
+import json
+import random
+from datetime import datetime
+
+import pytest
+
+from src.api.v1.ai_evaluation_reports import get_learned_grader_accuracy
+from src.config import database
+from src.models.ai_evaluation_report import AIEvaluationReport, EvaluationStatus
+from src.models.quiz import QuizAttempt
+from src.models.user import User
+from src.services import grading_service, learned_grader
+from src.services.grading_service import FreeTextAnswer
+from src.services.learned_grader import CorrectedAnswer, get_learned_grader, save_models, train_models
+
+pytest.importorskip("sklearn")
+
+GOOD = "Fotosinteza este procesul prin care plantele folosesc lumina si clorofila {}"
+PARTIAL = "Plantele fac fotosinteza ca sa traiasca {}"
+POOR = "Nu stiu exact ce inseamna {}"
+
+
+def _answer(text, question_id=1, subject="Biologie"):
+    return FreeTextAnswer(question_id, "Ce este fotosinteza?", text, "fotosinteza, clorofila, lumina", 4.0, ["x"], subject)
+
+
+def _corrections(count=60, seed=0):
+    rng = random.Random(seed)
+    corrections = []
+    for i in range(count):
+        template, score = [(GOOD, 4.0), (PARTIAL, 2.0), (POOR, 0.0)][i % 3]
+        ai_score = min(4.0, max(0.0, score + rng.choice([-1.5, 1.5])))  # the AI is off, professors corrected it
+        corrections.append(CorrectedAnswer(_answer(template.format(i)), ai_score, score))
+    return corrections
+
+
+def test_models_are_trained_per_question_and_beat_the_ai():
+    models = train_models(_corrections(), min_samples=30)
+
+    assert set(models) == {"question:1"}
+    accuracy = models["question:1"].accuracy
+    assert accuracy["test_samples"] == 12
+    assert accuracy["mae"] < accuracy["ai_mae"]
+    assert models["question:1"].max_uncertainty == accuracy["max_uncertainty"] is not None
+    (good, _), (poor, _) = models["question:1"].predict([_answer(GOOD.format("nou")), _answer(POOR.format("nou"))])
+    assert good > 0.8 and poor < 0.2
+
+
+def test_only_confident_answers_to_trained_questions_skip_the_ai(monkeypatch, slow_evaluator):
+    save_models(train_models(_corrections(), min_samples=30), learned_grader.settings.LEARNED_GRADER_PATH)
+    evaluator = slow_evaluator(delay=0)
+    monkeypatch.setattr(grading_service, "get_ai_evaluation_service", lambda: evaluator)
+    monkeypatch.setattr(grading_service.settings, "GRADING_BATCH_SIZE", 1)
+    negated = "Fotosinteza nu este procesul prin care plantele folosesc lumina si clorofila"
+    answers = [
+        _answer(GOOD.format("a")),
+        _answer("", question_id=1),  # trivial: left to triage
+        _answer(GOOD.format("b"), question_id=2, subject="Fizica"),  # no model
+        _answer(GOOD.format("c"), question_id=3),  # same subject, but not a trained question
+        _answer(negated),  # the features cannot see the negation
+    ]
+
+    grades = asyncio.run(grading_service.grade_free_text_answers(answers))
+
+    assert [grade.metadata.get("method") for grade in grades] == ["learned_grader", None, None, None, None]
+    assert grades[0].score > 3.0
+    assert sorted(evaluator.answers) == sorted(["", GOOD.format("b"), GOOD.format("c"), negated])
+
+
+def test_models_whose_held_out_error_is_too_high_score_nothing():
+    rng = random.Random(1)
+    noisy = [
+        CorrectedAnswer(_answer(GOOD.format(i)), 2.0, rng.choice([0.0, 4.0]))  # professors disagree at random
+        for i in range(60)
+    ]
+    model = train_models(noisy, min_samples=30)["question:1"]
+
+    assert model.max_uncertainty is None and model.accuracy["confident_share"] == 0.0
+    save_models({model.key: model}, learned_grader.settings.LEARNED_GRADER_PATH)
+    assert get_learned_grader().grade([_answer(GOOD.format("x"))]) == [None]
+
+
+def test_training_from_professor_corrections_and_accuracy_report(db, make_quiz, session_factory, monkeypatch):
+    monkeypatch.setattr(database, "SessionLocal", session_factory)
+    quiz = make_quiz([("free_text", ["x"], 4.0)])
+    question = quiz.questions[0]
+    for correction in _corrections(30):
+        attempt = QuizAttempt(
+            quiz_id=quiz.id,
+            student_id=2,
+            answers=json.dumps({str(question.id): correction.answer.student_answer}),
+            completed_at=datetime.utcnow()
+        )
+        db.add(attempt)
+        db.flush()
+        db.add(AIEvaluationReport(
+            quiz_attempt_id=attempt.id,
+            question_id=question.id,
+            student_id=2,
+            ai_score=correction.ai_score,
+            ai_model_version="gemini-2.5-flash",
+            reason="Auto-evaluated by AI system",
+            status=EvaluationStatus.RESOLVED,
+            new_score=correction.professor_score,
+            reviewed_at=datetime.utcnow()
+        ))
+        # placeholder from a professor editing a score the AI never produced
+        db.add(AIEvaluationReport(
+            quiz_attempt_id=attempt.id,
+            question_id=question.id,
+            student_id=2,
+            ai_score=0,
+            ai_feedback="Manual edit by professor",
+            reason="Manual edit by professor",
+            status=EvaluationStatus.RESOLVED,
+            reviewed_at=datetime.utcnow()
+        ))
+    db.commit()
+    assert len(learned_grader.load_corrections(db)) == 30
+
+    report = learned_grader.train_and_save(min_samples=30)
+
+    assert [model["key"] for model in report["models"]] == [f"question:{question.id}"]
+    assert get_learned_grader().model_for(_answer("?", question_id=question.id)) is not None
+    accuracy = get_learned_grader_accuracy(db=db, current_user=db.get(User, 1))
+    assert accuracy["available"] and accuracy["test_samples"] == 6
+    assert accuracy["mae"] < accuracy["ai_mae"]
+    assert accuracy["live_corrections"] == 0
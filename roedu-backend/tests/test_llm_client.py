@@ -0,0 +1,43 @@
+import asyncio
+
+import httpx
+import pytest
+
+from src.services import llm_client
+from src.services.llm_client import GeminiClient, LLMTimeoutError
+
+
+def _use_transport(monkeypatch, handler):
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    monkeypatch.setattr(llm_client, "_http_client", client)
+
+
+def _gemini(monkeypatch):
+    monkeypatch.setattr(llm_client.settings, "GEMINI_API_KEY", "test-key")
+    return GeminiClient()
+
+
+def test_gemini_generate_parses_text_and_usage(monkeypatch):
+    def handler(request):
+        assert request.headers["x-goog-api-key"] == "test-key"
+        assert request.url.path.endswith(":generateContent")
+        return httpx.Response(200, json={
+            "candidates": [{"content": {"parts": [{"text": "{\"score\": "}, {"text": "1}"}]}}],
+            "usageMetadata": {"promptTokenCount": 12, "candidatesTokenCount": 3}
+        })
+
+    _use_transport(monkeypatch, handler)
+    response = asyncio.run(_gemini(monkeypatch).generate("prompt", operation="free_text_evaluation"))
+
+    assert response.text == "{\"score\": 1}"
+    assert (response.prompt_tokens, response.completion_tokens) == (12, 3)
+
+
+def test_generate_times_out(monkeypatch):
+    async def handler(request):
+        await asyncio.sleep(1)
+        return httpx.Response(200, json={})
+
+    _use_transport(monkeypatch, handler)
+    with pytest.raises(LLMTimeoutError):
+        asyncio.run(_gemini(monkeypatch).generate("prompt", timeout=0.05))
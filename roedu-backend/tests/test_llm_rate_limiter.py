@@ -0,0 +1,203 @@
+import asyncio
+import sqlite3
+import time
+
+import pytest
+
+from src.services import llm_rate_limiter
+from src.services.llm_client import LLMCircuitOpenError, LLMClient, LLMError, LLMRateLimitedError, LLMResponse
+from src.services.llm_rate_limiter import (
+    LLMPriority,
+    SQLiteRateLimiter,
+    acquire,
+    get_rate_limiter,
+    llm_priority,
+    settle
+)
+from src.services import llm_resilience
+from src.services.llm_resilience import get_circuit_breaker, get_latency_tracker
+
+
+class CountingClient(LLMClient):
+    provider = "fake"
+
+    def __init__(self):
+        super().__init__(model="fake", api_key="key", default_timeout=2.0)
+        self.calls = 0
+
+    async def _generate(self, request):
+        self.calls += 1
+        return LLMResponse(text="ok", provider=self.provider, model=self.model, latency_ms=0.0)
+
+
+class FailingClient(LLMClient):
+    """Every call fails, the first one after `first_delay` seconds"""
+    provider = "fake"
+
+    def __init__(self, first_delay=0.0):
+        super().__init__(model="fake", api_key="key", default_timeout=2.0)
+        self.first_delay = first_delay
+        self.calls = 0
+
+    async def _generate(self, request):
+        self.calls += 1
+        if self.calls == 1:
+            await asyncio.sleep(self.first_delay)
+        raise LLMError("503")
+
+
+@pytest.fixture
+def limits(monkeypatch):
+    def _set(rpm="", tpm=""):
+        monkeypatch.setattr(llm_rate_limiter.settings, "LLM_RPM_LIMITS", rpm)
+        monkeypatch.setattr(llm_rate_limiter.settings, "LLM_TPM_LIMITS", tpm)
+    return _set
+
+
+def _empty_bucket(provider):
+    limiter = get_rate_limiter()
+    with limiter._transaction() as conn:
+        limiter._save(conn, provider, 0, 0, time.time())
+
+
+def test_queued_calls_are_served_by_priority(limits):
+    limits(rpm="fake=600")  # one request every 0.1s once the bucket is empty
+    _empty_bucket("fake")
+    served = []
+
+    async def call(priority):
+        with llm_priority(priority):
+            await acquire("fake", "quiz_generation", 10)
+        served.append(priority)
+
+    async def scenario():
+        tasks = []
+        for priority in (LLMPriority.BULK, LLMPriority.PRACTICE_GENERATION, LLMPriority.EXAM_GRADING):
+            tasks.append(asyncio.create_task(call(priority)))
+            await asyncio.sleep(0.02)
+        await asyncio.gather(*tasks)
+
+    asyncio.run(scenario())
+
+    assert served == [LLMPriority.EXAM_GRADING, LLMPriority.PRACTICE_GENERATION, LLMPriority.BULK]
+
+
+def test_budget_is_shared_between_processes(limits):
+    limits(rpm="fake=3")
+    # Two limiter instances on one file stand in for two worker processes
+    workers = [get_rate_limiter(), SQLiteRateLimiter(get_rate_limiter().path)]
+
+    waits = []
+    for i in range(4):
+        limiter = workers[i % 2]
+        waiter_id = limiter.enqueue("fake", LLMPriority.EXAM_GRADING)
+        waits.append(limiter.try_acquire(waiter_id, "fake", 10, 3, 0))
+
+    assert waits[:3] == [0.0, 0.0, 0.0]
+    assert waits[3] == pytest.approx(20, rel=0.05)  # 3 RPM: next request in ~20s
+
+
+def test_reserved_tokens_are_corrected_with_actual_usage(limits):
+    limits(tpm="fake=1000")
+
+    async def scenario():
+        grant = await acquire("fake", "answer_question", 1000)
+        await settle(grant, 100)  # only 100 of the 1000 estimated tokens were used
+        started = time.monotonic()
+        await acquire("fake", "answer_question", 800)
+        return time.monotonic() - started
+
+    assert asyncio.run(scenario()) < 0.1
+
+
+def test_calls_queue_then_give_up_after_max_wait(limits, monkeypatch):
+    limits(rpm="fake=60")
+    monkeypatch.setattr(llm_rate_limiter.settings, "LLM_RATE_LIMIT_MAX_WAIT_SECONDS", 0.5)
+    _empty_bucket("fake")
+    client = CountingClient()
+
+    with pytest.raises(LLMRateLimitedError):
+        asyncio.run(client.generate("p", operation="free_text_evaluation"))
+    assert client.calls == 0
+    assert llm_rate_limiter.rate_limit_status()["queued"] == {}
+
+
+def test_unlisted_providers_are_not_limited(limits):
+    limits(rpm="gemini=1")
+    client = CountingClient()
+
+    async def scenario():
+        for _ in range(5):
+            await client.generate("p")
+
+    asyncio.run(scenario())
+    assert client.calls == 5
+
+
+def test_waiters_behind_the_head_do_not_take_the_write_lock(limits):
+    limits(rpm="fake=3")
+    limiter = get_rate_limiter()
+    head = limiter.enqueue("fake", LLMPriority.EXAM_GRADING)
+    behind = limiter.enqueue("fake", LLMPriority.BULK)
+
+    other_process = sqlite3.connect(limiter.path, timeout=0, isolation_level=None)
+    other_process.execute("BEGIN IMMEDIATE")  # Holds the write lock
+    try:
+        started = time.monotonic()
+        assert limiter.try_acquire(behind, "fake", 10, 3, 0) is None
+        assert time.monotonic() - started < 0.5
+    finally:
+        other_process.execute("ROLLBACK")
+        other_process.close()
+
+    assert limiter.try_acquire(head, "fake", 10, 3, 0) == 0.0
+    assert limiter.try_acquire(behind, "fake", 10, 3, 0) == 0.0
+
+
+def test_open_breaker_takes_no_budget(limits):
+    limits(rpm="fake=3")
+    breaker = get_circuit_breaker("fake")
+    for _ in range(breaker.failure_threshold):
+        breaker.record_failure()
+    client = CountingClient()
+
+    with pytest.raises(LLMCircuitOpenError):
+        asyncio.run(client.generate("p"))
+    assert llm_rate_limiter.rate_limit_status()["buckets"] == {}
+
+
+def test_streams_return_the_unused_output_budget(limits):
+    limits(tpm="fake=5000")
+    client = CountingClient()
+
+    async def scenario():
+        return [chunk async for chunk in client.stream("p" * 400)]
+
+    assert asyncio.run(scenario()) == ["ok"]
+    # 100 prompt tokens used, not the 1124 reserved
+    assert llm_rate_limiter.rate_limit_status()["buckets"]["fake"]["tokens_available"] == pytest.approx(4900, abs=2)
+
+
+def _tokens_available(provider):
+    return llm_rate_limiter.rate_limit_status()["buckets"][provider]["tokens_available"]
+
+
+def test_failed_calls_are_charged_their_prompt(limits, monkeypatch):
+    limits(tpm="fake=10000")
+
+    with pytest.raises(LLMError):
+        asyncio.run(FailingClient().generate("p" * 400))
+    # 100 prompt tokens charged, the output budget returned
+    assert _tokens_available("fake") == pytest.approx(9900, abs=20)
+
+    monkeypatch.setattr(llm_resilience.settings, "LLM_HEDGE_OPERATIONS", "free_text_evaluation")
+    monkeypatch.setattr(llm_resilience.settings, "LLM_HEDGE_MIN_DELAY_SECONDS", 0.02)
+    tracker = get_latency_tracker("fake", "free_text_evaluation")
+    for _ in range(llm_resilience.MIN_LATENCY_SAMPLES):
+        tracker.record(0.01)
+    client = FailingClient(first_delay=0.1)
+
+    with pytest.raises(LLMError):
+        asyncio.run(client.generate("p" * 400, operation="free_text_evaluation"))
+    assert client.calls == 2  # Hedged, and both requests failed
+    assert _tokens_available("fake") == pytest.approx(9700, abs=40)
@@ -0,0 +1,44 @@
+import asyncio
+
+import pytest
+
+from src.services.ai_evaluation_service import AIEvaluationService
+from src.services.llm_client import LLMError
+from src.services.llm_replay import ReplayLLMClient
+from src.services.quiz_generation_service import QuizGenerationService
+
+
+def _replay_client(tmp_path, **kwargs):
+    options = {"latency": "fixed:0", "failure_rate": 0.0, "seed": 7}
+    options.update(kwargs)
+    return ReplayLLMClient(recordings_file=str(tmp_path / "rec.jsonl"), record=False, **options)
+
+
+def test_replay_quiz_generation_is_schema_valid_and_deterministic(tmp_path):
+    service = QuizGenerationService()
+    service.llm, service.enabled = _replay_client(tmp_path), True
+
+    generate = lambda: asyncio.run(service.generate_quiz_from_material(
+        material_title="Fotosinteza", material_content="x" * 40, subject="Biologie", grade_level=9
+    ))
+    first, second = generate(), generate()
+
+    assert first == second
+    assert [q["question_type"] for q in first["questions"]] == ["single_choice", "multiple_choice", "free_text"]
+    assert first["grade_level"] == 9
+
+
+def test_replay_evaluation_goes_through_the_real_parser(tmp_path):
+    service = AIEvaluationService()
+    service.llm, service.enabled = _replay_client(tmp_path), True
+
+    score, _, metadata = asyncio.run(service.evaluate_free_text_answer("Ce este?", "Un raspuns", "criterii", 4.0))
+
+    assert 0 < score <= 4.0
+    assert metadata["ai_generated"] is True
+
+
+def test_replay_injects_failures(tmp_path):
+    client = _replay_client(tmp_path, failure_rate=1.0)
+    with pytest.raises(LLMError):
+        asyncio.run(client.generate("prompt", operation="answer_question"))
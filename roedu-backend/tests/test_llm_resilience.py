@@ -0,0 +1,145 @@
+import asyncio
+
+import pytest
+
+from src.services import llm_resilience
+from src.services.ai_evaluation_service import AIEvaluationService
+from src.services.llm_client import LLMCircuitOpenError, LLMClient, LLMError, LLMResponse, LLMTimeoutError
+from src.services.llm_resilience import adaptive_timeout, get_circuit_breaker, get_latency_tracker, resilience_status
+from src.utils.metrics import metrics
+
+
+class FakeClient(LLMClient):
+    provider = "fake"
+
+    def __init__(self, *delays_or_errors):
+        super().__init__(model="fake", api_key="key", default_timeout=2.0)
+        self.script = list(delays_or_errors)
+        self.calls = 0
+
+    async def _generate(self, request):
+        step = self.script[min(self.calls, len(self.script) - 1)]
+        self.calls += 1
+        if isinstance(step, Exception):
+            raise step
+        await asyncio.sleep(step)
+        return LLMResponse(text=f"call {self.calls}", provider=self.provider, model=self.model, latency_ms=0.0)
+
+
+@pytest.fixture
+def breaker_settings(monkeypatch):
+    monkeypatch.setattr(llm_resilience.settings, "LLM_BREAKER_FAILURES", 2)
+    monkeypatch.setattr(llm_resilience.settings, "LLM_BREAKER_RESET_SECONDS", 0.05)
+    monkeypatch.setattr(llm_resilience.settings, "LLM_HEDGE_OPERATIONS", "")
+
+
+def test_breaker_fails_fast_then_recovers_after_trial_call(breaker_settings):
+    client = FakeClient(LLMError("503"), LLMError("503"), 0)
+
+    async def scenario():
+        for _ in range(2):
+            with pytest.raises(LLMError):
+                await client.generate("p")
+        with pytest.raises(LLMCircuitOpenError):
+            await client.generate("p")
+        calls_while_open = client.calls
+        await asyncio.sleep(0.06)
+        response = await client.generate("p")  # half-open trial
+        return calls_while_open, response
+
+    calls_while_open, response = asyncio.run(scenario())
+
+    assert calls_while_open == 2
+    assert response.text == "call 3"
+    assert resilience_status()["circuit_breakers"]["fake"]["state"] == "closed"
+
+
+def test_adaptive_timeout_follows_p95_within_slo(monkeypatch):
+    monkeypatch.setattr(llm_resilience.settings, "LLM_SLO_SECONDS", "free_text_evaluation=15")
+    monkeypatch.setattr(llm_resilience.settings, "LLM_MIN_TIMEOUT_SECONDS", 5)
+    monkeypatch.setattr(llm_resilience.settings, "LLM_TIMEOUT_P95_MULTIPLIER", 2.0)
+
+    assert adaptive_timeout("fake", "free_text_evaluation", 30) == 15  # no samples yet: SLO
+
+    tracker = get_latency_tracker("fake", "free_text_evaluation")
+    for _ in range(50):
+        tracker.record(4.0)
+    assert adaptive_timeout("fake", "free_text_evaluation", 30) == 8.0
+    for _ in range(50):
+        tracker.record(1.0)
+    assert adaptive_timeout("fake", "free_text_evaluation", 30) == 8.0  # p95 still 4s
+    for _ in range(200):
+        tracker.record(1.0)
+    assert adaptive_timeout("fake", "free_text_evaluation", 30) == 5  # clamped to the minimum
+
+
+def test_timeout_grows_and_breaker_closes_when_latency_steps_up(breaker_settings, monkeypatch):
+    monkeypatch.setattr(llm_resilience.settings, "LLM_SLO_SECONDS", "free_text_evaluation=1.0")
+    monkeypatch.setattr(llm_resilience.settings, "LLM_MIN_TIMEOUT_SECONDS", 0.02)
+    monkeypatch.setattr(llm_resilience.settings, "LLM_TIMEOUT_P95_MULTIPLIER", 2.0)
+    tracker = get_latency_tracker("fake", "free_text_evaluation")
+    for _ in range(llm_resilience.MIN_LATENCY_SAMPLES):
+        tracker.record(0.01)
+    learned = adaptive_timeout("fake", "free_text_evaluation", 30)
+    client = FakeClient(0.1)  # Now slower than the learned timeout
+
+    async def scenario():
+        for _ in range(2):
+            with pytest.raises(LLMTimeoutError):
+                await client.generate("p", operation="free_text_evaluation")
+        await asyncio.sleep(0.06)
+        return await client.generate("p", operation="free_text_evaluation")  # Trial with the whole SLO
+
+    response = asyncio.run(scenario())
+
+    assert learned == 0.02
+    assert response.text == "call 3"
+    assert get_circuit_breaker("fake").state == "closed"
+    assert adaptive_timeout("fake", "free_text_evaluation", 30) > learned
+
+
+def test_slow_grading_call_is_hedged_once_its_p95_is_known(monkeypatch):
+    metrics.reset()
+    monkeypatch.setattr(llm_resilience.settings, "LLM_HEDGE_OPERATIONS", "free_text_evaluation")
+    monkeypatch.setattr(llm_resilience.settings, "LLM_HEDGE_MIN_DELAY_SECONDS", 0.05)
+
+    cold = FakeClient(0.1)
+    asyncio.run(cold.generate("p", operation="free_text_evaluation"))
+    assert cold.calls == 1  # No p95 yet: not hedged
+
+    tracker = get_latency_tracker("fake", "free_text_evaluation")
+    for _ in range(llm_resilience.MIN_LATENCY_SAMPLES):
+        tracker.record(0.01)
+    client = FakeClient(1.0, 0.01)
+
+    response = asyncio.run(client.generate("p", operation="free_text_evaluation"))
+
+    assert response.text == "call 2"
+    assert response.latency_ms < 500
+    assert metrics.get("llm_hedge_wins_total", provider="fake", operation="free_text_evaluation") == 1
+
+
+def test_open_breaker_grades_with_keyword_fallback(breaker_settings):
+    service = AIEvaluationService()
+    service.llm, service.enabled = FakeClient(LLMError("503")), True
+
+    async def grade():
+        return [await service.evaluate_free_text_answer("Q", "clorofila", "clorofila", 2.0) for _ in range(3)]
+
+    results = asyncio.run(grade())
+
+    assert all(metadata["method"] == "keyword_matching" for _, _, metadata in results)
+    assert service.llm.calls == 2
+
+
+def test_streams_use_the_adaptive_timeout_and_record_their_latency(monkeypatch):
+    monkeypatch.setattr(llm_resilience.settings, "LLM_SLO_SECONDS", "quiz_generation=0.05")
+    monkeypatch.setattr(llm_resilience.settings, "LLM_MIN_TIMEOUT_SECONDS", 0.01)
+
+    async def collect(client):
+        return [chunk async for chunk in client.stream("p", operation="quiz_generation")]
+
+    assert asyncio.run(collect(FakeClient(0.01))) == ["call 1"]
+    assert len(get_latency_tracker("fake", "quiz_generation")) == 1
+    with pytest.raises(LLMTimeoutError):
+        asyncio.run(collect(FakeClient(0.2)))  # Slower than the SLO
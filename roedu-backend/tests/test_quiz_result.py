@@ -0,0 +1,51 @@
+import asyncio
+
+from src.api.v1.quizzes import RESULT_QUERY_BUDGET, get_quiz_result
+from src.models.attempt_question_score import AttemptQuestionScore
+from src.models.user import User
+from src.services import grading_service
+from src.services.grading_worker import GradingWorker
+from src.services.scoring import clear_answer_keys
+
+
+def _graded_attempt(db, make_quiz, monkeypatch, submit, slow_evaluator):
+    quiz = make_quiz([("single_choice", ["A"], 1.0), ("free_text", ["x"], 2.0)] * 10)
+    monkeypatch.setattr(grading_service, "get_ai_evaluation_service", lambda: slow_evaluator(delay=0))
+    attempt = submit(quiz, {
+        str(question.id): ["A"] if question.question_type == "single_choice" else "Clorofila"
+        for question in quiz.questions
+    })
+    asyncio.run(GradingWorker(workers=1).grade_attempts([attempt.id]))
+    return quiz, attempt.id
+
+
+def test_result_stays_within_its_query_budget(db, make_quiz, monkeypatch, worker_db, submit, slow_evaluator, session_factory, count_queries):
+    _, attempt_id = _graded_attempt(db, make_quiz, monkeypatch, submit, slow_evaluator)
+    clear_answer_keys()
+
+    for budget in (RESULT_QUERY_BUDGET, RESULT_QUERY_BUDGET - 1):  # Cold, then cached answer key
+        session = session_factory()
+        try:
+            student = session.get(User, 2)  # Loaded by the auth dependency in the API
+            with count_queries(session.get_bind()) as statements:
+                result = get_quiz_result(attempt_id, db=session, current_user=student)
+        finally:
+            session.close()
+        assert len(statements) <= budget, statements
+
+    assert result["attempt"]["student_email"] == "elev@roedu.ro"
+    assert len(result["question_scores"]) == len(result["ai_evaluations"]) * 2 == 20
+    assert set(result["question_scores"].values()) == {1.0}
+
+
+def test_result_of_attempt_without_stored_scores(db, make_quiz, monkeypatch, worker_db, submit, slow_evaluator):
+    _, attempt_id = _graded_attempt(db, make_quiz, monkeypatch, submit, slow_evaluator)
+    stored = get_quiz_result(attempt_id, db=db, current_user=db.get(User, 2))
+
+    db.query(AttemptQuestionScore).delete()
+    db.commit()
+    db.expire_all()
+
+    rescored = get_quiz_result(attempt_id, db=db, current_user=db.get(User, 2))
+    assert rescored["question_scores"] == stored["question_scores"]
+    assert rescored["ai_evaluations"] == stored["ai_evaluations"]
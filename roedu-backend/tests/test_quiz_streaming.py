@@ -0,0 +1,112 @@
+import asyncio
+import json
+
+import httpx
+
+from src.api.v1 import quizzes
+from src.config import database
+from src.models.material import Material
+from src.models.quiz import Quiz
+from src.services import llm_client
+from src.services import quiz_generation_service
+from src.services.llm_client import GeminiClient
+from src.services.llm_replay import ReplayLLMClient
+from src.services.quiz_generation_service import QuizGenerationService
+from src.utils.json_stream import JSONArrayItemStream
+
+DOCUMENT = (
+    '```json\n{"title": "Test {x}", "questions": ['
+    '{"question_text": "Ce face \\"}\\"?", "options": ["[a]", "b"], "correct_answers": ["b"]},'
+    '{"question_text": "Q2", "options": null, "correct_answers": ["k"]}'
+    '], "grade_level": 10}\n```'
+)
+
+
+def test_array_items_are_emitted_as_soon_as_they_close():
+    parser = JSONArrayItemStream("questions")
+    emitted_at = []
+    for index, char in enumerate(DOCUMENT):
+        for item in parser.feed(char):
+            emitted_at.append((index, item["question_text"]))
+
+    first_end = DOCUMENT.index('["b"]}') + len('["b"]}') - 1
+    assert emitted_at[0] == (first_end, 'Ce face "}"?')
+    assert [text for _, text in emitted_at] == ['Ce face "}"?', "Q2"]
+    assert parser.document()["grade_level"] == 10
+
+
+def test_gemini_stream_reads_sse_chunks(monkeypatch):
+    def handler(request):
+        assert request.url.path.endswith(":streamGenerateContent")
+        assert request.url.params["alt"] == "sse"
+        events = "".join(
+            f"data: {json.dumps({'candidates': [{'content': {'parts': [{'text': text}]}}]})}\n\n"
+            for text in ["Bună", " ziua"]
+        )
+        return httpx.Response(200, text=events, headers={"content-type": "text/event-stream"})
+
+    monkeypatch.setattr(llm_client, "_http_client", httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+    monkeypatch.setattr(llm_client.settings, "GEMINI_API_KEY", "test-key")
+
+    async def collect():
+        return [chunk async for chunk in GeminiClient().stream("prompt")]
+
+    assert asyncio.run(collect()) == ["Bună", " ziua"]
+
+
+def _parse_events(body):
+    events = []
+    for block in body.strip().split("\n\n"):
+        event, data = block.split("\n")
+        events.append((event[len("event: "):], json.loads(data[len("data: "):])))
+    return events
+
+
+def test_streamed_generation_persists_questions_incrementally(db, session_factory, tmp_path, monkeypatch):
+    service = QuizGenerationService()
+    service.llm = ReplayLLMClient(
+        recordings_file=str(tmp_path / "rec.jsonl"), record=False, latency="fixed:0", failure_rate=0.0, seed=1
+    )
+    service.enabled = True
+    monkeypatch.setattr(quiz_generation_service, "get_quiz_generation_service", lambda: service)
+    monkeypatch.setattr(database, "SessionLocal", session_factory)
+
+    material = Material(id=1, title="Fotosinteza", subject="Biologie", grade_level=9, content="x" * 50, professor_id=1)
+
+    async def collect():
+        body = ""
+        saved_before_done = []
+        async for event in quizzes._quiz_generation_events(material, material.content, 1, None):
+            body += event
+            if event.startswith("event: question"):
+                saved_before_done.append(len(db.query(Quiz).one().questions))
+                db.expire_all()
+        return body, saved_before_done
+
+    body, saved_before_done = asyncio.run(collect())
+    events = _parse_events(body)
+
+    assert [name for name, _ in events] == ["quiz", "question", "question", "question", "done"]
+    assert saved_before_done == [1, 2, 3]
+    assert events[-1][1]["question_count"] == 3
+    assert db.query(Quiz).one().title == "Test Biologie - Fotosinteza"
+
+
+def test_failed_stream_removes_empty_quiz(db, session_factory, tmp_path, monkeypatch):
+    service = QuizGenerationService()
+    service.llm = ReplayLLMClient(
+        recordings_file=str(tmp_path / "rec.jsonl"), record=False, latency="fixed:0", failure_rate=1.0, seed=1
+    )
+    service.enabled = True
+    monkeypatch.setattr(quiz_generation_service, "get_quiz_generation_service", lambda: service)
+    monkeypatch.setattr(database, "SessionLocal", session_factory)
+
+    material = Material(id=1, title="Fotosinteza", subject="Biologie", grade_level=9, content="x" * 50, professor_id=1)
+
+    async def collect():
+        return "".join([event async for event in quizzes._quiz_generation_events(material, material.content, 1, None)])
+
+    events = _parse_events(asyncio.run(collect()))
+
+    assert [name for name, _ in events] == ["quiz", "error"]
+    assert db.query(Quiz).count() == 0
@@ -0,0 +1,153 @@
+import asyncio
+
+import pytest
+from fastapi import BackgroundTasks, HTTPException
+from sqlalchemy import event, func
+
+from src.api.v1.ai_evaluation_reports import recalculate_attempt_score, start_question_regrade
+from src.api.v1.quizzes import submit_quiz_attempt, update_question
+from src.models.ai_evaluation_report import AIEvaluationReport
+from src.models.attempt_question_score import AttemptQuestionScore
+from src.models.evaluation_cache import EvaluationCacheEntry
+from src.models.quiz import QuizAttempt
+from src.models.regrade_job import RegradeJob
+from src.models.user import User
+from src.schemas.quiz_schema import QuestionUpdate, QuizAttemptCreate
+from src.services import grading_service
+from src.services.grading_worker import GradingWorker
+from src.services.regrade_service import cancel_regrade_job, create_regrade_job, run_regrade_job
+
+ANSWERS = [
+    "Plantele transformă lumina în energie",
+    "Clorofila absoarbe lumina solară",
+    "Fotosinteza produce oxigen și glucoză",
+    "Are loc în cloroplaste, ziua",
+    "Dioxidul de carbon devine zahăr",
+]
+
+
+@pytest.fixture
+def full_marks(slow_evaluator):
+    """Evaluator giving full marks under the new criteria"""
+    class FullMarks(slow_evaluator):
+        async def evaluate_free_text_answer(self, question_text, student_answer, criteria, max_score, question_type, **kwargs):
+            await super().evaluate_free_text_answer(question_text, student_answer, criteria, max_score, question_type)
+            return max_score, "Corect după noile criterii", {"version": "test", "ai_generated": True}
+    return FullMarks
+
+
+def _graded_quiz(db, make_quiz, monkeypatch, submit, slow_evaluator):
+    """Quiz whose 5 attempts were graded (1 + 1 of 3 points each), the first one overridden to 3/3"""
+    quiz = make_quiz([("single_choice", ["A"], 1.0), ("free_text", ["x"], 2.0)])
+    question = quiz.questions[1]
+    monkeypatch.setattr(grading_service, "get_ai_evaluation_service", lambda: slow_evaluator(delay=0))
+    monkeypatch.setattr(grading_service.settings, "GRADING_BATCH_SIZE", 1)
+    attempts = [
+        submit(quiz, {str(quiz.questions[0].id): ["A"], str(question.id): text}) for text in ANSWERS
+    ]
+    asyncio.run(GradingWorker(workers=1).grade_attempts([attempt.id for attempt in attempts]))
+
+    override = db.query(AIEvaluationReport).filter(AIEvaluationReport.quiz_attempt_id == attempts[0].id).one()
+    override.new_score = 2.0
+    db.commit()
+    recalculate_attempt_score(db, attempts[0].id)
+    db.expire_all()
+    return quiz, question
+
+
+def test_regrade_updates_reports_and_totals_but_keeps_overrides(db, make_quiz, monkeypatch, worker_db, submit, slow_evaluator, full_marks):
+    quiz, question = _graded_quiz(db, make_quiz, monkeypatch, submit, slow_evaluator)
+    assert [attempt.score for attempt in db.query(QuizAttempt).order_by(QuizAttempt.id)] == [3.0, 2.0, 2.0, 2.0, 2.0]
+    assert db.query(EvaluationCacheEntry).count() == 5
+
+    update_question(question.id, QuestionUpdate(evaluation_criteria="fotosinteza, lumina, oxigen"), db=db, current_user=db.get(User, 1))
+    assert db.query(EvaluationCacheEntry).count() == 0
+
+    evaluator = full_marks(delay=0)
+    monkeypatch.setattr(grading_service, "get_ai_evaluation_service", lambda: evaluator)
+    attempt_updates = []
+
+    def count_updates(conn, cursor, statement, parameters, context, executemany):
+        if statement.startswith("UPDATE quiz_attempts"):
+            attempt_updates.append(executemany)
+    engine = db.get_bind()
+    event.listen(engine, "before_cursor_execute", count_updates)
+    try:
+        job = create_regrade_job(db, question, created_by=1)
+        summary = asyncio.run(run_regrade_job(job.id, batch_size=2))
+    finally:
+        event.remove(engine, "before_cursor_execute", count_updates)
+
+    assert (summary["status"], summary["processed"], summary["updated"], summary["overridden"]) == ("completed", 5, 5, 1)
+    assert summary["progress"] == 1.0
+    assert len(evaluator.answers) == 5
+    assert len(attempt_updates) == 3  # one UPDATE statement per batch
+    db.expire_all()
+    assert [attempt.score for attempt in db.query(QuizAttempt).order_by(QuizAttempt.id)] == [3.0] * 5
+    reports = db.query(AIEvaluationReport).order_by(AIEvaluationReport.quiz_attempt_id).all()
+    assert all(report.ai_score == 2.0 and report.ai_feedback == "Corect după noile criterii" for report in reports)
+    assert reports[0].new_score == 2.0
+    stored = db.query(AttemptQuestionScore).filter(AttemptQuestionScore.question_id == question.id)
+    assert [(row.score, row.source) for row in stored.order_by(AttemptQuestionScore.attempt_id)] == (
+        [(2.0, "professor")] + [(2.0, "ai")] * 4
+    )
+
+
+def test_regrade_can_be_cancelled_between_batches(db, make_quiz, monkeypatch, worker_db, submit, slow_evaluator, full_marks, session_factory):
+    quiz, question = _graded_quiz(db, make_quiz, monkeypatch, submit, slow_evaluator)
+    job = create_regrade_job(db, question)
+
+    class CancellingEvaluator(full_marks):
+        async def evaluate_free_text_answer(self, *args, **kwargs):
+            session = session_factory()
+            try:
+                cancel_regrade_job(session, session.get(RegradeJob, job.id))
+            finally:
+                session.close()
+            return await super().evaluate_free_text_answer(*args, **kwargs)
+
+    monkeypatch.setattr(grading_service, "get_ai_evaluation_service", lambda: CancellingEvaluator(delay=0))
+    monkeypatch.setattr(grading_service.settings, "EVALUATION_CACHE_ENABLED", False)
+    monkeypatch.setattr(grading_service.settings, "ANSWER_CLUSTERING_ENABLED", False)
+
+    summary = asyncio.run(run_regrade_job(job.id, batch_size=2))
+
+    assert (summary["status"], summary["processed"], summary["total"]) == ("cancelled", 2, 5)
+    db.expire_all()
+    # The first batch (override + one answer) is regraded, the rest keep their old score
+    assert [attempt.score for attempt in db.query(QuizAttempt).order_by(QuizAttempt.id)] == [3.0, 3.0, 2.0, 2.0, 2.0]
+
+
+def test_regrade_of_a_keyword_scored_attempt_replaces_its_keyword_score(db, make_quiz, monkeypatch, worker_db, slow_evaluator):
+    quiz = make_quiz([("single_choice", ["A"], 1.0), ("free_text", ["x"], 2.0)])
+    choice, question = quiz.questions
+    attempt = submit_quiz_attempt(
+        quiz.id,
+        QuizAttemptCreate(answers={choice.id: ["A"], question.id: "x"}),
+        db=db,
+        current_user=db.get(User, 2)
+    )
+    assert attempt.score == 3.0  # The reference answer scores full marks without the AI
+
+    class HalfMarks(slow_evaluator):
+        async def evaluate_free_text_answer(self, question_text, student_answer, criteria, max_score, question_type, **kwargs):
+            return max_score / 2, "Incomplet", {"version": "test", "ai_generated": True}
+
+    monkeypatch.setattr(grading_service, "get_ai_evaluation_service", lambda: HalfMarks(delay=0))
+    job = create_regrade_job(db, question, created_by=1)
+    asyncio.run(run_regrade_job(job.id))
+
+    db.expire_all()
+    rows = db.query(func.sum(AttemptQuestionScore.score)).filter(AttemptQuestionScore.attempt_id == attempt.id).scalar()
+    assert db.get(QuizAttempt, attempt.id).score == rows == 2.0
+
+
+def test_a_second_regrade_is_refused_while_one_is_pending(db, make_quiz):
+    quiz = make_quiz([("free_text", ["x"], 2.0)])
+    question_id = quiz.questions[0].id
+    professor = db.get(User, 1)
+
+    start_question_regrade(question_id, BackgroundTasks(), db=db, current_user=professor)
+    with pytest.raises(HTTPException) as error:
+        start_question_regrade(question_id, BackgroundTasks(), db=db, current_user=professor)
+    assert error.value.status_code == 409
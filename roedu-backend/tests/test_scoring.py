@@ -0,0 +1,165 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from src.api.v1.ai_evaluation_reports import edit_question_score
+from src.api.v1.quizzes import get_quiz_result, submit_quiz_attempt, update_question
+from src.models.ai_evaluation_report import EvaluationStatus
+from src.models.attempt_question_score import AttemptQuestionScore
+from src.models.quiz import QuizAttempt
+from src.models.user import User
+from src.schemas.ai_evaluation_schema import ReviewReportRequest
+from src.schemas.quiz_schema import QuestionUpdate, QuizAttemptCreate
+from src.services import grading_service
+from src.services.grading_worker import GradingWorker
+from src.services.scoring import FreeTextScoring, get_answer_key, score_answers
+from src.utils.metrics import metrics
+
+
+def test_answer_key_is_cached_until_the_quiz_is_edited(db, make_quiz):
+    quiz = make_quiz([("single_choice", ["A"], 1.0), ("free_text", ["Clorofila"], 2.0)])
+    lookups = lambda: [metrics.get("answer_key_cache_total", outcome=outcome) for outcome in ("miss", "hit")]
+    before = lookups()
+
+    key = get_answer_key(db, quiz.id)
+    assert get_answer_key(db, quiz.id) is key
+    assert [after - count for after, count in zip(lookups(), before)] == [1, 1]
+    assert key.max_score == 3.0
+
+    update_question(
+        quiz.questions[0].id,
+        QuestionUpdate(correct_answers=["B"], points=2.0),
+        db=db,
+        current_user=db.get(User, 1)
+    )
+
+    edited = get_answer_key(db, quiz.id)
+    assert edited is not key and edited.version == key.version + 1
+    assert edited.questions[0].correct == frozenset({"B"})
+    assert edited.max_score == 4.0
+
+
+def test_answer_key_is_immutable(db, make_quiz):
+    quiz = make_quiz([("multiple_choice", ["A", "B"], 1.0)])
+    key = get_answer_key(db, quiz.id)
+
+    with pytest.raises(AttributeError):
+        key.max_score = 10.0
+    with pytest.raises(AttributeError):
+        key.questions[0].points = 10.0
+    with pytest.raises(AttributeError):
+        key.questions[0].extra = True
+
+
+def test_score_answers_precedence(db, make_quiz):
+    quiz = make_quiz([
+        ("single_choice", ["A"], 1.0),
+        ("multiple_choice", ["A", "B"], 2.0),
+        ("free_text", ["Clorofila"], 2.0),
+        ("free_text", ["Clorofila"], 4.0),
+    ])
+    single, multiple, evaluated, unevaluated = (q.id for q in quiz.questions)
+    key = get_answer_key(db, quiz.id)
+    answers = {
+        str(single): ["A"],
+        str(multiple): ["A"],
+        str(evaluated): "Clorofila e verde",
+        str(unevaluated): " clorofila",  # Reference answer, by exact match
+    }
+    reports = {
+        multiple: SimpleNamespace(ai_score=0.0, new_score=1.5),  # Professor override on a grila question
+        evaluated: SimpleNamespace(ai_score=1.2, new_score=None),
+    }
+
+    scores = {
+        mode: score_answers(key, answers, reports, mode) for mode in FreeTextScoring
+    }
+
+    assert scores[FreeTextScoring.KEYWORDS].question_scores == {
+        single: 1.0, multiple: 1.5, evaluated: 1.2, unevaluated: 4.0
+    }
+    assert scores[FreeTextScoring.EVALUATED_ONLY].score == pytest.approx(3.7)
+    deferred = scores[FreeTextScoring.DEFER]
+    assert deferred.pending_questions == [unevaluated]
+    assert [answer.question_id for answer in deferred.free_text_answers] == [unevaluated]
+    assert deferred.max_score == 9.0
+
+
+def test_question_scores_are_materialized_and_read_by_the_result_page(db, make_quiz, monkeypatch, worker_db, submit, slow_evaluator):
+    quiz = make_quiz([("single_choice", ["A"], 1.0), ("free_text", ["x"], 2.0)])
+    single, free_text = (q.id for q in quiz.questions)
+    monkeypatch.setattr(grading_service, "get_ai_evaluation_service", lambda: slow_evaluator(delay=0))
+    stored = lambda: {
+        row.question_id: (row.score, row.source)
+        for row in db.query(AttemptQuestionScore).filter(AttemptQuestionScore.attempt_id == attempt.id)
+    }
+
+    attempt = submit(quiz, {str(single): ["A"], str(free_text): "Clorofila"})
+    assert stored() == {single: (1.0, "auto"), free_text: (0.0, "pending")}
+    assert get_quiz_result(attempt.id, db=db, current_user=db.get(User, 2))["pending_questions"] == [free_text]
+
+    asyncio.run(GradingWorker(workers=1).grade_attempts([attempt.id]))
+    db.expire_all()
+    assert stored() == {single: (1.0, "auto"), free_text: (1.0, "ai")}
+
+    review = ReviewReportRequest(status=EvaluationStatus.RESOLVED, professor_feedback="Răspuns complet, nota maximă", new_score=2.0)
+    edit_question_score(attempt.id, free_text, review, db=db, current_user=db.get(User, 1))
+    db.expire_all()
+    assert stored() == {single: (1.0, "auto"), free_text: (2.0, "professor")}
+    assert attempt.score == 3.0
+
+    # The result page reads the stored scores instead of rescoring the answers
+    db.query(AttemptQuestionScore).filter(AttemptQuestionScore.question_id == single).update({"score": 0.25})
+    db.commit()
+    result = get_quiz_result(attempt.id, db=db, current_user=db.get(User, 2))
+    assert result["question_scores"] == {single: 0.25, free_text: 2.0}
+    assert result["pending_questions"] == []
+
+
+def _stored(db, attempt_id):
+    return {
+        row.question_id: (row.score, row.source)
+        for row in db.query(AttemptQuestionScore).filter(AttemptQuestionScore.attempt_id == attempt_id)
+    }
+
+
+def test_question_edit_rescores_finished_attempts(db, make_quiz):
+    quiz = make_quiz([("single_choice", ["A"], 1.0), ("free_text", ["x"], 2.0)])
+    single, free_text = quiz.questions
+    attempt = submit_quiz_attempt(
+        quiz.id, QuizAttemptCreate(answers={single.id: ["B"], free_text.id: "x"}), db=db, current_user=db.get(User, 2)
+    )
+    open_attempt = QuizAttempt(quiz_id=quiz.id, student_id=2, answers="{}")
+    db.add(open_attempt)
+    db.commit()
+    assert (attempt.score, attempt.max_score) == (2.0, 3.0)
+
+    professor = db.get(User, 1)
+    update_question(single.id, QuestionUpdate(correct_answers=["B"], points=2.0), db=db, current_user=professor)
+    db.expire_all()
+
+    assert _stored(db, attempt.id) == {single.id: (2.0, "auto"), free_text.id: (2.0, "auto")}
+    assert (db.get(QuizAttempt, attempt.id).score, db.get(QuizAttempt, attempt.id).max_score) == (4.0, 4.0)
+    assert _stored(db, open_attempt.id) == {}
+
+    update_question(free_text.id, QuestionUpdate(correct_answers=["y"]), db=db, current_user=professor)
+    db.expire_all()
+    assert _stored(db, attempt.id)[free_text.id] == (0.0, "auto")
+    assert db.get(QuizAttempt, attempt.id).score == 2.0
+
+
+def test_override_keeps_the_keyword_scores_of_other_answers(db, make_quiz):
+    quiz = make_quiz([("free_text", ["x"], 2.0), ("free_text", ["y"], 2.0)])
+    first, second = quiz.questions
+    attempt = submit_quiz_attempt(
+        quiz.id, QuizAttemptCreate(answers={first.id: "x", second.id: "y"}), db=db, current_user=db.get(User, 2)
+    )
+    assert attempt.score == 4.0
+
+    review = ReviewReportRequest(status=EvaluationStatus.RESOLVED, professor_feedback="Răspuns incomplet", new_score=1.0)
+    edit_question_score(attempt.id, first.id, review, db=db, current_user=db.get(User, 1))
+    db.expire_all()
+
+    assert _stored(db, attempt.id) == {first.id: (1.0, "professor"), second.id: (2.0, "auto")}
+    assert db.get(QuizAttempt, attempt.id).score == 3.0
@@ -0,0 +1,114 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy.exc import IntegrityError
+
+from src.api.v1.groups import add_students_to_group
+from src.api.v1.quizzes import prewarm_quiz, start_quiz_attempt
+from src.models.group import Group
+from src.models.quiz import QuizAttempt
+from src.models.student import Student
+from src.models.user import User, UserRole
+from src.schemas.group_schema import GroupAddStudentsRequest
+from src.utils.metrics import metrics
+
+CLASS = range(10, 60)
+
+
+def _group_quiz(db, make_quiz):
+    """A quiz assigned to a group of 50 students (user ids 10-59); student 2 is not in it"""
+    quiz = make_quiz([("single_choice", ["A"], 1.0)])
+    students = []
+    for user_id in CLASS:
+        db.add(User(id=user_id, username=f"elev{user_id}", email=f"elev{user_id}@roedu.ro", hashed_password="x", role=UserRole.STUDENT))
+        students.append(Student(id=user_id))
+    group = Group(name="9A", professor_id=1, students=students)
+    db.add(group)
+    db.flush()
+    quiz.group_id = group.id
+    db.commit()
+    return quiz
+
+
+def test_start_is_idempotent_until_the_attempt_is_submitted(db, make_quiz):
+    quiz = make_quiz([("single_choice", ["A"], 1.0)])
+    student = db.get(User, 2)
+
+    first = start_quiz_attempt(quiz.id, db=db, current_user=student)
+    again = start_quiz_attempt(quiz.id, db=db, current_user=student)
+    assert again.id == first.id and again.deadline_at == first.deadline_at
+
+    db.add(QuizAttempt(quiz_id=quiz.id, student_id=2))
+    with pytest.raises(IntegrityError):
+        db.commit()
+    db.rollback()
+
+    first.completed_at = first.started_at
+    db.commit()
+    with pytest.raises(HTTPException) as error:
+        start_quiz_attempt(quiz.id, db=db, current_user=student)
+    assert error.value.status_code == 403
+
+
+def test_conflicting_start_without_an_open_attempt_is_a_conflict(db, make_quiz, monkeypatch):
+    quiz = make_quiz([("single_choice", ["A"], 1.0)])
+    student = db.get(User, 2)
+
+    def conflict():
+        raise IntegrityError("INSERT INTO quiz_attempts", {}, Exception("UNIQUE constraint failed"))
+    monkeypatch.setattr(db, "commit", conflict)  # The other attempt was submitted (or deleted) meanwhile
+
+    with pytest.raises(HTTPException) as error:
+        start_quiz_attempt(quiz.id, db=db, current_user=student)
+    assert error.value.status_code == 409
+
+
+def test_group_access_is_cached_and_dropped_on_membership_edits(db, make_quiz):
+    quiz = _group_quiz(db, make_quiz)
+
+    with pytest.raises(HTTPException) as error:
+        start_quiz_attempt(quiz.id, db=db, current_user=db.get(User, 2))
+    assert error.value.status_code == 403
+
+    add_students_to_group(quiz.group_id, GroupAddStudentsRequest(student_emails=["elev@roedu.ro"]), db=db)
+    assert start_quiz_attempt(quiz.id, db=db, current_user=db.get(User, 2)).student_id == 2
+
+    with pytest.raises(HTTPException) as error:
+        start_quiz_attempt(quiz.id + 1, db=db, current_user=db.get(User, 2))
+    assert error.value.status_code == 404
+
+
+def test_prewarmed_start_reads_no_quiz_or_group_data(db, make_quiz, count_queries):
+    quiz = _group_quiz(db, make_quiz)
+    assert prewarm_quiz(quiz.id, db=db, current_user=db.get(User, 1)) == {"quiz_id": quiz.id, "students": 50, "questions": 1}
+    with pytest.raises(HTTPException) as error:
+        prewarm_quiz(quiz.id, db=db, current_user=db.get(User, 10))
+    assert error.value.status_code == 403
+
+    student = db.get(User, 10)
+    with count_queries(db.get_bind()) as statements:
+        start_quiz_attempt(quiz.id, db=db, current_user=student)
+    assert len(statements) <= 3, statements  # Attempt lookup, insert, reload
+    assert not any("quizzes" in statement.split("WHERE")[0] or "student_groups" in statement for statement in statements)
+
+
+def test_class_wide_burst_opens_one_attempt_per_student(db, make_quiz, session_factory):
+    quiz = _group_quiz(db, make_quiz)
+    misses = metrics.get("quiz_access_cache_total", outcome="miss")
+
+    def start(user_id):
+        session = session_factory()
+        try:
+            return start_quiz_attempt(quiz.id, db=session, current_user=session.get(User, user_id)).id
+        finally:
+            session.close()
+
+    requests = [user_id for user_id in CLASS for _ in range(4)]  # Double (and quadruple) clicks
+    with ThreadPoolExecutor(max_workers=40) as pool:
+        attempt_ids = list(pool.map(start, requests))
+
+    assert len(attempt_ids) == 200
+    assert len(set(attempt_ids)) == len(CLASS)
+    assert db.query(QuizAttempt).filter(QuizAttempt.quiz_id == quiz.id).count() == len(CLASS)
+    assert metrics.get("quiz_access_cache_total", outcome="miss") == misses + 1
@@ -0,0 +1,99 @@
+import asyncio
+import json
+
+import pytest
+
+from src.schemas.ai_output_schema import FreeTextEvaluation, GeneratedQuiz
+from src.services.ai_evaluation_service import AIEvaluationService
+from src.services.llm_client import GeminiClient, LLMRequest, LLMResponse
+from src.services.quiz_generation_service import QuizGenerationService
+from src.utils.json_repair import parse_json_object
+from src.utils.metrics import metrics
+
+
+@pytest.mark.parametrize("text, expected", [
+    ('```json\n{"a": [1, 2,], "b": {"c": 1,},}\n```', {"a": [1, 2], "b": {"c": 1}}),
+    ('Iată evaluarea: {"feedback": "bine}"} Sper că ajută.', {"feedback": "bine}"}),
+    ('{"score": 3, "strengths": ["clar", "corect', {"score": 3, "strengths": ["clar", "corect"]}),
+    ('{"score": 3, "feedback"', {"score": 3}),
+    ('{"questions": [{"q": 1}, {"q": 2, "options": [1, 2', {"questions": [{"q": 1}, {"q": 2, "options": [1, 2]}]}),
+])
+def test_parse_json_object_repairs_common_defects(text, expected):
+    data, _ = parse_json_object(text)
+    assert data == expected
+
+
+def test_parse_json_object_rejects_text_without_json():
+    with pytest.raises(ValueError):
+        parse_json_object("Nu pot evalua acest răspuns.")
+
+
+def test_gemini_request_uses_structured_output(monkeypatch):
+    monkeypatch.setattr("src.services.llm_client.settings.GEMINI_API_KEY", "test-key")
+    body = GeminiClient()._build_body(LLMRequest(prompt="p", response_schema=GeneratedQuiz.model_json_schema()))
+
+    config = body["generationConfig"]
+    question = config["responseSchema"]["properties"]["questions"]["items"]
+    assert config["responseMimeType"] == "application/json"
+    assert "$ref" not in json.dumps(config["responseSchema"])
+    assert question["properties"]["question_type"]["enum"] == ["single_choice", "multiple_choice", "free_text"]
+    assert question["properties"]["options"] == {"type": "ARRAY", "items": {"type": "STRING"}, "nullable": True}
+
+
+class ScriptedLLM:
+    enabled = True
+
+    def __init__(self, *texts):
+        self.texts = list(texts)
+        self.schemas = []
+
+    async def generate(self, prompt, operation="default", response_schema=None, **kwargs):
+        self.schemas.append(response_schema)
+        return LLMResponse(text=self.texts.pop(0), provider="test", model="test", latency_ms=0.0)
+
+
+def _evaluator(*texts):
+    service = AIEvaluationService()
+    service.llm, service.enabled = ScriptedLLM(*texts), True
+    return service
+
+
+def test_truncated_evaluation_is_repaired_without_retry():
+    metrics.reset()
+    service = _evaluator('{"score": 3, "feedback": "Răspuns bun", "strengths": ["clar"')
+
+    score, feedback, metadata = asyncio.run(service.evaluate_free_text_answer("Q", "A", "fotosinteza", 4.0))
+
+    assert (score, feedback) == (3, "Răspuns bun")
+    assert metadata["repaired_json"] is True
+    assert service.llm.schemas == [FreeTextEvaluation.model_json_schema()]
+    assert metrics.get("llm_parse_total", operation="free_text_evaluation", outcome="repaired") == 1
+
+
+def test_unusable_evaluation_retries_then_falls_back_to_keywords():
+    metrics.reset()
+    service = _evaluator("Nu pot evalua.", '{"feedback": "fără scor"}')
+
+    score, _, metadata = asyncio.run(service.evaluate_free_text_answer("Q", "clorofila si lumina", "clorofila, lumina", 4.0))
+
+    assert metadata["method"] == "keyword_matching"
+    assert score == 4.0
+    assert metrics.get("llm_retries_total", operation="free_text_evaluation") == 1
+    assert metrics.get("llm_parse_total", operation="free_text_evaluation", outcome="invalid") == 2
+    assert 'llm_retries_total{operation="free_text_evaluation"} 1' in metrics.render()
+
+
+def test_quiz_response_is_validated_and_normalized():
+    service = QuizGenerationService()
+    questions = ",".join(
+        json.dumps({"question_text": f"Q{i}", "question_type": "free_text", "correct_answers": "cheie", "points": None})
+        for i in range(3)
+    )
+
+    quiz = service._parse_quiz_response(f'{{"title": "Test", "questions": [{questions},]}}')
+
+    assert quiz["questions"][0] == {
+        "question_text": "Q0", "question_type": "free_text", "correct_answers": ["cheie"], "points": 1.0
+    }
+    with pytest.raises(ValueError):
+        service._parse_quiz_response('{"questions": [{"question_text": "Q", "question_type": "essay"}]}')
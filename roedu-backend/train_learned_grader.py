@@ -0,0 +1,55 @@
+"""
+Train the local learned grader on professor-reviewed scores (CLI)
+
+Needs numpy and scikit-learn: pip install numpy scikit-learn
+
+Examples:
+    python train_learned_grader.py
+    python train_learned_grader.py --min-samples 50
+"""
+import argparse
+import os
+import sys
+
+# Change to the script's directory so the default sqlite path resolves
+script_dir = os.path.dirname(os.path.abspath(__file__))
+os.chdir(script_dir)
+
+from src.config.database import Base, engine
+from src.config.settings import settings
+import src.models  # noqa: F401 - register all tables
+from src.services.learned_grader import SKLEARN_AVAILABLE, train_and_save
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train the learned grader from professor reviews")
+    parser.add_argument("--min-samples", type=int, default=settings.LEARNED_GRADER_MIN_SAMPLES,
+                        help="Minimum reviewed answers for a question model")
+    args = parser.parse_args()
+
+    if not SKLEARN_AVAILABLE:
+        print("❌ scikit-learn not installed. Install with: pip install numpy scikit-learn")
+        sys.exit(1)
+
+    # Create missing tables only - never drop existing data
+    Base.metadata.create_all(bind=engine)
+
+    report = train_and_save(min_samples=args.min_samples)
+    if not report["models"]:
+        print(f"ℹ️  No question has {args.min_samples} reviewed answers yet")
+        return
+
+    for model in report["models"]:
+        print(
+            f"🎓 {model['key']}: {model['samples']} reviews, MAE {model['mae']:.3f} "
+            f"(AI {model['ai_mae']:.3f}), {model['confident_share']:.0%} confident"
+        )
+    print("-" * 50)
+    print(
+        f"Saved {len(report['models'])} models to {settings.LEARNED_GRADER_PATH}: "
+        f"MAE {report['mae']:.3f} vs AI {report['ai_mae']:.3f} on {report['test_samples']} held-out reviews"
+    )
+
+
+if __name__ == "__main__":
+    main()